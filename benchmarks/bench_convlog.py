@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark resuming a session from the conversation log.
+
+Fills logs of increasing size with interleaved sessions, then times restoring
+the recent context window of one session. The naive baseline scans a JSON
+Lines file for the session's messages; the conversation log follows record
+pointers from its index, so its resume time should stay flat as the log grows.
+The log is filled without ``close()``, as a process that exits or crashes
+mid-session would leave it; its open time should still follow the number of
+sessions, not of messages.
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Add the src directory to the path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from agent.settings import ConversationLogConfig
+from agent.convlog import ConversationLog
+
+SESSIONS = 500
+WINDOW = 12
+ANSWER = "Ah, Batman Returns—what a wonderfully dark playground that was to create in! " * 3
+
+
+def fill(directory, messages):
+    log = ConversationLog(ConversationLogConfig(path=os.path.join(directory, "log")))
+    jsonl_path = os.path.join(directory, "naive.jsonl")
+    with open(jsonl_path, "w") as jsonl:
+        for i in range(messages // 2):
+            session_id = f"session-{i % SESSIONS}"
+            log.append_exchange(session_id, f"question {i}", ANSWER, "Michelle Pfeiffer")
+            for role, text in (("user", f"question {i}"), ("assistant", ANSWER)):
+                jsonl.write(json.dumps({"session": session_id, "role": role, "content": text}) + "\n")
+    return jsonl_path
+
+
+def naive_resume(jsonl_path, session_id):
+    with open(jsonl_path) as f:
+        messages = [m for m in map(json.loads, f) if m["session"] == session_id]
+    return messages[-WINDOW:]
+
+
+def timed(fn, *args, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main():
+    print(f"Resume benchmark ({SESSIONS} interleaved sessions, {WINDOW}-message window)")
+    print(f"{'messages':>10} {'naive ms':>10} {'index KiB':>10} {'log open ms':>12} {'log resume ms':>14}")
+    for messages in (10_000, 100_000, 500_000):
+        with tempfile.TemporaryDirectory() as directory:
+            jsonl_path = fill(directory, messages)
+            config = ConversationLogConfig(path=os.path.join(directory, "log"))
+            session_id = "session-7"
+
+            index_kib = os.path.getsize(os.path.join(config.path, "index.bin")) / 1024
+            log = ConversationLog(config)
+            opened = timed(lambda: ConversationLog(config).open().close(), repeat=3)
+            resumed = timed(log.recent, session_id, WINDOW)
+            naive = timed(naive_resume, jsonl_path, session_id, repeat=1)
+            assert [r.text for r in log.recent(session_id, WINDOW)] == [m["content"] for m in naive_resume(jsonl_path, session_id)]
+            log.close()
+            print(f"{messages:>10,} {naive:>10.1f} {index_kib:>10.1f} {opened:>12.2f} {resumed:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark the agent daemon's client round trip against cold interpreter start.
+
+Measures, against the stub model (no API calls):
+- ping round trip over the Unix socket (pure transport overhead);
+- a cached turn served by the daemon vs the same turn run in-process;
+- starting a fresh interpreter that builds an agent vs starting the thin client.
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# Add the src directory to the path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from agents import RunConfig
+
+from agent.client import AgentClient, SOCKET_ENV
+from agent.daemon import AgentDaemon, execute
+from agent.metrics import LatencyWindow
+from agent.settings import DaemonConfig
+from agent.stub_model import StubModelProvider
+
+ROUNDS = 500
+STARTS = 5
+SRC = os.path.join(os.path.dirname(__file__), '..', 'src')
+
+
+def timed(fn, rounds):
+    window = LatencyWindow(rounds)
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        window.add(time.perf_counter() - started)
+    return window
+
+
+def process_start(args):
+    window = LatencyWindow(STARTS)
+    for _ in range(STARTS):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, *args], check=False, capture_output=True)
+        window.add(time.perf_counter() - started)
+    return window
+
+
+def row(label, window):
+    print(f"{label:<40} {window.percentile(50) * 1000:>9.2f} {window.percentile(99) * 1000:>9.2f}")
+
+
+def main():
+    directory = tempfile.mkdtemp(prefix="agentd", dir="/tmp")
+    path = os.path.join(directory, "agentd.sock")
+    run_config = RunConfig(model_provider=StubModelProvider(ttft=0.0, token_delay=0.0, answer_tokens=40), tracing_disabled=True)
+    daemon = AgentDaemon(DaemonConfig(preload=["obama"]), path=path, warm=False, run_config=run_config)
+    thread = daemon.serve_in_thread()
+    client = AgentClient(path)
+    question = "What were Michelle Obama's major initiatives as First Lady?"
+    client.run("obama", question)  # fill the response cache
+
+    print(f"Agent daemon benchmark ({ROUNDS} requests, {STARTS} process starts)")
+    print(f"{'':<40} {'p50 ms':>9} {'p99 ms':>9}")
+    row("ping round trip", timed(client.ping, ROUNDS))
+    row("cached turn via daemon", timed(lambda: client.run("obama", question), ROUNDS))
+    row("cached turn in-process", timed(lambda: execute({"agent": "obama", "input": question}, run_config=run_config), ROUNDS))
+
+    os.environ[SOCKET_ENV] = path  # for the client started below
+    cold = [
+        "-c",
+        f"import sys; sys.path.append({SRC!r}); from agent.registry import get_agent; get_agent('obama')",
+    ]
+    row("cold interpreter + build agent", process_start(cold))
+    row("thin client start + ping", process_start([os.path.join(SRC, "agent", "client.py"), "--ping"]))
+
+    client.close()
+    daemon.stop()
+    thread.join(5)
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
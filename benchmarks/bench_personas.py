@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark persona catalogue start-up time and memory as the catalogue grows.
+
+Writes N synthetic personas (the size of the Michelle Pfeiffer persona, each
+handing off to two others) and compares validating them all eagerly, as an
+inline `agents:` section does, against opening the indexed catalogue and
+building one agent with its handoff targets.
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import yaml
+
+# Add the src directory to the path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from agent.settings import settings, PersonaConfig, AgentConfig
+from agent.personas import PersonaCatalogue, write_index
+
+
+def write_personas(directory, count, instructions):
+    for i in range(count):
+        persona = {
+            "name": f"Persona {i}",
+            "emoji": "🎬",
+            "handoffs": [f"persona_{(i + 1) % count}", f"persona_{(i + 2) % count}"],
+            "instructions": instructions,
+        }
+        with open(os.path.join(directory, f"persona_{i}.yaml"), "w") as f:
+            yaml.safe_dump(persona, f, allow_unicode=True)
+
+
+def eager(directory):
+    configs = {}
+    for filename in os.listdir(directory):
+        if filename.endswith(".yaml"):
+            with open(os.path.join(directory, filename)) as f:
+                configs[filename[:-5]] = AgentConfig(**yaml.safe_load(f))
+    return configs
+
+
+def catalogue(directory):
+    personas = PersonaCatalogue(PersonaConfig(directory=directory, index=os.path.join(directory, "index.json")))
+    first = personas["persona_0"]
+    for key in personas.handoffs("persona_0"):
+        personas[key]
+    return personas, first
+
+
+def measure(builder, *args):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = builder(*args)
+    elapsed = time.perf_counter() - started
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return elapsed, memory
+
+
+def main():
+    instructions = settings.get_agent_config("michelle").instructions
+    print("Persona catalogue benchmark (open + build one agent with its handoffs)")
+    print(f"{'personas':>10} {'eager ms':>10} {'eager KB':>10} {'catalogue ms':>13} {'catalogue KB':>13}")
+    for count in (100, 1_000, 5_000):
+        with tempfile.TemporaryDirectory() as directory:
+            write_personas(directory, count, instructions)
+            write_index(directory, os.path.join(directory, "index.json"))
+            eager_time, eager_memory = measure(eager, directory)
+            lazy_time, lazy_memory = measure(catalogue, directory)
+            print(
+                f"{count:>10} {eager_time * 1000:>10.1f} {eager_memory / 1024:>10,.0f} "
+                f"{lazy_time * 1000:>13.1f} {lazy_memory / 1024:>13,.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
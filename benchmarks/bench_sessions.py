@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark memory per conversation session.
+
+Compares the compact session store against a naive representation where each
+session keeps a copy of the agent instructions and plain message dicts, and
+reports bytes per session at 1k and 10k sessions.
+"""
+import os
+import sys
+import tempfile
+import tracemalloc
+
+# Add the src directory to the path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from agent.settings import settings, SessionConfig
+from agent.sessions import SessionStore, ROLE_ASSISTANT, ROLE_USER
+
+TURNS = [
+    ("Tell me about Batman Returns", "Ah, Batman Returns—what a wonderfully dark playground that was to create in! " * 4),
+    ("What about The Age of Innocence?", "Ah, The Age of Innocence. That project is very dear to me. " * 4),
+    ("How do you approach character development?", "Every role teaches you something new about yourself. " * 4),
+    ("What's your favorite acting technique?", "Listening, really listening to the other actor. " * 4),
+]
+
+
+def build_naive(count, instructions):
+    sessions = []
+    for _ in range(count):
+        session = {"instructions": "".join(list(instructions)), "messages": []}
+        for question, answer in TURNS * 3:
+            session["messages"].append({"role": "user", "content": "".join(list(question))})
+            session["messages"].append({"role": "assistant", "content": "".join(list(answer))})
+        sessions.append(session)
+    return sessions
+
+
+def build_compact(count, instructions, spill_dir):
+    store = SessionStore(SessionConfig(max_resident=count, spill_dir=spill_dir))
+    for _ in range(count):
+        session = store.create("michelle", instructions)
+        for question, answer in TURNS * 3:
+            session.append(ROLE_USER, "".join(list(question)))
+            session.append(ROLE_ASSISTANT, "".join(list(answer)))
+    return store
+
+
+def measure(builder, *args):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = builder(*args)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return after - before
+
+
+def main():
+    instructions = settings.get_agent_config("michelle").instructions
+    print("Session memory benchmark (12 exchanges per session)")
+    print(f"{'sessions':>10} {'naive B/session':>16} {'compact B/session':>18} {'ratio':>7}")
+    with tempfile.TemporaryDirectory() as spill_dir:
+        for count in (1_000, 10_000):
+            naive = measure(build_naive, count, instructions) / count
+            compact = measure(build_compact, count, instructions, spill_dir) / count
+            print(f"{count:>10} {naive:>16,.0f} {compact:>18,.0f} {naive / compact:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark the cost of telemetry on the request path.
+
+Measures the per-span cost of queueing a span with the background flusher
+running, compares it with writing each span synchronously, and checks that a
+stalled exporter makes the pipeline drop spans instead of blocking. The result
+is compared with ``telemetry.overhead_budget_us`` from settings.yaml.
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Add the src directory to the path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from agent.settings import settings
+from agent.telemetry import Telemetry
+
+SPANS = 50_000
+ATTRIBUTES = {"agent_key": "michelle", "agent_name": "Tim Burton", "source": "model", "ttft": 0.42, "hedged": False}
+
+
+def per_span_us(fn, count=SPANS):
+    started = time.perf_counter()
+    for _ in range(count):
+        fn()
+    return (time.perf_counter() - started) / count * 1e6
+
+
+def main():
+    budget = settings.telemetry_config.overhead_budget_us
+    with tempfile.TemporaryDirectory() as directory:
+        config = settings.telemetry_config.model_copy(update={"enabled": True, "path": directory})
+        sink = Telemetry(config)
+        now = time.time()
+        queued = per_span_us(lambda: sink.record("turn", now, now, ATTRIBUTES))
+        sink.shutdown()
+
+        sink = Telemetry(config)
+
+        def with_span():
+            with sink.span("turn", **ATTRIBUTES):
+                pass
+        context = per_span_us(with_span)
+        sink.shutdown()
+
+        path = os.path.join(directory, "sync.jsonl")
+
+        def synchronous():
+            with open(path, "a") as f:
+                f.write(json.dumps({"name": "turn", "start": now, "end": now, "attributes": ATTRIBUTES}) + "\n")
+        sync = per_span_us(synchronous, 5_000)
+
+        stalled = Telemetry(config.model_copy(update={"buffer_size": 1000, "flush_interval": 3600, "batch_size": 10**9}))
+        stalled._start = lambda: None  # no flusher: the buffer can only fill up
+        worst = 0.0
+        for _ in range(5_000):
+            started = time.perf_counter()
+            stalled.record("turn", now, now, ATTRIBUTES)
+            worst = max(worst, time.perf_counter() - started)
+
+    print(f"Telemetry overhead per span ({SPANS:,} spans, budget {budget:.0f} µs)")
+    print(f"  queue record()        {queued:8.2f} µs  {'✓' if queued <= budget else '✗ over budget'}")
+    print(f"  span() context        {context:8.2f} µs  {'✓' if context <= budget else '✗ over budget'}")
+    print(f"  synchronous write     {sync:8.2f} µs")
+    print(f"  stalled exporter      {stalled.dropped:,} of 5,000 dropped, worst record() {worst * 1e6:.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
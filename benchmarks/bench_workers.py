@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark building the persona index in-process against the worker pool.
+
+Writes N synthetic personas (the size of the Michelle Pfeiffer persona) and
+builds the index from inside a running event loop, the way a long-lived
+process such as the daemon would. In-process, parsing and validating holds the
+GIL and the loop stalls for the whole build; through the pool the loop keeps
+ticking, and with more than one core the build itself runs in parallel.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# Add the src directory to the path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.dirname(__file__))
+
+from bench_personas import write_personas
+from agent.personas import index_personas, build_index
+from agent.settings import settings
+from agent.workers import WorkerPool
+
+TICK = 0.01
+
+
+async def measure(build):
+    """Wall time of ``build()`` and the longest stall of a 10 ms ticker running beside it."""
+    loop = asyncio.get_running_loop()
+    lag = 0.0
+    done = asyncio.Event()
+
+    async def ticker():
+        nonlocal lag
+        while not done.is_set():
+            expected = loop.time() + TICK
+            await asyncio.sleep(TICK)
+            lag = max(lag, loop.time() - expected)
+
+    task = asyncio.ensure_future(ticker())
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    await build()
+    elapsed = time.perf_counter() - started
+    done.set()
+    await task
+    return elapsed, lag
+
+
+def main():
+    instructions = settings.agent_configs["michelle"].instructions
+    pool = WorkerPool(settings.worker_config.model_copy(update={"inline_threshold": 0, "chunk_size": 64}))
+    print(f"Persona index build ({pool.processes} worker processes, {os.cpu_count()} CPUs)")
+    print(f"{'personas':>10} {'inline s':>10} {'loop stall ms':>14} {'pool s':>10} {'loop stall ms':>14}")
+    asyncio.run(pool.run(len, []))  # Start the workers outside the timings
+
+    async def inline(directory):
+        build_index(directory)
+
+    for count in (500, 2000, 5000):
+        with tempfile.TemporaryDirectory() as directory:
+            write_personas(directory, count, instructions)
+            inline_s, inline_lag = asyncio.run(measure(lambda: inline(directory)))
+            pool_s, pool_lag = asyncio.run(measure(lambda: index_personas(directory, pool)))
+            print(f"{count:>10} {inline_s:>10.2f} {inline_lag * 1000:>14.1f} {pool_s:>10.2f} {pool_lag * 1000:>14.1f}")
+    pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""Session-level agent affinity.
+
+Once a conversation has been handed to a director, a follow-up such as "and
+how did you design her costume?" is meant for that director. Without affinity
+every turn re-enters the entry agent (Michelle), which spends a triage model
+call only to hand the conversation straight back. With affinity, follow-ups
+start at the agent that answered last.
+
+A local topic-shift detector (no model call) decides when a message should go
+back through the entry agent instead. Every persona's vocabulary comes from its
+instructions: a message shifts when it matches another persona's distinctive
+words better than the current agent's words and the recent exchange, when it
+asks for another persona by name ("can I talk to Michelle?"), or when it shares
+nothing with the current agent and reads as a new question rather than a
+follow-up. Per-session counts show how many triage calls affinity saved.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Optional, Set, Tuple
+
+from agent.registry import find_agent
+from agent.sessions import session_store, Session, ROLE_ASSISTANT
+from agent.settings import settings, AffinityConfig
+from agent.tokens import tokenize
+
+# Words (and pleasantries) that carry no topic
+STOPWORDS = frozenset("""
+a about after again all also am an and any are as ask at be been being but by can could did do does doing
+for from get had has have having he her here hers him his how i if in into is it its just know like me more
+most my no not now of on one or our out over please really said say she so some tell than that the their them
+then there these they this those to too us very was we were what when where which while who why will with
+would you your yours
+thanks thank great cool okay wow nice interesting wonderful amazing fascinating lovely
+""".split())
+
+# Phrases that mark a message as continuing the current thread
+FOLLOW_UP_CUES = (
+    "and", "also", "what about", "how about", "tell me more", "more about", "why", "how did", "did you",
+    "was it", "were you", "she", "her", "he", "him", "it", "that", "those", "this", "they", "them",
+)
+
+# Phrases that ask for someone else, when followed by another persona's name
+RETURN_CUES = ("back to", "talk to", "talk with", "speak to", "speak with", "switch to", "ask", "hand me")
+
+
+def _stem(word: str) -> str:
+    if len(word) > 4 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def content_words(text: str) -> Set[str]:
+    """Lowercase topic words of a text: no stopwords, punctuation or short words."""
+    return {_stem(word) for word in tokenize(text) if word.isalpha() and len(word) > 2 and word not in STOPWORDS}
+
+
+def detect_shift(
+    text: str,
+    current: str,
+    vocabularies: Dict[str, FrozenSet[str]],
+    names: Dict[str, FrozenSet[str]],
+    context: Set[str] = frozenset(),
+) -> Tuple[bool, str]:
+    """Decide whether a message leaves the current agent's topic.
+
+    ``vocabularies`` and ``names`` map every persona in the conversation's
+    handoff graph to its topic words and name words. Returns whether to go
+    back to the entry agent and the reason.
+    """
+    words = content_words(text)
+    padded = f" {' '.join(tokenize(text))} "
+    others = [key for key in vocabularies if key != current]
+    if any(f" {cue} " in padded for cue in RETURN_CUES):
+        for key in others:
+            if words & names.get(key, frozenset()):
+                return True, f"asked for {key}"
+    own = vocabularies.get(current, frozenset())
+    current_hits = len(words & (own | context))
+    best, best_hits = None, 0
+    for key in others:
+        hits = len(words & (vocabularies[key] - own))
+        if hits > best_hits:
+            best, best_hits = key, hits
+    if best_hits > current_hits:
+        return True, f"topic of {best}"
+    if current_hits or not words:
+        return False, "same topic"
+    if any(f" {cue} " in padded for cue in FOLLOW_UP_CUES):
+        return False, "follow-up"
+    return True, "new topic"
+
+
+@dataclass
+class AffinityStats:
+    """How one session's turns were routed."""
+    turns: int = 0
+    direct: int = 0  # Follow-ups sent straight to the last agent (triage calls saved)
+    shifts: int = 0  # Follow-ups sent back through the entry agent
+
+
+class SessionAffinity:
+    """Routes follow-ups to the agent that answered the previous turn."""
+
+    def __init__(self, config: Optional[AffinityConfig] = None):
+        self.config = config or AffinityConfig()
+        self._vocabularies: Dict[str, FrozenSet[str]] = {}
+        self._names: Dict[str, FrozenSet[str]] = {}
+        self.sessions: Dict[str, AffinityStats] = {}
+
+    def _persona(self, key: str) -> None:
+        if key not in self._vocabularies:
+            config = settings.agent_configs[key]
+            self._names[key] = frozenset(content_words(config.name))
+            self._vocabularies[key] = frozenset(content_words(config.instructions)) | self._names[key]
+
+    def _last_agent(self, session: Session) -> Optional[str]:
+        messages = session.messages or session.history()
+        for message in reversed(messages):
+            if message.role == ROLE_ASSISTANT:
+                try:
+                    return session_store.instructions.agent_key(message.agent_id)
+                except IndexError:  # session from another store
+                    return None
+        return None
+
+    def _context(self, session: Session) -> Set[str]:
+        recent = session.messages[-self.config.context_messages:] if self.config.context_messages else []
+        words: Set[str] = set()
+        for message in recent:
+            words |= content_words(message.text)
+        return words
+
+    def route(self, agent, agent_key: str, session: Optional[Session], user_input) -> Tuple[Optional[object], Optional[str]]:
+        """The agent to start this turn at (None for the entry agent) and the decision taken."""
+        if not self.config.enabled or session is None or not len(session) or not isinstance(user_input, str):
+            return None, None
+        graph = settings.handoff_graph
+        if agent_key not in graph.reachable or not graph.targets(agent_key):
+            return None, None
+        stats = self.sessions.setdefault(session.session_id, AffinityStats())
+        stats.turns += 1
+        current = self._last_agent(session)
+        if current is None or current == agent_key:
+            return None, None
+        keys = graph.order(agent_key)
+        if current not in keys:
+            return None, None
+        target = find_agent(agent, settings.agent_configs.display_name(current))
+        if target is None:
+            return None, None
+        for key in keys:
+            self._persona(key)
+        shift, _ = detect_shift(
+            user_input,
+            current,
+            {key: self._vocabularies[key] for key in keys},
+            {key: self._names[key] for key in keys},
+            self._context(session),
+        )
+        if shift:
+            stats.shifts += 1
+            return None, "shift"
+        stats.direct += 1
+        return target, "affinity"
+
+    def stats(self) -> Dict[str, float]:
+        sessions = len(self.sessions)
+        direct = sum(s.direct for s in self.sessions.values())
+        return {
+            "sessions": sessions,
+            "turns": sum(s.turns for s in self.sessions.values()),
+            "direct": direct,
+            "shifts": sum(s.shifts for s in self.sessions.values()),
+            "triage_saved_per_session": round(direct / sessions, 2) if sessions else 0.0,
+        }
+
+    def report(self, session_id: str) -> str:
+        stats = self.sessions.get(session_id, AffinityStats())
+        return (
+            f"🧭 Affinity: {stats.direct} follow-ups went straight to the last agent "
+            f"({stats.direct} triage calls saved), {stats.shifts} went back to triage"
+        )
+
+
+# Global session affinity (used by run_turn for sessions with handoffs)
+session_affinity = SessionAffinity(settings.affinity_config)
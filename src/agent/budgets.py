@@ -0,0 +1,198 @@
+"""Adaptive response budgets.
+
+``model.max_tokens`` is a ceiling, not a target: a factual one-liner and a
+request for a detailed walkthrough would otherwise get the same budget and
+the same instructions, and the model happily fills it. Before each turn a
+local classifier scores the query from cheap lexical features (no model call)
+and picks a tier. The tier's ``max_tokens`` and temperature go into the run's
+model settings and its instruction suffix is appended to the instructions of
+every agent in the run, handoff targets included.
+
+Per-tier latency and output tokens are kept so the effect of the tiers can be
+checked, and each turn's tier is recorded on its telemetry span.
+"""
+
+import dataclasses
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+from agents import ModelSettings, RunConfig
+from agents.run_config import ModelInputData
+
+from agent.metrics import LatencyWindow
+from agent.settings import settings, ResponseBudgetConfig
+from agent.tokens import tokenize
+
+TIER_ORDER = ("short", "medium", "long")
+
+# Phrases that signal how much answer the user expects; positive asks for more
+LENGTH_CUES = {
+    "walk me through": 2,
+    "step by step": 2,
+    "in detail": 2,
+    "elaborate": 2,
+    "compare": 2,
+    "write": 2,
+    "story": 2,
+    "poem": 2,
+    "essay": 2,
+    "explain": 1,
+    "describe": 1,
+    "tell me about": 1,
+    "how do you approach": 1,
+    "why": 1,
+    "what year": -2,
+    "when did": -2,
+    "when was": -2,
+    "who directed": -2,
+    "who played": -2,
+    "how many": -2,
+    "how old": -2,
+    "briefly": -2,
+    "quick question": -2,
+    "in one sentence": -3,
+    "yes or no": -3,
+    "short": -1,
+}
+FACTOID_OPENERS = {"who", "when", "where", "which", "is", "was", "did", "does", "are", "were"}
+
+
+def _last_user_text(user_input) -> str:
+    if isinstance(user_input, str):
+        return user_input
+    for item in reversed(user_input):
+        if isinstance(item, dict) and item.get("role") == "user":
+            return str(item.get("content", ""))
+    return ""
+
+
+def classify_query(text: str) -> Tuple[str, Dict[str, Any]]:
+    """Pick a response tier for a query; returns the tier and the features used."""
+    words = [token for token in tokenize(text) if token.isalnum()]
+    padded = f" {' '.join(words)} "
+    cues = {cue: weight for cue, weight in LENGTH_CUES.items() if f" {cue} " in padded}
+    score = sum(cues.values())
+    if words and words[0] in FACTOID_OPENERS:
+        score -= 1
+    # Length only tips the balance when no phrase said how much is wanted
+    if not cues and len(words) <= 6:
+        score -= 1
+    elif len(words) >= 25:
+        score += 1
+    if text.count("?") > 1:
+        score += 1
+    tier = "short" if score <= -2 else "long" if score >= 2 else "medium"
+    return tier, {"words": len(words), "cues": sorted(cues), "score": score}
+
+
+@dataclass
+class Budget:
+    """The response budget chosen for one turn."""
+    tier: str
+    max_tokens: int
+    temperature: Optional[float] = None
+    instruction_suffix: str = ""
+    features: Dict[str, Any] = field(default_factory=dict)
+
+
+class ResponseBudgets:
+    """Chooses per-turn budgets and tracks how each tier performs."""
+
+    def __init__(self, config: Optional[ResponseBudgetConfig] = None, max_tokens: Optional[int] = None):
+        self.config = config or ResponseBudgetConfig()
+        self.max_tokens = max_tokens
+        self._latency: Dict[str, LatencyWindow] = {}
+        self._output_tokens: Dict[str, int] = {}
+
+    def _clamp(self, agent_key: str, tier: str) -> str:
+        limits = self.config.agents.get(agent_key, {})
+        index = TIER_ORDER.index(tier)
+        if "min_tier" in limits:
+            index = max(index, TIER_ORDER.index(limits["min_tier"]))
+        if "max_tier" in limits:
+            index = min(index, TIER_ORDER.index(limits["max_tier"]))
+        return TIER_ORDER[index]
+
+    def plan(self, agent_key: str, user_input) -> Optional[Budget]:
+        """Choose the budget for a turn, or None when budgets are disabled."""
+        if not self.config.enabled:
+            return None
+        tier, features = classify_query(_last_user_text(user_input))
+        tier = self._clamp(agent_key, tier)
+        tier_config = self.config.tiers[tier]
+        max_tokens = tier_config.max_tokens
+        if self.max_tokens:
+            max_tokens = min(max_tokens, self.max_tokens)
+        return Budget(tier, max_tokens, tier_config.temperature, tier_config.instruction_suffix, features)
+
+    @staticmethod
+    def apply(budget: Optional[Budget], run_kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Return run kwargs whose run config enforces the budget."""
+        if budget is None:
+            return run_kwargs
+        run_config = run_kwargs.get("run_config") or RunConfig()
+        overrides = ModelSettings(max_tokens=budget.max_tokens, temperature=budget.temperature)
+        model_settings = (run_config.model_settings or ModelSettings()).resolve(overrides)
+        input_filter = run_config.call_model_input_filter
+        if budget.instruction_suffix:
+            input_filter = _suffix_filter(budget.instruction_suffix, input_filter)
+        run_config = dataclasses.replace(
+            run_config, model_settings=model_settings, call_model_input_filter=input_filter
+        )
+        return dict(run_kwargs, run_config=run_config)
+
+    def record(self, budget: Optional[Budget], elapsed: float, output_tokens: Optional[int] = None) -> None:
+        """Note how long a turn on this budget took."""
+        if budget is None:
+            return
+        self._latency.setdefault(budget.tier, LatencyWindow()).add(elapsed)
+        if output_tokens:
+            self._output_tokens[budget.tier] = self._output_tokens.get(budget.tier, 0) + output_tokens
+
+    def stats(self) -> Dict[str, Any]:
+        """Turn count, latency and mean output tokens per tier."""
+        stats = {}
+        for tier in TIER_ORDER:
+            window = self._latency.get(tier)
+            if window is None:
+                continue
+            summary = window.summary()
+            summary["mean_output_tokens"] = self._output_tokens.get(tier, 0) / window.count
+            stats[tier] = summary
+        return stats
+
+    def report(self) -> str:
+        stats = self.stats()
+        lines = [f"📏 Response budgets: {sum(s['count'] for s in stats.values())} turns"]
+        for tier, s in stats.items():
+            lines.append(
+                f"   {tier:<7} {s['count']} turns  p50 {s['p50']:.2f} s  p95 {s['p95']:.2f} s  "
+                f"~{s['mean_output_tokens']:.0f} output tokens"
+            )
+        return "\n".join(lines)
+
+
+def _suffix_filter(suffix: str, inner=None):
+    """A call_model_input_filter appending the tier's suffix to every agent's instructions."""
+
+    async def append_suffix(data) -> ModelInputData:
+        model_data = data.model_data
+        if inner is not None:
+            model_data = inner(data)
+            if hasattr(model_data, "__await__"):
+                model_data = await model_data
+        instructions = f"{model_data.instructions}\n\n{suffix}" if model_data.instructions else suffix
+        return ModelInputData(input=model_data.input, instructions=instructions)
+
+    return append_suffix
+
+
+def output_tokens(outcome) -> Optional[int]:
+    """Output tokens used by a run, when the outcome carries its result."""
+    result = getattr(outcome, "result", None)
+    usage = getattr(getattr(result, "context_wrapper", None), "usage", None)
+    return getattr(usage, "output_tokens", None)
+
+
+# Global response budget planner
+response_budgets = ResponseBudgets(settings.response_budget_config, settings.model_max_tokens)
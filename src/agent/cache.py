@@ -0,0 +1,377 @@
+"""Response and routing caches for agent turns.
+
+The response cache keeps whole answers to opening questions (a turn with no
+conversation history before it), keyed by agent and normalised prompt. The
+routing cache remembers which agent finally answered a prompt, so a repeat of
+it can start at that agent and skip the triage call that would hand it off.
+
+Both are bounded LRU maps with a time-to-live, filled by ordinary turns and
+ahead of time by the warm-up stage (see ``agent.warmup``).
+
+With ``caches.shared`` configured, each map is the first tier of a
+``TieredCache``. The second tier is a key-value store shared by every node
+(see ``agent.kvstore``), so an answer one node paid for is served on all of
+them. Shared entries carry their write time, so they expire on the same
+schedule everywhere. Larger entries are compressed. Their keys include a hash
+of the agent's configuration (instructions, handoff targets, model settings),
+so changing an agent moves it to a fresh namespace on every node at once. When
+several nodes miss the same opening question together, the first one claims it
+and the others wait briefly for its answer instead of all calling the model.
+Backend errors only cost the shared tier: it is skipped for a while and the
+local tier keeps working.
+"""
+
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Set, Tuple
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+from agent.kvstore import KVError, MemoryKV, RedisKV
+from agent.registry import get_agent
+from agent.settings import settings, SharedCacheConfig
+from agent.tokens import tokenize
+
+
+def prompt_key(agent_key: str, prompt: str) -> Tuple[str, str]:
+    """Cache key for a prompt: the agent plus its lowercase words."""
+    return agent_key, " ".join(tokenize(prompt))
+
+
+class TTLCache:
+    """Thread-safe LRU map whose entries expire after ``ttl`` seconds."""
+
+    remote = False  # Lookups never leave the process
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any, bool]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.warmed = 0
+        self.warm_hits = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, value, warm = entry
+            if self._clock() - stored_at > self.ttl:
+                del self._entries[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            if warm:
+                self.warm_hits += 1
+            return value
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Whether a fresh entry exists (without counting a lookup)."""
+        entry = self._entries.get(key)
+        return entry is not None and self._clock() - entry[0] <= self.ttl
+
+    def put(self, key: Hashable, value: Any, warm: bool = False, age: float = 0.0) -> None:
+        """Store a value; ``age`` is how long ago it was computed (for entries from the shared tier)."""
+        with self._lock:
+            self._entries[key] = (self._clock() - age, value, warm)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            if warm:
+                self.warmed += 1
+
+    def release(self, key: Hashable) -> None:
+        """Give up the claim on a key whose answer will not be stored (only tiered caches claim keys)."""
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "warmed": self.warmed,
+            "warm_hits": self.warm_hits,
+            "hit_rate": round(self.hit_rate(), 3),
+        }
+
+
+def _describe(agent, seen: Set[int]) -> list:
+    """What in an agent (and its handoff targets) shapes its answers."""
+    if id(agent) in seen:
+        return []
+    seen.add(id(agent))
+    instructions = agent.instructions
+    if not isinstance(instructions, str):
+        instructions = getattr(instructions, "__qualname__", repr(instructions))
+    model = agent.model if isinstance(agent.model, str) or agent.model is None else type(agent.model).__name__
+    described = [[agent.name, instructions, agent.handoff_description, model]]
+    for handoff in agent.handoffs:
+        target = handoff if hasattr(handoff, "instructions") else None
+        if target is None:
+            described.append([getattr(handoff, "agent_name", ""), getattr(handoff, "tool_description", "")])
+        else:
+            described.extend(_describe(target, seen))
+    return described
+
+
+_config_hashes: Dict[str, str] = {}
+
+
+def config_hash(agent_key: str) -> str:
+    """Short hash of an agent's configuration: the shared cache namespace for its entries."""
+    if agent_key not in _config_hashes:
+        try:
+            agents = _describe(get_agent(agent_key), set())
+        except KeyError:
+            agents = [[agent_key]]
+        described = {
+            "agents": agents,
+            "model": [settings.model_name, settings.model_temperature, settings.model_max_tokens],
+        }
+        encoded = json.dumps(described, sort_keys=True, default=str).encode("utf-8")
+        _config_hashes[agent_key] = hashlib.blake2b(encoded, digest_size=6).hexdigest()
+    return _config_hashes[agent_key]
+
+
+_RAW, _ZLIB, _ZSTD = b"0", b"1", b"2"
+
+
+class TieredCache:
+    """A local ``TTLCache`` in front of a shared key-value backend."""
+
+    remote = True  # Misses go to the backend (and may wait on another node)
+
+    def __init__(
+        self,
+        local: TTLCache,
+        backend,
+        kind: str,
+        config: Optional[SharedCacheConfig] = None,
+        stampede: bool = False,
+        namespace: Callable[[str], str] = config_hash,
+        clock=time.time,
+    ):
+        self.local = local
+        self.backend = backend
+        self.kind = kind
+        self.config = config or SharedCacheConfig()
+        self.stampede = stampede
+        self._namespace = namespace
+        self._clock = clock
+        self._owner = f"{socket.gethostname()}:{os.getpid()}".encode("utf-8")
+        self._claimed: Set[str] = set()
+        self._lock = threading.Lock()
+        self._skip_until = 0.0
+        self.shared_hits = 0
+        self.shared_misses = 0
+        self.shared_errors = 0
+        self.stampede_waits = 0
+        self.stampede_served = 0
+        self.bytes_raw = 0
+        self.bytes_stored = 0
+
+    @property
+    def ttl(self) -> float:
+        return self.local.ttl
+
+    def shared_key(self, key: Hashable) -> str:
+        if isinstance(key, tuple) and key and isinstance(key[0], str):
+            agent_key, rest = key[0], key[1:]
+        else:
+            agent_key, rest = "", (key,)
+        digest = hashlib.blake2b("\x1f".join(map(str, rest)).encode("utf-8"), digest_size=16).hexdigest()
+        return f"{self.config.prefix}:{self.kind}:{agent_key}:{self._namespace(agent_key) if agent_key else '-'}:{digest}"
+
+    # Encoding
+
+    def encode(self, value: Any) -> bytes:
+        data = json.dumps({"v": value, "t": self._clock()}, ensure_ascii=False).encode("utf-8")
+        if len(data) < self.config.compress_min_bytes:
+            codec, stored = _RAW, data
+        elif self.config.compression == "zstd" and zstandard is not None:
+            codec, stored = _ZSTD, zstandard.ZstdCompressor(level=3).compress(data)
+        else:
+            codec, stored = _ZLIB, zlib.compress(data, 6)
+        with self._lock:
+            self.bytes_raw += len(data)
+            self.bytes_stored += len(stored) + 1
+        return codec + stored
+
+    def decode(self, data: bytes) -> Tuple[Any, float]:
+        """The stored value and its age in seconds."""
+        codec, body = data[:1], data[1:]
+        if codec == _ZSTD:
+            body = zstandard.ZstdDecompressor().decompress(body)
+        elif codec == _ZLIB:
+            body = zlib.decompress(body)
+        payload = json.loads(body)
+        value = payload["v"]
+        return (tuple(value) if isinstance(value, list) else value), max(0.0, self._clock() - payload["t"])
+
+    # Backend
+
+    def _call(self, method: str, *args, **kwargs) -> Tuple[bool, Any]:
+        """Call the backend unless it failed recently; returns (ok, result)."""
+        if self.backend is None or time.monotonic() < self._skip_until:
+            return False, None
+        try:
+            return True, getattr(self.backend, method)(*args, **kwargs)
+        except KVError:
+            with self._lock:
+                self.shared_errors += 1
+            self._skip_until = time.monotonic() + self.config.retry_after
+            return False, None
+
+    def _fetch(self, key: Hashable, shared: str) -> Optional[Any]:
+        ok, data = self._call("get", shared)
+        if not ok or data is None:
+            return None
+        try:
+            value, age = self.decode(data)
+        except (ValueError, KeyError, zlib.error):
+            return None
+        if age > self.ttl:
+            return None
+        self.local.put(key, value, age=age)
+        return value
+
+    # Cache interface
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        shared = self.shared_key(key)
+        value = self._fetch(key, shared)
+        with self._lock:
+            if value is not None:
+                self.shared_hits += 1
+                return value
+            self.shared_misses += 1
+        if self.stampede:
+            return self._claim_or_wait(key, shared)
+        return None
+
+    def _claim_or_wait(self, key: Hashable, shared: str) -> Optional[Any]:
+        """Claim a missing key for this caller, or wait for the node that holds it."""
+        ok, claimed = self._call("set", f"{shared}:lock", self._owner, self.config.lock_ttl, nx=True)
+        if not ok:
+            return None
+        if claimed:
+            with self._lock:
+                self._claimed.add(shared)
+            return None
+        with self._lock:
+            self.stampede_waits += 1
+        deadline = time.monotonic() + self.config.lock_wait
+        while time.monotonic() < deadline:
+            time.sleep(self.config.poll_interval)
+            value = self._fetch(key, shared)
+            if value is not None:
+                with self._lock:
+                    self.stampede_served += 1
+                return value
+            ok, holder = self._call("get", f"{shared}:lock")
+            if not ok or holder is None:  # Released without an answer
+                break
+        return None
+
+    def __contains__(self, key: Hashable) -> bool:
+        if key in self.local:
+            return True
+        ok, data = self._call("get", self.shared_key(key))
+        return ok and data is not None
+
+    def put(self, key: Hashable, value: Any, warm: bool = False) -> None:
+        self.local.put(key, value, warm=warm)
+        shared = self.shared_key(key)
+        self._call("set", shared, self.encode(value), self.ttl)
+        self.release(key, shared)
+
+    def release(self, key: Hashable, shared: Optional[str] = None) -> None:
+        shared = shared or self.shared_key(key)
+        with self._lock:
+            if shared not in self._claimed:
+                return
+            self._claimed.discard(shared)
+        self._call("delete", f"{shared}:lock")
+
+    def clear(self) -> None:
+        """Drop the local tier (shared entries expire, or move namespace when an agent changes)."""
+        self.local.clear()
+
+    def __len__(self) -> int:
+        return len(self.local)
+
+    def hit_rate(self) -> float:
+        lookups = self.local.hits + self.local.misses
+        return (self.local.hits + self.shared_hits + self.stampede_served) / lookups if lookups else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.local.stats()
+        stats.update({
+            "hit_rate": round(self.hit_rate(), 3),
+            "local_hits": self.local.hits,
+            "shared_hits": self.shared_hits,
+            "shared_misses": self.shared_misses,
+            "shared_errors": self.shared_errors,
+            "stampede_waits": self.stampede_waits,
+            "stampede_served": self.stampede_served,
+            "compression_ratio": round(self.bytes_stored / self.bytes_raw, 3) if self.bytes_raw else None,
+        })
+        stats["hits"] = self.local.hits + self.shared_hits + self.stampede_served
+        return stats
+
+
+def shared_backend(config: SharedCacheConfig):
+    """The key-value backend of the shared tier, or None without one."""
+    if config.backend == "none":
+        return None
+    if config.backend == "memory":
+        return MemoryKV()
+    if config.backend == "redis":
+        return RedisKV(config.url, config.timeout, config.pool_size)
+    raise ValueError(f"Unknown shared cache backend: {config.backend}")
+
+
+def build_cache(kind: str, ttl: float, backend=None, config=None, stampede: bool = False):
+    """A local LRU, behind which the shared tier sits when a backend is configured."""
+    config = config or settings.cache_config
+    local = TTLCache(config.max_entries, ttl)
+    if backend is None:
+        return local
+    return TieredCache(local, backend, kind, config.shared, stampede=stampede)
+
+
+# Global caches (only consulted when caching is enabled)
+_backend = shared_backend(settings.cache_config.shared)
+response_cache = build_cache("response", settings.cache_config.response_ttl, _backend, stampede=True)
+routing_cache = build_cache("route", settings.cache_config.routing_ttl, _backend)
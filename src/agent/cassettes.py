@@ -0,0 +1,370 @@
+"""Record and replay model traffic for reproducible latency experiments.
+
+In record mode every ``Runner`` model call goes to the real model and is also
+written to a cassette: the request fingerprint, the response items, token usage
+and, for streamed calls, every stream event with its offset from the start of
+the request. In replay mode a stand-in model serves those recordings offline,
+at the recorded pace or sped up, so our own overhead (routing, caching,
+rendering) can be profiled without network noise.
+
+Cassettes are gzip-compressed JSON Lines files. Requests are matched on the
+agent's instructions, its handoffs and the normalised prompt text; a prompt
+that changed insignificantly falls back to the most similar recording.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import TypeAdapter
+from agents import MultiProvider, RunConfig
+from agents.items import ModelResponse
+from agents.models.interface import Model, ModelProvider
+from agents.usage import Usage
+from openai.types.responses import (
+    Response,
+    ResponseCompletedEvent,
+    ResponseCreatedEvent,
+    ResponseOutputItem,
+    ResponseStreamEvent,
+)
+
+from agent.settings import settings, CassetteConfig
+from agent.tokens import cosine_similarity, hash_vector, tokenize
+
+CASSETTE_VERSION = 1
+MODES = ("off", "record", "replay")
+
+_output_items = TypeAdapter(List[ResponseOutputItem])
+_stream_event = TypeAdapter(ResponseStreamEvent)
+
+
+class CassetteMiss(LookupError):
+    """Raised when a replayed request has no matching recording."""
+
+
+def _content_text(content) -> str:
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return ""
+
+
+def prompt_text(input) -> str:
+    """Flatten a model input (string or item list) into plain text."""
+    if isinstance(input, str):
+        return input
+    lines = []
+    for item in input:
+        item = item if isinstance(item, dict) else item.model_dump()
+        if "role" in item:
+            lines.append(f"{item['role']}: {_content_text(item.get('content'))}")
+        elif item.get("type") == "function_call":
+            lines.append(f"call: {item.get('name')}")
+        elif item.get("type") == "function_call_output":
+            lines.append(f"result: {item.get('output')}")
+    return "\n".join(lines)
+
+
+def normalise(text: str) -> str:
+    """Drop case and whitespace differences."""
+    return " ".join(tokenize(text or ""))
+
+
+def _digest(*parts: str) -> str:
+    return hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass
+class Interaction:
+    """One recorded model call."""
+    agent: str
+    handoffs: List[str]
+    prompt: str
+    duration: float
+    output: List[Dict[str, Any]]
+    usage: Dict[str, int] = field(default_factory=dict)
+    events: List[Tuple[float, Dict[str, Any]]] = field(default_factory=list)
+    model: str = ""
+
+    @property
+    def scope(self) -> str:
+        """Which agent (instructions plus handoffs) made the call."""
+        return _digest(self.agent, *self.handoffs)
+
+    @property
+    def key(self) -> str:
+        return _digest(self.scope, self.prompt)
+
+    def to_json(self) -> str:
+        return json.dumps(self.__dict__, separators=(",", ":"), ensure_ascii=False)
+
+
+def _request_fields(system_instructions, input, handoffs) -> Dict[str, Any]:
+    return {
+        "agent": _digest(normalise(system_instructions)),
+        "handoffs": sorted(handoff.tool_name for handoff in handoffs or []),
+        "prompt": normalise(prompt_text(input)),
+    }
+
+
+def _usage_dict(usage: Usage) -> Dict[str, int]:
+    return {
+        "requests": usage.requests,
+        "input_tokens": usage.input_tokens,
+        "output_tokens": usage.output_tokens,
+        "total_tokens": usage.total_tokens,
+    }
+
+
+class Cassette:
+    """A set of recorded interactions backed by one file."""
+
+    def __init__(self, path: str, interactions: Optional[List[Interaction]] = None):
+        self.path = path
+        self.interactions: List[Interaction] = []
+        self._by_key: Dict[str, List[Interaction]] = defaultdict(list)
+        self._by_scope: Dict[str, List[Interaction]] = defaultdict(list)
+        self._served: Dict[str, int] = defaultdict(int)
+        self._vectors: Dict[int, Any] = {}
+        self.hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+        for interaction in interactions or []:
+            self._index(interaction)
+
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        """Read a cassette file."""
+        interactions = []
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                data = json.loads(line)
+                if "version" in data:
+                    continue
+                data["events"] = [tuple(event) for event in data.get("events", [])]
+                interactions.append(Interaction(**data))
+        return cls(path, interactions)
+
+    @classmethod
+    def record(cls, path: str) -> "Cassette":
+        """Start a new, empty cassette file (replacing any existing one)."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            f.write(json.dumps({"version": CASSETTE_VERSION, "recorded_at": time.time()}) + "\n")
+        return cls(path)
+
+    def _index(self, interaction: Interaction) -> None:
+        self.interactions.append(interaction)
+        self._by_key[interaction.key].append(interaction)
+        self._by_scope[interaction.scope].append(interaction)
+
+    def add(self, interaction: Interaction) -> None:
+        """Keep an interaction and append it to the file."""
+        self._index(interaction)
+        # gzip members concatenate, so appending keeps the file valid
+        with gzip.open(self.path, "at", encoding="utf-8") as f:
+            f.write(interaction.to_json() + "\n")
+
+    def match(self, system_instructions, input, handoffs, threshold: float = 0.85) -> Interaction:
+        """Find the recording for a request.
+
+        Exact matches are served in recorded order (cycling when a prompt was
+        asked more often than recorded); otherwise the most similar prompt from
+        the same agent is used if it clears the threshold.
+        """
+        request = _request_fields(system_instructions, input, handoffs)
+        probe = Interaction(output=[], duration=0.0, **request)
+        candidates = self._by_key.get(probe.key)
+        if candidates:
+            served = self._served[probe.key]
+            self._served[probe.key] += 1
+            self.hits += 1
+            return candidates[served % len(candidates)]
+
+        best, best_score = None, threshold
+        probe_vector = hash_vector(probe.prompt)
+        for interaction in self._by_scope.get(probe.scope, []):
+            vector = self._vectors.get(id(interaction))
+            if vector is None:
+                vector = self._vectors[id(interaction)] = hash_vector(interaction.prompt)
+            score = cosine_similarity(probe_vector, vector)
+            if score >= best_score:
+                best, best_score = interaction, score
+        if best is None:
+            self.misses += 1
+            raise CassetteMiss(f"No recording in {self.path} for prompt: {probe.prompt[:80]!r}")
+        self.fuzzy_hits += 1
+        return best
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "interactions": len(self.interactions),
+            "hits": self.hits,
+            "fuzzy_hits": self.fuzzy_hits,
+            "misses": self.misses,
+        }
+
+
+class RecordingModel(Model):
+    """Passes calls through to a real model and records them."""
+
+    def __init__(self, model: Model, cassette: Cassette, model_name: str = ""):
+        self._model = model
+        self._cassette = cassette
+        self._model_name = model_name
+
+    async def get_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, **kwargs):
+        started = time.perf_counter()
+        response = await self._model.get_response(
+            system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, **kwargs
+        )
+        self._cassette.add(Interaction(
+            duration=time.perf_counter() - started,
+            output=[item.model_dump(mode="json") for item in response.output],
+            usage=_usage_dict(response.usage),
+            model=self._model_name,
+            **_request_fields(system_instructions, input, handoffs),
+        ))
+        return response
+
+    async def stream_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, **kwargs):
+        started = time.perf_counter()
+        events = []
+        completed = None
+        async for event in self._model.stream_response(
+            system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, **kwargs
+        ):
+            events.append((round(time.perf_counter() - started, 6), event.model_dump(mode="json")))
+            if isinstance(event, ResponseCompletedEvent):
+                completed = event.response
+            yield event
+        if completed is None:
+            return  # Cancelled or failed streams are not worth replaying
+        usage = completed.usage
+        self._cassette.add(Interaction(
+            duration=time.perf_counter() - started,
+            output=[item.model_dump(mode="json") for item in completed.output],
+            usage={
+                "requests": 1,
+                "input_tokens": usage.input_tokens if usage else 0,
+                "output_tokens": usage.output_tokens if usage else 0,
+                "total_tokens": usage.total_tokens if usage else 0,
+            },
+            events=events,
+            model=self._model_name,
+            **_request_fields(system_instructions, input, handoffs),
+        ))
+
+
+class ReplayModel(Model):
+    """Serves recorded interactions instead of calling a model."""
+
+    def __init__(self, cassette: Cassette, speed: float = 1.0, match_threshold: float = 0.85, model_name: str = ""):
+        self._cassette = cassette
+        self._speed = speed
+        self._threshold = match_threshold
+        self._model_name = model_name
+
+    async def _pause(self, seconds: float) -> None:
+        if self._speed > 0 and seconds > 0:
+            await asyncio.sleep(seconds / self._speed)
+
+    @staticmethod
+    def _usage(interaction: Interaction) -> Usage:
+        return Usage(**{name: interaction.usage.get(name, 0) for name in ("requests", "input_tokens", "output_tokens", "total_tokens")})
+
+    async def get_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, **kwargs):
+        interaction = self._cassette.match(system_instructions, input, handoffs, self._threshold)
+        await self._pause(interaction.duration)
+        return ModelResponse(
+            output=_output_items.validate_python(interaction.output),
+            usage=self._usage(interaction),
+            response_id=None,
+        )
+
+    async def stream_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, **kwargs):
+        interaction = self._cassette.match(system_instructions, input, handoffs, self._threshold)
+        if interaction.events:
+            previous = 0.0
+            for offset, event in interaction.events:
+                await self._pause(offset - previous)
+                previous = offset
+                yield _stream_event.validate_python(event)
+            return
+
+        # Recorded without streaming: replay as a single completed response
+        response = Response(
+            id="replay",
+            created_at=time.time(),
+            model=interaction.model or self._model_name or "replay",
+            object="response",
+            output=_output_items.validate_python(interaction.output),
+            tool_choice="auto",
+            tools=[],
+            parallel_tool_calls=False,
+        )
+        yield ResponseCreatedEvent(type="response.created", response=response, sequence_number=0)
+        await self._pause(interaction.duration)
+        yield ResponseCompletedEvent(type="response.completed", response=response, sequence_number=1)
+
+
+class RecordingModelProvider(ModelProvider):
+    """Model provider that records every call made through it."""
+
+    def __init__(self, cassette: Cassette, provider: Optional[ModelProvider] = None):
+        self.cassette = cassette
+        self._provider = provider or MultiProvider()
+
+    def get_model(self, model_name: Optional[str]) -> Model:
+        return RecordingModel(self._provider.get_model(model_name), self.cassette, model_name or "")
+
+
+class ReplayModelProvider(ModelProvider):
+    """Model provider that answers from a cassette."""
+
+    def __init__(self, cassette: Cassette, speed: float = 1.0, match_threshold: float = 0.85):
+        self.cassette = cassette
+        self.speed = speed
+        self.match_threshold = match_threshold
+
+    def get_model(self, model_name: Optional[str]) -> Model:
+        return ReplayModel(self.cassette, self.speed, self.match_threshold, model_name or "")
+
+
+def cassette_path(name: str, config: Optional[CassetteConfig] = None) -> str:
+    config = config or settings.cassette_config
+    return os.path.join(config.directory, f"{name}.cassette")
+
+
+def cassette_run_config(
+    name: str, mode: Optional[str] = None, speed: Optional[float] = None, config: Optional[CassetteConfig] = None
+) -> Optional[RunConfig]:
+    """A run config that records to or replays from the named cassette.
+
+    The mode comes from the argument, then ``AGENT_CASSETTES``, then settings.
+    Returns None when recording and replay are off, which ``Runner`` treats as
+    its default configuration.
+    """
+    config = config or settings.cassette_config
+    mode = mode or os.getenv("AGENT_CASSETTES") or config.mode
+    if mode not in MODES:
+        raise ValueError(f"Unknown cassette mode: {mode}")
+    if mode == "off":
+        return None
+    path = cassette_path(name, config)
+    if mode == "record":
+        return RunConfig(model_provider=RecordingModelProvider(Cassette.record(path)))
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No cassette at {path}; run once with AGENT_CASSETTES=record first")
+    provider = ReplayModelProvider(
+        Cassette.load(path), config.speed if speed is None else speed, config.match_threshold
+    )
+    return RunConfig(model_provider=provider, tracing_disabled=True)
@@ -0,0 +1,54 @@
+"""Command-line options shared by the agent entry points."""
+
+import argparse
+from typing import List, Optional
+
+
+def parse_args(description: str, argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse the options common to every agent script."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        "--interactive",
+        action="store_true",
+        help="chat with the agent in a terminal session",
+    )
+    parser.add_argument(
+        "--resume",
+        metavar="SESSION_ID",
+        help="continue a logged conversation (implies --interactive)",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="sample the session's stacks and write a flamegraph (folded stacks) to profiles/ at exit",
+    )
+    parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help="track allocations with tracemalloc and write the top growth sites to profiles/ at exit",
+    )
+    parser.add_argument(
+        "--prefetch",
+        action="store_true",
+        help="answer likely follow-up questions in the background while you type (see prefetch: in settings.yaml)",
+    )
+    parser.add_argument(
+        "--no-pipeline",
+        action="store_true",
+        help="answer piped questions one at a time as a conversation instead of concurrently",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        metavar="N",
+        help="questions answered at once when stdin is piped (default: pipeline.concurrency)",
+    )
+    parser.add_argument(
+        "--jsonl",
+        action="store_true",
+        help="write piped answers as JSON lines",
+    )
+    args = parser.parse_args(argv)
+    if args.resume:
+        args.interactive = True
+    return args
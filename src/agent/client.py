@@ -0,0 +1,184 @@
+"""Thin client for the local agent daemon.
+
+Starting an agent script costs a fresh interpreter: importing the agents SDK
+and pydantic, parsing ``config/settings.yaml`` and building the agents, all
+before the first model call. This client only uses the standard library: when
+the daemon (``agent.daemon``) is listening it sends the request over its Unix
+socket and prints the answer; when no daemon is up it falls back to running
+the same request in-process.
+
+    python src/agent/client.py obama "Who is Michelle Obama?"
+    python src/agent/client.py michelle            # the agent's sample question
+    python src/agent/client.py michelle -i         # chat (sessions live in the daemon)
+    python src/agent/client.py --ping
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+import tempfile
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+SOCKET_ENV = "AGENT_DAEMON_SOCKET"
+
+
+def socket_path() -> str:
+    """The daemon socket: $AGENT_DAEMON_SOCKET, or a per-user path in the temp dir.
+
+    Only the environment can move it, since the client does not read
+    ``settings.yaml`` and must find the same socket the daemon binds.
+    """
+    return os.environ.get(SOCKET_ENV) or os.path.join(tempfile.gettempdir(), f"agents-michelle-{os.getuid()}.sock")
+
+
+class DaemonUnavailable(ConnectionError):
+    """Raised when no daemon is listening on the socket."""
+
+
+class AgentClient:
+    """Sends newline-delimited JSON requests to the daemon over its Unix socket."""
+
+    def __init__(self, path: Optional[str] = None, timeout: float = 600.0, connect_timeout: float = 0.5):
+        self.path = path or socket_path()
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self._sock: Optional[socket.socket] = None
+        self._buffer = b""
+
+    def _connect(self) -> socket.socket:
+        if self._sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.connect_timeout)
+            try:
+                sock.connect(self.path)
+            except (FileNotFoundError, ConnectionRefusedError, socket.timeout) as exc:
+                sock.close()
+                raise DaemonUnavailable(f"no agent daemon at {self.path}") from exc
+            sock.settimeout(self.timeout)
+            self._sock = sock
+        return self._sock
+
+    def request(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Send one request and wait for its response (the connection is reused)."""
+        sock = self._connect()
+        try:
+            sock.sendall(json.dumps(payload).encode("utf-8") + b"\n")
+            while b"\n" not in self._buffer:
+                chunk = sock.recv(65536)
+                if not chunk:
+                    raise ConnectionResetError("agent daemon closed the connection")
+                self._buffer += chunk
+        except OSError:
+            self.close()
+            raise
+        line, _, self._buffer = self._buffer.partition(b"\n")
+        return json.loads(line)
+
+    def close(self) -> None:
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+            self._buffer = b""
+
+    def available(self) -> bool:
+        try:
+            return self.ping().get("ok", False)
+        except (DaemonUnavailable, OSError, ValueError):
+            return False
+
+    def ping(self) -> Dict[str, Any]:
+        return self.request({"op": "ping"})
+
+    def stats(self) -> Dict[str, Any]:
+        return self.request({"op": "stats"})
+
+    def shutdown(self) -> Dict[str, Any]:
+        return self.request({"op": "shutdown"})
+
+    def run(self, agent: str, user_input: Optional[str] = None, session: Optional[str] = None) -> Dict[str, Any]:
+        return self.request({"op": "run", "agent": agent, "input": user_input, "session": session})
+
+
+def ask(
+    agent: str,
+    user_input: Optional[str] = None,
+    session: Optional[str] = None,
+    client: Optional[AgentClient] = None,
+    use_daemon: bool = True,
+) -> Dict[str, Any]:
+    """Run one turn on the daemon when it is up, otherwise in-process."""
+    if use_daemon:
+        try:
+            return (client or AgentClient()).run(agent, user_input, session)
+        except DaemonUnavailable:
+            pass
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+    from agent.daemon import execute
+
+    return execute({"op": "run", "agent": agent, "input": user_input, "session": session})
+
+
+def _print_answer(response: Dict[str, Any]) -> None:
+    if not response.get("ok"):
+        print(f"❌ Error: {response.get('error')}")
+        return
+    print(response["final_output"])
+
+
+def _chat(agent: str, client: AgentClient, use_daemon: bool) -> None:
+    session = uuid.uuid4().hex[:12]
+    print(f"💬 Chatting with '{agent}' (session {session}); type 'exit' to quit.\n")
+    while True:
+        try:
+            user_input = input("💬 You: ").strip()
+        except (EOFError, KeyboardInterrupt):
+            print("\n👋 Goodbye!")
+            return
+        if user_input.lower() in ("exit", "quit", "bye"):
+            print("👋 Goodbye!")
+            return
+        if not user_input:
+            continue
+        response = ask(agent, user_input, session, client, use_daemon)
+        if response.get("ok"):
+            print(f"\n{response['agent_name']}: {response['final_output']}\n")
+        else:
+            print(f"\n❌ Error: {response.get('error')}\n")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Ask an agent through the local daemon (or in-process)")
+    parser.add_argument("agent", nargs="?", help="agent key (michelle, obama, creative, spanish_agent, ...)")
+    parser.add_argument("prompt", nargs="?", help="question to ask (default: the agent's sample question)")
+    parser.add_argument("-i", "--interactive", action="store_true", help="chat with the agent")
+    parser.add_argument("--no-daemon", action="store_true", help="always run in-process")
+    parser.add_argument("--ping", action="store_true", help="check whether the daemon is up")
+    args = parser.parse_args(argv)
+    client = AgentClient()
+
+    if args.ping:
+        started = time.perf_counter()
+        try:
+            status = client.ping()
+        except DaemonUnavailable:
+            print(f"No agent daemon at {client.path}")
+            return 1
+        print(f"✓ Agent daemon pid {status['pid']} up {status['uptime']:.0f}s, "
+              f"round trip {(time.perf_counter() - started) * 1000:.2f} ms")
+        return 0
+    if not args.agent:
+        parser.error("an agent key is required")
+    if args.interactive:
+        _chat(args.agent, client, not args.no_daemon)
+        return 0
+    response = ask(args.agent, args.prompt, client=client, use_daemon=not args.no_daemon)
+    _print_answer(response)
+    return 0 if response.get("ok") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
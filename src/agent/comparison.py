@@ -0,0 +1,273 @@
+"""Model latency/quality comparison harness.
+
+Runs each agent's prompt suite (``comparison.suites`` in ``settings.yaml``) on
+every configured variant, meaning a model plus its settings. The runs go
+through the same resilient runner as production, with handoff limits and
+filters, so Pfeiffer's suite exercises the handoffs. Up to
+``comparison.concurrency`` runs are in flight at once. For each agent and
+variant the report gives:
+
+- latency and time-to-first-token percentiles;
+- generation speed in output tokens per second after the first token;
+- handoff correctness, the share of prompts with an ``expect`` answered by
+  that persona;
+- cost per turn and in total, from ``comparison.prices``;
+- a suggested variant: the fastest at p95 among those with the best handoff
+  correctness and no errors.
+
+Each variant's traffic can be recorded to its own cassette and the whole
+comparison replayed offline later (see ``agent.cassettes``):
+
+    python src/agent/comparison.py --record            # live, saved to cassettes/comparison-<variant>.cassette
+    python src/agent/comparison.py --replay --speed 0  # offline, from the recordings
+    python src/agent/comparison.py --agents michelle --variants gpt-4o-mini --json report.json
+"""
+
+import asyncio
+import dataclasses
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from agents import ModelSettings, RunConfig
+
+# Allow running as a script (python src/agent/comparison.py)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from agent.cassettes import cassette_run_config
+from agent.metrics import percentile
+from agent.registry import get_agent
+from agent.resilience import ResilientRunner
+from agent.settings import settings, CassetteConfig, ComparisonConfig, ComparisonVariant, ModelPrice
+
+
+@dataclass
+class ComparisonRun:
+    """One prompt run on one variant, and what it measured."""
+    agent_key: str
+    variant: str
+    model: str
+    prompt: str
+    expect: Optional[str] = None
+    elapsed: float = 0.0
+    ttft: Optional[float] = None
+    input_tokens: int = 0
+    output_tokens: int = 0
+    answered_by: Optional[str] = None  # Persona key of the agent that answered
+    timed_out: bool = False
+    error: Optional[str] = None
+
+    @property
+    def correct(self) -> Optional[bool]:
+        if self.expect is None or self.error is not None:
+            return None
+        return self.answered_by == self.expect
+
+
+def _persona_keys() -> Dict[str, str]:
+    graph = settings.handoff_graph
+    return {settings.agent_configs.display_name(key): key for key in graph.reachable}
+
+
+class ModelComparison:
+    """Runs the prompt suites on every variant."""
+
+    def __init__(
+        self,
+        config: Optional[ComparisonConfig] = None,
+        agents: Optional[List[str]] = None,
+        variants: Optional[List[str]] = None,
+        mode: Optional[str] = None,
+        speed: Optional[float] = None,
+        run_config: Optional[RunConfig] = None,
+        cassettes: Optional[CassetteConfig] = None,
+    ):
+        self.config = config or settings.comparison_config
+        self.agents = agents or list(self.config.suites)
+        for agent_key in self.agents:
+            if agent_key not in self.config.suites:
+                raise ValueError(f"no comparison suite for agent '{agent_key}'")
+        self.variants = [v for v in self.config.variants if variants is None or v.name in variants]
+        if variants is not None and len(self.variants) != len(set(variants)):
+            known = ", ".join(v.name for v in self.config.variants)
+            raise ValueError(f"unknown comparison variant in {variants} (known: {known})")
+        self.mode = mode
+        self.speed = speed
+        self.cassettes = cassettes
+        self._base_config = run_config  # Used instead of cassettes (tests, benchmarks)
+        self._run_configs: Dict[str, RunConfig] = {}
+        self._runner = ResilientRunner()
+
+    def run_config(self, variant: ComparisonVariant) -> RunConfig:
+        """The variant's model and settings over its cassette (or the default provider)."""
+        if variant.name not in self._run_configs:
+            base = self._base_config or cassette_run_config(
+                f"comparison-{variant.name}", self.mode, self.speed, self.cassettes
+            ) or RunConfig()
+            self._run_configs[variant.name] = dataclasses.replace(
+                base,
+                model=variant.model,
+                model_settings=ModelSettings(temperature=variant.temperature, max_tokens=variant.max_tokens),
+            )
+        return self._run_configs[variant.name]
+
+    def jobs(self) -> List[ComparisonRun]:
+        return [
+            ComparisonRun(agent_key, variant.name, variant.model, item.prompt, item.expect)
+            for variant in self.variants
+            for agent_key in self.agents
+            for item in self.config.suites[agent_key]
+            for _ in range(max(1, self.config.repeats))
+        ]
+
+    async def _run_one(self, job: ComparisonRun, variant: ComparisonVariant, semaphore: asyncio.Semaphore, keys) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                outcome = await self._runner.run(
+                    get_agent(job.agent_key), job.prompt, job.agent_key, run_config=self.run_config(variant)
+                )
+            except Exception as exc:
+                job.elapsed = time.perf_counter() - started
+                job.error = f"{type(exc).__name__}: {exc}"
+                return
+            job.elapsed = time.perf_counter() - started
+        if outcome.source not in ("model", "hedge", "deadline"):
+            job.error = f"answered from {outcome.source}, not the variant's model"
+            return
+        job.ttft = outcome.ttft
+        job.timed_out = outcome.timed_out
+        job.answered_by = keys.get(outcome.agent_name, outcome.agent_name)
+        usage = getattr(getattr(outcome.result, "context_wrapper", None), "usage", None)
+        if usage is not None:
+            job.input_tokens = usage.input_tokens
+            job.output_tokens = usage.output_tokens
+
+    async def run_async(self) -> List[ComparisonRun]:
+        semaphore = asyncio.Semaphore(max(1, self.config.concurrency))
+        keys = _persona_keys()
+        keys.update({get_agent(agent_key).name: agent_key for agent_key in self.agents})
+        variants = {variant.name: variant for variant in self.variants}
+        jobs = self.jobs()
+        await asyncio.gather(*(self._run_one(job, variants[job.variant], semaphore, keys) for job in jobs))
+        return jobs
+
+    def run(self) -> List[ComparisonRun]:
+        return asyncio.run(self.run_async())
+
+
+def _cost(runs: List[ComparisonRun], price: Optional[ModelPrice]) -> Optional[float]:
+    if price is None:
+        return None
+    return sum(r.input_tokens * price.input + r.output_tokens * price.output for r in runs) / 1e6
+
+
+def summarise(runs: List[ComparisonRun], prices: Optional[Dict[str, ModelPrice]] = None) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """Metrics per agent and variant."""
+    prices = settings.comparison_config.prices if prices is None else prices
+    summary: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for run in runs:
+        summary.setdefault(run.agent_key, {}).setdefault(run.variant, {})
+    for agent_key, variants in summary.items():
+        for variant in variants:
+            rows = [r for r in runs if r.agent_key == agent_key and r.variant == variant]
+            ok = [r for r in rows if r.error is None]
+            elapsed = [r.elapsed for r in ok]
+            ttfts = [r.ttft for r in ok if r.ttft is not None]
+            generating = [(r.output_tokens, r.elapsed - r.ttft) for r in ok if r.ttft is not None and r.elapsed > r.ttft]
+            graded = [r.correct for r in rows if r.correct is not None]
+            cost = _cost(ok, prices.get(rows[0].model))
+            variants[variant] = {
+                "model": rows[0].model,
+                "runs": len(rows),
+                "errors": len(rows) - len(ok),
+                "timed_out": sum(r.timed_out for r in ok),
+                "p50": percentile(elapsed, 50),
+                "p95": percentile(elapsed, 95),
+                "p99": percentile(elapsed, 99),
+                "ttft_p50": percentile(ttfts, 50),
+                "ttft_p95": percentile(ttfts, 95),
+                "tokens_per_s": (
+                    sum(t for t, _ in generating) / sum(s for _, s in generating) if generating else 0.0
+                ),
+                "handoff_correct": sum(graded) / len(graded) if graded else None,
+                "cost": cost,
+                "cost_per_turn": cost / len(ok) if cost is not None and ok else None,
+            }
+    return summary
+
+
+def recommend(summary: Dict[str, Dict[str, Dict[str, Any]]]) -> Dict[str, Optional[str]]:
+    """Per agent, the fastest variant at p95 among the most correct ones without errors."""
+    picks: Dict[str, Optional[str]] = {}
+    for agent_key, variants in summary.items():
+        clean = {name: m for name, m in variants.items() if not m["errors"] and not m["timed_out"]}
+        if not clean:
+            picks[agent_key] = None
+            continue
+        best = max((m["handoff_correct"] or 0.0) for m in clean.values())
+        eligible = {name: m for name, m in clean.items() if (m["handoff_correct"] or 0.0) == best}
+        picks[agent_key] = min(eligible, key=lambda name: eligible[name]["p95"])
+    return picks
+
+
+def _money(value: Optional[float]) -> str:
+    return "n/a" if value is None else f"${value:.5f}"
+
+
+def format_report(summary: Dict[str, Dict[str, Dict[str, Any]]]) -> str:
+    picks = recommend(summary)
+    lines = []
+    for agent_key, variants in summary.items():
+        lines.append(f"\n{agent_key}")
+        lines.append(
+            f"   {'variant':<16}{'runs':>5}{'p50 s':>8}{'p95 s':>8}{'p99 s':>8}{'ttft p50':>10}"
+            f"{'tok/s':>8}{'handoffs':>10}{'$/turn':>11}{'errors':>8}"
+        )
+        for name, m in variants.items():
+            correct = "-" if m["handoff_correct"] is None else f"{m['handoff_correct']:.0%}"
+            lines.append(
+                f"   {name:<16}{m['runs']:>5}{m['p50']:>8.2f}{m['p95']:>8.2f}{m['p99']:>8.2f}{m['ttft_p50']:>10.2f}"
+                f"{m['tokens_per_s']:>8.1f}{correct:>10}{_money(m['cost_per_turn']):>11}{m['errors']:>8}"
+            )
+        pick = picks[agent_key]
+        lines.append(f"   → suggested: {pick}" if pick else "   → no variant ran without errors")
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare models per agent on fixed prompt suites")
+    parser.add_argument("--agents", nargs="+", help="agents to compare (default: every suite)")
+    parser.add_argument("--variants", nargs="+", help="variant names to run (default: all)")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--record", action="store_const", const="record", dest="mode", help="record each variant's traffic")
+    mode.add_argument("--replay", action="store_const", const="replay", dest="mode", help="replay recorded traffic offline")
+    parser.add_argument("--speed", type=float, help="replay speed-up (0 = no delays)")
+    parser.add_argument("--json", metavar="PATH", help="also write the per-run results and summary as JSON")
+    args = parser.parse_args(argv)
+
+    comparison = ModelComparison(agents=args.agents, variants=args.variants, mode=args.mode, speed=args.speed)
+    jobs = comparison.jobs()
+    print(f"Comparing {len(comparison.variants)} variants on {len(jobs)} runs "
+          f"({', '.join(comparison.agents)}), {comparison.config.concurrency} at a time...")
+    started = time.perf_counter()
+    runs = comparison.run()
+    summary = summarise(runs)
+    print(format_report(summary))
+    print(f"\nDone in {time.perf_counter() - started:.1f}s")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "runs": [dataclasses.asdict(run) for run in runs],
+                "summary": summary,
+                "suggested": recommend(summary),
+            }, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,381 @@
+"""Durable append-only conversation log with constant-time resume.
+
+Messages are appended to fixed-size segment files in a compact binary format.
+Every record carries a pointer to the previous record of the same session, and
+a small index maps each session to its latest record. Resuming a session reads
+only its last few records by following those pointers through memory-mapped
+segments, so the cost of ``--resume`` does not depend on the size of the log.
+
+The index is append-only too (one entry per message) and is compacted to one
+entry per session whenever it holds more than twice as many entries as there
+are sessions: on open, while appending and when the log is closed (logs still
+open at interpreter exit are closed then). Its size, and so the time to open
+the log, therefore follows the number of sessions, not of messages.
+
+Several processes (the daemon, interactive sessions, the API) may share one
+log directory. Appending, rolling to a new segment, recovery and compaction
+hold an exclusive ``flock`` on ``log.lock``, so records never interleave and
+segment numbers never collide. Compaction first merges the entries other
+processes appended to the index, and a process whose index file was replaced
+by another's compaction reopens it, so no process drops another's sessions.
+
+Record layout (little endian)::
+
+    crc32 u32 | text_len u32 | prev_segment u32 | prev_offset u64 |
+    role u8 | session_len u8 | agent_len u16 | session | agent | text
+"""
+
+import atexit
+import contextlib
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import weakref
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from agent.registry import persona_key
+from agent.settings import settings, ConversationLogConfig
+from agent.sessions import session_store, SessionStore, Session, ROLE_ASSISTANT, ROLE_USER
+
+_RECORD_HEADER = struct.Struct("<IIIQBBH")
+_INDEX_ENTRY = struct.Struct("<16sIQ")
+_SEGMENT_FORMAT = "segment-{:08d}.log"
+_INDEX_FILE = "index.bin"
+_LOCK_FILE = "log.lock"
+_COMPACT_MIN_ENTRIES = 4096  # Never rewrite an index smaller than this
+
+_open_logs = weakref.WeakSet()
+
+Position = Tuple[int, int]  # (segment number, byte offset); segment 0 means "none"
+
+
+class LogRecord:
+    """One message read back from the log."""
+
+    __slots__ = ("session_id", "role", "agent_name", "text")
+
+    def __init__(self, session_id: str, role: int, agent_name: str, text: str):
+        self.session_id = session_id
+        self.role = role
+        self.agent_name = agent_name
+        self.text = text
+
+
+def _session_key(session_id: str) -> bytes:
+    return hashlib.blake2b(session_id.encode("utf-8"), digest_size=16).digest()
+
+
+class ConversationLog:
+    """Segmented append-only log of conversation messages."""
+
+    def __init__(self, config: Optional[ConversationLogConfig] = None):
+        self.config = config or ConversationLogConfig()
+        self._lock = threading.Lock()
+        self._heads: Dict[bytes, Position] = {}
+        self._maps: Dict[int, Tuple[int, mmap.mmap]] = {}
+        self._active_segment = 0
+        self._active_file = None
+        self._index_file = None
+        self._lock_file = None
+        self._index_entries = 0
+        self._followed = set()
+
+    # Opening and closing
+
+    def open(self) -> "ConversationLog":
+        """Load the index and recover any records written after it."""
+        if self._active_file is not None:
+            return self
+        os.makedirs(self.config.path, exist_ok=True)
+        self._lock_file = open(os.path.join(self.config.path, _LOCK_FILE), "ab")
+        with self._exclusive():
+            self._merge_index()
+            if self._index_oversized():
+                self._compact_index()
+            segments = self._segment_numbers()
+            self._active_segment = segments[-1] if segments else 1
+            self._index_file = open(self._index_path(), "ab")
+            self._recover_tail()
+            self._active_file = open(self._segment_path(self._active_segment), "ab")
+        _open_logs.add(self)
+        return self
+
+    def close(self) -> None:
+        """Flush, compact the index to one entry per session and release maps."""
+        with self._lock:
+            if self._active_file is None:
+                return
+            self._active_file.close()
+            self._index_file.close()
+            self._active_file = self._index_file = None
+            for _, mapped in self._maps.values():
+                mapped.close()
+            self._maps.clear()
+            with self._exclusive():
+                self._compact_index()
+            self._lock_file.close()
+            self._lock_file = None
+            _open_logs.discard(self)
+
+    @contextlib.contextmanager
+    def _exclusive(self):
+        """Hold the cross-process lock on the log directory."""
+        fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _index_path(self) -> str:
+        return os.path.join(self.config.path, _INDEX_FILE)
+
+    def _merge_index(self) -> None:
+        """Read the index file, keeping the latest position of every session (callers hold the lock)."""
+        index_path = self._index_path()
+        if not os.path.exists(index_path):
+            return
+        with open(index_path, "rb") as f:
+            data = f.read()
+        usable = len(data) - len(data) % _INDEX_ENTRY.size
+        for key, segment, offset in _INDEX_ENTRY.iter_unpack(data[:usable]):
+            if (segment, offset) > self._heads.get(key, (0, 0)):
+                self._heads[key] = (segment, offset)
+        self._index_entries = usable // _INDEX_ENTRY.size
+
+    def _catch_up(self) -> None:
+        """Follow other processes' compactions and appends before writing (callers hold the lock)."""
+        if os.fstat(self._index_file.fileno()).st_ino != os.stat(self._index_path()).st_ino:
+            self._index_file.close()
+            self._index_file = open(self._index_path(), "ab")
+        self._index_file.seek(0, os.SEEK_END)
+        self._index_entries = self._index_file.tell() // _INDEX_ENTRY.size
+        self._active_file.seek(0, os.SEEK_END)
+
+    def _index_oversized(self) -> bool:
+        return self._index_entries > max(_COMPACT_MIN_ENTRIES, 2 * len(self._heads))
+
+    def _compact_index(self) -> None:
+        """Rewrite the index with one entry per session (reopening it for appends if it was open).
+
+        Callers hold the cross-process lock; entries other processes appended are merged in first.
+        """
+        index_path = self._index_path()
+        self._merge_index()
+        reopen = self._index_file is not None
+        if reopen:
+            self._index_file.close()
+        tmp_path = index_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            for key, (segment, offset) in self._heads.items():
+                f.write(_INDEX_ENTRY.pack(key, segment, offset))
+        os.replace(tmp_path, index_path)
+        self._index_entries = len(self._heads)
+        if reopen:
+            self._index_file = open(index_path, "ab")
+
+    def _segment_numbers(self) -> List[int]:
+        numbers = []
+        for name in os.listdir(self.config.path):
+            if name.startswith("segment-") and name.endswith(".log"):
+                numbers.append(int(name[len("segment-"):-len(".log")]))
+        return sorted(numbers)
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.config.path, _SEGMENT_FORMAT.format(segment))
+
+    def _recover_tail(self) -> None:
+        """Re-index records in the active segment that the index missed."""
+        path = self._segment_path(self._active_segment)
+        if not os.path.exists(path):
+            return
+        indexed = [off for seg, off in self._heads.values() if seg == self._active_segment]
+        offset = max(indexed) if indexed else 0
+        with open(path, "rb") as f:
+            data = f.read()
+        valid_end = offset
+        while offset + _RECORD_HEADER.size <= len(data):
+            parsed = self._parse(data, offset)
+            if parsed is None:
+                break
+            record, end = parsed
+            key = _session_key(record.session_id)
+            if self._heads.get(key, (0, -1)) < (self._active_segment, offset):
+                self._heads[key] = (self._active_segment, offset)
+                self._index_file.write(_INDEX_ENTRY.pack(key, self._active_segment, offset))
+                self._index_entries += 1
+            valid_end = offset = end
+        if valid_end < len(data):
+            # Drop a torn record left by a crash mid-write
+            with open(path, "r+b") as f:
+                f.truncate(valid_end)
+
+    # Writing
+
+    def append(self, session_id: str, role: int, text: str, agent_name: str = "") -> Position:
+        """Append one message and return its position."""
+        with self._lock:
+            self.open()
+            with self._exclusive():
+                return self._append(session_id, role, text, agent_name)
+
+    def _append(self, session_id: str, role: int, text: str, agent_name: str) -> Position:
+        self._catch_up()
+        if self._active_file.tell() >= self.config.segment_bytes:
+            self._roll()
+        key = _session_key(session_id)
+        prev_segment, prev_offset = self._heads.get(key, (0, 0))
+        sid = session_id.encode("utf-8")[:255]
+        agent = agent_name.encode("utf-8")[:65535]
+        body = text.encode("utf-8")
+        header_tail = _RECORD_HEADER.pack(0, len(body), prev_segment, prev_offset, role, len(sid), len(agent))[4:]
+        payload = header_tail + sid + agent + body
+        crc = zlib.crc32(payload)
+        offset = self._active_file.tell()
+        self._active_file.write(struct.pack("<I", crc) + payload)
+        self._active_file.flush()
+        if self.config.fsync:
+            os.fsync(self._active_file.fileno())
+        position = (self._active_segment, offset)
+        self._heads[key] = position
+        self._index_file.write(_INDEX_ENTRY.pack(key, *position))
+        self._index_file.flush()
+        self._index_entries += 1
+        if self._index_oversized():
+            self._compact_index()
+        return position
+
+    def append_exchange(self, session_id: str, user_text: str, answer: str, agent_name: str) -> None:
+        """Append a user message and the agent's answer."""
+        self.append(session_id, ROLE_USER, user_text)
+        self.append(session_id, ROLE_ASSISTANT, answer, agent_name)
+
+    def follow(self, session_id: str) -> None:
+        """Log every completed turn of this session from now on."""
+        self._followed.add(session_id)
+
+    def record_turn(self, session_id: str, user_text: str, answer: str, agent_name: str) -> None:
+        """Append a turn if the session is followed and logging is enabled."""
+        if self.config.enabled and session_id in self._followed:
+            self.append_exchange(session_id, user_text, answer, agent_name)
+
+    def _roll(self) -> None:
+        """Move to the next segment, or to the one another process already rolled to."""
+        self._active_file.close()
+        self._active_segment = max(self._segment_numbers()[-1], self._active_segment)
+        if os.path.getsize(self._segment_path(self._active_segment)) >= self.config.segment_bytes:
+            self._active_segment += 1
+        self._active_file = open(self._segment_path(self._active_segment), "ab")
+
+    # Reading
+
+    def _map(self, segment: int) -> mmap.mmap:
+        size = os.path.getsize(self._segment_path(segment))
+        cached = self._maps.get(segment)
+        if cached is not None and cached[0] >= size:
+            return cached[1]
+        if cached is not None:
+            cached[1].close()
+        with open(self._segment_path(segment), "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps[segment] = (size, mapped)
+        return mapped
+
+    @staticmethod
+    def _parse(data, offset: int):
+        """Parse the record at offset; None if it is torn or corrupt."""
+        if offset + _RECORD_HEADER.size > len(data):
+            return None
+        crc, text_len, prev_segment, prev_offset, role, sid_len, agent_len = _RECORD_HEADER.unpack_from(data, offset)
+        end = offset + _RECORD_HEADER.size + sid_len + agent_len + text_len
+        if end > len(data) or zlib.crc32(data[offset + 4:end]) != crc:
+            return None
+        cursor = offset + _RECORD_HEADER.size
+        session_id = bytes(data[cursor:cursor + sid_len]).decode("utf-8")
+        cursor += sid_len
+        agent_name = bytes(data[cursor:cursor + agent_len]).decode("utf-8")
+        cursor += agent_len
+        text = bytes(data[cursor:end]).decode("utf-8")
+        return LogRecord(session_id, role, agent_name, text), end
+
+    def _read_at(self, position: Position) -> Tuple[LogRecord, Position]:
+        """The record at a position and the position of its predecessor."""
+        segment, offset = position
+        data = self._map(segment)
+        parsed = self._parse(data, offset)
+        if parsed is None:
+            raise ValueError(f"Corrupt conversation log record at {position}")
+        _, _, prev_segment, prev_offset, *_ = _RECORD_HEADER.unpack_from(data, offset)
+        return parsed[0], (prev_segment, prev_offset)
+
+    def recent(self, session_id: str, limit: int) -> List[LogRecord]:
+        """The last ``limit`` messages of a session, oldest first."""
+        with self._lock:
+            self.open()
+            position = self._heads.get(_session_key(session_id))
+            records = []
+            while position is not None and position[0] and len(records) < limit:
+                record, previous = self._read_at(position)
+                if record.session_id != session_id:
+                    break
+                records.append(record)
+                position = previous
+            records.reverse()
+            return records
+
+    def has_session(self, session_id: str) -> bool:
+        """Whether the log holds any messages for a session."""
+        with self._lock:
+            self.open()
+            return _session_key(session_id) in self._heads
+
+    def restore(self, store: SessionStore, session_id: str, agent_key: str, instructions: str = "") -> Optional[Session]:
+        """Rebuild a session's recent context window in the session store."""
+        records = self.recent(session_id, self.config.resume_messages)
+        if not records:
+            return None
+        session = store.get(session_id) or store.create(agent_key, instructions, session_id)
+        if len(session) == 0:
+            for record in records:
+                agent_id = store.instructions.intern(persona_key(agent_key, record.agent_name)) if record.agent_name else None
+                session.append(record.role, record.text, agent_id)
+        return session
+
+
+def start_session(
+    agent_key: str,
+    instructions: str = "",
+    resume: Optional[str] = None,
+    store: Optional[SessionStore] = None,
+    log: Optional["ConversationLog"] = None,
+) -> Tuple[Session, bool]:
+    """Start an interactive session, restoring it from the log when resuming.
+
+    Returns the session and whether it was resumed.
+    """
+    store = session_store if store is None else store
+    log = conversation_log if log is None else log
+    session = None
+    if resume and log.config.enabled:
+        session = log.restore(store, resume, agent_key, instructions)
+    resumed = session is not None
+    if session is None:
+        session = store.create(agent_key, instructions)
+    if log.config.enabled:
+        log.follow(session.session_id)
+    return session, resumed
+
+
+@atexit.register
+def _close_open_logs() -> None:
+    """Close (and so compact) every log still open when the interpreter exits."""
+    for log in list(_open_logs):
+        with contextlib.suppress(OSError, ValueError):
+            log.close()
+
+
+# Global conversation log instance (files are opened on first use)
+conversation_log = ConversationLog(settings.conversation_log_config)
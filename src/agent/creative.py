@@ -0,0 +1,358 @@
+"""Parallel creative candidates for the creative assistant.
+
+A poem or story request is sent as several variants at once, one per
+configured temperature, under a concurrency cap. Once the first variant is
+done the others get ``rank_wait`` seconds to finish; the finished ones are
+ranked locally with cheap heuristics and the best is shown. Poems are scored
+on end rhyme and on how regular their line lengths (in syllables) are, stories
+on paragraphing, dialogue and sentence variety; each check only runs when
+``enable_poetry`` / ``enable_storytelling`` allows that kind of writing.
+
+The best variant is shown whole rather than streamed: it can only be ranked
+once it is complete, and the turns print finished answers. It is shown as soon
+as the ranking ends, without waiting for the variants still running.
+
+The variants that were not shown are kept per session, so "give me another"
+is answered from memory without a model call. Variants that finish after the
+ranking join the same cache; they are added on the scheduler loop's thread
+while "another" is served from the caller's, so each set has a lock.
+"""
+
+import asyncio
+import dataclasses
+import re
+import statistics
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from agents import ModelSettings, RunConfig
+
+from agent import profiling
+from agent.budgets import response_budgets
+from agent.resilience import resilient_runner
+from agent.scheduler import scheduler, PriorityScheduler, INTERACTIVE
+from agent.sessions import Session
+from agent.settings import settings, CreativeConfig
+from agent.telemetry import telemetry
+from agent.tokens import tokenize
+from agent.turns import TurnResult, turn_input, record_exchange
+
+POEM = "poem"
+STORY = "story"
+
+POEM_WORDS = {"poem", "poems", "poetry", "haiku", "limerick", "sonnet", "verse", "rhyme", "rhyming", "ode", "ballad"}
+STORY_WORDS = {"story", "stories", "tale", "fable", "narrative", "fairytale", "anecdote"}
+
+ANOTHER_RE = re.compile(
+    r"^\s*(?:please\s+)?(?:give me|show me|write|try|let's see|how about)?\s*"
+    r"(?:another(?: one)?|one more|a different one|something else|again)\b",
+    re.IGNORECASE,
+)
+_VOWELS_RE = re.compile(r"[aeiou]+|(?<=.)y+")
+# Rhyme endings spelled differently but sounding the same
+_RHYME_SOUNDS = {"ue": "oo", "ew": "oo", "ou": "oo", "ough": "oo", "ie": "y", "igh": "y", "ite": "yte"}
+_SENTENCE_RE = re.compile(r"[^.!?]+[.!?]")
+
+
+def request_kind(text: str, config: CreativeConfig) -> Optional[str]:
+    """The kind of writing requested, if it is enabled (None otherwise)."""
+    words = set(tokenize(text))
+    if config.enable_poetry and (words & POEM_WORDS or "roses are red" in text.lower()):
+        return POEM
+    if config.enable_storytelling and words & STORY_WORDS:
+        return STORY
+    return None
+
+
+def is_another_request(text: str) -> bool:
+    """Whether the user is asking for a different version of the last piece."""
+    return bool(ANOTHER_RE.match(text))
+
+
+def syllables(word: str) -> int:
+    """Estimate the syllables in a word from its vowel groups."""
+    word = word.lower()
+    count = len(_VOWELS_RE.findall(word))
+    if count > 1 and word.endswith("e") and not word.endswith(("le", "ee")):
+        count -= 1
+    return max(1, count)
+
+
+def rhyme_key(word: str) -> str:
+    """The part of a word that has to match for an end rhyme."""
+    word = "".join(c for c in word.lower() if c.isalpha())
+    groups = list(_VOWELS_RE.finditer(word))
+    if not groups:
+        return word
+    if len(groups) > 1 and word.endswith("e") and groups[-1].start() == len(word) - 1:
+        key = word[groups[-2].start():]
+    else:
+        key = word[groups[-1].start():]
+    return _RHYME_SOUNDS.get(key, key)
+
+
+def _rhymes(a: str, b: str) -> bool:
+    return a != b and bool(a) and (rhyme_key(a) == rhyme_key(b) or (len(a) > 2 and a[-3:] == b[-3:]))
+
+
+def _lexical_variety(text: str) -> float:
+    words = [w for w in tokenize(text) if w.isalpha()]
+    return len(set(words)) / len(words) if words else 0.0
+
+
+def poem_checks(text: str) -> Dict[str, float]:
+    """Rhyme and meter heuristics for a poem."""
+    lines = [line.strip() for line in text.splitlines() if any(c.isalpha() for c in line)]
+    ends = [[w for w in tokenize(line) if w.isalpha()][-1:] for line in lines]
+    ends = [end[0] if end else "" for end in ends]
+    pairs = max(1, len(ends) // 2)
+    couplets = sum(_rhymes(ends[i], ends[i + 1]) for i in range(0, len(ends) - 1, 2)) / pairs
+    alternate = sum(
+        _rhymes(ends[i], ends[i + 2]) for start in range(0, len(ends), 4)
+        for i in (start, start + 1) if i + 2 < min(start + 4, len(ends))
+    ) / pairs
+    counts = [sum(syllables(w) for w in tokenize(line) if w.isalpha()) for line in lines]
+    if len(counts) > 1 and statistics.mean(counts):
+        meter = 1.0 - min(1.0, statistics.pstdev(counts) / statistics.mean(counts))
+    else:
+        meter = 0.0
+    return {
+        "rhyme": min(1.0, max(couplets, alternate)) if len(lines) > 1 else 0.0,
+        "meter": meter,
+        "variety": _lexical_variety(text),
+    }
+
+
+def story_checks(text: str) -> Dict[str, float]:
+    """Structure heuristics for a short story."""
+    paragraphs = [p for p in re.split(r"\n\s*\n", text.strip()) if p.strip()]
+    lengths = [len(s.split()) for s in _SENTENCE_RE.findall(text)]
+    if len(lengths) > 1 and statistics.mean(lengths):
+        rhythm = min(1.0, statistics.pstdev(lengths) / statistics.mean(lengths))
+    else:
+        rhythm = 0.0
+    return {
+        "paragraphs": min(1.0, len(paragraphs) / 3),
+        "dialogue": 1.0 if re.search(r"[\"“”]", text) else 0.0,
+        "rhythm": rhythm,
+        "ending": 1.0 if text.rstrip().endswith((".", "!", "?", "\"", "”")) else 0.0,
+        "variety": _lexical_variety(text),
+    }
+
+
+# Weight of each check in the overall score
+POEM_WEIGHTS = {"rhyme": 0.5, "meter": 0.3, "variety": 0.2}
+STORY_WEIGHTS = {"paragraphs": 0.25, "dialogue": 0.15, "rhythm": 0.25, "ending": 0.15, "variety": 0.2}
+
+
+def score_candidate(text: str, kind: str) -> Tuple[float, Dict[str, float]]:
+    """Score a candidate of the given kind; returns the score and its checks."""
+    checks, weights = (poem_checks(text), POEM_WEIGHTS) if kind == POEM else (story_checks(text), STORY_WEIGHTS)
+    return sum(weights[name] * value for name, value in checks.items()), checks
+
+
+@dataclass
+class Candidate:
+    """One generated variant and how it scored."""
+    text: str
+    agent_name: str
+    temperature: float
+    score: float
+    checks: Dict[str, float] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+
+class CandidateSet:
+    """The ranked variants for one request; the best is served first."""
+
+    def __init__(self, prompt: str, kind: str):
+        self.prompt = prompt
+        self.kind = kind
+        self.pending: List[Candidate] = []
+        self.served: List[Candidate] = []
+        self._lock = threading.Lock()
+
+    def add(self, candidate: Candidate) -> None:
+        with self._lock:
+            self.pending.append(candidate)
+            self.pending.sort(key=lambda c: c.score, reverse=True)
+
+    def next(self) -> Optional[Candidate]:
+        """Take the best variant not shown yet."""
+        with self._lock:
+            if not self.pending:
+                return None
+            candidate = self.pending.pop(0)
+            self.served.append(candidate)
+            return candidate
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self.pending)
+
+
+class CreativeCandidates:
+    """Generates, ranks and caches creative variants."""
+
+    def __init__(self, config: Optional[CreativeConfig] = None, turn_scheduler: Optional[PriorityScheduler] = None):
+        self.config = config or CreativeConfig()
+        self.scheduler = turn_scheduler or scheduler
+        self._sets: "OrderedDict[str, CandidateSet]" = OrderedDict()
+        self.requests = 0
+        self.variants = 0
+        self.failed = 0
+        self.late = 0
+        self.served_from_cache = 0
+
+    def enabled_for(self, text: str) -> Optional[str]:
+        """The kind of writing to generate candidates for, or None to run a normal turn."""
+        if not self.config.candidates.enabled or not self.config.candidates.temperatures:
+            return None
+        return request_kind(text, self.config)
+
+    def another(self, cache_key: str) -> Optional[Candidate]:
+        """Serve the next unused variant for a session, if there is one."""
+        candidates = self._sets.get(cache_key)
+        candidate = candidates.next() if candidates is not None else None
+        if candidate is not None:
+            self.served_from_cache += 1
+        return candidate
+
+    def cached(self, cache_key: str) -> int:
+        """Number of unused variants kept for a session."""
+        candidates = self._sets.get(cache_key)
+        return len(candidates) if candidates is not None else 0
+
+    def _remember(self, cache_key: str, candidates: CandidateSet) -> None:
+        self._sets[cache_key] = candidates
+        self._sets.move_to_end(cache_key)
+        while len(self._sets) > self.config.candidates.cache_size:
+            self._sets.popitem(last=False)
+
+    async def generate(
+        self, agent, user_input: str, agent_key: str, cache_key: str,
+        model_input=None, priority: str = INTERACTIVE, **run_kwargs,
+    ) -> CandidateSet:
+        """Generate the variants concurrently and rank those done in time."""
+        config = self.config.candidates
+        kind = request_kind(user_input, self.config) or POEM
+        candidates = CandidateSet(user_input, kind)
+        self.requests += 1
+        run_kwargs = response_budgets.apply(response_budgets.plan(agent_key, user_input), run_kwargs)
+        base = run_kwargs.get("run_config") or RunConfig()
+        model_input = user_input if model_input is None else model_input
+        limit = asyncio.Semaphore(max(1, config.max_concurrency))
+
+        async def variant(temperature: float) -> Candidate:
+            model_settings = (base.model_settings or ModelSettings()).resolve(ModelSettings(temperature=temperature))
+            kwargs = dict(run_kwargs, run_config=dataclasses.replace(base, model_settings=model_settings))
+            async with limit:
+                started = time.perf_counter()
+                outcome = await self.scheduler.run(
+                    lambda: resilient_runner.run(agent, model_input, agent_key, **kwargs), priority
+                )
+            score, checks = score_candidate(outcome.final_output, kind)
+            return Candidate(outcome.final_output, outcome.agent_name, temperature, score, checks,
+                             time.perf_counter() - started)
+
+        tasks = [asyncio.ensure_future(variant(t)) for t in config.temperatures]
+        self.variants += len(tasks)
+        try:
+            pending = set(tasks)
+            while pending and not any(t.done() and not t.exception() for t in tasks):
+                _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            if pending:
+                _, pending = await asyncio.wait(pending, timeout=config.rank_wait)
+        except asyncio.CancelledError:
+            for task in tasks:
+                task.cancel()
+            raise
+
+        for task in tasks:
+            if task in pending:
+                task.add_done_callback(lambda t: self._late(t, candidates))
+            elif task.exception() is not None:
+                self.failed += 1
+            else:
+                candidates.add(task.result())
+        if not len(candidates):
+            raise tasks[0].exception()
+        self._remember(cache_key, candidates)
+        return candidates
+
+    def _late(self, task: "asyncio.Task", candidates: CandidateSet) -> None:
+        if task.cancelled() or task.exception() is not None:
+            self.failed += 1
+            return
+        self.late += 1
+        candidates.add(task.result())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "variants": self.variants,
+            "failed": self.failed,
+            "late": self.late,
+            "served_from_cache": self.served_from_cache,
+            "sessions_cached": len(self._sets),
+        }
+
+
+def run_creative_turn(
+    agent, user_input: str, agent_key: str = "creative", session: Optional[Session] = None,
+    generator: Optional["CreativeCandidates"] = None, **run_kwargs,
+) -> Optional[TurnResult]:
+    """Answer a creative request from ranked variants.
+
+    Variants are only generated within a session, where the spares can answer
+    "give me another"; one-shot requests get a single run. Returns None when
+    there is no session or the request is neither a poem/story nor a request
+    for another version, so the caller runs a normal turn instead.
+    """
+    generator = generator or creative_candidates
+    cache_key = session.session_id if session is not None else agent_key
+    started = time.perf_counter()
+    profiler = profiling.active_profiler
+    profile = profiler.turn_started() if profiler is not None else None
+    if is_another_request(user_input) and generator.cached(cache_key):
+        best = generator.another(cache_key)
+        source = "candidate_cache"
+    elif session is not None and generator.enabled_for(user_input):
+        future = asyncio.run_coroutine_threadsafe(
+            generator.generate(
+                agent, user_input, agent_key, cache_key, model_input=turn_input(session, user_input), **run_kwargs
+            ),
+            generator.scheduler.loop,
+        )
+        try:
+            best = future.result().next()
+        except KeyboardInterrupt:
+            future.cancel()
+            return TurnResult(final_output="", agent_name=agent.name, source="cancelled",
+                              elapsed=time.perf_counter() - started, cancelled=True)
+        source = "candidates"
+    else:
+        return None
+
+    result = TurnResult(
+        final_output=best.text, agent_name=best.agent_name, source=source, elapsed=time.perf_counter() - started
+    )
+    record_exchange(session, user_input, result)
+    end = time.time()
+    telemetry.record("creative_turn", end - result.elapsed, end, {
+        "agent_key": agent_key,
+        "source": source,
+        "temperature": best.temperature,
+        "score": round(best.score, 3),
+        "spare_variants": generator.cached(cache_key),
+    })
+    if profiler is not None:
+        profiler.turn_finished(profile, agent_key, result)
+    return result
+
+
+# Global creative candidate generator
+creative_candidates = CreativeCandidates(settings.creative_config)
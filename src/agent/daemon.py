@@ -0,0 +1,237 @@
+"""Long-lived local agent daemon.
+
+Each ``make`` target or CLI run used to start a new interpreter and pay for
+importing the agents SDK, parsing the settings and building the agents before
+its first model call, then throw all of it away, caches and HTTP connections
+included. The daemon does that once: it builds the ``daemon.preload`` agents,
+starts the cache warm-up and serves turns over a Unix socket until stopped.
+
+The protocol is newline-delimited JSON, one request and one response per
+line, several per connection:
+
+- ``{"op": "run", "agent": "obama", "input": "...", "session": "abc"}`` runs a
+  turn (``input`` defaults to the agent's sample question; ``session`` keeps a
+  conversation in the daemon's session store);
+- ``{"op": "ping"}``, ``{"op": "stats"}`` and ``{"op": "shutdown"}``.
+
+Turns go through the same path as the interactive CLIs (scheduler, resilient
+runner, caches), in worker threads so a slow answer never blocks the socket.
+``agent.client`` is the thin client; it runs ``execute()`` in-process when no
+daemon is up.
+
+    python src/agent/daemon.py serve | status | stop
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+# Allow running as a script (python src/agent/daemon.py serve)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from agent.cache import response_cache, routing_cache
+from agent.client import AgentClient, DaemonUnavailable, socket_path
+from agent.creative import run_creative_turn
+from agent.registry import get_agent
+from agent.scheduler import API
+from agent.sessions import session_store
+from agent.settings import settings, DaemonConfig
+from agent.turns import run_turn
+from agent.warmup import warmup
+
+# What each agent is asked when a request has no input (the scripts' samples)
+SAMPLE_PROMPTS = {
+    "michelle": "Tell me about working with Tim Burton on Batman Returns.",
+    "obama": "What were Michelle Obama's major initiatives as First Lady?",
+    "spanish_agent": "¿Puedes escribir un poema corto sobre la tecnología?",
+}
+
+
+def sample_prompt(agent_key: str) -> str:
+    if agent_key == "creative":
+        return settings.creative_config.default_task
+    return SAMPLE_PROMPTS.get(agent_key, "Hello! What can you tell me about yourself?")
+
+
+def execute(request: Dict[str, Any], **run_kwargs) -> Dict[str, Any]:
+    """Run one ``run`` request and build its response (also the client's in-process fallback)."""
+    try:
+        agent_key = request["agent"]
+        user_input = request.get("input") or sample_prompt(agent_key)
+        agent = get_agent(agent_key)
+        session = None
+        if request.get("session"):
+            session = session_store.get_or_create(request["session"], agent_key, agent.instructions)
+        result = None
+        if agent_key == "creative":
+            result = run_creative_turn(agent, user_input, agent_key, session=session, **run_kwargs)
+        if result is None:
+            result = run_turn(agent, user_input, agent_key, priority=API, session=session, **run_kwargs)
+    except Exception as exc:
+        return {"ok": False, "error": f"{type(exc).__name__}: {exc}"}
+    return {
+        "ok": True,
+        "final_output": result.final_output,
+        "agent_name": result.agent_name,
+        "source": result.source,
+        "elapsed": result.elapsed,
+        "timed_out": result.timed_out,
+    }
+
+
+class AgentDaemon:
+    """Serves agent turns over a Unix socket."""
+
+    def __init__(self, config: Optional[DaemonConfig] = None, path: Optional[str] = None, warm: bool = True, **run_kwargs):
+        self.config = config or DaemonConfig()
+        self.path = path or socket_path()
+        self.warm = warm
+        self._run_kwargs = run_kwargs
+        self._executor = ThreadPoolExecutor(max_workers=max(1, self.config.max_workers), thread_name_prefix="agentd")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopped: Optional[asyncio.Event] = None
+        self._connections: Dict[asyncio.StreamWriter, asyncio.Task] = {}
+        self.ready = threading.Event()
+        self.started_at = time.time()
+        self.requests = 0
+        self.errors = 0
+
+    def _claim_socket(self) -> None:
+        """Remove a stale socket file, refusing to start if a daemon is already listening."""
+        if not os.path.exists(self.path):
+            return
+        if AgentClient(self.path, connect_timeout=0.2).available():
+            raise RuntimeError(f"an agent daemon is already listening on {self.path}")
+        os.unlink(self.path)
+
+    def preload(self) -> None:
+        """Build the preloaded agents and start warming their caches."""
+        for agent_key in self.config.preload:
+            get_agent(agent_key)
+        if self.warm:
+            warmup.start(self.config.preload)
+
+    async def serve(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        self._claim_socket()
+        await self._loop.run_in_executor(self._executor, self.preload)
+        server = await asyncio.start_unix_server(self._handle, path=self.path)
+        os.chmod(self.path, 0o600)
+        self.started_at = time.time()
+        self.ready.set()
+        try:
+            await self._stopped.wait()
+        finally:
+            server.close()
+            # Closing the transports ends each connection's read loop cleanly
+            for writer in list(self._connections):
+                writer.close()
+            await asyncio.gather(*self._connections.values(), return_exceptions=True)
+            await server.wait_closed()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def serve_in_thread(self) -> threading.Thread:
+        """Run the daemon on a background thread (tests and benchmarks)."""
+        thread = threading.Thread(target=asyncio.run, args=(self.serve(),), name="agentd", daemon=True)
+        thread.start()
+        if not self.ready.wait(30):
+            raise RuntimeError("agent daemon did not start")
+        return thread
+
+    def stop(self) -> None:
+        if self._loop is not None and self._stopped is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._stopped.set)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._connections[writer] = asyncio.current_task()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("expected a JSON object")
+                    response = await self._dispatch(request)
+                except ValueError as exc:
+                    response = {"ok": False, "error": f"bad request: {exc}"}
+                writer.write(json.dumps(response).encode("utf-8") + b"\n")
+                await writer.drain()
+        except (ConnectionResetError, BrokenPipeError):
+            pass
+        finally:
+            self._connections.pop(writer, None)
+            writer.close()
+
+    async def _dispatch(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        op = request.get("op")
+        if op == "ping":
+            return {"ok": True, "pid": os.getpid(), "uptime": time.time() - self.started_at}
+        if op == "stats":
+            return {"ok": True, **self.stats()}
+        if op == "shutdown":
+            self.stop()
+            return {"ok": True}
+        if op == "run":
+            self.requests += 1
+            response = await self._loop.run_in_executor(
+                self._executor, lambda: execute(request, **self._run_kwargs)
+            )
+            if not response["ok"]:
+                self.errors += 1
+            return response
+        return {"ok": False, "error": f"unknown op '{op}'"}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pid": os.getpid(),
+            "uptime": time.time() - self.started_at,
+            "requests": self.requests,
+            "errors": self.errors,
+            "warmup": warmup.progress(),
+            "response_cache": response_cache.stats(),
+            "routing_cache": routing_cache.stats(),
+            "sessions": session_store.stats(),
+        }
+
+
+def main(argv=None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local agent daemon")
+    parser.add_argument("command", choices=["serve", "status", "stop"])
+    args = parser.parse_args(argv)
+    client = AgentClient(socket_path())
+    if args.command == "serve":
+        daemon = AgentDaemon(settings.daemon_config)
+        print(f"🛰️  Agent daemon listening on {daemon.path} (Ctrl+C to stop)")
+        try:
+            asyncio.run(daemon.serve())
+        except KeyboardInterrupt:
+            pass
+        return 0
+    try:
+        if args.command == "stop":
+            client.shutdown()
+            print("✓ Agent daemon stopped")
+        else:
+            stats = client.stats()
+            print(f"✓ Agent daemon pid {stats['pid']} up {stats['uptime']:.0f}s, "
+                  f"{stats['requests']} requests ({stats['errors']} errors)")
+            print(f"   {stats['warmup']}")
+    except DaemonUnavailable:
+        print(f"No agent daemon at {client.path}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+"""Local input guardrails that run alongside generation.
+
+Screening a message before ``Runner.run`` would put a whole extra step in
+front of every turn, and a model-based guardrail would add a model call. These
+checks are local and cheap, and the resilient runner starts them at the same
+moment as the model run (on a worker thread, off the event loop). If a check
+trips, the run is cancelled (closing the upstream stream) and the turn is
+answered with the check's message; a clean turn never waits on them.
+
+- ``prompt_injection``: weighted patterns for attempts to override or reveal
+  the instructions ("ignore all previous instructions", "developer mode",
+  fake ``system:`` turns);
+- ``abusive``: weighted abusive terms (after undoing l33t spellings), insults
+  counting double when aimed at the agent;
+- ``off_topic``: a vocabulary classifier that trips when a message has enough
+  off-topic words (code, finance, homework, ...) and none of the topic words of
+  the agent or the agents it hands off to.
+
+Every check is timed; per-check latency percentiles and trip counts are kept
+and each screening is recorded as a ``guardrail`` telemetry span.
+"""
+
+import asyncio
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
+
+from agent.affinity import content_words
+from agent.metrics import LatencyWindow
+from agent.settings import settings, GuardrailConfig
+from agent.telemetry import telemetry
+
+INJECTION_PATTERNS: List[Tuple[re.Pattern, float]] = [
+    (re.compile(r"\b(ignore|disregard|forget|override|bypass)\b.{0,40}\b(instructions?|prompts?|rules|guidelines|directions)\b"), 1.0),
+    (re.compile(r"\b(reveal|show|print|repeat|output|tell me|what (is|are))\b.{0,30}\b(system prompt|your (instructions|prompt|rules)|(initial|hidden|original) (instructions|prompt))"), 1.0),
+    (re.compile(r"\b(developer|dan|god|admin) mode\b|\bjailbreak"), 1.0),
+    (re.compile(r"<\|?(system|im_start|im_end|endoftext)\|?>|\[/?(system|inst)\]|(^|\n)\s*(system|assistant)\s*:"), 1.0),
+    (re.compile(r"\byou are (now|no longer)\b"), 0.6),
+    (re.compile(r"\b(new instructions|from now on)\b"), 0.5),
+    (re.compile(r"\b(act as|pretend (to be|you are)|role-?play as)\b"), 0.4),
+]
+
+ABUSIVE_TERMS: Dict[str, float] = {
+    "fuck": 1.0, "fucking": 1.0, "shit": 0.5, "bitch": 1.0, "bastard": 1.0, "asshole": 1.0, "cunt": 1.0,
+    "kys": 1.0, "kill yourself": 1.0, "shut up": 0.5, "idiot": 0.5, "stupid": 0.5, "moron": 0.5,
+    "dumb": 0.5, "useless": 0.5, "pathetic": 0.5, "trash": 0.5, "garbage": 0.5, "hate you": 1.0,
+}
+# Mild terms count double when aimed at the agent ("you idiot", "you're useless")
+ADDRESSEES = frozenset({"you", "u", "ur"})
+LEET = str.maketrans({"0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t", "@": "a", "$": "s", "*": "u"})
+
+OFF_TOPIC_TERMS = """
+code coding program programming python javascript java sql html css function compile compiler debug bug
+algorithm database server api regex excel spreadsheet stock stocks crypto bitcoin ethereum invest investing
+investment portfolio mortgage loan tax taxes insurance recipe recipes bake baking cook cooking ingredients
+homework equation calculus derivative integral algebra physics chemistry weather forecast lottery casino
+betting football soccer basketball nfl nba diet calories medication dosage diagnosis symptoms
+""".split()
+
+
+def latest_user_text(user_input) -> str:
+    """The newest user message of a turn's input."""
+    if isinstance(user_input, str):
+        return user_input
+    for item in reversed(user_input):
+        if isinstance(item, dict) and item.get("role") == "user":
+            return str(item.get("content", ""))
+    return ""
+
+
+def prompt_injection(text: str, vocabulary: FrozenSet[str], config: GuardrailConfig) -> Tuple[bool, float]:
+    lowered = text.lower()
+    score = sum(weight for pattern, weight in INJECTION_PATTERNS if pattern.search(lowered))
+    return score >= config.injection_threshold, score
+
+
+def abusive(text: str, vocabulary: FrozenSet[str], config: GuardrailConfig) -> Tuple[bool, float]:
+    words = re.findall(r"[a-z]+", text.lower().translate(LEET))
+    padded = f" {' '.join(words)} "
+    score = sum(weight for term, weight in ABUSIVE_TERMS.items() if " " in term and f" {term} " in padded)
+    for i, word in enumerate(words):
+        weight = ABUSIVE_TERMS.get(word)
+        if weight is not None:
+            aimed = weight < 1.0 and ADDRESSEES.intersection(words[max(0, i - 4):i])
+            score += weight * 2 if aimed else weight
+    return score >= config.abuse_threshold, score
+
+
+def off_topic(text: str, vocabulary: FrozenSet[str], config: GuardrailConfig) -> Tuple[bool, float]:
+    words = content_words(text)
+    if words & vocabulary:
+        return False, 0.0
+    hits = len(words & _off_topic_vocabulary(tuple(config.off_topic_terms)))
+    return hits >= config.off_topic_min_hits, float(hits)
+
+
+_off_topic_cache: Dict[tuple, FrozenSet[str]] = {}
+
+
+def _off_topic_vocabulary(extra: tuple) -> FrozenSet[str]:
+    if extra not in _off_topic_cache:
+        _off_topic_cache[extra] = frozenset(content_words(" ".join(OFF_TOPIC_TERMS + list(extra))))
+    return _off_topic_cache[extra]
+
+
+CHECKS: Dict[str, Callable[[str, FrozenSet[str], GuardrailConfig], Tuple[bool, float]]] = {
+    "prompt_injection": prompt_injection,
+    "abusive": abusive,
+    "off_topic": off_topic,
+}
+
+
+@dataclass
+class GuardrailVerdict:
+    """The outcome of screening one message."""
+    tripped: Optional[str] = None  # The first check that tripped
+    scores: Dict[str, float] = field(default_factory=dict)
+    timings: Dict[str, float] = field(default_factory=dict)  # Seconds per check
+
+    @property
+    def elapsed(self) -> float:
+        return sum(self.timings.values())
+
+
+class Guardrails:
+    """Screens agent input with local checks next to the model run."""
+
+    def __init__(self, config: Optional[GuardrailConfig] = None):
+        self.config = config or GuardrailConfig()
+        for name in self.config.checks:
+            if name not in CHECKS:
+                raise ValueError(f"unknown guardrail check '{name}' (known: {', '.join(CHECKS)})")
+        self._vocabularies: Dict[str, FrozenSet[str]] = {}
+        self._lock = threading.Lock()
+        self.timings: Dict[str, LatencyWindow] = {name: LatencyWindow() for name in self.config.checks}
+        self.trips: Dict[str, int] = {name: 0 for name in self.config.checks}
+        self.screened = 0
+        self.cancelled_runs = 0
+
+    def applies_to(self, agent_key: str) -> bool:
+        return self.config.enabled and bool(self.config.checks) and agent_key in self.config.agents
+
+    def vocabulary(self, agent, agent_key: str) -> FrozenSet[str]:
+        """Topic words of an agent and every agent it can hand off to."""
+        if agent_key not in self._vocabularies:
+            words, seen, stack = set(), set(), [agent]
+            while stack:
+                current = stack.pop()
+                if id(current) in seen:
+                    continue
+                seen.add(id(current))
+                words |= content_words(f"{getattr(current, 'name', '')} {getattr(current, 'instructions', '') or ''}")
+                stack.extend(h for h in getattr(current, "handoffs", []) if hasattr(h, "instructions"))
+            self._vocabularies[agent_key] = frozenset(words)
+        return self._vocabularies[agent_key]
+
+    def screen(self, agent, agent_key: str, user_input) -> GuardrailVerdict:
+        """Run every check on the latest user message, stopping at the first that trips."""
+        started = time.time()
+        text = latest_user_text(user_input)
+        vocabulary = self.vocabulary(agent, agent_key)
+        verdict = GuardrailVerdict()
+        for name in self.config.checks:
+            check_started = time.perf_counter()
+            tripped, score = CHECKS[name](text, vocabulary, self.config)
+            verdict.timings[name] = time.perf_counter() - check_started
+            verdict.scores[name] = score
+            if tripped:
+                verdict.tripped = name
+                break
+        with self._lock:
+            self.screened += 1
+            for name, seconds in verdict.timings.items():
+                self.timings[name].add(seconds)
+            if verdict.tripped:
+                self.trips[verdict.tripped] += 1
+        telemetry.record("guardrail", started, time.time(), {
+            "agent_key": agent_key,
+            "tripped": verdict.tripped,
+            **{f"{name}_us": round(seconds * 1e6, 1) for name, seconds in verdict.timings.items()},
+        })
+        return verdict
+
+    def start(self, agent, agent_key: str, user_input) -> Optional["asyncio.Future"]:
+        """Start screening on a worker thread; None when the agent is not screened."""
+        if not self.applies_to(agent_key):
+            return None
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(None, self.screen, agent, agent_key, user_input)
+
+    def message(self, check: str) -> str:
+        return self.config.messages.get(check, "I can't help with that.")
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "screened": self.screened,
+                "cancelled_runs": self.cancelled_runs,
+                "trips": dict(self.trips),
+                "checks_us": {
+                    name: {k: (v * 1e6 if k != "count" else v) for k, v in window.summary().items()}
+                    for name, window in self.timings.items()
+                },
+            }
+
+    def report(self) -> str:
+        stats = self.stats()
+        lines = [f"🛡️  Guardrails: {stats['screened']} messages screened, {stats['cancelled_runs']} runs cancelled"]
+        for name, timing in stats["checks_us"].items():
+            lines.append(
+                f"   {name:<17} p50 {timing['p50']:.0f} µs  p99 {timing['p99']:.0f} µs  tripped {stats['trips'][name]}"
+            )
+        return "\n".join(lines)
+
+
+# Global guardrails (started by the resilient runner next to each screened run)
+guardrails = Guardrails(settings.guardrail_config)
@@ -0,0 +1,215 @@
+"""Per-edge handoff input filters.
+
+By default a handoff target receives the whole conversation so far: every
+earlier message, the triage agent's turn and the handoff tool call and its
+output, on top of its own persona instructions. Input tokens, and with them
+time-to-first-token, grow with every hop.
+
+Each edge of the handoff graph (``michelle->tim_burton``) can declare a chain
+of filters under ``handoff_graph.filters`` in ``settings.yaml``; edges without
+one use the default chain:
+
+- ``drop_tools``: drop tool and handoff calls and their outputs;
+- ``last_turns``: keep only the messages from the last ``last_turns`` user
+  messages on;
+- ``summary_only``: replace the history with a short local summary of the
+  earlier questions and answers followed by the latest user message.
+
+Filters only change what the target model sees (``input_items``); the run's
+items, and so the session history, stay complete. Token counts before and
+after every handoff are kept per edge and recorded as a ``handoff`` telemetry
+span; in verbose mode each trim is also printed on stderr.
+"""
+
+import dataclasses
+import json
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from agents import RunConfig
+from agents.extensions.handoff_filters import remove_all_tools
+from agents.handoffs import HandoffInputData
+from agents.items import HandoffOutputItem
+
+from agent.handoff_graph import HandoffGraphError
+from agent.settings import settings, HandoffFilterConfig
+from agent.telemetry import telemetry
+from agent.tokens import count_tokens
+
+
+def _as_input(item) -> Any:
+    return item.to_input_item() if hasattr(item, "to_input_item") else item
+
+
+def _text(item) -> str:
+    item = _as_input(item)
+    if isinstance(item, dict):
+        content = item.get("content")
+        if isinstance(content, str):
+            return content
+        if isinstance(content, list):
+            return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+        return json.dumps(item, default=str)
+    return str(item)
+
+
+def _role(item) -> Optional[str]:
+    item = _as_input(item)
+    return item.get("role") if isinstance(item, dict) else None
+
+
+def _model_items(data: HandoffInputData) -> Tuple:
+    return data.input_items if data.input_items is not None else data.new_items
+
+
+def input_tokens(data: HandoffInputData) -> int:
+    """Tokens the handoff target would receive (instructions not included)."""
+    history = data.input_history
+    texts = [history] if isinstance(history, str) else [_text(item) for item in history]
+    texts += [_text(item) for item in data.pre_handoff_items + _model_items(data)]
+    return sum(count_tokens(text) for text in texts)
+
+
+def drop_tools(data: HandoffInputData, config: HandoffFilterConfig) -> HandoffInputData:
+    """Drop tool and handoff calls and their outputs."""
+    filtered = remove_all_tools(data.clone(input_items=_model_items(data)))
+    return data.clone(
+        input_history=filtered.input_history,
+        pre_handoff_items=filtered.pre_handoff_items,
+        input_items=filtered.input_items,
+    )
+
+
+def last_turns(data: HandoffInputData, config: HandoffFilterConfig) -> HandoffInputData:
+    """Keep the history from the last ``config.last_turns`` user messages on."""
+    history = data.input_history
+    if isinstance(history, str) or config.last_turns <= 0:
+        return data
+    users = [i for i, item in enumerate(history) if _role(item) == "user"]
+    if len(users) <= config.last_turns:
+        return data
+    return data.clone(input_history=history[users[-config.last_turns]:])
+
+
+def summary_only(data: HandoffInputData, config: HandoffFilterConfig) -> HandoffInputData:
+    """Replace the conversation with a short summary plus the latest user message."""
+    history = data.input_history
+    if isinstance(history, str):
+        return data.clone(pre_handoff_items=(), input_items=())
+    users = [i for i, item in enumerate(history) if _role(item) == "user"]
+    if not users:
+        return data.clone(pre_handoff_items=(), input_items=())
+    latest = history[users[-1]]
+    lines = []
+    for item in history[:users[-1]]:
+        role, text = _role(item), " ".join(_text(item).split())
+        if role == "user":
+            lines.append(f"- Asked: {text}")
+        elif role == "assistant":
+            lines.append(f"- Answered: {text.split('. ')[0]}")
+    summary = "\n".join(lines)
+    if len(summary) > config.summary_chars:
+        summary = "…" + summary[-config.summary_chars:]
+    items = ({"role": "user", "content": f"Conversation so far:\n{summary}"},) if summary else ()
+    return data.clone(input_history=items + (latest,), pre_handoff_items=(), input_items=())
+
+
+FILTERS: Dict[str, Callable[[HandoffInputData, HandoffFilterConfig], HandoffInputData]] = {
+    "drop_tools": drop_tools,
+    "last_turns": last_turns,
+    "summary_only": summary_only,
+}
+
+
+def edge_name(source: str, target: str) -> str:
+    return f"{source}->{target}"
+
+
+class HandoffFilters:
+    """The ``RunConfig.handoff_input_filter`` that applies each edge's filter chain."""
+
+    def __init__(self, config: Optional[HandoffFilterConfig] = None):
+        self.config = config or HandoffFilterConfig()
+        self._keys: Optional[Dict[str, str]] = None  # agent name -> persona key
+        self._lock = threading.Lock()
+        self.edges: Dict[str, Dict[str, int]] = {}
+
+    def _persona_keys(self) -> Dict[str, str]:
+        """Validate the configured edges and map agent names to persona keys."""
+        if self._keys is None:
+            graph = settings.handoff_graph
+            for name in self.config.default + [f for chain in self.config.edges.values() for f in chain]:
+                if name not in FILTERS:
+                    raise HandoffGraphError(f"unknown handoff filter '{name}' (known: {', '.join(FILTERS)})")
+            for edge in self.config.edges:
+                source, _, target = edge.partition("->")
+                if target not in graph.targets(source):
+                    raise HandoffGraphError(f"handoff filter for '{edge}', which is not an edge of the handoff graph")
+            self._keys = {settings.agent_configs.display_name(key): key for key in graph.reachable}
+        return self._keys
+
+    def chain(self, source: str, target: str) -> List[str]:
+        return self.config.edges.get(edge_name(source, target), self.config.default)
+
+    def __call__(self, data: HandoffInputData) -> HandoffInputData:
+        handoff = next((item for item in data.new_items if isinstance(item, HandoffOutputItem)), None)
+        if handoff is None:
+            return data
+        keys = self._persona_keys()
+        source = keys.get(handoff.source_agent.name, handoff.source_agent.name)
+        target = keys.get(handoff.target_agent.name, handoff.target_agent.name)
+        chain = self.chain(source, target)
+        started = time.time()
+        before = input_tokens(data)
+        for name in chain:
+            data = FILTERS[name](data, self.config)
+        after = input_tokens(data)
+        edge = edge_name(source, target)
+        with self._lock:
+            stats = self.edges.setdefault(edge, {"handoffs": 0, "tokens_before": 0, "tokens_after": 0})
+            stats["handoffs"] += 1
+            stats["tokens_before"] += before
+            stats["tokens_after"] += after
+        telemetry.record("handoff", started, time.time(), {
+            "edge": edge,
+            "filters": ",".join(chain),
+            "tokens_before": before,
+            "tokens_after": after,
+        })
+        if settings.agent_verbose:
+            print(f"🔀 Handoff {edge}: {before} → {after} input tokens ({', '.join(chain) or 'no filters'})",
+                  file=sys.stderr)
+        return data
+
+    def apply(self, agent_key: str, run_kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Run kwargs with this filter installed for runs that can hand off."""
+        if not self.config.enabled or not settings.handoff_graph.targets(agent_key):
+            return run_kwargs
+        self._persona_keys()
+        run_config = run_kwargs.get("run_config") or RunConfig()
+        if run_config.handoff_input_filter is not None:
+            return run_kwargs
+        return dict(run_kwargs, run_config=dataclasses.replace(run_config, handoff_input_filter=self))
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                edge: dict(stats, saved=1 - stats["tokens_after"] / stats["tokens_before"] if stats["tokens_before"] else 0.0)
+                for edge, stats in self.edges.items()
+            }
+
+    def report(self) -> str:
+        stats = self.stats()
+        lines = [f"🔀 Handoff filters: {sum(s['handoffs'] for s in stats.values())} handoffs"]
+        for edge, s in stats.items():
+            lines.append(
+                f"   {edge:<28} {s['handoffs']} handoffs  {s['tokens_before']} → {s['tokens_after']} tokens "
+                f"({s['saved']:.0%} saved)"
+            )
+        return "\n".join(lines)
+
+
+# Global handoff filters (installed by the resilient runner)
+handoff_filters = HandoffFilters(settings.handoff_graph_config.filters)
@@ -0,0 +1,156 @@
+"""Compiled handoff graph.
+
+Handoffs are declared by key in each persona (``handoffs: [tim_burton, ...]``)
+and compiled once per settings snapshot into an immutable graph: adjacency as
+tuples, the personas reachable from each entry agent, and the longest handoff
+chain (hop depth) from every reachable persona. Compiling rejects handoffs to
+unknown personas and cycles, and reports personas no entry agent can reach
+(``personas.py build`` and ``list`` print them).
+
+The graph only reads the persona index, so compiling it does not load any
+persona file. ``build_agents()`` then creates the agents of one entry point,
+handoff targets first, and the resilient runner bounds each run to
+``max_turns(agent_key)`` model calls (one per hop plus the answer), so a
+handoff chain can never run longer than the graph allows.
+"""
+
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, FrozenSet, List, Mapping, Optional, Tuple
+
+from agents import Agent
+
+
+class HandoffGraphError(ValueError):
+    """Raised when declared handoffs do not form a valid graph."""
+
+
+@dataclass(frozen=True)
+class HandoffGraph:
+    """Immutable handoff adjacency with precomputed reachability and depth."""
+    adjacency: Mapping[str, Tuple[str, ...]]
+    entries: Tuple[str, ...]
+    reachable: FrozenSet[str]
+    unreachable: FrozenSet[str]
+    depths: Mapping[str, int]  # Longest handoff chain starting at each reachable persona
+
+    def targets(self, key: str) -> Tuple[str, ...]:
+        return self.adjacency.get(key, ())
+
+    def depth(self, key: str) -> Optional[int]:
+        return self.depths.get(key)
+
+    @property
+    def max_depth(self) -> int:
+        return max(self.depths.values(), default=0)
+
+    def max_turns(self, key: str) -> Optional[int]:
+        """Model calls a run starting at ``key`` can need: one per hop plus the answer."""
+        depth = self.depths.get(key)
+        return None if depth is None else depth + 1
+
+    def order(self, entry: str) -> List[str]:
+        """Personas reachable from ``entry``, every handoff target before its source."""
+        ordered, seen = [], set()
+
+        def visit(key):
+            if key in seen:
+                return
+            seen.add(key)
+            for target in self.adjacency.get(key, ()):
+                visit(target)
+            ordered.append(key)
+
+        visit(entry)
+        return ordered
+
+    def report(self) -> str:
+        lines = [f"🔀 Handoff graph: longest chain {self.max_depth} hop(s) from {', '.join(self.entries) or 'no entry'}"]
+        if self.unreachable:
+            lines.append(f"⚠️  No entry agent hands off to: {', '.join(sorted(self.unreachable))}")
+        return "\n".join(lines)
+
+
+def _find_cycle(adjacency: Dict[str, Tuple[str, ...]]) -> Optional[List[str]]:
+    """Return one cycle as a list of keys (first key repeated at the end), if any."""
+    state: Dict[str, int] = {}  # 1 = on the current path, 2 = finished
+    for root in adjacency:
+        if state.get(root):
+            continue
+        path, stack = [], [(root, iter(adjacency[root]))]
+        state[root] = 1
+        path.append(root)
+        while stack:
+            key, targets = stack[-1]
+            target = next(targets, None)
+            if target is None:
+                stack.pop()
+                path.pop()
+                state[key] = 2
+            elif state.get(target) == 1:
+                return path[path.index(target):] + [target]
+            elif not state.get(target):
+                state[target] = 1
+                path.append(target)
+                stack.append((target, iter(adjacency.get(target, ()))))
+    return None
+
+
+def compile_graph(catalogue, entries: List[str]) -> HandoffGraph:
+    """Compile the handoffs declared in a persona catalogue.
+
+    ``catalogue`` needs ``__iter__`` and ``handoffs(key)`` (see
+    ``agent.personas.PersonaCatalogue``); entries that are not personas are
+    ignored, so agents without handoffs (``obama``, ``creative``) can share
+    the same entry list.
+    """
+    adjacency = {key: tuple(catalogue.handoffs(key)) for key in catalogue}
+    for key, targets in adjacency.items():
+        unknown = [target for target in targets if target not in adjacency]
+        if unknown:
+            raise HandoffGraphError(f"'{key}' hands off to unknown persona(s): {', '.join(unknown)}")
+    cycle = _find_cycle(adjacency)
+    if cycle:
+        raise HandoffGraphError(f"handoff cycle: {' → '.join(cycle)}")
+
+    entries = tuple(entry for entry in entries if entry in adjacency)
+    reachable = set()
+    stack = list(entries)
+    while stack:
+        key = stack.pop()
+        if key not in reachable:
+            reachable.add(key)
+            stack.extend(adjacency[key])
+
+    depths: Dict[str, int] = {}
+
+    def depth(key):
+        if key not in depths:
+            depths[key] = 1 + max((depth(target) for target in adjacency[key]), default=-1)
+        return depths[key]
+
+    for key in reachable:
+        depth(key)
+    return HandoffGraph(
+        adjacency=MappingProxyType(adjacency),
+        entries=entries,
+        reachable=frozenset(reachable),
+        unreachable=frozenset(set(adjacency) - reachable),
+        depths=MappingProxyType(depths),
+    )
+
+
+def build_agents(entry: str, graph: HandoffGraph, catalogue, model: str) -> Dict[str, Agent]:
+    """Create the agents reachable from ``entry``, wired to their handoff targets."""
+    if entry not in graph.reachable:
+        raise KeyError(f"'{entry}' is not an entry agent of the handoff graph")
+    agents: Dict[str, Agent] = {}
+    for key in graph.order(entry):
+        config = catalogue[key]
+        agents[key] = Agent(
+            name=config.name,
+            instructions=config.instructions,
+            model=model,
+            handoffs=[agents[target] for target in graph.targets(key)],
+        )
+    return agents
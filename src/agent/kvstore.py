@@ -0,0 +1,300 @@
+"""Key-value backends for the shared cache tier.
+
+Every node keeps its own in-process LRU (see ``agent.cache``) in front of one
+of these:
+
+- ``RedisKV`` speaks the Redis protocol (RESP2) over a small pool of sockets;
+  it needs no client library and works with Redis, Valkey or anything
+  compatible;
+- ``MemoryKV`` is the embedded stand-in: the same interface in process, for
+  tests and single-node runs.
+
+``EmbeddedRedisServer`` serves a ``MemoryKV`` over the Redis protocol, so
+several local processes can share a cache without installing Redis (and the
+adapter is tested end to end):
+
+    python src/agent/kvstore.py serve --port 6390
+
+Backends store bytes with a time-to-live and support ``SET NX``, which the
+cache uses for its stampede locks.
+"""
+
+import socket
+import socketserver
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+
+class KVError(Exception):
+    """A backend call failed (connection, timeout or an error reply)."""
+
+
+class ReplyError(KVError):
+    """The server answered with an error (the connection is still usable)."""
+
+
+class MemoryKV:
+    """In-process key-value store with per-key expiry."""
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._data: Dict[str, Tuple[bytes, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires is not None and self._clock() >= expires:
+            del self._data[key]
+            return None
+        return value
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            return self._live(key)
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None, nx: bool = False) -> bool:
+        """Store a value; with ``nx`` only if the key is absent. Returns whether it was stored."""
+        with self._lock:
+            if nx and self._live(key) is not None:
+                return False
+            self._data[key] = (value, self._clock() + ttl if ttl else None)
+            return True
+
+    def delete(self, key: str) -> int:
+        with self._lock:
+            return int(self._data.pop(key, None) is not None)
+
+    def ping(self) -> bool:
+        return True
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def _encode_command(args) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode("utf-8")
+        elif isinstance(arg, (int, float)):
+            arg = str(arg).encode("ascii")
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+
+def _read_reply(stream):
+    line = stream.readline()
+    if not line.endswith(b"\r\n"):
+        raise KVError("connection closed")
+    kind, body = line[:1], line[1:-2]
+    if kind == b"+":
+        return body.decode("utf-8")
+    if kind == b"-":
+        raise ReplyError(body.decode("utf-8", "replace"))
+    if kind == b":":
+        return int(body)
+    if kind == b"$":
+        length = int(body)
+        if length < 0:
+            return None
+        data = stream.read(length + 2)
+        if len(data) != length + 2:
+            raise KVError("connection closed")
+        return data[:-2]
+    if kind == b"*":
+        count = int(body)
+        return None if count < 0 else [_read_reply(stream) for _ in range(count)]
+    raise KVError(f"unexpected reply {line[:20]!r}")
+
+
+class RedisKV:
+    """Minimal Redis-protocol client: GET, SET (PX, NX), DEL and PING."""
+
+    def __init__(self, url: str = "redis://localhost:6379/0", timeout: float = 0.2, pool_size: int = 8):
+        parsed = urlparse(url)
+        if parsed.scheme not in ("redis", ""):
+            raise ValueError(f"unsupported cache backend URL: {url}")
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._idle: List[Tuple[socket.socket, object]] = []
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), self.timeout)
+        sock.settimeout(self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        connection = (sock, sock.makefile("rb"))
+        try:
+            if self.password:
+                self._send(connection, ("AUTH", self.password))
+            if self.db:
+                self._send(connection, ("SELECT", self.db))
+        except BaseException:
+            self._close(connection)
+            raise
+        return connection
+
+    @staticmethod
+    def _send(connection, args):
+        sock, stream = connection
+        sock.sendall(_encode_command(args))
+        return _read_reply(stream)
+
+    def command(self, *args):
+        """Run one command and return its reply (raises ``KVError``)."""
+        with self._lock:
+            connection = self._idle.pop() if self._idle else None
+        try:
+            if connection is None:
+                connection = self._connect()
+            reply = self._send(connection, args)
+        except ReplyError:
+            if connection is not None:
+                self._release(connection)
+            raise
+        except KVError:
+            if connection is not None:
+                self._close(connection)
+            raise
+        except (OSError, ValueError) as exc:
+            if connection is not None:
+                self._close(connection)
+            raise KVError(f"{type(exc).__name__}: {exc}") from exc
+        self._release(connection)
+        return reply
+
+    def _release(self, connection) -> None:
+        with self._lock:
+            if len(self._idle) < self.pool_size:
+                self._idle.append(connection)
+                return
+        self._close(connection)
+
+    @staticmethod
+    def _close(connection) -> None:
+        sock, stream = connection
+        stream.close()
+        sock.close()
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            self._close(connection)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.command("GET", key)
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None, nx: bool = False) -> bool:
+        args = ["SET", key, value]
+        if ttl:
+            args += ["PX", max(1, int(ttl * 1000))]
+        if nx:
+            args.append("NX")
+        return self.command(*args) == "OK"
+
+    def delete(self, key: str) -> int:
+        return self.command("DEL", key)
+
+    def ping(self) -> bool:
+        return self.command("PING") == "PONG"
+
+
+class _RESPHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        kv: MemoryKV = self.server.kv
+        while True:
+            try:
+                args = _read_reply(self.rfile)
+            except (KVError, OSError, ValueError):
+                return
+            if not isinstance(args, list) or not args:
+                return
+            self.wfile.write(self._execute(kv, [a if isinstance(a, bytes) else str(a).encode() for a in args]))
+
+    @staticmethod
+    def _execute(kv: MemoryKV, args: List[bytes]) -> bytes:
+        name = args[0].upper()
+        if name == b"PING":
+            return b"+PONG\r\n"
+        if name in (b"AUTH", b"SELECT"):
+            return b"+OK\r\n"
+        if name == b"GET" and len(args) == 2:
+            value = kv.get(args[1].decode())
+            return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+        if name == b"SET" and len(args) >= 3:
+            options = [a.upper() for a in args[3:]]
+            ttl = None
+            if b"PX" in options:
+                ttl = int(args[3 + options.index(b"PX") + 1]) / 1000
+            elif b"EX" in options:
+                ttl = int(args[3 + options.index(b"EX") + 1])
+            stored = kv.set(args[1].decode(), args[2], ttl, nx=b"NX" in options)
+            return b"+OK\r\n" if stored else b"$-1\r\n"
+        if name == b"DEL":
+            return b":%d\r\n" % sum(kv.delete(key.decode()) for key in args[1:])
+        return b"-ERR unknown command '%s'\r\n" % args[0]
+
+
+class EmbeddedRedisServer(socketserver.ThreadingTCPServer):
+    """Serves a ``MemoryKV`` over the Redis protocol (the commands ``RedisKV`` uses)."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, kv: Optional[MemoryKV] = None):
+        super().__init__((host, port), _RESPHandler)
+        self.kv = kv or MemoryKV()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"redis://{host}:{port}/0"
+
+    def start(self) -> "EmbeddedRedisServer":
+        threading.Thread(target=self.serve_forever, name="embedded-redis", daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+def main(argv=None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Embedded Redis-protocol stand-in for the shared cache")
+    parser.add_argument("command", choices=["serve", "ping"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args(argv)
+    if args.command == "ping":
+        try:
+            print("PONG" if RedisKV(f"redis://{args.host}:{args.port}/0", timeout=1.0).ping() else "no reply")
+        except KVError as exc:
+            print(f"unreachable: {exc}")
+            return 1
+        return 0
+    server = EmbeddedRedisServer(args.host, args.port)
+    print(f"Serving an in-memory cache on {server.url} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""Load generator that simulates many concurrent interactive users.
+
+Each virtual user plays a scripted multi-turn persona built from the README
+sample conversations, waits a sampled think time between turns and talks to the
+Michelle Pfeiffer system through the same scheduler, resilient runner and
+session store as ``interactive_mode()``. Users start over a ramp-up period and
+personas are mixed so a chosen share of conversations trigger handoffs.
+
+The stack is driven in-process (there is no HTTP front-end to target) against
+the local stub model by default, which keeps thousands of users cheap. The
+report covers throughput, turn latency and time-to-first-token percentiles,
+handoff routing accuracy, scheduler rejections, process memory and event-loop
+lag on the loop that runs the agents.
+
+By default the interactive capacity is sized to the number of users (each
+user has at most one turn in flight), so the report measures the turn path
+rather than admission control; ``--max-concurrency`` sets a smaller cap to
+test overload. The response and routing caches are bypassed unless
+``--cache`` is given, since the scripted openers would otherwise be answered
+from the cache; cached turns are then reported apart from model turns.
+
+Usage::
+
+    python src/agent/loadgen.py --users 2000 --ramp-up 20 --think-time 2
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import resource
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Add the src directory to the path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from agents import RunConfig
+
+from agent.settings import settings, PriorityClassConfig, SchedulerConfig
+from agent.metrics import percentile
+from agent.scheduler import PriorityScheduler, INTERACTIVE
+from agent.sessions import session_store
+from agent.stub_model import StubModelProvider
+from agent.turns import run_turn_async
+
+THINK_TIME_DISTRIBUTIONS = ("exponential", "lognormal", "uniform", "constant")
+
+
+@dataclass(frozen=True)
+class Persona:
+    """A scripted conversation: (question, agent expected to answer) pairs."""
+    name: str
+    turns: Tuple[Tuple[str, str], ...]
+    handoff: bool
+
+
+PERSONAS: Tuple[Persona, ...] = (
+    Persona("batman_fan", (
+        ("Tell me about Batman Returns", "Tim Burton"),
+        ("What was it like playing Catwoman?", "Tim Burton"),
+        ("How did Tim Burton build that gothic world?", "Tim Burton"),
+    ), handoff=True),
+    Persona("period_drama_fan", (
+        ("What about The Age of Innocence?", "Martin Scorsese"),
+        ("How did Scorsese help you find Ellen Olenska?", "Martin Scorsese"),
+        ("What did Edith Wharton's novel mean to you?", "Martin Scorsese"),
+    ), handoff=True),
+    Persona("acting_student", (
+        ("How do you approach character development?", "Michelle Pfeiffer"),
+        ("What's your favorite acting technique?", "Michelle Pfeiffer"),
+        ("How do you prepare for a demanding role?", "Michelle Pfeiffer"),
+    ), handoff=False),
+    Persona("career_curious", (
+        ("How did you get your start in acting?", "Michelle Pfeiffer"),
+        ("Which of your films are you proudest of?", "Michelle Pfeiffer"),
+        ("What advice would you give young actors?", "Michelle Pfeiffer"),
+    ), handoff=False),
+)
+
+
+@dataclass
+class LoadProfile:
+    """Shape of a load test."""
+    users: int = 100
+    ramp_up: float = 10.0
+    turns_per_user: int = 3
+    think_time: float = 2.0
+    think_time_distribution: str = "exponential"
+    handoff_mix: float = 0.5
+    duration: Optional[float] = None
+    seed: int = 7
+
+    def think(self, rng: random.Random) -> float:
+        """Sample one think time from the configured distribution."""
+        mean = self.think_time
+        if mean <= 0:
+            return 0.0
+        if self.think_time_distribution == "exponential":
+            return rng.expovariate(1.0 / mean)
+        if self.think_time_distribution == "lognormal":
+            sigma = 0.5
+            return rng.lognormvariate(math.log(mean) - sigma * sigma / 2, sigma)
+        if self.think_time_distribution == "uniform":
+            return rng.uniform(0, 2 * mean)
+        if self.think_time_distribution == "constant":
+            return mean
+        raise ValueError(f"Unknown think time distribution: {self.think_time_distribution}")
+
+    def persona(self, rng: random.Random) -> Persona:
+        """Pick a persona so that ``handoff_mix`` of users trigger handoffs."""
+        handoff = rng.random() < self.handoff_mix
+        return rng.choice([p for p in PERSONAS if p.handoff == handoff])
+
+
+def _rss_bytes() -> int:
+    """Current resident set size (falls back to the peak where /proc is missing)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+@dataclass
+class LoadReport:
+    """Measurements collected during a load test."""
+    users: int = 0
+    elapsed: float = 0.0
+    turns: int = 0
+    errors: Counter = field(default_factory=Counter)
+    latencies: List[float] = field(default_factory=list)  # Turns that went to the model
+    cached_latencies: List[float] = field(default_factory=list)  # Turns served from the cache or a prefetch
+    ttfts: List[float] = field(default_factory=list)
+    routed: int = 0
+    misrouted: int = 0
+    loop_lag: List[float] = field(default_factory=list)
+    rss_start: int = 0
+    rss_peak: int = 0
+    max_active: int = 0
+
+    def summary(self) -> Dict[str, float]:
+        def pct(values: Sequence[float], p: float) -> float:
+            return percentile(sorted(values), p) if values else 0.0
+
+        return {
+            "users": self.users,
+            "elapsed_s": round(self.elapsed, 3),
+            "turns": self.turns,
+            "errors": sum(self.errors.values()),
+            "throughput_turns_per_s": round(self.turns / self.elapsed, 2) if self.elapsed else 0.0,
+            "latency_p50_s": round(pct(self.latencies, 50), 4),
+            "latency_p95_s": round(pct(self.latencies, 95), 4),
+            "latency_p99_s": round(pct(self.latencies, 99), 4),
+            "latency_max_s": round(max(self.latencies, default=0.0), 4),
+            "cached_turns": len(self.cached_latencies),
+            "cached_latency_p50_s": round(pct(self.cached_latencies, 50), 4),
+            "ttft_p50_s": round(pct(self.ttfts, 50), 4),
+            "ttft_p95_s": round(pct(self.ttfts, 95), 4),
+            "routing_accuracy": round(self.routed / (self.routed + self.misrouted), 4) if self.turns else 0.0,
+            "loop_lag_p50_ms": round(pct(self.loop_lag, 50) * 1000, 2),
+            "loop_lag_p99_ms": round(pct(self.loop_lag, 99) * 1000, 2),
+            "loop_lag_max_ms": round(max(self.loop_lag, default=0.0) * 1000, 2),
+            "rss_start_mb": round(self.rss_start / 2**20, 1),
+            "rss_peak_mb": round(self.rss_peak / 2**20, 1),
+            "rss_per_user_kb": round((self.rss_peak - self.rss_start) / 1024 / self.users, 1) if self.users else 0.0,
+            "max_active_users": self.max_active,
+        }
+
+    def format(self) -> str:
+        data = self.summary()
+        lines = [
+            f"👥 {data['users']} users, {data['turns']} turns in {data['elapsed_s']}s "
+            f"({data['throughput_turns_per_s']} turns/s, peak {data['max_active_users']} active)",
+            f"⏱️  latency p50 {data['latency_p50_s']}s  p95 {data['latency_p95_s']}s  "
+            f"p99 {data['latency_p99_s']}s  max {data['latency_max_s']}s",
+            f"   (model turns; {data['cached_turns']} cached turns, p50 {data['cached_latency_p50_s']}s)",
+            f"⚡ first token p50 {data['ttft_p50_s']}s  p95 {data['ttft_p95_s']}s",
+            f"🔀 routing accuracy {data['routing_accuracy']:.1%}",
+            f"🔁 loop lag p50 {data['loop_lag_p50_ms']}ms  p99 {data['loop_lag_p99_ms']}ms  max {data['loop_lag_max_ms']}ms",
+            f"🧠 RSS {data['rss_start_mb']} → {data['rss_peak_mb']} MB ({data['rss_per_user_kb']} KB/user)",
+        ]
+        if self.errors:
+            lines.append("❌ errors: " + ", ".join(f"{name} × {count}" for name, count in self.errors.most_common()))
+        return "\n".join(lines)
+
+
+class LoadTest:
+    """Drives virtual users against an agent on a scheduler's event loop."""
+
+    def __init__(
+        self,
+        profile: LoadProfile,
+        agent=None,
+        agent_key: str = "michelle",
+        run_config: Optional[RunConfig] = None,
+        turn_scheduler: Optional[PriorityScheduler] = None,
+        lag_interval: float = 0.05,
+        cache: bool = False,
+    ):
+        if agent is None:
+            from agent.pfeiffer import michelle_agent
+            agent = michelle_agent
+        self.profile = profile
+        self.agent = agent
+        self.agent_key = agent_key
+        self.run_config = run_config
+        self.scheduler = turn_scheduler or PriorityScheduler(settings.scheduler_config)
+        self.lag_interval = lag_interval
+        self.cache = cache
+        self.report = LoadReport(users=profile.users)
+        self._active = 0
+        self._deadline = None
+
+    def run(self) -> LoadReport:
+        """Run the test to completion and return the report."""
+        return asyncio.run_coroutine_threadsafe(self._run(), self.scheduler.loop).result()
+
+    async def _run(self) -> LoadReport:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        if self.profile.duration:
+            self._deadline = started + self.profile.duration
+        self.report.rss_start = self.report.rss_peak = _rss_bytes()
+        stop = asyncio.Event()
+        probe = asyncio.ensure_future(self._probe(stop))
+
+        spacing = self.profile.ramp_up / self.profile.users if self.profile.users else 0.0
+        users = [
+            asyncio.ensure_future(self._user(index, started + index * spacing))
+            for index in range(self.profile.users)
+        ]
+        await asyncio.gather(*users)
+
+        self.report.elapsed = loop.time() - started
+        stop.set()
+        await probe
+        return self.report
+
+    async def _probe(self, stop: asyncio.Event) -> None:
+        """Sample event-loop lag and memory while the test runs."""
+        loop = asyncio.get_running_loop()
+        while not stop.is_set():
+            expected = loop.time() + self.lag_interval
+            await asyncio.sleep(self.lag_interval)
+            self.report.loop_lag.append(max(0.0, loop.time() - expected))
+            self.report.rss_peak = max(self.report.rss_peak, _rss_bytes())
+
+    def _expired(self) -> bool:
+        return self._deadline is not None and asyncio.get_running_loop().time() >= self._deadline
+
+    async def _user(self, index: int, start_at: float) -> None:
+        loop = asyncio.get_running_loop()
+        rng = random.Random(self.profile.seed * 100_003 + index)
+        persona = self.profile.persona(rng)
+        await asyncio.sleep(max(0.0, start_at - loop.time()))
+        session = session_store.create(self.agent_key, self.agent.instructions)
+        self._active += 1
+        self.report.max_active = max(self.report.max_active, self._active)
+        try:
+            for turn in range(self.profile.turns_per_user):
+                if self._expired():
+                    break
+                question, expected = persona.turns[turn % len(persona.turns)]
+                await self._turn(session, question, expected)
+                if turn + 1 < self.profile.turns_per_user:
+                    await asyncio.sleep(self.profile.think(rng))
+        finally:
+            self._active -= 1
+
+    async def _turn(self, session, question: str, expected: str) -> None:
+        try:
+            result = await run_turn_async(
+                self.agent, question, self.agent_key, INTERACTIVE, session,
+                turn_scheduler=self.scheduler, use_cache=self.cache, run_config=self.run_config,
+            )
+        except Exception as exc:
+            self.report.errors[type(exc).__name__] += 1
+            return
+        self.report.turns += 1
+        if result.source in ("cache", "prefetch"):
+            self.report.cached_latencies.append(result.elapsed)
+        else:
+            self.report.latencies.append(result.elapsed)
+        if result.outcome is not None and result.outcome.ttft is not None:
+            self.report.ttfts.append(result.outcome.ttft)
+        if result.agent_name == expected:
+            self.report.routed += 1
+        else:
+            self.report.misrouted += 1
+
+
+def stub_run_config(ttft: float = 0.2, token_delay: float = 0.01, answer_tokens: int = 40) -> RunConfig:
+    """Run config that sends every model call to the local stub model."""
+    provider = StubModelProvider(ttft=ttft, token_delay=token_delay, answer_tokens=answer_tokens)
+    return RunConfig(model_provider=provider, tracing_disabled=True)
+
+
+def load_scheduler(max_concurrency: Optional[int], users: int) -> PriorityScheduler:
+    """The configured scheduler with an interactive capacity of ``max_concurrency``.
+
+    ``None`` sizes it to ``users`` (no turn is ever rejected); ``0`` keeps the
+    configured capacity.
+    """
+    if max_concurrency is None:
+        max_concurrency = users
+    if not max_concurrency:
+        return PriorityScheduler(settings.scheduler_config)
+    classes = dict(settings.scheduler_config.classes)
+    interactive = classes.get(INTERACTIVE, PriorityClassConfig())
+    classes[INTERACTIVE] = interactive.model_copy(update={
+        "max_concurrency": max_concurrency,
+        "max_queue": max(interactive.max_queue, users),
+    })
+    return PriorityScheduler(SchedulerConfig(max_concurrency=max_concurrency, classes=classes))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Simulate concurrent interactive users against the agent stack.")
+    parser.add_argument("--users", type=int, default=100, help="number of virtual users")
+    parser.add_argument("--ramp-up", type=float, default=10.0, help="seconds over which users start")
+    parser.add_argument("--turns", type=int, default=3, help="turns per user")
+    parser.add_argument("--think-time", type=float, default=2.0, help="mean think time between turns (s)")
+    parser.add_argument("--think-dist", choices=THINK_TIME_DISTRIBUTIONS, default="exponential")
+    parser.add_argument("--handoff-mix", type=float, default=0.5, help="share of users asking handoff questions")
+    parser.add_argument("--duration", type=float, help="stop starting new turns after this many seconds")
+    parser.add_argument("--max-concurrency", type=int,
+                        help="interactive capacity (default: one per user; 0 = the configured scheduler)")
+    parser.add_argument("--cache", action="store_true", help="serve repeated openers from the response cache")
+    parser.add_argument("--live", action="store_true", help="use the real model instead of the stub")
+    parser.add_argument("--stub-ttft", type=float, default=0.2, help="stub time to first token (s)")
+    parser.add_argument("--stub-token-delay", type=float, default=0.01, help="stub delay per output token (s)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    profile = LoadProfile(
+        users=args.users,
+        ramp_up=args.ramp_up,
+        turns_per_user=args.turns,
+        think_time=args.think_time,
+        think_time_distribution=args.think_dist,
+        handoff_mix=args.handoff_mix,
+        duration=args.duration,
+        seed=args.seed,
+    )
+    run_config = None if args.live else stub_run_config(args.stub_ttft, args.stub_token_delay)
+    test = LoadTest(profile, run_config=run_config, turn_scheduler=load_scheduler(args.max_concurrency, args.users),
+                    cache=args.cache)
+    report = test.run()
+    print(json.dumps(report.summary(), indent=2) if args.json else report.format())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+"""Small latency statistics helpers shared by the agent runtime."""
+
+from collections import deque
+from typing import Dict, Iterable
+
+
+def percentile(values: Iterable[float], pct: float) -> float:
+    """Return the pct-th percentile of values using linear interpolation."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    if len(ordered) == 1:
+        return ordered[0]
+    rank = (len(ordered) - 1) * (pct / 100.0)
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    fraction = rank - lower
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * fraction
+
+
+class LatencyWindow:
+    """Bounded window of recent latency samples in seconds."""
+
+    def __init__(self, maxlen: int = 1024):
+        self._samples = deque(maxlen=maxlen)
+        self.count = 0
+
+    def add(self, value: float) -> None:
+        """Record a new sample."""
+        self._samples.append(value)
+        self.count += 1
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, pct: float) -> float:
+        """Return the pct-th percentile of the samples in the window."""
+        return percentile(list(self._samples), pct)
+
+    def summary(self) -> Dict[str, float]:
+        """Summarise the window as count, mean, p50, p95, p99 and max."""
+        samples = list(self._samples)
+        if not samples:
+            return {"count": 0, "mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+        return {
+            "count": self.count,
+            "mean": sum(samples) / len(samples),
+            "p50": percentile(samples, 50),
+            "p95": percentile(samples, 95),
+            "p99": percentile(samples, 99),
+            "max": max(samples),
+        }
@@ -1,10 +1,22 @@
-from agents import Agent, Runner
+from agents import Agent
 import sys
 import os
 
 # Add the src directory to the path for imports
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from agent.settings import settings
+from agent.budgets import response_budgets
+from agent.client import ask
+from agent.cli import parse_args
+from agent.convlog import start_session
+from agent.guardrails import guardrails
+from agent.pipeline import pipeline_mode, run_piped
+from agent.prefetch import prefetcher
+from agent.profiling import profile_session
+from agent.resilience import CircuitOpenError
+from agent.scheduler import API
+from agent.turns import run_turn
+from agent.warmup import warmup
 
 
 def create_obama_agent():
@@ -20,7 +32,7 @@ def create_obama_agent():
     )
 
 
-def interactive_mode():
+def interactive_mode(resume=None):
     """Run the Michelle Obama agent in interactive mode."""
     agent = create_obama_agent()
     
@@ -30,6 +42,14 @@ def interactive_mode():
     print("   her books, initiatives, and remarkable life.")
     print("\n   Type 'exit' to quit.\n")
 
+    session, resumed = start_session("obama", agent.instructions, resume)
+    if resumed:
+        print(f"   ↩️  Resumed session {session.session_id} ({len(session)} recent messages restored).\n")
+    elif resume:
+        print(f"   ⚠️  No saved conversation '{resume}', starting a new one.\n")
+    if not resumed:
+        print(f"   💾 Session {session.session_id} (continue later with --resume {session.session_id})\n")
+
     while True:
         try:
             user_input = input("💬 You: ").strip()
@@ -43,33 +63,63 @@ def interactive_mode():
                 continue
 
             # Run the agent with user input
-            result = Runner.run_sync(agent, user_input)
-            
+            result = run_turn(agent, user_input, "obama", session=session)
+
+            if result.cancelled:
+                print("\n\n⏹️  Stopped that answer. Ask me something else.\n")
+                continue
+
             # Display the response
             print(f"\n👩🏾‍💼 Michelle Obama Expert: {result.final_output}\n")
+            if result.timed_out:
+                print("⏱️  (Answer cut short at the turn deadline.)\n")
+            if settings.agent_verbose and result.tier:
+                print(f"📏 Budget tier: {result.tier}\n")
 
         except KeyboardInterrupt:
             print(f"\n\n👋 Goodbye!")
             break
+        except CircuitOpenError as e:
+            print(f"\n⏳ The model is temporarily unavailable ({str(e)}). Please try again shortly.\n")
         except Exception as e:
             print(f"\n❌ Error: {str(e)}\n")
 
+    if settings.agent_verbose and guardrails.screened:
+        print(guardrails.report())
+    if settings.agent_verbose and prefetcher.predicted:
+        print(prefetcher.report())
+    if settings.agent_verbose and response_budgets.stats():
+        print(response_budgets.report())
+
+
+def answer_question(user_input, agent=None):
+    """Answer one piped question on its own (pipeline mode)."""
+    return run_turn(agent or create_obama_agent(), user_input, "obama", priority=API)
+
 
 def main():
-    """Run a single example query about Michelle Obama."""
-    agent = create_obama_agent()
-    
+    """Run a single example query about Michelle Obama (on the agent daemon when one is running)."""
     print("Michelle Obama Knowledge Assistant")
     print("Using model:", settings.model_name)
     print("-" * 40)
     
-    result = Runner.run_sync(agent, "What were Michelle Obama's major initiatives as First Lady?")
-    print(result.final_output)
+    response = ask("obama", "What were Michelle Obama's major initiatives as First Lady?")
+    print(response["final_output"] if response["ok"] else f"❌ Error: {response['error']}")
 
 
 if __name__ == "__main__":
-    # Check if we want interactive mode
-    if len(sys.argv) > 1 and sys.argv[1] == "--interactive":
-        interactive_mode()
-    else:
-        main()
\ No newline at end of file
+    args = parse_args("Michelle Obama knowledge assistant")
+    with profile_session("obama", cpu=args.profile, memory=args.profile_memory):
+        if args.interactive and pipeline_mode(args):
+            obama_agent = create_obama_agent()
+            run_piped(args, lambda user_input: answer_question(user_input, obama_agent), "👩🏾‍💼 Michelle Obama Expert")
+        elif args.interactive:
+            if args.prefetch:
+                prefetcher.enable()
+            if warmup.start(["obama"]) is not None:
+                print(f"🔥 Warming caches in the background ({warmup.total} prompts)")
+            interactive_mode(resume=args.resume)
+            if warmup.total and settings.agent_verbose:
+                print(warmup.report())
+        else:
+            main()
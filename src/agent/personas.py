@@ -0,0 +1,251 @@
+"""Persona catalogue: one YAML file per agent plus a prebuilt index.
+
+Each persona lives in ``config/personas/<key>.yaml`` with the same fields as an
+``agents:`` entry in ``settings.yaml`` (``name``, ``emoji``, ``instructions``
+and the keys of the personas it can hand off to). ``index.json`` next to them
+lists every key with its file, display name, emoji, handoff keys and prompt
+token counts, so listing the catalogue, resolving handoff graphs and checking
+prompt budgets never opens a persona file.
+
+A persona's file is read and validated only when its config is first asked
+for, and at most ``max_loaded`` validated configs are kept, so start-up time
+and memory stay flat however many personas the catalogue holds. A file that
+changed since the index was built is re-read on access; a missing index is
+rebuilt in memory (``make persona-index`` writes it to disk and validates
+every file). Edits are detected by the file's content hash rather than its
+modification time, which a fresh checkout resets.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
+
+import yaml
+from pydantic import ValidationError
+
+# Allow running as a script (python src/agent/personas.py build)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from agent.prompt_costs import estimated_prompt_tokens
+from agent.settings import AgentConfig, PersonaConfig
+
+if TYPE_CHECKING:
+    from agent.workers import WorkerPool
+
+INDEX_VERSION = 3
+PERSONA_SUFFIXES = (".yaml", ".yml")
+
+
+class PersonaError(ValueError):
+    """Raised when a persona file is missing or does not validate."""
+
+
+def _read_persona(path: str) -> Tuple[AgentConfig, str]:
+    """The validated config in a persona file and the hash of its content."""
+    try:
+        with open(path, "rb") as f:
+            content = f.read()
+        data = yaml.safe_load(content) or {}
+        return AgentConfig(**data), hashlib.sha1(content).hexdigest()[:16]
+    except (OSError, yaml.YAMLError, ValidationError, TypeError) as exc:
+        raise PersonaError(f"invalid persona file {path}: {exc}") from exc
+
+
+def _index_entry(filename: str, config: AgentConfig, digest: str) -> Dict[str, Any]:
+    instruction_tokens, handoff_tokens = estimated_prompt_tokens(config.instructions, config.name)
+    return {
+        "file": filename,
+        "name": config.name,
+        "emoji": config.emoji,
+        "handoffs": list(config.handoffs),
+        "instruction_tokens": instruction_tokens,
+        "handoff_tokens": handoff_tokens,  # The tool other personas hand off to it with
+        "sha1": digest,
+    }
+
+
+def _persona_files(directory: str) -> List[str]:
+    return [name for name in sorted(os.listdir(directory)) if os.path.splitext(name)[1] in PERSONA_SUFFIXES]
+
+
+def index_stage(filenames: List[str], directory: str) -> List[Dict[str, Any]]:
+    """Index entries for a batch of persona files (runs in worker processes)."""
+    return [_index_entry(filename, *_read_persona(os.path.join(directory, filename))) for filename in filenames]
+
+
+async def index_personas(directory: str, pool: "WorkerPool") -> Dict[str, Any]:
+    """``build_index`` with the files parsed and validated across a worker pool."""
+    filenames = _persona_files(directory)
+    entries = await pool.map(index_stage, filenames, directory)
+    personas = {os.path.splitext(entry["file"])[0]: entry for entry in entries}
+    return {"version": INDEX_VERSION, "personas": personas}
+
+
+def build_index(directory: str, pool: Optional["WorkerPool"] = None) -> Dict[str, Any]:
+    """Read and validate every persona file in a directory and return the index.
+
+    With a ``pool``, large catalogues are parsed across its worker processes.
+    """
+    if pool is not None:
+        return asyncio.run(index_personas(directory, pool))
+    entries = index_stage(_persona_files(directory), directory)
+    return {"version": INDEX_VERSION, "personas": {os.path.splitext(entry["file"])[0]: entry for entry in entries}}
+
+
+def write_index(directory: str, index_path: str, pool: Optional["WorkerPool"] = None) -> Dict[str, Any]:
+    """Build the index and write it atomically."""
+    index = build_index(directory, pool)
+    temporary = f"{index_path}.tmp"
+    with open(temporary, "w") as f:
+        json.dump(index, f, indent=1, ensure_ascii=False)
+        f.write("\n")
+    os.replace(temporary, index_path)
+    return index
+
+
+class PersonaCatalogue(Mapping):
+    """Read-only mapping of agent key to ``AgentConfig``, loaded on demand.
+
+    Configs defined inline (the ``agents:`` section of ``settings.yaml``) take
+    precedence over persona files with the same key.
+    """
+
+    def __init__(self, config: Optional[PersonaConfig] = None, inline: Optional[Dict[str, AgentConfig]] = None):
+        self.config = config or PersonaConfig()
+        self.inline = dict(inline or {})
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self._loaded: "OrderedDict[str, AgentConfig]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.index_rebuilt = False
+
+    # Index
+
+    @property
+    def entries(self) -> Dict[str, Dict[str, Any]]:
+        """Index entries by key (read once, on first use)."""
+        if self._entries is None:
+            with self._lock:
+                if self._entries is None:
+                    self._entries = self._read_index()
+        return self._entries
+
+    def _read_index(self) -> Dict[str, Dict[str, Any]]:
+        directory, index_path = self.config.directory, self.config.index
+        if not os.path.isdir(directory):
+            return {}
+        try:
+            with open(index_path, "r") as f:
+                index = json.load(f)
+            if index.get("version") == INDEX_VERSION:
+                return index["personas"]
+        except (OSError, ValueError, KeyError):
+            pass
+        self.index_rebuilt = True
+        return build_index(directory)["personas"]
+
+    # Mapping interface
+
+    def __getitem__(self, key: str) -> AgentConfig:
+        if key in self.inline:
+            return self.inline[key]
+        with self._lock:
+            config = self._loaded.get(key)
+            if config is not None:
+                self._loaded.move_to_end(key)
+                return config
+        entry = self.entries.get(key)
+        if entry is None:
+            raise KeyError(key)
+        config = self._load(key, entry)
+        with self._lock:
+            self._loaded[key] = config
+            while len(self._loaded) > self.config.max_loaded:
+                self._loaded.popitem(last=False)
+        return config
+
+    def _load(self, key: str, entry: Dict[str, Any]) -> AgentConfig:
+        config, digest = _read_persona(os.path.join(self.config.directory, entry["file"]))
+        with self._lock:
+            self.loads += 1
+            if digest != entry.get("sha1"):
+                # Edited since the index was built: trust the file
+                self.entries[key] = _index_entry(entry["file"], config, digest)
+        return config
+
+    def __contains__(self, key) -> bool:
+        return key in self.inline or key in self.entries
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self.inline
+        yield from (key for key in self.entries if key not in self.inline)
+
+    def __len__(self) -> int:
+        return len(self.inline) + sum(1 for key in self.entries if key not in self.inline)
+
+    # Cheap lookups that never open a persona file
+
+    def handoffs(self, key: str) -> List[str]:
+        """Keys of the personas an agent can hand off to."""
+        if key in self.inline:
+            return list(self.inline[key].handoffs)
+        entry = self.entries.get(key)
+        if entry is None:
+            raise KeyError(key)
+        return list(entry.get("handoffs", []))
+
+    def display_name(self, key: str) -> str:
+        if key in self.inline:
+            return self.inline[key].name
+        return self.entries[key]["name"]
+
+    def prompt_tokens(self, key: str) -> Tuple[int, int]:
+        """Estimated tokens of a persona's instructions and of the tool that hands off to it."""
+        if key in self.inline:
+            return estimated_prompt_tokens(self.inline[key].instructions, self.inline[key].name)
+        entry = self.entries[key]
+        return entry["instruction_tokens"], entry["handoff_tokens"]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "personas": len(self),
+            "loaded": len(self._loaded),
+            "loads": self.loads,
+            "index_rebuilt": self.index_rebuilt,
+        }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import argparse
+    from agent.handoff_graph import compile_graph
+    from agent.settings import settings
+    from agent.workers import worker_pool
+
+    parser = argparse.ArgumentParser(description="Build or inspect the persona catalogue index")
+    parser.add_argument("command", choices=["build", "list"])
+    args = parser.parse_args(argv)
+    config = settings.persona_config
+    if args.command == "build":
+        try:
+            index = write_index(config.directory, config.index, worker_pool)
+        finally:
+            worker_pool.shutdown()
+        print(f"✓ Indexed and validated {len(index['personas'])} personas into {config.index}")
+    catalogue = PersonaCatalogue(config, settings.inline_agents)
+    graph = compile_graph(catalogue, settings.handoff_graph_config.entries)
+    if args.command == "list":
+        for key in catalogue:
+            handoffs = ", ".join(catalogue.handoffs(key)) or "-"
+            depth = graph.depth(key)
+            hops = "unreachable" if depth is None else f"depth {depth}"
+            print(f"{key:<24} {catalogue.display_name(key):<32} {hops:<12} → {handoffs}")
+    print(graph.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,37 @@
-from agents import Agent, Runner
-import asyncio
 import sys
 import os
 
 # Add the src directory to the path for imports
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from agent.settings import settings
+from agent.affinity import session_affinity
+from agent.budgets import response_budgets
+from agent.client import ask
+from agent.cli import parse_args
+from agent.convlog import start_session
+from agent.guardrails import guardrails
+from agent.handoff_filters import handoff_filters
+from agent.handoff_graph import build_agents
+from agent.pipeline import pipeline_mode, run_piped
+from agent.prefetch import prefetcher
+from agent.profiling import profile_session
+from agent.resilience import CircuitOpenError
+from agent.scheduler import API
+from agent.turns import run_turn
+from agent.warmup import warmup
 
-# Create Tim Burton agent
+# Build Michelle Pfeiffer and her director friends from the compiled handoff
+# graph (handoffs are declared in config/personas/)
+michelle_config = settings.get_agent_config("michelle")
 tim_config = settings.get_agent_config("tim_burton")
-tim_burton_agent = Agent(
-    name=tim_config.name,
-    instructions=tim_config.instructions,
-    model=settings.model_name,
-)
-
-# Create Martin Scorsese agent
 martin_config = settings.get_agent_config("martin_scorsese")
-martin_scorsese_agent = Agent(
-    name=martin_config.name,
-    instructions=martin_config.instructions,
-    model=settings.model_name,
-)
-
-# Create Michelle Pfeiffer agent with handoffs to her director friends
-michelle_config = settings.get_agent_config("michelle")
-michelle_agent = Agent(
-    name=michelle_config.name,
-    instructions=michelle_config.instructions,
-    model=settings.model_name,
-    handoffs=[tim_burton_agent, martin_scorsese_agent],
-)
+cast = build_agents("michelle", settings.handoff_graph, settings.agent_configs, settings.model_name)
+michelle_agent = cast["michelle"]
+tim_burton_agent = cast["tim_burton"]
+martin_scorsese_agent = cast["martin_scorsese"]
 
 
-def interactive_mode():
+def interactive_mode(resume=None):
     """Run the agent in interactive mode."""
     print(f"\n{michelle_config.emoji} {michelle_config.name} Agent System")
     print("━" * 50)
@@ -44,6 +42,14 @@ def interactive_mode():
     print(f"   {martin_config.emoji} {martin_config.name} (The Age of Innocence director)")
     print("\n   Type 'exit' to quit.\n")
 
+    session, resumed = start_session("michelle", michelle_agent.instructions, resume)
+    if resumed:
+        print(f"   ↩️  Resumed session {session.session_id} ({len(session)} recent messages restored).\n")
+    elif resume:
+        print(f"   ⚠️  No saved conversation '{resume}', starting a new one.\n")
+    if not resumed:
+        print(f"   💾 Session {session.session_id} (continue later with --resume {session.session_id})\n")
+
     while True:
         try:
             user_input = input("💬 You: ").strip()
@@ -57,27 +63,65 @@ def interactive_mode():
                 continue
 
             # Run the agent with user input
-            result = Runner.run_sync(michelle_agent, user_input)
-            
+            result = run_turn(michelle_agent, user_input, "michelle", session=session)
+
+            if result.cancelled:
+                print("\n\n⏹️  Stopped that answer. Ask me something else.\n")
+                continue
+
             # Display the response
             print(f"\n🎭 Response: {result.final_output}\n")
+            if result.timed_out:
+                print("⏱️  (Answer cut short at the turn deadline.)\n")
+            if settings.agent_verbose and result.tier:
+                print(f"📏 Budget tier: {result.tier}\n")
 
         except KeyboardInterrupt:
             print(f"\n\n👋 Goodbye!")
             break
+        except CircuitOpenError as e:
+            print(f"\n⏳ The model is temporarily unavailable ({str(e)}). Please try again shortly.\n")
         except Exception as e:
             print(f"\n❌ Error: {str(e)}\n")
 
+    if settings.agent_verbose:
+        print(session_affinity.report(session.session_id))
+        if guardrails.screened:
+            print(guardrails.report())
+        if prefetcher.predicted:
+            print(prefetcher.report())
+        if response_budgets.stats():
+            print(response_budgets.report())
+        if handoff_filters.edges:
+            print(handoff_filters.report())
+
+
+def answer_question(user_input):
+    """Answer one piped question on its own (pipeline mode)."""
+    return run_turn(michelle_agent, user_input, "michelle", priority=API)
+
 
-async def main():
-    """Example of a single interaction."""
-    result = await Runner.run(michelle_agent, input="Tell me about working with Tim Burton on Batman Returns.")
-    print(f"\n{michelle_config.emoji} {result.final_output}")
+def main():
+    """Example of a single interaction (answered by the agent daemon when one is running)."""
+    response = ask("michelle", "Tell me about working with Tim Burton on Batman Returns.")
+    if not response["ok"]:
+        print(f"\n❌ Error: {response['error']}")
+        return
+    print(f"\n{michelle_config.emoji} {response['final_output']}")
 
 
 if __name__ == "__main__":
-    # Check if we want interactive mode
-    if len(sys.argv) > 1 and sys.argv[1] == "--interactive":
-        interactive_mode()
-    else:
-        asyncio.run(main())
\ No newline at end of file
+    args = parse_args("Michelle Pfeiffer agent system")
+    with profile_session("pfeiffer", cpu=args.profile, memory=args.profile_memory):
+        if args.interactive and pipeline_mode(args):
+            run_piped(args, answer_question, "🎭 Response")
+        elif args.interactive:
+            if args.prefetch:
+                prefetcher.enable()
+            if warmup.start(["michelle"]) is not None:
+                print(f"🔥 Warming caches in the background ({warmup.total} prompts)")
+            interactive_mode(resume=args.resume)
+            if warmup.total and settings.agent_verbose:
+                print(warmup.report())
+        else:
+            main()
@@ -0,0 +1,181 @@
+"""Pipelined stdin mode for the interactive entry points.
+
+When questions are piped into ``--interactive`` (stdin is not a terminal), the
+conversation loop would read one line, wait for its answer and only then read
+the next. In pipeline mode a reader keeps reading ahead, each question is
+answered on its own (no shared session, so every question is independent and
+can come from the response cache), up to ``pipeline.concurrency`` at once, and
+a writer prints the answers strictly in input order as soon as each one and
+everything before it is done.
+
+Reading stops at EOF or an ``exit``/``quit``/``bye`` line. Reading never runs
+more than ``pipeline.read_ahead`` questions ahead of the oldest unanswered one,
+so a long input stream is processed in bounded memory. A failed question is
+reported in its place and the rest carry on.
+
+    cat questions.txt | python src/agent/pfeiffer.py --interactive
+    cat questions.txt | python src/agent/obama.py --interactive --jsonl --concurrency 12
+"""
+
+import json
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional, TextIO
+
+from agent.resilience import CircuitOpenError
+from agent.settings import settings, PipelineConfig
+
+EXIT_COMMANDS = ("exit", "quit", "bye")
+FORMATS = ("text", "jsonl")
+
+
+@dataclass
+class PipelineStats:
+    """What one pipelined run did."""
+    questions: int = 0
+    errors: int = 0
+    elapsed: float = 0.0
+    max_in_flight: int = 0
+
+    def report(self, concurrency: int) -> str:
+        rate = self.questions / self.elapsed if self.elapsed else 0.0
+        return (
+            f"⚡ Pipeline: {self.questions} questions in {self.elapsed:.1f}s "
+            f"({rate:.1f}/s, up to {self.max_in_flight} at once, limit {concurrency}), {self.errors} errors"
+        )
+
+
+def pipeline_mode(args, stdin: Optional[TextIO] = None) -> bool:
+    """Whether an ``--interactive`` run should answer its input as a pipeline."""
+    if args.no_pipeline or args.resume:
+        return False
+    stdin = stdin or sys.stdin
+    try:
+        return not stdin.isatty()
+    except (AttributeError, ValueError):
+        return False
+
+
+def _questions(lines: Iterable[str]):
+    for line in lines:
+        question = line.strip()
+        if question.lower() in EXIT_COMMANDS:
+            return
+        if question:
+            yield question
+
+
+def _error(exc: BaseException) -> str:
+    if isinstance(exc, CircuitOpenError):
+        return f"The model is temporarily unavailable ({exc})"
+    return str(exc) or type(exc).__name__
+
+
+def _format(fmt: str, label: str, index: int, question: str, result, error: Optional[str]) -> str:
+    if fmt == "jsonl":
+        record = {"index": index, "input": question}
+        if error is None:
+            record.update(
+                output=result.final_output,
+                agent=result.agent_name,
+                source=result.source,
+                elapsed=round(result.elapsed, 3),
+                timed_out=result.timed_out,
+            )
+        else:
+            record["error"] = error
+        return json.dumps(record, ensure_ascii=False) + "\n"
+    if error is not None:
+        return f"💬 You: {question}\n\n❌ Error: {error}\n\n"
+    text = f"💬 You: {question}\n\n{label}: {result.final_output}\n\n"
+    if result.timed_out:
+        text += "⏱️  (Answer cut short at the turn deadline.)\n\n"
+    return text
+
+
+def run_pipeline(
+    answer: Callable[[str], object],
+    label: str,
+    lines: Optional[Iterable[str]] = None,
+    out: Optional[TextIO] = None,
+    config: Optional[PipelineConfig] = None,
+    concurrency: Optional[int] = None,
+    fmt: Optional[str] = None,
+) -> PipelineStats:
+    """Answer every question in ``lines`` concurrently and write the answers in input order.
+
+    ``answer`` runs one independent question and returns a ``TurnResult``;
+    ``label`` prefixes text-format answers, as in the entry point's own loop.
+    """
+    config = config or settings.pipeline_config
+    concurrency = max(1, concurrency or config.concurrency)
+    fmt = fmt or config.format
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown pipeline format '{fmt}' (known: {', '.join(FORMATS)})")
+    lines = sys.stdin if lines is None else lines
+    out = out or sys.stdout
+    stats = PipelineStats()
+    in_flight = 0
+    lock = threading.Lock()
+
+    def run(question: str):
+        nonlocal in_flight
+        with lock:
+            in_flight += 1
+            stats.max_in_flight = max(stats.max_in_flight, in_flight)
+        try:
+            return answer(question)
+        finally:
+            with lock:
+                in_flight -= 1
+
+    # The reader blocks on this queue once it is read_ahead questions ahead
+    pending: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=max(concurrency, config.read_ahead))
+
+    def write() -> None:
+        while True:
+            entry = pending.get()
+            if entry is None:
+                return
+            index, question, future = entry
+            try:
+                result, error = future.result(), None
+            except BaseException as exc:  # reported in place; the pipeline carries on
+                result, error = None, _error(exc)
+                stats.errors += 1
+            out.write(_format(fmt, label, index, question, result, error))
+            out.flush()
+
+    started = time.perf_counter()
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="pipeline")
+    writer = threading.Thread(target=write, name="pipeline-writer", daemon=True)
+    writer.start()
+    try:
+        # Only the writer's queue holds futures, so written answers are freed as the input streams
+        for index, question in enumerate(_questions(lines)):
+            future: Future = executor.submit(run, question)
+            pending.put((index, question, future))
+            stats.questions += 1
+        pending.put(None)
+        writer.join()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)  # On Ctrl+C, drops every question not yet started
+        stats.elapsed = time.perf_counter() - started
+    return stats
+
+
+def run_piped(args, answer: Callable[[str], object], label: str) -> PipelineStats:
+    """Run the pipeline for an entry point's parsed arguments and report on stderr."""
+    concurrency = args.concurrency or settings.pipeline_config.concurrency
+    try:
+        stats = run_pipeline(answer, label, concurrency=concurrency, fmt="jsonl" if args.jsonl else None)
+    except KeyboardInterrupt:
+        print("\n👋 Goodbye!", file=sys.stderr)
+        return PipelineStats()
+    if settings.agent_verbose:
+        print(stats.report(concurrency), file=sys.stderr)
+    return stats
@@ -0,0 +1,279 @@
+"""Predictive prefetch of likely follow-up answers.
+
+In an interactive session the user spends seconds reading an answer and typing
+the next question, and after some answers that question is easy to guess:
+Batman Returns leads to the Catwoman costume, working with Tim Burton or the
+gothic look. When prefetch is on (``prefetch.enabled`` or ``--prefetch``),
+each finished turn predicts the ``top_k`` most likely follow-ups from the
+candidates listed under ``prefetch.follow_ups``. The prediction is local, with
+no model call: it uses the topic words of the last question and answer, and
+skips follow-ups the session has already asked. The predicted questions are
+then answered in the background at batch priority, with the session's context
+and starting at the agent that answered last. If the next question matches one
+of them closely, that answer is served without waiting for the model. If it is
+still being generated, the turn waits for it instead of starting over. The
+other predictions are cancelled or dropped. Speculative runs leave the agent's
+circuit breaker alone: they neither take its half-open probe nor count towards
+opening it. Nothing is predicted while the circuit is not closed.
+
+Speculation costs tokens. A session stops predicting once its spend, plus a
+reservation for each prediction still running, reaches
+``prefetch.token_budget``. The hit rate and the tokens (and dollars) spent on
+answers nobody asked for are in ``stats()`` and ``report()``, so the budget
+and ``top_k`` can be tuned.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set
+
+from agent.affinity import content_words
+from agent.budgets import response_budgets
+from agent.registry import find_agent
+from agent.resilience import resilient_runner, CircuitBreaker
+from agent.scheduler import scheduler, PriorityScheduler
+from agent.sessions import session_store, Session, ROLE_USER
+from agent.settings import settings, PrefetchConfig
+from agent.telemetry import telemetry
+
+
+def similarity(a: Set[str], b: Set[str]) -> float:
+    """Word overlap (Jaccard) of two content-word sets."""
+    return len(a & b) / len(a | b) if a | b else 0.0
+
+
+@dataclass
+class Prefetch:
+    """One follow-up being answered ahead of time."""
+    question: str
+    words: Set[str]
+    future: Optional[Future] = None
+    started: float = field(default_factory=time.perf_counter)
+    input_tokens: int = 0  # Once finished
+    output_tokens: int = 0
+
+
+@dataclass
+class SessionPrefetches:
+    pending: List[Prefetch] = field(default_factory=list)
+    spent: int = 0
+
+
+class Prefetcher:
+    """Predicts follow-ups after each turn and answers them in the background."""
+
+    def __init__(
+        self,
+        config: Optional[PrefetchConfig] = None,
+        turn_scheduler: Optional[PriorityScheduler] = None,
+        **run_kwargs,
+    ):
+        self.config = config or PrefetchConfig()
+        self.scheduler = turn_scheduler or scheduler
+        self._run_kwargs = run_kwargs  # Overrides for every speculative run (tests, benchmarks)
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, SessionPrefetches] = {}
+        self._follow_ups = {
+            agent_key: [(frozenset(content_words(" ".join(entry.after))), entry) for entry in entries]
+            for agent_key, entries in self.config.follow_ups.items()
+        }
+        self.predicted = 0
+        self.lookups = 0  # Turns that had predictions waiting
+        self.hits = 0
+        self.in_flight_hits = 0  # Hits still being generated when asked
+        self.wasted = 0  # Predictions never asked for
+        self.budget_skips = 0
+        self.circuit_skips = 0
+        self.failed = 0
+        self.input_tokens = 0  # Spent on speculation
+        self.output_tokens = 0
+        self.served_input_tokens = 0  # Of answers that were served
+        self.served_output_tokens = 0
+        self.seconds_saved = 0.0
+
+    def enable(self) -> None:
+        self.config = self.config.model_copy(update={"enabled": True})
+
+    def predict(self, agent_key: str, text: str, asked: List[str] = ()) -> List[str]:
+        """The top_k follow-ups to a question and its answer, most likely first."""
+        words = content_words(text)
+        asked_words = [content_words(question) for question in asked]
+        scored = []
+        for order, (topic, entry) in enumerate(self._follow_ups.get(agent_key, ())):
+            hits = len(words & topic)
+            if not hits:
+                continue
+            question_words = content_words(entry.question)
+            if any(similarity(question_words, seen) >= self.config.match_threshold for seen in asked_words):
+                continue
+            scored.append((-hits, order, entry.question))
+        return [question for _, _, question in sorted(scored)[:max(0, self.config.top_k)]]
+
+    # After a turn
+
+    def start(self, agent, agent_key: str, session: Optional[Session], user_input, result, **run_kwargs) -> List[str]:
+        """Answer the likely follow-ups to a finished turn in the background; returns the questions."""
+        if not self.config.enabled or session is None or not isinstance(user_input, str):
+            return []
+        if result.cancelled or result.source in ("guardrail", "cancelled"):
+            return []
+        self.discard(session.session_id)
+        if resilient_runner.breaker(agent_key).state != CircuitBreaker.CLOSED:
+            with self._lock:
+                self.circuit_skips += 1
+            return []  # Keep a degraded provider for the user's own turns
+        asked = [message.text for message in session.history() if message.role == ROLE_USER]
+        questions = self.predict(agent_key, f"{user_input} {result.final_output}", asked)
+        if not questions:
+            return []
+        start_agent = agent
+        if settings.affinity_config.enabled and result.agent_name != agent.name:
+            start_agent = find_agent(agent, result.agent_name) or agent
+        context = session.input_items(session_store.config.context_messages)
+        kwargs = dict(run_kwargs, **self._run_kwargs)
+        launched = []
+        with self._lock:
+            state = self._sessions.setdefault(session.session_id, SessionPrefetches())
+            for question in questions:
+                if state.spent + (len(state.pending) + 1) * self.config.reserve_tokens > self.config.token_budget:
+                    self.budget_skips += 1
+                    continue
+                model_input = context + [{"role": "user", "content": question}]
+                question_kwargs = response_budgets.apply(response_budgets.plan(agent_key, question), kwargs)
+                prefetch = Prefetch(question, content_words(question))
+                prefetch.future = asyncio.run_coroutine_threadsafe(
+                    self._speculate(prefetch, start_agent, model_input, agent_key, state, question_kwargs),
+                    self.scheduler.loop,
+                )
+                state.pending.append(prefetch)
+                self.predicted += 1
+                launched.append(question)
+        return launched
+
+    async def _speculate(self, prefetch: Prefetch, agent, model_input, agent_key: str, state: SessionPrefetches, run_kwargs):
+        started = time.time()
+        try:
+            outcome = await self.scheduler.run(
+                lambda: resilient_runner.run(agent, model_input, agent_key, circuit=False, **run_kwargs),
+                self.config.priority,
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            with self._lock:
+                self.failed += 1
+            telemetry.record("prefetch", started, time.time(), {"agent_key": agent_key, "error": type(exc).__name__})
+            return None
+        usage = getattr(getattr(outcome.result, "context_wrapper", None), "usage", None)
+        if usage is not None:
+            prefetch.input_tokens, prefetch.output_tokens = usage.input_tokens, usage.output_tokens
+        with self._lock:
+            state.spent += prefetch.input_tokens + prefetch.output_tokens
+            self.input_tokens += prefetch.input_tokens
+            self.output_tokens += prefetch.output_tokens
+        telemetry.record("prefetch", started, time.time(), {
+            "agent_key": agent_key,
+            "agent_name": outcome.agent_name,
+            "source": outcome.source,
+            "input_tokens": prefetch.input_tokens,
+            "output_tokens": prefetch.output_tokens,
+        })
+        if outcome.timed_out or outcome.source not in ("model", "hedge"):
+            with self._lock:
+                self.failed += 1
+            return None
+        return outcome
+
+    # Before a turn
+
+    def take(self, session: Optional[Session], user_input) -> Optional[Future]:
+        """The prefetch answering this question, if one was predicted; the others are dropped.
+
+        Returns a future resolving to the run outcome (None if the prefetch failed).
+        """
+        if session is None or not isinstance(user_input, str):
+            return None
+        with self._lock:
+            state = self._sessions.get(session.session_id)
+            if state is None or not state.pending:
+                return None
+            self.lookups += 1
+            words = content_words(user_input)
+            best, best_score = None, 0.0
+            for prefetch in state.pending:
+                score = similarity(words, prefetch.words)
+                if score > best_score:
+                    best, best_score = prefetch, score
+            if best is None or best_score < self.config.match_threshold:
+                best = None
+            else:
+                state.pending.remove(best)
+        self.discard(session.session_id)
+        if best is None:
+            return None
+        result: Future = Future()
+
+        def served(future: Future) -> None:
+            outcome = None if future.cancelled() or future.exception() else future.result()
+            with self._lock:
+                if outcome is not None:
+                    self.hits += 1
+                    self.in_flight_hits += not finished
+                    self.served_input_tokens += best.input_tokens
+                    self.served_output_tokens += best.output_tokens
+                    self.seconds_saved += time.perf_counter() - best.started
+            result.set_result(outcome)
+
+        finished = best.future.done()
+        best.future.add_done_callback(served)
+        return result
+
+    def discard(self, session_id: str) -> None:
+        """Cancel or drop a session's outstanding predictions."""
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is None:
+                return
+            pending, state.pending = state.pending, []
+            self.wasted += len(pending)
+        for prefetch in pending:
+            prefetch.future.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            wasted_input = self.input_tokens - self.served_input_tokens
+            wasted_output = self.output_tokens - self.served_output_tokens
+            price = settings.comparison_config.prices.get(settings.model_name)
+            wasted_cost = (wasted_input * price.input + wasted_output * price.output) / 1e6 if price else None
+            return {
+                "predicted": self.predicted,
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "in_flight_hits": self.in_flight_hits,
+                "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+                "wasted": self.wasted,
+                "failed": self.failed,
+                "budget_skips": self.budget_skips,
+                "circuit_skips": self.circuit_skips,
+                "tokens_spent": self.input_tokens + self.output_tokens,
+                "tokens_wasted": wasted_input + wasted_output,
+                "wasted_cost": wasted_cost,
+                "seconds_saved": round(self.seconds_saved, 2),
+            }
+
+    def report(self) -> str:
+        s = self.stats()
+        cost = f" (~${s['wasted_cost']:.4f})" if s["wasted_cost"] is not None else ""
+        return (
+            f"🔮 Prefetch: {s['hits']} of {s['lookups']} follow-ups answered ahead ({s['hit_rate']:.0%}, "
+            f"{s['in_flight_hits']} still generating), {s['predicted']} predicted, {s['wasted']} unused, "
+            f"{s['budget_skips']} skipped by the budget\n"
+            f"   {s['tokens_spent']} speculative tokens, {s['tokens_wasted']} on unused answers{cost}"
+        )
+
+
+# Global prefetcher (fed by run_turn)
+prefetcher = Prefetcher(settings.prefetch_config)
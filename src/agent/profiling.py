@@ -0,0 +1,212 @@
+"""Profiling hooks for the agent entry points.
+
+``--profile`` runs a sampling profiler for the whole session: a background
+thread snapshots every thread's stack at a fixed interval and the samples are
+written at exit as collapsed stacks (``thread;outer;...;inner count``), the
+input format of flamegraph.pl, speedscope and most other flamegraph tools.
+Because it samples wall-clock time, time spent waiting (on the model, on
+``input()``) shows up as well as CPU.
+
+Every turn is also split into model wait and local CPU: the process CPU time
+spent during the turn (less the sampler's own) is local work (routing, handoff
+processing, sessions, rendering) and the rest of the wall time is spent
+waiting.
+
+``--profile-memory`` adds tracemalloc: per-turn allocation deltas, and at exit
+the allocation sites that grew the most since the session started.
+"""
+
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional
+
+DEFAULT_INTERVAL = 0.005
+PROFILE_DIR = "profiles"
+
+
+class SamplingProfiler:
+    """Collects wall-clock stack samples from all threads."""
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL):
+        self.interval = interval
+        self.samples = Counter()
+        self.sample_count = 0
+        self.cpu_seconds = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            cpu_started = time.thread_time()
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                self.samples[";".join(reversed(stack))] += 1
+            self.sample_count += 1
+            self.cpu_seconds += time.thread_time() - cpu_started
+
+    def folded(self) -> str:
+        """Samples in collapsed-stack format, heaviest first."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+@dataclass
+class TurnProfile:
+    """Where one turn's wall time went."""
+    agent_key: str
+    agent_name: str
+    wall: float
+    cpu: float
+    ttft: Optional[float] = None
+    memory_delta: Optional[int] = None
+    tier: Optional[str] = None
+
+    @property
+    def model_wait(self) -> float:
+        return max(0.0, self.wall - self.cpu)
+
+
+class SessionProfiler:
+    """Profiles one CLI session and writes the results at exit."""
+
+    def __init__(self, name: str, cpu: bool = True, memory: bool = False,
+                 directory: str = PROFILE_DIR, interval: float = DEFAULT_INTERVAL):
+        self.name = name
+        self.memory = memory
+        self.directory = directory
+        self.sampler = SamplingProfiler(interval) if cpu else None
+        self.turns: List[TurnProfile] = []
+        self._baseline = None
+        self._started = 0.0
+        self._cpu_started = 0.0
+
+    def start(self) -> None:
+        self._started = time.perf_counter()
+        self._cpu_started = self._cpu()
+        if self.memory:
+            tracemalloc.start(10)
+            self._baseline = tracemalloc.take_snapshot()
+        if self.sampler is not None:
+            self.sampler.start()
+
+    def _cpu(self) -> float:
+        """Process CPU time, minus what the sampler itself spent."""
+        overhead = self.sampler.cpu_seconds if self.sampler is not None else 0.0
+        return time.process_time() - overhead
+
+    def turn_started(self):
+        """Opaque marker passed back to ``turn_finished``."""
+        memory = tracemalloc.get_traced_memory()[0] if self.memory and tracemalloc.is_tracing() else None
+        return time.perf_counter(), self._cpu(), memory
+
+    def turn_finished(self, marker, agent_key: str, result) -> None:
+        wall_started, cpu_started, memory = marker
+        outcome = getattr(result, "outcome", None)
+        self.turns.append(TurnProfile(
+            agent_key=agent_key,
+            agent_name=result.agent_name,
+            wall=time.perf_counter() - wall_started,
+            cpu=max(0.0, self._cpu() - cpu_started),
+            ttft=outcome.ttft if outcome is not None else None,
+            memory_delta=tracemalloc.get_traced_memory()[0] - memory if memory is not None else None,
+            tier=getattr(result, "tier", None),
+        ))
+
+    def stop(self) -> List[str]:
+        """Stop profiling, write the output files and return their paths."""
+        if self.sampler is not None:
+            self.sampler.stop()
+        os.makedirs(self.directory, exist_ok=True)
+        prefix = os.path.join(self.directory, f"{self.name}-{datetime.now():%Y%m%d-%H%M%S}")
+        written = []
+        if self.sampler is not None:
+            with open(f"{prefix}.folded", "w") as f:
+                f.write(self.sampler.folded())
+            written.append(f"{prefix}.folded")
+        with open(f"{prefix}-turns.txt", "w") as f:
+            f.write(self.turn_report())
+        written.append(f"{prefix}-turns.txt")
+        if self.memory and tracemalloc.is_tracing():
+            with open(f"{prefix}-memory.txt", "w") as f:
+                f.write(self.memory_report())
+            tracemalloc.stop()
+            written.append(f"{prefix}-memory.txt")
+        return written
+
+    def turn_report(self) -> str:
+        wall = time.perf_counter() - self._started
+        cpu = self._cpu() - self._cpu_started
+        lines = [
+            f"Session {self.name}: {wall:.2f}s wall, {cpu:.2f}s CPU, {len(self.turns)} turns",
+            f"{'turn':>4}  {'agent':<36} {'wall s':>8} {'model wait s':>13} {'local CPU s':>12} {'ttft s':>7} {'tier':<6}"
+            + (f" {'mem KB':>9}" if self.memory else ""),
+        ]
+        for index, turn in enumerate(self.turns, 1):
+            ttft = f"{turn.ttft:7.2f}" if turn.ttft is not None else f"{'-':>7}"
+            line = f"{index:>4}  {turn.agent_name[:36]:<36} {turn.wall:8.3f} {turn.model_wait:13.3f} {turn.cpu:12.3f} {ttft} {turn.tier or '-':<6}"
+            if self.memory:
+                line += f" {(turn.memory_delta or 0) / 1024:9.1f}"
+            lines.append(line)
+        if self.turns:
+            total_wall = sum(t.wall for t in self.turns)
+            total_cpu = sum(t.cpu for t in self.turns)
+            lines.append(
+                f"Turns: {total_wall:.2f}s wall = {total_wall - total_cpu:.2f}s model wait "
+                f"({(total_wall - total_cpu) / total_wall:.0%}) + {total_cpu:.2f}s local CPU"
+                if total_wall else "Turns: no time recorded"
+            )
+        return "\n".join(lines) + "\n"
+
+    def memory_report(self, limit: int = 30) -> str:
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"Traced memory: {current / 2**20:.1f} MB now, {peak / 2**20:.1f} MB peak", ""]
+        stats = tracemalloc.take_snapshot().compare_to(self._baseline, "lineno")
+        lines.append(f"Top {limit} allocation sites by growth since session start:")
+        lines.extend(str(stat) for stat in stats[:limit])
+        return "\n".join(lines) + "\n"
+
+
+# The profiler of the running session, if any (read by agent.turns)
+active_profiler: Optional[SessionProfiler] = None
+
+
+@contextmanager
+def profile_session(name: str, cpu: bool = False, memory: bool = False, directory: str = PROFILE_DIR):
+    """Profile the enclosed session when ``cpu`` or ``memory`` is set."""
+    global active_profiler
+    if not (cpu or memory):
+        yield None
+        return
+    profiler = SessionProfiler(name, cpu=cpu, memory=memory, directory=directory)
+    active_profiler = profiler
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        active_profiler = None
+        paths = profiler.stop()
+        print(f"\n📊 Profile written to {', '.join(paths)}", file=sys.stderr)
@@ -0,0 +1,308 @@
+"""Static prompt-cost analyser and latency budget report.
+
+Every model call of a turn sends the answering agent's instructions, plus one
+tool for each agent it can hand off to, ahead of the conversation. Long
+instructions and a wide handoff fan-out therefore inflate time-to-first-token
+on every request. This module counts those tokens offline, without a model
+call:
+
+- per agent: instruction tokens, and tool tokens (the name and description
+  the SDK gives each handoff, plus schema overhead);
+- per handoff path, from the entry agent to whichever agent answers: the
+  largest prompt any call on the path sends, and the input and output tokens
+  summed over its calls (one per hop plus the answer);
+- the projected time until the answer starts streaming, full-turn latency and
+  cost, from the throughput figures in ``prompt_budget`` and the prices in
+  ``comparison.prices``.
+
+An agent is flagged when its worst path exceeds ``prompt_budget.limits``, or
+its own overrides in ``prompt_budget.agents``:
+
+    python src/agent/prompt_costs.py                          # every agent script and persona
+    python src/agent/prompt_costs.py --agents obama --json costs.json
+
+The report exits with status 1 when an agent is over budget. Settings load
+runs the same check on the persona catalogue and warns about personas over
+budget. It uses the token estimates stored in the persona index (see
+``agent.personas``), so it opens no persona file and runs no tokenizer.
+"""
+
+import json
+import os
+import re
+import sys
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Tuple
+
+# Allow running as a script (python src/agent/prompt_costs.py)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from agent.settings import ModelPrice, ModelThroughput, PromptBudgetConfig, PromptBudgetLimits
+from agent.tokens import count_tokens, estimate_tokens
+
+TOOL_OVERHEAD_TOKENS = 12  # Function schema around each tool's name and description
+
+
+def handoff_tool_text(name: str, description: Optional[str] = None) -> str:
+    """Name and description of the tool that hands off to ``name`` (the SDK's defaults)."""
+    tool_name = re.sub(r"[^a-z0-9_]", "_", f"transfer_to_{name}".lower())
+    return f"{tool_name} Handoff to the {name} agent to handle the request. {description or ''}"
+
+
+def handoff_tool_tokens(name: str, description: Optional[str] = None, model: Optional[str] = None) -> int:
+    return count_tokens(handoff_tool_text(name, description), model) + TOOL_OVERHEAD_TOKENS
+
+
+def estimated_prompt_tokens(instructions: str, name: str) -> Tuple[int, int]:
+    """Estimated tokens of a persona's instructions and of the tool that hands off to it.
+
+    These are what the persona index stores: estimates rather than tokenizer
+    counts, so the committed index is the same whether or not ``tiktoken`` is
+    installed where it is built.
+    """
+    return estimate_tokens(instructions), estimate_tokens(handoff_tool_text(name)) + TOOL_OVERHEAD_TOKENS
+
+
+@dataclass(frozen=True)
+class AgentPrompt:
+    """The fixed part of every prompt one agent sends."""
+    name: str
+    model: str
+    instruction_tokens: int
+    tool_tokens: int
+    handoffs: Tuple[str, ...]  # Ids of the agents it can hand off to
+
+    @property
+    def system_tokens(self) -> int:
+        return self.instruction_tokens + self.tool_tokens
+
+
+@dataclass
+class PathCost:
+    """Projected size, latency and cost of a turn answered at the end of one handoff path."""
+    path: Tuple[str, ...]  # Agent names, entry first
+    prompt_tokens: int  # Largest prompt of any call on the path
+    input_tokens: int  # Summed over the path's calls
+    output_tokens: int
+    ttft: float  # Seconds until the answer starts streaming
+    latency: float  # Seconds until the answer is complete
+    cost: Optional[float]  # USD; None when a model has no price
+
+
+@dataclass
+class AgentReport:
+    """Prompt costs of one agent and every path its turns can take."""
+    key: str
+    agent: AgentPrompt
+    paths: List[PathCost]
+    over: List[str]  # Budget checks the worst paths fail
+
+    @property
+    def worst(self) -> PathCost:
+        return max(self.paths, key=lambda path: (path.prompt_tokens, path.latency))
+
+
+def describe_agents(agent, model: str) -> Dict[str, AgentPrompt]:
+    """Prompt sizes of an agent and of every agent it can hand off to, by name."""
+    from agents import Handoff
+
+    prompts: Dict[str, AgentPrompt] = {}
+    stack = [agent]
+    while stack:
+        current = stack.pop()
+        if current.name in prompts:
+            continue
+        agent_model = current.model if isinstance(current.model, str) and current.model else model
+        tools, targets = 0, []
+        for handoff in current.handoffs:
+            if isinstance(handoff, Handoff):
+                tools += count_tokens(f"{handoff.tool_name} {handoff.tool_description}", agent_model)
+                tools += TOOL_OVERHEAD_TOKENS
+                targets.append(handoff.agent_name)
+            else:
+                tools += handoff_tool_tokens(handoff.name, handoff.handoff_description, agent_model)
+                targets.append(handoff.name)
+                stack.append(handoff)
+        for tool in current.tools:
+            schema = json.dumps(getattr(tool, "params_json_schema", None) or {})
+            text = f"{tool.name} {getattr(tool, 'description', '')} {schema}"
+            tools += count_tokens(text, agent_model) + TOOL_OVERHEAD_TOKENS
+        # Instructions built per run (a callable) are not known offline
+        instructions = current.instructions if isinstance(current.instructions, str) else ""
+        prompts[current.name] = AgentPrompt(
+            name=current.name,
+            model=agent_model,
+            instruction_tokens=count_tokens(instructions, agent_model),
+            tool_tokens=tools,
+            handoffs=tuple(targets),
+        )
+    return prompts
+
+
+def describe_catalogue(catalogue, model: str) -> Dict[str, AgentPrompt]:
+    """Prompt sizes of every persona by key, from the persona index counts."""
+    prompts = {}
+    for key in catalogue:
+        instruction_tokens, _ = catalogue.prompt_tokens(key)
+        targets = tuple(catalogue.handoffs(key))
+        prompts[key] = AgentPrompt(
+            name=catalogue.display_name(key),
+            model=model,
+            instruction_tokens=instruction_tokens,
+            tool_tokens=sum(catalogue.prompt_tokens(target)[1] for target in targets if target in catalogue),
+            handoffs=targets,
+        )
+    return prompts
+
+
+def handoff_paths(prompts: Dict[str, AgentPrompt], start: str) -> List[Tuple[str, ...]]:
+    """Every handoff chain from ``start``; a turn can end at any agent along one."""
+    paths = []
+
+    def visit(path):
+        paths.append(path)
+        for target in prompts[path[-1]].handoffs:
+            if target in prompts and target not in path:
+                visit(path + (target,))
+
+    visit((start,))
+    return paths
+
+
+class PromptCostAnalyser:
+    """Projects prompt size, latency and cost per handoff path and checks them against budgets."""
+
+    def __init__(self, config: Optional[PromptBudgetConfig] = None, prices: Optional[Dict[str, ModelPrice]] = None):
+        self.config = config or PromptBudgetConfig()
+        self.prices = prices or {}
+
+    def throughput(self, model: str) -> ModelThroughput:
+        return self.config.models.get(model, self.config.throughput)
+
+    def limits(self, agent_key: str) -> PromptBudgetLimits:
+        overrides = self.config.agents.get(agent_key, {})
+        return PromptBudgetLimits(**{**self.config.limits.model_dump(), **overrides})
+
+    def path_cost(self, prompts: Dict[str, AgentPrompt], path: Tuple[str, ...]) -> PathCost:
+        """Cost of a turn that hands off along ``path`` and is answered by its last agent."""
+        config = self.config
+        largest = input_tokens = output_tokens = 0
+        elapsed, cost = 0.0, 0.0
+        for hop, agent_id in enumerate(path):
+            prompt = prompts[agent_id]
+            answering = hop == len(path) - 1
+            # Each call resends the conversation plus the handoffs made so far
+            call_input = prompt.system_tokens + config.context_tokens + hop * config.handoff_call_tokens
+            call_output = config.output_tokens if answering else config.handoff_call_tokens
+            throughput = self.throughput(prompt.model)
+            elapsed += throughput.ttft_base + call_input / throughput.prefill_tokens_per_s
+            if answering:
+                ttft = elapsed
+            elapsed += call_output / throughput.output_tokens_per_s
+            largest = max(largest, call_input)
+            input_tokens += call_input
+            output_tokens += call_output
+            price = self.prices.get(prompt.model)
+            if price is None or cost is None:
+                cost = None
+            else:
+                cost += (call_input * price.input + call_output * price.output) / 1_000_000
+        return PathCost(
+            path=tuple(prompts[agent_id].name for agent_id in path),
+            prompt_tokens=largest,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            ttft=ttft,
+            latency=elapsed,
+            cost=cost,
+        )
+
+    def check(self, agent_key: str, paths: List[PathCost]) -> List[str]:
+        """The budget checks an agent's paths fail, each with its worst path."""
+        limits, problems = self.limits(agent_key), []
+        checks = (
+            ("prompt", "prompt_tokens", limits.max_prompt_tokens, "{:d} tokens"),
+            ("time to first token", "ttft", limits.max_ttft, "{:.2f}s"),
+            ("cost per turn", "cost", limits.max_cost_per_turn, "${:.5f}"),
+        )
+        for label, field, limit, unit in checks:
+            measured = [path for path in paths if getattr(path, field) is not None]
+            if limit is None or not measured:
+                continue
+            worst = max(measured, key=lambda path: getattr(path, field))
+            value = getattr(worst, field)
+            if value > limit:
+                problems.append(f"{label} {unit.format(value)} over {unit.format(limit)} "
+                                f"({' → '.join(worst.path)})")
+        return problems
+
+    def report(self, agent_key: str, prompts: Dict[str, AgentPrompt], start: str) -> AgentReport:
+        paths = [self.path_cost(prompts, path) for path in handoff_paths(prompts, start)]
+        return AgentReport(agent_key, prompts[start], paths, self.check(agent_key, paths))
+
+
+def check_catalogue(catalogue, model: str, analyser: Optional[PromptCostAnalyser] = None) -> List[AgentReport]:
+    """Reports for every persona of a catalogue, without opening a persona file."""
+    analyser = analyser or PromptCostAnalyser()
+    prompts = describe_catalogue(catalogue, model)
+    return [analyser.report(key, prompts, key) for key in prompts]
+
+
+def analyse_agents(keys: Optional[List[str]] = None, analyser: Optional[PromptCostAnalyser] = None) -> List[AgentReport]:
+    """Reports for registered agents (by default every agent script and every persona)."""
+    # Imported here: settings runs check_catalogue() while it is still loading
+    from agent.registry import AGENT_SOURCES, get_agent
+    from agent.settings import settings
+
+    if analyser is None:
+        analyser = PromptCostAnalyser(settings.prompt_budget_config, settings.comparison_config.prices)
+    if keys is None:
+        keys = list(AGENT_SOURCES) + [key for key in settings.agent_configs if key not in AGENT_SOURCES]
+    reports = []
+    for key in keys:
+        agent = get_agent(key)
+        reports.append(analyser.report(key, describe_agents(agent, settings.model_name), agent.name))
+    return reports
+
+
+def format_report(reports: List[AgentReport], config: Optional[PromptBudgetConfig] = None) -> str:
+    config = config or PromptBudgetConfig()
+    lines = [f"Per turn: {config.context_tokens} context tokens, {config.output_tokens} answer tokens, "
+             f"{config.handoff_call_tokens} tokens per handoff"]
+    for report in reports:
+        agent = report.agent
+        status = "over budget" if report.over else "ok"
+        lines.append("")
+        lines.append(f"{report.key} ({agent.name}, {agent.model}): {agent.instruction_tokens} instruction + "
+                     f"{agent.tool_tokens} tool tokens  [{status}]")
+        lines.append(f"  {'path':<48} {'prompt':>6} {'input':>6} {'ttft':>6} {'latency':>7} {'cost':>9}")
+        for path in report.paths:
+            cost = f"${path.cost:.5f}" if path.cost is not None else "-"
+            lines.append(f"  {' → '.join(path.path):<48} {path.prompt_tokens:>6} {path.input_tokens:>6} "
+                         f"{path.ttft:>5.2f}s {path.latency:>6.2f}s {cost:>9}")
+        for problem in report.over:
+            lines.append(f"  ⚠ {problem}")
+    over = [report.key for report in reports if report.over]
+    lines.append("")
+    lines.append(f"Over budget: {', '.join(over)}" if over else "Every agent is within its budget")
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    import argparse
+    from agent.settings import settings
+
+    parser = argparse.ArgumentParser(description="Report prompt size, latency and cost per agent and handoff path")
+    parser.add_argument("--agents", nargs="+", help="agents to analyse (default: every agent script and persona)")
+    parser.add_argument("--json", metavar="PATH", help="also write the reports as JSON")
+    args = parser.parse_args(argv)
+
+    reports = analyse_agents(args.agents)
+    print(format_report(reports, settings.prompt_budget_config))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump([{**asdict(report), "worst": asdict(report.worst)} for report in reports], f, indent=2)
+    return 1 if any(report.over for report in reports) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
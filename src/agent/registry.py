@@ -0,0 +1,83 @@
+"""Look up the agents of this project by key.
+
+Each agent script builds its agents at import time or through a factory. The
+registry maps the keys used everywhere else (``michelle``, ``obama``,
+``creative``) to those builders and imports them only when an agent is first
+asked for, so background jobs such as the cache warm-up can run any agent
+without importing every script up front. Any other key of the persona
+catalogue (``spanish_agent``) is built straight from its persona, with its
+handoff targets resolved by key.
+"""
+
+import importlib
+import threading
+from collections import deque
+from typing import Dict
+
+from agents import Agent
+
+from agent.settings import settings
+
+# key -> "module:attribute"; callables are called once to build the agent
+AGENT_SOURCES = {
+    "michelle": "agent.pfeiffer:michelle_agent",
+    "obama": "agent.obama:create_obama_agent",
+    "creative": "agent.simple_agent:create_creative_agent",
+}
+
+_agents: Dict[str, object] = {}
+_lock = threading.RLock()
+
+
+def _persona_agent(agent_key: str):
+    config = settings.agent_configs[agent_key]
+    return Agent(
+        name=config.name,
+        instructions=config.instructions,
+        model=settings.model_name,
+        handoffs=[get_agent(target) for target in settings.handoff_graph.targets(agent_key)],
+    )
+
+
+def get_agent(agent_key: str):
+    """Return the agent registered under a key, building it on first use."""
+    with _lock:
+        if agent_key not in _agents:
+            if agent_key in AGENT_SOURCES:
+                module_name, attribute = AGENT_SOURCES[agent_key].split(":")
+                source = getattr(importlib.import_module(module_name), attribute)
+                _agents[agent_key] = source() if callable(source) else source
+            elif agent_key in settings.agent_configs:
+                _agents[agent_key] = _persona_agent(agent_key)
+            else:
+                raise KeyError(f"unknown agent '{agent_key}'")
+        return _agents[agent_key]
+
+
+def persona_key(entry_key: str, agent_name: str) -> str:
+    """The key of the persona called ``agent_name`` among ``entry_key`` and its handoff targets.
+
+    Agents that are not personas (``obama``, ``creative``) only answer their
+    own turns, so a name that matches no persona maps to ``entry_key``.
+    """
+    configs = settings.agent_configs
+    if entry_key in configs:
+        for key in settings.handoff_graph.order(entry_key):
+            if configs.display_name(key) == agent_name:
+                return key
+    return entry_key
+
+
+def find_agent(agent, name: str):
+    """Find the agent called ``name`` among ``agent`` and its handoff targets."""
+    seen = set()
+    queue = deque([agent])
+    while queue:
+        current = queue.popleft()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+        if current.name == name:
+            return current
+        queue.extend(target for target in getattr(current, "handoffs", []) if hasattr(target, "handoffs"))
+    return None
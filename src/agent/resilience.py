@@ -0,0 +1,424 @@
+"""Hedged requests and circuit breaking for agent runs.
+
+A run is streamed so that its time-to-first-token can be observed. When
+hedging is enabled and no first token arrives within the configured percentile
+of recent first-token latencies, a duplicate request is fired and whichever
+attempt starts answering first wins; the loser is cancelled.
+
+A turn deadline bounds the whole run: when it fires the attempts are
+cancelled and the text streamed so far is returned as a partial answer. Runs
+of agents in the handoff graph are also limited to one model call per hop of
+the longest handoff chain plus the answer, so a handoff loop fails fast, and
+handoff targets get their edge's input filters (see ``agent.handoff_filters``).
+
+For screened agents the local input guardrails (``agent.guardrails``) start
+together with the run; if one trips, the run is cancelled and the turn is
+answered with the guardrail's message instead.
+
+Each agent also has a circuit breaker. After repeated failures (errors or
+missed turn deadlines) it opens and turns are served from the fallbacks
+configured in ``settings.yaml`` (a cached answer or a smaller model) instead of
+waiting on a degraded provider.
+"""
+
+import asyncio
+import contextlib
+import dataclasses
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from agents import RunConfig, Runner
+
+from agent.guardrails import guardrails
+from agent.handoff_filters import handoff_filters
+from agent.metrics import LatencyWindow
+from agent.settings import settings, CircuitBreakerConfig, HedgingConfig, ResilienceProfile
+
+# Stream events that count as the model starting to answer
+FIRST_TOKEN_EVENTS = {
+    "response.output_text.delta",
+    "response.function_call_arguments.delta",
+    "response.refusal.delta",
+}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when an agent's circuit is open and no fallback is available."""
+
+
+@dataclass
+class RunOutcome:
+    """The answer produced by a resilient run and where it came from."""
+    final_output: str
+    agent_name: str
+    source: str = "model"
+    ttft: Optional[float] = None
+    hedged: bool = False
+    timed_out: bool = False
+    result: Any = None
+
+
+class StreamedAttempt:
+    """One streamed Runner call that tracks its first token and partial text."""
+
+    def __init__(self, agent, user_input, **run_kwargs):
+        self.started_at = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self.ready = asyncio.Event()
+        self.error: Optional[BaseException] = None
+        self.chunks = []
+        self.result = Runner.run_streamed(agent, user_input, **run_kwargs)
+        self.task = asyncio.ensure_future(self._consume())
+
+    async def _consume(self):
+        try:
+            async for event in self.result.stream_events():
+                if event.type == "agent_updated_stream_event":
+                    self.chunks = []
+                elif event.type == "raw_response_event":
+                    event_type = getattr(event.data, "type", None)
+                    if event_type in FIRST_TOKEN_EVENTS and self.first_token_at is None:
+                        self.first_token_at = time.perf_counter()
+                        self.ready.set()
+                    if event_type == "response.output_text.delta":
+                        self.chunks.append(event.data.delta)
+        except Exception as exc:
+            self.error = exc
+            raise
+        finally:
+            self.ready.set()
+        return self.result
+
+    @property
+    def ttft(self) -> Optional[float]:
+        """Seconds from start to first token, if one arrived."""
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started_at
+
+    @property
+    def partial_output(self) -> str:
+        """Text streamed so far by the currently active agent."""
+        return "".join(self.chunks)
+
+    @property
+    def final_output(self) -> str:
+        return str(self.result.final_output)
+
+    @property
+    def agent_name(self) -> str:
+        return self.result.last_agent.name
+
+    def cancel(self) -> None:
+        """Stop the run and close the upstream stream."""
+        self.result.cancel()
+        self.task.cancel()
+
+
+class CircuitBreaker:
+    """Closed / open / half-open circuit breaker counting consecutive failures."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, config: CircuitBreakerConfig, clock=time.monotonic):
+        self.config = config
+        self._clock = clock
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.failures = 0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.config.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def allow(self) -> bool:
+        """Return True if a request may go to the provider."""
+        if not self.config.enabled:
+            return True
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def release_probe(self) -> None:
+        """Give up a half-open probe that ended without a verdict (neither success nor failure)."""
+        self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._state = self.CLOSED
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._state == self.HALF_OPEN or self.failures >= self.config.failure_threshold:
+            if self._state != self.OPEN:
+                self.times_opened += 1
+            self._state = self.OPEN
+            self._opened_at = self._clock()
+            self._probe_in_flight = False
+
+
+def _answer_key(agent_key: str, user_input) -> tuple:
+    """Key last-good answers by agent and the latest user message."""
+    if not isinstance(user_input, str):
+        user_messages = [
+            item.get("content") for item in user_input
+            if isinstance(item, dict) and item.get("role") == "user"
+        ]
+        user_input = str(user_messages[-1]) if user_messages else ""
+    return agent_key, " ".join(user_input.lower().split())
+
+
+class ResilientRunner:
+    """Runs agents with optional hedging, a per-agent circuit breaker and fallbacks."""
+
+    def __init__(self, attempt_factory=StreamedAttempt, answer_cache_size: int = 256):
+        self._attempt_factory = attempt_factory
+        self._answer_cache_size = answer_cache_size
+        self._answers: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._ttft: Dict[str, LatencyWindow] = {}
+        self.hedges_fired = 0
+        self.hedge_wins = 0
+        self.fallbacks_served = 0
+        self.deadlines_hit = 0
+
+    def breaker(self, agent_key: str, config: Optional[CircuitBreakerConfig] = None) -> CircuitBreaker:
+        """Get (or create) the circuit breaker for an agent."""
+        if agent_key not in self._breakers:
+            config = config or settings.get_resilience_profile(agent_key).circuit_breaker
+            self._breakers[agent_key] = CircuitBreaker(config)
+        return self._breakers[agent_key]
+
+    def hedge_delay(self, agent_key: str, config: HedgingConfig) -> float:
+        """Seconds to wait for a first token before firing a hedge."""
+        window = self._ttft.get(agent_key)
+        if window is None or len(window) < config.min_samples:
+            return config.initial_delay
+        return max(config.min_delay, window.percentile(config.percentile))
+
+    async def run(
+        self,
+        agent,
+        user_input,
+        agent_key: str,
+        profile: Optional[ResilienceProfile] = None,
+        circuit: bool = True,
+        **run_kwargs,
+    ) -> RunOutcome:
+        """Run an agent turn with hedging, circuit breaking and fallbacks.
+
+        With ``circuit=False`` (speculative runs) the agent's circuit breaker is
+        neither consulted nor updated, so such runs can never take the
+        half-open probe or open the circuit for user turns.
+        """
+        profile = profile or settings.get_resilience_profile(agent_key)
+        max_turns = settings.handoff_graph.max_turns(agent_key)
+        if max_turns is not None:
+            run_kwargs.setdefault("max_turns", max_turns)
+        run_kwargs = handoff_filters.apply(agent_key, run_kwargs)
+        if circuit:
+            breaker = self.breaker(agent_key, profile.circuit_breaker)
+        else:
+            breaker = CircuitBreaker(profile.circuit_breaker)  # Private and discarded with the run
+        if not breaker.allow():
+            error = CircuitOpenError(f"circuit open for '{agent_key}' after {breaker.failures} failures")
+            return await self._fallback(agent, user_input, agent_key, profile.circuit_breaker, error, run_kwargs)
+
+        probing = breaker.state == CircuitBreaker.HALF_OPEN  # This run is the one probe let through
+        try:
+            return await self._run_allowed(agent, user_input, agent_key, profile, breaker, run_kwargs)
+        finally:
+            if probing:
+                breaker.release_probe()  # No-op once the probe was recorded; frees it on any other exit
+
+    async def _run_allowed(self, agent, user_input, agent_key, profile, breaker, run_kwargs) -> RunOutcome:
+        """Run a turn the circuit breaker let through and record how it went."""
+        screening = guardrails.start(agent, agent_key, user_input)
+        attempts = []
+        try:
+            outcome = await asyncio.wait_for(
+                self._screened(
+                    agent, self._hedged(agent, user_input, agent_key, profile.hedging, run_kwargs, attempts), screening
+                ),
+                profile.turn_deadline,
+            )
+        except asyncio.TimeoutError:
+            self.deadlines_hit += 1
+            breaker.record_failure()  # A provider too slow to answer in time is as degraded as a failing one
+            return self._partial(agent, attempts)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            breaker.record_failure()
+            raise
+
+        if outcome.source == "guardrail":
+            return outcome  # Says nothing about the provider; run() frees a half-open probe
+        breaker.record_success()
+        self._remember(agent_key, user_input, outcome)
+        return outcome
+
+    async def _screened(self, agent, run, screening) -> RunOutcome:
+        """Await the run unless the guardrails screening its input trip first."""
+        if screening is None:
+            return await run
+        task = asyncio.ensure_future(run)
+        try:
+            await asyncio.wait({task, screening}, return_when=asyncio.FIRST_COMPLETED)
+            try:
+                verdict = await screening  # Only waits when the run finished first
+            except Exception:
+                verdict = None  # A failing check never blocks a turn
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        if verdict is None or verdict.tripped is None:
+            return await task
+        if not task.done():
+            guardrails.cancelled_runs += 1
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError, Exception):
+            await task  # Lets the attempts close their upstream streams
+        return RunOutcome(final_output=guardrails.message(verdict.tripped), agent_name=agent.name, source="guardrail")
+
+    async def _hedged(self, agent, user_input, agent_key, hedging: HedgingConfig, run_kwargs, attempts) -> RunOutcome:
+        attempts.append(self._attempt_factory(agent, user_input, **run_kwargs))
+        hedges_left = hedging.max_hedges if hedging.enabled else 0
+        delay = self.hedge_delay(agent_key, hedging)
+        try:
+            while True:
+                winner = await self._first_ready(attempts, delay if hedges_left else None)
+                if winner is not None:
+                    break
+                attempts.append(self._attempt_factory(agent, user_input, **run_kwargs))
+                hedges_left -= 1
+                self.hedges_fired += 1
+
+            for attempt in attempts:
+                if attempt is not winner:
+                    attempt.cancel()
+            # Shield so cancellation reaches the attempt through cancel(), which
+            # also closes the upstream stream.
+            result = await asyncio.shield(winner.task)
+        finally:
+            for attempt in attempts:
+                if not attempt.task.done():
+                    attempt.cancel()
+                elif not attempt.task.cancelled():
+                    attempt.task.exception()  # mark failed losers as retrieved
+
+        if winner.ttft is not None:
+            self._ttft.setdefault(agent_key, LatencyWindow()).add(winner.ttft)
+        hedged = winner is not attempts[0]
+        if hedged:
+            self.hedge_wins += 1
+        return RunOutcome(
+            final_output=winner.final_output,
+            agent_name=winner.agent_name,
+            source="hedge" if hedged else "model",
+            ttft=winner.ttft,
+            hedged=len(attempts) > 1,
+            result=result,
+        )
+
+    def _partial(self, agent, attempts) -> RunOutcome:
+        """Build an outcome from the furthest-along attempt when the deadline fires."""
+        started = [a for a in attempts if a.first_token_at is not None]
+        if not started:
+            return RunOutcome(final_output="", agent_name=agent.name, source="deadline", timed_out=True)
+        best = max(started, key=lambda a: len(a.partial_output))
+        try:
+            agent_name = best.agent_name
+        except Exception:
+            agent_name = agent.name
+        return RunOutcome(
+            final_output=best.partial_output,
+            agent_name=agent_name,
+            source="deadline",
+            ttft=best.ttft,
+            hedged=len(attempts) > 1,
+            timed_out=True,
+        )
+
+    async def _first_ready(self, attempts, timeout: Optional[float]):
+        """Wait for the first healthy attempt to start answering.
+
+        Returns None if the timeout expires first; raises the primary error if
+        every attempt has failed.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            live = [a for a in attempts if a.error is None]
+            if not live:
+                raise attempts[0].error
+            ready = [a for a in live if a.ready.is_set()]
+            if ready:
+                return min(ready, key=lambda a: a.first_token_at or float("inf"))
+            remaining = None if deadline is None else deadline - loop.time()
+            if remaining is not None and remaining <= 0:
+                return None
+            waiters = [asyncio.ensure_future(a.ready.wait()) for a in live]
+            try:
+                await asyncio.wait(waiters, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for waiter in waiters:
+                    waiter.cancel()
+
+    async def _fallback(self, agent, user_input, agent_key, config: CircuitBreakerConfig, error, run_kwargs) -> RunOutcome:
+        for kind in config.fallbacks:
+            if kind == "cache":
+                cached = self._answers.get(_answer_key(agent_key, user_input))
+                if cached is not None:
+                    self.fallbacks_served += 1
+                    return RunOutcome(final_output=cached[0], agent_name=cached[1], source="cache")
+            elif kind == "model" and config.fallback_model:
+                run_config = run_kwargs.get("run_config") or RunConfig()
+                kwargs = dict(run_kwargs, run_config=dataclasses.replace(run_config, model=config.fallback_model))
+                attempt = self._attempt_factory(agent, user_input, **kwargs)
+                result = await attempt.task
+                self.fallbacks_served += 1
+                return RunOutcome(
+                    final_output=attempt.final_output,
+                    agent_name=attempt.agent_name,
+                    source="fallback_model",
+                    ttft=attempt.ttft,
+                    result=result,
+                )
+        raise error
+
+    def _remember(self, agent_key: str, user_input, outcome: RunOutcome) -> None:
+        key = _answer_key(agent_key, user_input)
+        self._answers[key] = (outcome.final_output, outcome.agent_name)
+        self._answers.move_to_end(key)
+        while len(self._answers) > self._answer_cache_size:
+            self._answers.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hedging counters and circuit state per agent."""
+        return {
+            "hedges_fired": self.hedges_fired,
+            "hedge_wins": self.hedge_wins,
+            "fallbacks_served": self.fallbacks_served,
+            "deadlines_hit": self.deadlines_hit,
+            "circuits": {key: breaker.state for key, breaker in self._breakers.items()},
+            "ttft": {key: window.summary() for key, window in self._ttft.items()},
+        }
+
+
+# Global resilient runner instance
+resilient_runner = ResilientRunner()
@@ -0,0 +1,182 @@
+"""Priority-aware scheduler that sits in front of the agents Runner.
+
+Interactive turns, API requests and batch jobs share the same process and
+model budget. Every run is submitted with a priority class; classes are served
+by weighted fair queuing and each class has its own concurrency cap, so a large
+batch cannot starve the humans typing into ``interactive_mode()``.
+
+The scheduler owns a background event loop so that synchronous callers (the
+interactive loops) and asynchronous callers (batch jobs) share one queue.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from agents import Runner
+
+from agent.metrics import LatencyWindow
+from agent.settings import settings, SchedulerConfig
+
+INTERACTIVE = "interactive"
+API = "api"
+BATCH = "batch"
+
+PRIORITY_CLASSES = (INTERACTIVE, API, BATCH)
+
+
+class SchedulerOverloaded(RuntimeError):
+    """Raised when a priority class queue is full."""
+
+
+class _ClassState:
+    """Queue, counters and queue-time samples for one priority class."""
+
+    def __init__(self, name: str, weight: float, max_concurrency: int, max_queue: int):
+        self.name = name
+        self.weight = max(weight, 1e-6)
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue = deque()
+        self.running = 0
+        self.last_finish_tag = 0.0
+        self.queue_times = LatencyWindow()
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.cancelled = 0
+
+
+class PriorityScheduler:
+    """Weighted fair queuing scheduler with per-class concurrency caps."""
+
+    def __init__(self, config: Optional[SchedulerConfig] = None):
+        config = config or SchedulerConfig()
+        self.max_concurrency = config.max_concurrency
+        self._classes: Dict[str, _ClassState] = {
+            name: _ClassState(name, c.weight, c.max_concurrency, c.max_queue)
+            for name, c in config.classes.items()
+        }
+        self._running = 0
+        self._virtual_time = 0.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The scheduler's event loop, started on first use."""
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=loop.run_forever, name="agent-scheduler", daemon=True
+                )
+                thread.start()
+                self._loop = loop
+        return self._loop
+
+    def submit(
+        self, factory: Callable[[], Awaitable[Any]], priority: str = INTERACTIVE
+    ):
+        """Submit a coroutine factory from any thread and return a concurrent future."""
+        return asyncio.run_coroutine_threadsafe(self._schedule(factory, priority), self.loop)
+
+    async def run(self, factory: Callable[[], Awaitable[Any]], priority: str = INTERACTIVE) -> Any:
+        """Run a coroutine factory under the scheduler from async code."""
+        if asyncio.get_running_loop() is self.loop:
+            return await self._schedule(factory, priority)
+        return await asyncio.wrap_future(self.submit(factory, priority))
+
+    def run_sync(self, factory: Callable[[], Awaitable[Any]], priority: str = INTERACTIVE) -> Any:
+        """Run a coroutine factory under the scheduler and block for its result."""
+        return self.submit(factory, priority).result()
+
+    async def run_agent(self, agent, user_input, priority: str = INTERACTIVE, **kwargs) -> Any:
+        """Schedule ``Runner.run`` for an agent from async code."""
+        return await self.run(lambda: Runner.run(agent, user_input, **kwargs), priority)
+
+    def run_agent_sync(self, agent, user_input, priority: str = INTERACTIVE, **kwargs) -> Any:
+        """Schedule ``Runner.run`` for an agent and block for the result."""
+        return self.run_sync(lambda: Runner.run(agent, user_input, **kwargs), priority)
+
+    async def _schedule(self, factory: Callable[[], Awaitable[Any]], priority: str) -> Any:
+        state = self._classes.get(priority)
+        if state is None:
+            raise ValueError(f"Unknown priority class: {priority}")
+        if len(state.queue) >= state.max_queue:
+            state.rejected += 1
+            raise SchedulerOverloaded(f"{priority} queue is full ({state.max_queue} pending)")
+
+        state.submitted += 1
+        enqueued_at = time.perf_counter()
+        tag = max(self._virtual_time, state.last_finish_tag) + 1.0 / state.weight
+        state.last_finish_tag = tag
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (tag, waiter)
+        state.queue.append(entry)
+        self._dispatch()
+
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            state.cancelled += 1
+            if entry in state.queue:
+                state.queue.remove(entry)
+            elif waiter.done() and not waiter.cancelled():
+                self._release(state)
+            raise
+
+        state.queue_times.add(time.perf_counter() - enqueued_at)
+        try:
+            return await factory()
+        finally:
+            state.completed += 1
+            self._release(state)
+
+    def _release(self, state: _ClassState) -> None:
+        state.running -= 1
+        self._running -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Grant free slots to the eligible queue heads with the lowest finish tags."""
+        while self._running < self.max_concurrency:
+            best = None
+            for state in self._classes.values():
+                if not state.queue or state.running >= state.max_concurrency:
+                    continue
+                if best is None or state.queue[0][0] < best.queue[0][0]:
+                    best = state
+            if best is None:
+                return
+            tag, waiter = best.queue.popleft()
+            if waiter.done():
+                continue
+            best.running += 1
+            self._running += 1
+            self._virtual_time = tag
+            waiter.set_result(None)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return per-class queue depth, counters and queue-time percentiles."""
+        report = {}
+        for name, state in self._classes.items():
+            waits = state.queue_times.summary()
+            report[name] = {
+                "queued": len(state.queue),
+                "running": state.running,
+                "submitted": state.submitted,
+                "completed": state.completed,
+                "rejected": state.rejected,
+                "cancelled": state.cancelled,
+                "queue_time_p50": waits["p50"],
+                "queue_time_p95": waits["p95"],
+                "queue_time_max": waits["max"],
+            }
+        return report
+
+
+# Global scheduler instance
+scheduler = PriorityScheduler(settings.scheduler_config)
@@ -0,0 +1,271 @@
+"""Compact session store for many concurrent conversations.
+
+Sessions keep only what a conversation needs to continue:
+
+- agent instructions are interned once per agent in an ``InstructionTable``
+  and sessions refer to them by a small integer id;
+- messages are slotted records, and older messages are packed into a compact
+  binary form and compressed (zstd when installed, zlib otherwise) in
+  append-only chunks, so moving messages to cold storage never re-reads it;
+- the store keeps a bounded number of sessions resident and spills the least
+  recently used ones to disk, loading them back on access.
+"""
+
+import os
+import struct
+import sys
+import uuid
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+from agent.settings import settings, SessionConfig
+
+ROLE_USER = 0
+ROLE_ASSISTANT = 1
+ROLE_NAMES = ("user", "assistant")
+
+_MESSAGE_HEADER = struct.Struct("<BHI")  # role, agent id, text length
+_SPILL_HEADER = struct.Struct("<4sBHI")  # magic, codec, agent id, cold message count
+_SPILL_MAGIC = b"SESS"
+_CODEC_NONE, _CODEC_ZLIB, _CODEC_ZSTD = 0, 1, 2
+
+
+def _compress(data: bytes, codec: int) -> bytes:
+    if codec == _CODEC_ZSTD:
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    if codec == _CODEC_ZLIB:
+        return zlib.compress(data, 6)
+    return data
+
+
+def _decompress(data: bytes, codec: int) -> bytes:
+    if codec == _CODEC_ZSTD:
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == _CODEC_ZLIB:
+        return zlib.decompress(data)
+    return data
+
+
+def _codec_for(config: SessionConfig) -> int:
+    if not config.compress_cold:
+        return _CODEC_NONE
+    if config.compression == "zstd" and zstandard is not None:
+        return _CODEC_ZSTD
+    return _CODEC_ZLIB
+
+
+class InstructionTable:
+    """Interns each agent's instructions once and hands out small ids."""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._entries: List[Tuple[str, str]] = []
+
+    def intern(self, agent_key: str, instructions: str = "") -> int:
+        """Return the id for an agent, storing its instructions the first time they are given."""
+        if agent_key not in self._ids:
+            self._ids[agent_key] = len(self._entries)
+            self._entries.append((sys.intern(agent_key), instructions))
+        elif instructions and not self._entries[self._ids[agent_key]][1]:
+            self._entries[self._ids[agent_key]] = (self._entries[self._ids[agent_key]][0], instructions)
+        return self._ids[agent_key]
+
+    def agent_key(self, agent_id: int) -> str:
+        return self._entries[agent_id][0]
+
+    def instructions(self, agent_id: int) -> str:
+        return self._entries[agent_id][1]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class Message:
+    """One conversation message.
+
+    ``agent_id`` is the ``InstructionTable`` id of the persona the message
+    belongs to: the session's agent for user messages, the persona that
+    answered for assistant messages.
+    """
+
+    __slots__ = ("role", "agent_id", "text")
+
+    def __init__(self, role: int, agent_id: int, text: str):
+        self.role = role
+        self.agent_id = agent_id
+        self.text = text
+
+    def to_input_item(self) -> Dict[str, str]:
+        """Message in the agents SDK input format."""
+        return {"role": ROLE_NAMES[self.role], "content": self.text}
+
+
+def pack_messages(messages: List[Message]) -> bytes:
+    """Encode messages into a compact binary form."""
+    parts = []
+    for message in messages:
+        text = message.text.encode("utf-8")
+        parts.append(_MESSAGE_HEADER.pack(message.role, message.agent_id, len(text)))
+        parts.append(text)
+    return b"".join(parts)
+
+
+def unpack_messages(data: bytes) -> List[Message]:
+    """Decode messages produced by ``pack_messages``."""
+    messages = []
+    offset = 0
+    while offset < len(data):
+        role, agent_id, length = _MESSAGE_HEADER.unpack_from(data, offset)
+        offset += _MESSAGE_HEADER.size
+        messages.append(Message(role, agent_id, data[offset:offset + length].decode("utf-8")))
+        offset += length
+    return messages
+
+
+class Session:
+    """A conversation: recent messages hot, older ones packed and compressed."""
+
+    __slots__ = ("session_id", "agent_id", "messages", "cold", "cold_count", "_codec", "_hot_limit")
+
+    def __init__(self, session_id: str, agent_id: int, codec: int = _CODEC_ZLIB, hot_limit: int = 8):
+        self.session_id = session_id
+        self.agent_id = agent_id
+        self.messages: List[Message] = []
+        self.cold: List[bytes] = []  # Compressed chunks of packed messages, oldest first
+        self.cold_count = 0
+        self._codec = codec
+        self._hot_limit = hot_limit
+
+    def append(self, role: int, text: str, agent_id: Optional[int] = None) -> None:
+        """Add a message, moving the oldest hot messages to cold storage."""
+        self.messages.append(Message(role, self.agent_id if agent_id is None else agent_id, text))
+        if len(self.messages) > 2 * self._hot_limit:
+            self._freeze(len(self.messages) - self._hot_limit)
+
+    def _freeze(self, count: int) -> None:
+        frozen = self.messages[:count]
+        del self.messages[:count]
+        self.cold.append(_compress(pack_messages(frozen), self._codec))
+        self.cold_count += count
+
+    def history(self) -> List[Message]:
+        """Every message in the session, oldest first."""
+        cold = [message for chunk in self.cold for message in unpack_messages(_decompress(chunk, self._codec))]
+        return cold + self.messages
+
+    def input_items(self, limit: Optional[int] = None) -> List[Dict[str, str]]:
+        """The most recent messages as SDK input items."""
+        if limit is None:
+            recent = self.history()
+        elif limit > len(self.messages):
+            recent = self._recent(limit)
+        else:
+            recent = self.messages[-limit:] if limit else []
+        return [message.to_input_item() for message in recent]
+
+    def _recent(self, limit: int) -> List[Message]:
+        """The newest ``limit`` messages, decompressing only the cold chunks they reach into."""
+        recent = list(self.messages)
+        for chunk in reversed(self.cold):
+            if len(recent) >= limit:
+                break
+            recent = unpack_messages(_decompress(chunk, self._codec)) + recent
+        return recent[-limit:]
+
+    def __len__(self) -> int:
+        return self.cold_count + len(self.messages)
+
+    def to_bytes(self) -> bytes:
+        """Serialise the whole session for spilling to disk."""
+        body = _compress(pack_messages(self.history()), self._codec)
+        return _SPILL_HEADER.pack(_SPILL_MAGIC, self._codec, self.agent_id, len(self)) + body
+
+    @classmethod
+    def from_bytes(cls, session_id: str, data: bytes, hot_limit: int = 8) -> "Session":
+        magic, codec, agent_id, _ = _SPILL_HEADER.unpack_from(data)
+        if magic != _SPILL_MAGIC:
+            raise ValueError(f"Not a spilled session: {session_id}")
+        session = cls(session_id, agent_id, codec, hot_limit)
+        session.messages = unpack_messages(_decompress(data[_SPILL_HEADER.size:], codec))
+        if len(session.messages) > hot_limit:
+            session._freeze(len(session.messages) - hot_limit)
+        return session
+
+
+class SessionStore:
+    """LRU store of resident sessions with spill-to-disk for the rest."""
+
+    def __init__(self, config: Optional[SessionConfig] = None, instructions: Optional[InstructionTable] = None):
+        self.config = config or SessionConfig()
+        self.instructions = InstructionTable() if instructions is None else instructions
+        self._codec = _codec_for(self.config)
+        self._resident: "OrderedDict[str, Session]" = OrderedDict()
+        self.spills = 0
+        self.loads = 0
+
+    def create(self, agent_key: str, instructions: str = "", session_id: Optional[str] = None) -> Session:
+        """Start a new session for an agent."""
+        session_id = session_id or uuid.uuid4().hex[:12]
+        agent_id = self.instructions.intern(agent_key, instructions)
+        session = Session(session_id, agent_id, self._codec, self.config.hot_messages)
+        self._put(session)
+        return session
+
+    def get(self, session_id: str) -> Optional[Session]:
+        """Fetch a session, loading it back from disk if it was spilled."""
+        session = self._resident.get(session_id)
+        if session is not None:
+            self._resident.move_to_end(session_id)
+            return session
+        path = self._spill_path(session_id)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            session = Session.from_bytes(session_id, f.read(), self.config.hot_messages)
+        os.remove(path)
+        self.loads += 1
+        self._put(session)
+        return session
+
+    def get_or_create(self, session_id: str, agent_key: str, instructions: str = "") -> Session:
+        return self.get(session_id) or self.create(agent_key, instructions, session_id)
+
+    def agent_key(self, session: Session) -> str:
+        return self.instructions.agent_key(session.agent_id)
+
+    def _put(self, session: Session) -> None:
+        self._resident[session.session_id] = session
+        self._resident.move_to_end(session.session_id)
+        while len(self._resident) > self.config.max_resident:
+            _, evicted = self._resident.popitem(last=False)
+            self._spill(evicted)
+
+    def _spill(self, session: Session) -> None:
+        os.makedirs(self.config.spill_dir, exist_ok=True)
+        with open(self._spill_path(session.session_id), "wb") as f:
+            f.write(session.to_bytes())
+        self.spills += 1
+
+    def _spill_path(self, session_id: str) -> str:
+        return os.path.join(self.config.spill_dir, f"{session_id}.sess")
+
+    def __len__(self) -> int:
+        return len(self._resident)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "resident": len(self._resident),
+            "agents": len(self.instructions),
+            "spills": self.spills,
+            "loads": self.loads,
+        }
+
+
+# Global session store instance
+session_store = SessionStore(settings.session_config)
@@ -1,10 +1,11 @@
 """Settings for agents.michelle."""
 
 import os
-from typing import Dict, Any, Optional
+import warnings
+from typing import Dict, Any, List, Optional
 
 import yaml
-from pydantic import Field, BaseModel
+from pydantic import Field, BaseModel, PrivateAttr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -13,6 +14,16 @@ class AgentConfig(BaseModel):
     name: str
     emoji: str
     instructions: str
+    handoffs: List[str] = []  # Keys of the personas this agent can hand off to
+
+
+class CandidateConfig(BaseModel):
+    """Configuration for generating several creative variants per request."""
+    enabled: bool = True
+    temperatures: List[float] = [0.7, 0.9, 1.1, 1.3]  # One variant per temperature
+    max_concurrency: int = 4
+    rank_wait: float = 5.0  # Seconds to wait for the rest after the first variant finishes
+    cache_size: int = 256  # Sessions whose unused variants are kept
 
 
 class CreativeConfig(BaseModel):
@@ -20,6 +31,308 @@ class CreativeConfig(BaseModel):
     enable_poetry: bool = True
     enable_storytelling: bool = True
     default_task: str = "Write a roses are red, violets are blue, poem."
+    candidates: CandidateConfig = CandidateConfig()
+
+
+class PriorityClassConfig(BaseModel):
+    """Scheduling parameters for one priority class."""
+    weight: float = 1.0
+    max_concurrency: int = 1
+    max_queue: int = 1000
+
+
+class SchedulerConfig(BaseModel):
+    """Configuration for the priority-aware request scheduler."""
+    max_concurrency: int = 8
+    classes: Dict[str, PriorityClassConfig] = {
+        "interactive": PriorityClassConfig(weight=8, max_concurrency=8, max_queue=100),
+        "api": PriorityClassConfig(weight=4, max_concurrency=6, max_queue=500),
+        "batch": PriorityClassConfig(weight=1, max_concurrency=6, max_queue=10000),
+    }
+
+
+class HedgingConfig(BaseModel):
+    """Configuration for hedging slow first tokens with a duplicate request."""
+    enabled: bool = False
+    percentile: float = 95.0
+    initial_delay: float = 2.0
+    min_delay: float = 0.25
+    min_samples: int = 20
+    max_hedges: int = 1
+
+
+class CircuitBreakerConfig(BaseModel):
+    """Configuration for failing fast when the model provider degrades."""
+    enabled: bool = True
+    failure_threshold: int = 5
+    reset_timeout: float = 30.0
+    fallbacks: List[str] = ["cache", "model"]
+    fallback_model: Optional[str] = "gpt-4o-mini"
+
+
+class ResilienceProfile(BaseModel):
+    """Hedging, circuit breaker and turn deadline settings for one agent."""
+    hedging: HedgingConfig = HedgingConfig()
+    circuit_breaker: CircuitBreakerConfig = CircuitBreakerConfig()
+    turn_deadline: Optional[float] = None
+
+
+class ResilienceConfig(BaseModel):
+    """Default resilience profile plus per-agent overrides."""
+    defaults: ResilienceProfile = ResilienceProfile()
+    agents: Dict[str, Dict[str, Any]] = {}
+
+
+class WorkerConfig(BaseModel):
+    """Configuration for the CPU worker process pool."""
+    processes: int = 0
+    chunk_size: int = 256
+    inline_threshold: int = 64
+    start_method: str = "spawn"
+
+
+class SessionConfig(BaseModel):
+    """Configuration for the in-memory conversation session store."""
+    max_resident: int = 10000
+    hot_messages: int = 8
+    context_messages: int = 12
+    compress_cold: bool = True
+    compression: str = "zstd"
+    spill_dir: str = ".sessions"
+
+
+class ConversationLogConfig(BaseModel):
+    """Configuration for the durable conversation log used by --resume."""
+    enabled: bool = True
+    path: str = ".convlog"
+    segment_bytes: int = 64 * 1024 * 1024
+    resume_messages: int = 12
+    fsync: bool = False
+
+
+class CassetteConfig(BaseModel):
+    """Configuration for recording and replaying model traffic."""
+    mode: str = "off"  # off, record or replay
+    directory: str = "cassettes"
+    speed: float = 1.0  # Replay speed-up; 0 replays without delays
+    match_threshold: float = 0.85
+
+
+class TelemetryConfig(BaseModel):
+    """Configuration for batched, non-blocking span export."""
+    enabled: bool = False
+    path: str = "telemetry"
+    format: str = "jsonl"  # jsonl or otlp
+    sample_rate: float = 1.0
+    sampling: Dict[str, float] = {}  # Per-span-name overrides of sample_rate
+    buffer_size: int = 8192
+    batch_size: int = 512
+    flush_interval: float = 2.0
+    sdk_traces: str = "openai"  # openai (SDK default exporter), local or off
+    overhead_budget_us: float = 50.0
+
+
+class BudgetTierConfig(BaseModel):
+    """Response budget for one tier of queries."""
+    max_tokens: int
+    temperature: Optional[float] = None  # None keeps the agent's temperature
+    instruction_suffix: str = ""
+
+
+class ResponseBudgetConfig(BaseModel):
+    """Configuration for adaptive response lengths."""
+    enabled: bool = True
+    tiers: Dict[str, BudgetTierConfig] = {
+        "short": BudgetTierConfig(
+            max_tokens=150, temperature=0.3,
+            instruction_suffix="Answer in one to three sentences; this is a quick factual question.",
+        ),
+        "medium": BudgetTierConfig(
+            max_tokens=600,
+            instruction_suffix="Keep the answer focused: a few short paragraphs at most.",
+        ),
+        "long": BudgetTierConfig(max_tokens=2000),
+    }
+    agents: Dict[str, Dict[str, str]] = {}  # Per-agent min_tier / max_tier
+
+
+class SharedCacheConfig(BaseModel):
+    """Configuration for the cache tier shared by every node."""
+    backend: str = "none"  # none, memory (embedded, this process only) or redis
+    url: str = "redis://localhost:6379/0"
+    prefix: str = "agents"  # Key prefix, to share one server between deployments
+    timeout: float = 0.2  # Seconds per backend call
+    pool_size: int = 8  # Connections kept open
+    retry_after: float = 5.0  # Seconds the shared tier is skipped after a backend error
+    compression: str = "zlib"  # zlib or zstd (when installed)
+    compress_min_bytes: int = 256  # Smaller values are stored as they are
+    lock_ttl: float = 30.0  # Seconds a node may hold a prompt while it computes the answer
+    lock_wait: float = 5.0  # Seconds other nodes wait for that answer before computing it too
+    poll_interval: float = 0.05
+
+
+class CacheConfig(BaseModel):
+    """Configuration for the response and routing caches."""
+    enabled: bool = True
+    max_entries: int = 1024
+    response_ttl: float = 3600.0  # Seconds a cached answer is served
+    routing_ttl: float = 86400.0  # Seconds a learned route is trusted
+    response_agents: List[str] = ["michelle", "obama"]  # Agents whose answers are cached
+    shared: SharedCacheConfig = SharedCacheConfig()
+
+
+class WarmupPrompt(BaseModel):
+    """One prompt to run ahead of the first user."""
+    agent: str
+    prompt: str
+
+
+class WarmupConfig(BaseModel):
+    """Configuration for warming the caches at process start."""
+    enabled: bool = True
+    concurrency: int = 4
+    priority: str = "batch"
+    prompts: List[WarmupPrompt] = []
+
+
+class PrefetchFollowUp(BaseModel):
+    """A likely follow-up question and the topic words that make it likely."""
+    after: List[str]
+    question: str
+
+
+class PrefetchConfig(BaseModel):
+    """Configuration for prefetching likely follow-up answers during think time."""
+    enabled: bool = False  # Opt-in (or --prefetch)
+    top_k: int = 2  # Follow-ups answered ahead after each turn
+    token_budget: int = 20000  # Speculative tokens (input + output) one session may spend
+    reserve_tokens: int = 1500  # Tokens held back for each prefetch still running
+    match_threshold: float = 0.6  # Word overlap for a question to count as predicted
+    priority: str = "batch"
+    follow_ups: Dict[str, List[PrefetchFollowUp]] = {}  # By agent key
+
+
+class PersonaConfig(BaseModel):
+    """Configuration for the on-disk persona catalogue."""
+    directory: str = "config/personas"  # One YAML file per persona
+    index: str = "config/personas/index.json"  # Prebuilt by `make persona-index`
+    max_loaded: int = 256  # Validated persona configs kept in memory
+
+
+class HandoffFilterConfig(BaseModel):
+    """Configuration for trimming what a handoff target receives, per edge."""
+    enabled: bool = True
+    default: List[str] = ["drop_tools"]  # Filter chain for edges not listed below
+    edges: Dict[str, List[str]] = {}  # "source->target" -> filter chain
+    last_turns: int = 3  # User messages (and what follows them) kept by last_turns
+    summary_chars: int = 600  # Longest summary written by summary_only
+
+
+class HandoffGraphConfig(BaseModel):
+    """Configuration for compiling the declared handoffs into a graph."""
+    entries: List[str] = ["michelle"]  # Agents users talk to first
+    filters: HandoffFilterConfig = HandoffFilterConfig()
+
+
+class AffinityConfig(BaseModel):
+    """Configuration for sending follow-ups straight to the last active agent."""
+    enabled: bool = True
+    context_messages: int = 2  # Recent messages whose words count as the current topic
+
+
+class DaemonConfig(BaseModel):
+    """Configuration for the long-lived local agent daemon."""
+    preload: List[str] = ["michelle", "obama", "creative"]  # Agents built (and warmed) at start
+    max_workers: int = 16  # Requests handled at once
+
+
+class PipelineConfig(BaseModel):
+    """Configuration for answering piped questions concurrently (non-TTY --interactive)."""
+    concurrency: int = 6  # Questions answered at once (the scheduler still caps model runs)
+    read_ahead: int = 32  # Questions read ahead of the oldest unanswered one
+    format: str = "text"  # text (as in the terminal) or jsonl (one JSON object per answer)
+
+
+class GuardrailConfig(BaseModel):
+    """Configuration for the local input guardrails run alongside generation."""
+    enabled: bool = True
+    agents: List[str] = ["michelle", "obama"]  # Agents whose input is screened
+    checks: List[str] = ["prompt_injection", "abusive", "off_topic"]
+    injection_threshold: float = 1.0  # Summed pattern weights that trip prompt_injection
+    abuse_threshold: float = 1.0  # Summed term weights that trip abusive
+    off_topic_min_hits: int = 2  # Off-topic words needed, with none of the agent's own topic words
+    off_topic_terms: List[str] = []  # Added to the built-in off-topic vocabulary
+    messages: Dict[str, str] = {
+        "prompt_injection": "I can't change how I work or share my instructions, but I'm happy to answer a question.",
+        "abusive": "Let's keep this conversation respectful. Is there something I can help you with?",
+        "off_topic": "That's outside what I can talk about here. Ask me something about my work and I'll gladly answer.",
+    }
+
+
+class ShadowConfig(BaseModel):
+    """Configuration for mirroring sampled turns to a candidate model."""
+    enabled: bool = False
+    model: str = "gpt-4o-mini"  # Candidate model the sampled turns are replayed on
+    sample_rate: float = 0.05  # Share of model-answered turns mirrored
+    agents: Dict[str, float] = {}  # Per-agent overrides of sample_rate
+    queue_size: int = 256  # Mirrored turns waiting or running; more are dropped
+    max_concurrency: int = 2  # Candidate runs in flight at once
+    path: str = "shadow"  # Directory of the JSON Lines result store
+
+
+class ComparisonVariant(BaseModel):
+    """One model and its settings in the model comparison."""
+    name: str
+    model: str
+    temperature: Optional[float] = None
+    max_tokens: Optional[int] = None
+
+
+class ComparisonPrompt(BaseModel):
+    """One prompt of an agent's comparison suite."""
+    prompt: str
+    expect: Optional[str] = None  # Persona key that should answer (handoff correctness)
+
+
+class ModelPrice(BaseModel):
+    """USD per million tokens."""
+    input: float = 0.0
+    output: float = 0.0
+
+
+class ComparisonConfig(BaseModel):
+    """Configuration for the model latency/quality comparison harness."""
+    concurrency: int = 4  # Suite runs in flight at once
+    repeats: int = 1  # Runs of each prompt per variant
+    variants: List[ComparisonVariant] = [ComparisonVariant(name="gpt-4o", model="gpt-4o-2024-11-20")]
+    suites: Dict[str, List[ComparisonPrompt]] = {}
+    prices: Dict[str, ModelPrice] = {}  # By model name
+
+
+class ModelThroughput(BaseModel):
+    """Planning figures for one model (measure them with `make compare-models`)."""
+    ttft_base: float = 0.4  # Seconds to the first token of an empty prompt
+    prefill_tokens_per_s: float = 4000.0  # Prompt tokens processed per second before the first token
+    output_tokens_per_s: float = 60.0
+
+
+class PromptBudgetLimits(BaseModel):
+    """Budget for the worst handoff path of one agent (None disables a check)."""
+    max_prompt_tokens: Optional[int] = 1500  # Largest prompt of any model call
+    max_ttft: Optional[float] = None  # Seconds until the answer starts streaming
+    max_cost_per_turn: Optional[float] = None  # USD
+
+
+class PromptBudgetConfig(BaseModel):
+    """Configuration for the static prompt-cost analyser."""
+    check_on_load: bool = True  # Warn about personas over budget when settings load
+    context_tokens: int = 600  # User message and recent history sent with every call
+    handoff_call_tokens: int = 25  # Handoff call and its result, added to later calls
+    output_tokens: int = 400  # Expected answer length
+    throughput: ModelThroughput = ModelThroughput()
+    models: Dict[str, ModelThroughput] = {}  # Per-model figures by model name
+    limits: PromptBudgetLimits = PromptBudgetLimits()
+    agents: Dict[str, Dict[str, Any]] = {}  # Per-agent limit overrides
 
 
 class Settings(BaseSettings):
@@ -45,8 +358,62 @@ class Settings(BaseSettings):
     # Creative settings
     creative_config: CreativeConfig = CreativeConfig()
 
-    # Agent configurations
-    agent_configs: Dict[str, AgentConfig] = {}
+    # Scheduler settings
+    scheduler_config: SchedulerConfig = SchedulerConfig()
+
+    # Resilience settings
+    resilience_config: ResilienceConfig = ResilienceConfig()
+
+    # CPU worker pool settings
+    worker_config: WorkerConfig = WorkerConfig()
+
+    # Session store settings
+    session_config: SessionConfig = SessionConfig()
+
+    # Conversation log settings
+    conversation_log_config: ConversationLogConfig = ConversationLogConfig()
+
+    # Record/replay settings
+    cassette_config: CassetteConfig = CassetteConfig()
+
+    # Telemetry settings
+    telemetry_config: TelemetryConfig = TelemetryConfig()
+
+    # Response budget settings
+    response_budget_config: ResponseBudgetConfig = ResponseBudgetConfig()
+
+    # Cache and warm-up settings
+    cache_config: CacheConfig = CacheConfig()
+    warmup_config: WarmupConfig = WarmupConfig()
+
+    # Follow-up prefetch settings
+    prefetch_config: PrefetchConfig = PrefetchConfig()
+
+    # Agent configurations: the persona catalogue plus any inline `agents:`
+    persona_config: PersonaConfig = PersonaConfig()
+    inline_agents: Dict[str, AgentConfig] = {}
+    handoff_graph_config: HandoffGraphConfig = HandoffGraphConfig()
+    affinity_config: AffinityConfig = AffinityConfig()
+
+    # Input guardrail settings
+    guardrail_config: GuardrailConfig = GuardrailConfig()
+
+    # Shadow traffic settings
+    shadow_config: ShadowConfig = ShadowConfig()
+
+    # Model comparison settings
+    comparison_config: ComparisonConfig = ComparisonConfig()
+
+    # Prompt cost and latency budget settings
+    prompt_budget_config: PromptBudgetConfig = PromptBudgetConfig()
+
+    # Agent daemon settings
+    daemon_config: DaemonConfig = DaemonConfig()
+
+    # Pipelined stdin settings
+    pipeline_config: PipelineConfig = PipelineConfig()
+    _catalogue: Any = PrivateAttr(None)
+    _handoff_graph: Any = PrivateAttr(None)
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -86,16 +453,118 @@ class Settings(BaseSettings):
             if "creative" in config:
                 settings_dict["creative_config"] = CreativeConfig(**config["creative"])
 
+            if "scheduler" in config:
+                settings_dict["scheduler_config"] = SchedulerConfig(**config["scheduler"])
+
+            if "resilience" in config:
+                settings_dict["resilience_config"] = ResilienceConfig(**config["resilience"])
+
+            if "workers" in config:
+                settings_dict["worker_config"] = WorkerConfig(**config["workers"])
+
+            if "sessions" in config:
+                settings_dict["session_config"] = SessionConfig(**config["sessions"])
+
+            if "conversation_log" in config:
+                settings_dict["conversation_log_config"] = ConversationLogConfig(**config["conversation_log"])
+
+            if "cassettes" in config:
+                settings_dict["cassette_config"] = CassetteConfig(**config["cassettes"])
+
+            if "telemetry" in config:
+                settings_dict["telemetry_config"] = TelemetryConfig(**config["telemetry"])
+
+            if "response_budgets" in config:
+                settings_dict["response_budget_config"] = ResponseBudgetConfig(**config["response_budgets"])
+
+            if "caches" in config:
+                settings_dict["cache_config"] = CacheConfig(**config["caches"])
+
+            if "warmup" in config:
+                settings_dict["warmup_config"] = WarmupConfig(**config["warmup"])
+
+            if "prefetch" in config:
+                settings_dict["prefetch_config"] = PrefetchConfig(**config["prefetch"])
+
+            if "personas" in config:
+                settings_dict["persona_config"] = PersonaConfig(**config["personas"])
+
+            if "handoff_graph" in config:
+                settings_dict["handoff_graph_config"] = HandoffGraphConfig(**config["handoff_graph"])
+
+            if "affinity" in config:
+                settings_dict["affinity_config"] = AffinityConfig(**config["affinity"])
+
+            if "guardrails" in config:
+                settings_dict["guardrail_config"] = GuardrailConfig(**config["guardrails"])
+
+            if "shadow" in config:
+                settings_dict["shadow_config"] = ShadowConfig(**config["shadow"])
+
+            if "comparison" in config:
+                settings_dict["comparison_config"] = ComparisonConfig(**config["comparison"])
+
+            if "prompt_budget" in config:
+                settings_dict["prompt_budget_config"] = PromptBudgetConfig(**config["prompt_budget"])
+
+            if "daemon" in config:
+                settings_dict["daemon_config"] = DaemonConfig(**config["daemon"])
+
+            if "pipeline" in config:
+                settings_dict["pipeline_config"] = PipelineConfig(**config["pipeline"])
+
             if "agents" in config:
-                agent_configs = {}
+                inline_agents = {}
                 for key, agent_config in config["agents"].items():
-                    agent_configs[key] = AgentConfig(**agent_config)
-                settings_dict["agent_configs"] = agent_configs
+                    inline_agents[key] = AgentConfig(**agent_config)
+                settings_dict["inline_agents"] = inline_agents
+
+        loaded = cls(**settings_dict)
+        if loaded.prompt_budget_config.check_on_load:
+            loaded.check_prompt_budgets()
+        return loaded
+
+    @property
+    def agent_configs(self):
+        """All agent configs by key, loaded from the persona catalogue on demand."""
+        if self._catalogue is None:
+            from agent.personas import PersonaCatalogue
+
+            self._catalogue = PersonaCatalogue(self.persona_config, self.inline_agents)
+        return self._catalogue
 
-        return cls(**settings_dict)
+    @property
+    def handoff_graph(self):
+        """The declared handoffs compiled into a graph (once per settings instance)."""
+        if self._handoff_graph is None:
+            from agent.handoff_graph import compile_graph
+
+            self._handoff_graph = compile_graph(self.agent_configs, self.handoff_graph_config.entries)
+        return self._handoff_graph
+
+    def check_prompt_budgets(self) -> None:
+        """Warn about personas whose worst handoff path is over its prompt budget.
+
+        Uses the token counts in the persona index, so no persona file is read.
+        """
+        try:
+            from agent.prompt_costs import PromptCostAnalyser, check_catalogue
+            from agent.personas import PersonaCatalogue  # noqa: F401
+        except ImportError:
+            return  # Loaded while the catalogue module itself is importing; nothing to check yet
+        analyser = PromptCostAnalyser(self.prompt_budget_config, self.comparison_config.prices)
+        try:
+            reports = check_catalogue(self.agent_configs, self.model_name, analyser)
+        except ValueError:
+            return  # An invalid catalogue is reported where the agents are built
+        for report in reports:
+            for problem in report.over:
+                warnings.warn(f"persona '{report.key}' is over its prompt budget: {problem}", stacklevel=2)
 
     def get_agent_config(self, agent_type: str) -> AgentConfig:
         """Get configuration for a specific agent type."""
+        if agent_type not in self.agent_configs:
+            warnings.warn(f"no persona '{agent_type}' in the catalogue, using the default agent config", stacklevel=2)
         return self.agent_configs.get(
             agent_type,
             AgentConfig(
@@ -105,6 +574,20 @@ class Settings(BaseSettings):
             ),
         )
 
+    def get_resilience_profile(self, agent_key: str) -> ResilienceProfile:
+        """Get the resilience profile for an agent, with its overrides applied."""
+        defaults = self.resilience_config.defaults
+        overrides = self.resilience_config.agents.get(agent_key, {})
+        return ResilienceProfile(
+            hedging=HedgingConfig(
+                **{**defaults.hedging.model_dump(), **overrides.get("hedging", {})}
+            ),
+            circuit_breaker=CircuitBreakerConfig(
+                **{**defaults.circuit_breaker.model_dump(), **overrides.get("circuit_breaker", {})}
+            ),
+            turn_deadline=overrides.get("turn_deadline", defaults.turn_deadline),
+        )
+
 
 # Global settings instance
 settings = Settings.load_from_yaml() 
\ No newline at end of file
@@ -0,0 +1,283 @@
+"""Shadow traffic to a candidate model.
+
+To judge a faster model under real traffic, a sampled share of the turns the
+production model answers (``shadow.sample_rate``, per agent under
+``shadow.agents``) is replayed on ``shadow.model``. The replay uses the same
+starting agent, conversation input and run options; only the model differs.
+Both answers, their latency and time-to-first-token, and a few local quality
+signals (same answering agent, word overlap, length ratio) go to a JSON Lines
+store under ``shadow.path`` for offline comparison:
+
+    python src/agent/shadow.py report
+
+Mirroring never touches the response path: ``offer`` only takes a sampling
+decision and hands the turn to a background thread with its own event loop
+and concurrency limit. At most ``shadow.queue_size`` turns wait or run there;
+beyond that new ones are dropped and counted.
+"""
+
+import asyncio
+import dataclasses
+import json
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from agents import RunConfig
+
+# Allow running as a script (python src/agent/shadow.py report)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from agent.affinity import content_words
+from agent.guardrails import latest_user_text
+from agent.handoff_filters import handoff_filters
+from agent.metrics import percentile
+from agent.resilience import StreamedAttempt
+from agent.settings import settings, ShadowConfig
+
+# Turn sources that were answered by the production model
+MIRRORED_SOURCES = ("model", "hedge")
+
+
+@dataclasses.dataclass
+class ShadowJob:
+    """One production turn to replay on the candidate model."""
+    agent: Any
+    agent_key: str
+    model_input: Any
+    run_kwargs: Dict[str, Any]
+    primary: Dict[str, Any]
+
+
+def compare(primary: str, candidate: str) -> Dict[str, float]:
+    """Local quality signals between the production and the candidate answer."""
+    a, b = content_words(primary), content_words(candidate)
+    return {
+        "overlap": round(len(a & b) / len(a | b), 3) if a | b else 1.0,
+        "length_ratio": round(len(candidate) / len(primary), 3) if primary else 0.0,
+    }
+
+
+class ShadowMirror:
+    """Replays sampled turns on the candidate model in the background."""
+
+    def __init__(self, config: Optional[ShadowConfig] = None, rng: Optional[random.Random] = None, **run_kwargs):
+        self.config = config or ShadowConfig()
+        self._rng = rng or random.Random()
+        self._run_kwargs = run_kwargs  # Overrides for every candidate run (tests, benchmarks)
+        self._lock = threading.Condition()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._file = None
+        self._file_day = None
+        self.pending = 0
+        self.offered = 0
+        self.sampled = 0
+        self.dropped = 0
+        self.completed = 0
+        self.failed = 0
+
+    def rate(self, agent_key: str) -> float:
+        if not self.config.enabled:
+            return 0.0
+        return self.config.agents.get(agent_key, self.config.sample_rate)
+
+    # Response path
+
+    def offer(self, agent, agent_key: str, model_input, result, **run_kwargs) -> bool:
+        """Maybe mirror a finished turn; never blocks. Returns whether it was queued."""
+        rate = self.rate(agent_key)
+        if rate <= 0.0 or result.source not in MIRRORED_SOURCES or result.timed_out:
+            return False
+        with self._lock:
+            self.offered += 1
+            if self._rng.random() >= rate:
+                return False
+            if self.pending >= self.config.queue_size:
+                self.dropped += 1
+                return False
+            self.pending += 1
+            self.sampled += 1
+        outcome = result.outcome
+        job = ShadowJob(agent, agent_key, model_input, dict(run_kwargs), {
+            "model": self._model_name(agent, run_kwargs),
+            "agent": result.agent_name,
+            "output": result.final_output,
+            "elapsed": round(result.elapsed, 4),
+            "ttft": round(outcome.ttft, 4) if outcome is not None and outcome.ttft is not None else None,
+        })
+        asyncio.run_coroutine_threadsafe(self._mirror(job), self.loop)
+        return True
+
+    # Background
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="shadow-mirror", daemon=True).start()
+                self._loop = loop
+        return self._loop
+
+    @staticmethod
+    def _model_name(agent, run_kwargs) -> str:
+        run_config = run_kwargs.get("run_config")
+        model = getattr(run_config, "model", None) or getattr(agent, "model", None) or settings.model_name
+        return model if isinstance(model, str) else type(model).__name__
+
+    async def _mirror(self, job: ShadowJob) -> None:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(max(1, self.config.max_concurrency))
+        try:
+            async with self._semaphore:
+                candidate = await self._candidate(job)
+            self._write(job, candidate)
+        finally:
+            with self._lock:
+                self.pending -= 1
+                self._lock.notify_all()
+
+    async def _candidate(self, job: ShadowJob) -> Dict[str, Any]:
+        kwargs = dict(job.run_kwargs, **self._run_kwargs)
+        max_turns = settings.handoff_graph.max_turns(job.agent_key)
+        if max_turns is not None:
+            kwargs.setdefault("max_turns", max_turns)
+        kwargs = handoff_filters.apply(job.agent_key, kwargs)
+        kwargs["run_config"] = dataclasses.replace(kwargs.get("run_config") or RunConfig(), model=self.config.model)
+        deadline = settings.get_resilience_profile(job.agent_key).turn_deadline
+        attempt = None
+        try:
+            attempt = StreamedAttempt(job.agent, job.model_input, **kwargs)
+            await asyncio.wait_for(asyncio.shield(attempt.task), deadline)
+            candidate = {
+                "agent": attempt.agent_name,
+                "output": attempt.final_output,
+                "elapsed": round(time.perf_counter() - attempt.started_at, 4),
+                "ttft": round(attempt.ttft, 4) if attempt.ttft is not None else None,
+            }
+            with self._lock:
+                self.completed += 1
+        except Exception as exc:
+            if attempt is not None:
+                attempt.cancel()
+            candidate = {"error": f"{type(exc).__name__}: {exc}"}
+            with self._lock:
+                self.failed += 1
+        candidate["model"] = self.config.model
+        return candidate
+
+    def _write(self, job: ShadowJob, candidate: Dict[str, Any]) -> None:
+        record = {
+            "time": time.time(),
+            "agent_key": job.agent_key,
+            "input": latest_user_text(job.model_input),
+            "primary": job.primary,
+            "candidate": candidate,
+        }
+        if "output" in candidate:
+            record["same_agent"] = candidate["agent"] == job.primary["agent"]
+            record.update(compare(job.primary["output"], candidate["output"]))
+        day = datetime.now().strftime("%Y%m%d")
+        if self._file is None or self._file_day != day:
+            if self._file is not None:
+                self._file.close()
+            os.makedirs(self.config.path, exist_ok=True)
+            self._file = open(os.path.join(self.config.path, f"shadow-{day}.jsonl"), "a", encoding="utf-8")
+            self._file_day = day
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def drain(self, timeout: float = 30.0) -> bool:
+        """Wait for every queued replay to finish (tests, benchmarks, shutdown)."""
+        with self._lock:
+            return self._lock.wait_for(lambda: self.pending == 0, timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "offered": self.offered,
+                "sampled": self.sampled,
+                "dropped": self.dropped,
+                "pending": self.pending,
+                "completed": self.completed,
+                "failed": self.failed,
+            }
+
+
+def load_records(path: str) -> List[Dict[str, Any]]:
+    """Every record in a shadow store directory (or a single file)."""
+    if os.path.isdir(path):
+        files = sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(".jsonl"))
+    else:
+        files = [path] if os.path.isfile(path) else []
+    records = []
+    for name in files:
+        with open(name, encoding="utf-8") as f:
+            records.extend(json.loads(line) for line in f if line.strip())
+    return records
+
+
+def summarise(records: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Per-agent latency and agreement of the production and candidate models."""
+    summary: Dict[str, Dict[str, Any]] = {}
+    for agent_key in sorted({r["agent_key"] for r in records}):
+        rows = [r for r in records if r["agent_key"] == agent_key]
+        answered = [r for r in rows if "output" in r["candidate"]]
+        entry: Dict[str, Any] = {
+            "turns": len(rows),
+            "errors": len(rows) - len(answered),
+            "models": f"{rows[-1]['primary']['model']} -> {rows[-1]['candidate']['model']}",
+        }
+        for side in ("primary", "candidate"):
+            for metric in ("elapsed", "ttft"):
+                values = [r[side][metric] for r in answered if r[side].get(metric) is not None]
+                entry[f"{side}_{metric}_p50"] = percentile(values, 50)
+                entry[f"{side}_{metric}_p95"] = percentile(values, 95)
+        if answered:
+            entry["same_agent"] = sum(r["same_agent"] for r in answered) / len(answered)
+            entry["overlap"] = sum(r["overlap"] for r in answered) / len(answered)
+            entry["length_ratio"] = sum(r["length_ratio"] for r in answered) / len(answered)
+        summary[agent_key] = entry
+    return summary
+
+
+def format_summary(summary: Dict[str, Dict[str, Any]]) -> str:
+    if not summary:
+        return "No shadow records yet (enable shadow: in config/settings.yaml)."
+    lines = []
+    for agent_key, s in summary.items():
+        lines.append(f"{agent_key}: {s['turns']} turns ({s['errors']} candidate errors), {s['models']}")
+        for metric in ("elapsed", "ttft"):
+            lines.append(
+                f"   {metric:<8} p50 {s[f'primary_{metric}_p50'] * 1000:8.0f} ms -> {s[f'candidate_{metric}_p50'] * 1000:8.0f} ms"
+                f"   p95 {s[f'primary_{metric}_p95'] * 1000:8.0f} ms -> {s[f'candidate_{metric}_p95'] * 1000:8.0f} ms"
+            )
+        if "overlap" in s:
+            lines.append(
+                f"   same answering agent {s['same_agent']:.0%}, word overlap {s['overlap']:.2f}, "
+                f"length ratio {s['length_ratio']:.2f}"
+            )
+    return "\n".join(lines)
+
+
+# Global shadow mirror (fed by run_turn)
+shadow = ShadowMirror(settings.shadow_config)
+
+
+def main(argv=None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Shadow traffic store")
+    parser.add_argument("command", choices=["report"])
+    parser.add_argument("path", nargs="?", default=settings.shadow_config.path)
+    args = parser.parse_args(argv)
+    print(format_summary(summarise(load_records(args.path))))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,21 @@
-from agents import Agent, Runner
+from agents import Agent
 import sys
 import os
 
 # Add the src directory to the path for imports
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from agent.settings import settings
+from agent.budgets import response_budgets
+from agent.client import ask
+from agent.cli import parse_args
+from agent.convlog import start_session
+from agent.creative import creative_candidates, run_creative_turn
+from agent.pipeline import pipeline_mode, run_piped
+from agent.profiling import profile_session
+from agent.resilience import CircuitOpenError
+from agent.scheduler import API
+from agent.turns import run_turn
+from agent.warmup import warmup
 
 
 def create_creative_agent():
@@ -16,7 +27,7 @@ def create_creative_agent():
     )
 
 
-def interactive_mode():
+def interactive_mode(resume=None):
     """Run the creative agent in interactive mode."""
     agent = create_creative_agent()
     
@@ -26,6 +37,14 @@ def interactive_mode():
     print("   I can help you with poetry, stories, creative writing, and more!")
     print("\n   Type 'exit' to quit.\n")
 
+    session, resumed = start_session("creative", agent.instructions, resume)
+    if resumed:
+        print(f"   ↩️  Resumed session {session.session_id} ({len(session)} recent messages restored).\n")
+    elif resume:
+        print(f"   ⚠️  No saved conversation '{resume}', starting a new one.\n")
+    if not resumed:
+        print(f"   💾 Session {session.session_id} (continue later with --resume {session.session_id})\n")
+
     while True:
         try:
             user_input = input("💬 You: ").strip()
@@ -38,25 +57,49 @@ def interactive_mode():
                 print("Please enter a request.\n")
                 continue
 
-            # Run the agent with user input
-            result = Runner.run_sync(agent, user_input)
-            
+            # Poems and stories come from ranked variants; anything else is a normal turn
+            result = run_creative_turn(agent, user_input, "creative", session=session)
+            if result is None:
+                result = run_turn(agent, user_input, "creative", session=session)
+
+            if result.cancelled:
+                print("\n\n⏹️  Stopped that answer. Ask me something else.\n")
+                continue
+
             # Display the response
             print(f"\n✨ Creative Assistant: {result.final_output}\n")
+            spare = creative_candidates.cached(session.session_id)
+            if result.source.startswith("candidate") and spare:
+                print(f"💡 {spare} more version{'s' if spare != 1 else ''} ready, just ask for another.\n")
+            if result.timed_out:
+                print("⏱️  (Answer cut short at the turn deadline.)\n")
+            if settings.agent_verbose and result.tier:
+                print(f"📏 Budget tier: {result.tier}\n")
 
         except KeyboardInterrupt:
             print(f"\n\n👋 Goodbye!")
             break
+        except CircuitOpenError as e:
+            print(f"\n⏳ The model is temporarily unavailable ({str(e)}). Please try again shortly.\n")
         except Exception as e:
             print(f"\n❌ Error: {str(e)}\n")
 
+    if settings.agent_verbose and response_budgets.stats():
+        print(response_budgets.report())
+
+
+def answer_question(user_input, agent=None):
+    """Answer one piped question on its own (pipeline mode)."""
+    agent = agent or create_creative_agent()
+    result = run_creative_turn(agent, user_input, "creative")
+    if result is None:
+        result = run_turn(agent, user_input, "creative", priority=API)
+    return result
+
 
 def main():
-    """Run a simple agent with Pydantic configuration."""
+    """Run a simple agent with Pydantic configuration (on the agent daemon when one is running)."""
     
-    # Create agent using settings
-    agent = create_creative_agent()
-
     # Use the default creative task from settings
     task = settings.creative_config.default_task
     
@@ -65,13 +108,21 @@ def main():
     print(f"Temperature: {settings.model_temperature}")
     print("-" * 50)
     
-    result = Runner.run_sync(agent, task)
-    print(result.final_output)
+    response = ask("creative", task)
+    print(response["final_output"] if response["ok"] else f"❌ Error: {response['error']}")
 
 
 if __name__ == "__main__":
-    # Check if we want interactive mode
-    if len(sys.argv) > 1 and sys.argv[1] == "--interactive":
-        interactive_mode()
-    else:
-        main() 
\ No newline at end of file
+    args = parse_args("Creative writing assistant")
+    with profile_session("simple_agent", cpu=args.profile, memory=args.profile_memory):
+        if args.interactive and pipeline_mode(args):
+            creative_agent = create_creative_agent()
+            run_piped(args, lambda user_input: answer_question(user_input, creative_agent), "✨ Creative Assistant")
+        elif args.interactive:
+            if warmup.start(["creative"]) is not None:
+                print(f"🔥 Warming caches in the background ({warmup.total} prompts)")
+            interactive_mode(resume=args.resume)
+            if warmup.total and settings.agent_verbose:
+                print(warmup.report())
+        else:
+            main()
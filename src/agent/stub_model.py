@@ -0,0 +1,136 @@
+"""Local stand-in for the OpenAI model, for load tests and offline runs.
+
+``StubModel`` answers with canned text after a configurable time to first
+token and per-token delay, streams like the real Responses API and routes
+handoffs by keyword, so the full agent stack (scheduler, resilient runner,
+handoffs, sessions) can be exercised at thousands of concurrent users without
+network access or spend.
+"""
+
+import asyncio
+import itertools
+import time
+from typing import Dict, Optional, Sequence
+
+from agents.items import ModelResponse
+from agents.models.interface import Model, ModelProvider
+from agents.usage import Usage
+from openai.types.responses import (
+    Response,
+    ResponseCompletedEvent,
+    ResponseCreatedEvent,
+    ResponseFunctionToolCall,
+    ResponseOutputMessage,
+    ResponseOutputText,
+    ResponseTextDeltaEvent,
+)
+
+# Keywords that make the stub hand off to an agent, by agent name
+DEFAULT_ROUTES: Dict[str, Sequence[str]] = {
+    "Tim Burton": ("batman", "catwoman", "burton", "gotham", "gothic"),
+    "Martin Scorsese": ("age of innocence", "scorsese", "olenska", "wharton"),
+}
+
+_WORDS = (
+    "every role teaches you something new about yourself and the people "
+    "you make it with so I always start by listening to the character"
+).split()
+
+
+def _last_user_text(input) -> str:
+    if isinstance(input, str):
+        return input
+    for item in reversed(input):
+        if isinstance(item, dict) and item.get("role") == "user":
+            content = item.get("content")
+            return content if isinstance(content, str) else str(content)
+    return ""
+
+
+class StubModel(Model):
+    """Fake model with realistic timing and keyword-based handoffs."""
+
+    def __init__(
+        self,
+        ttft: float = 0.2,
+        token_delay: float = 0.01,
+        answer_tokens: int = 40,
+        chunk_tokens: int = 4,
+        routes: Optional[Dict[str, Sequence[str]]] = None,
+    ):
+        self.ttft = ttft
+        self.token_delay = token_delay
+        self.answer_tokens = answer_tokens
+        self.chunk_tokens = max(1, chunk_tokens)
+        self.routes = DEFAULT_ROUTES if routes is None else routes
+        self.calls = 0
+        self._ids = itertools.count()
+
+    def _handoff(self, input, handoffs):
+        text = _last_user_text(input).lower()
+        for handoff in handoffs or []:
+            keywords = self.routes.get(handoff.agent_name, ())
+            if any(keyword in text for keyword in keywords):
+                return handoff
+        return None
+
+    def _answer(self, system_instructions) -> str:
+        speaker = (system_instructions or "assistant").split(".")[0][:40]
+        words = list(itertools.islice(itertools.cycle(_WORDS), self.answer_tokens))
+        return f"[{speaker}] " + " ".join(words)
+
+    def _output(self, system_instructions, input, handoffs):
+        self.calls += 1
+        call_id = f"stub_{next(self._ids)}"
+        handoff = self._handoff(input, handoffs)
+        if handoff is not None:
+            return [ResponseFunctionToolCall(
+                id=call_id, call_id=call_id, type="function_call", name=handoff.tool_name, arguments="{}",
+            )], None
+        text = self._answer(system_instructions)
+        message = ResponseOutputMessage(
+            id=call_id, type="message", role="assistant", status="completed",
+            content=[ResponseOutputText(text=text, type="output_text", annotations=[])],
+        )
+        return [message], text
+
+    def _usage(self, text: Optional[str]) -> Usage:
+        output_tokens = self.answer_tokens if text else 8
+        return Usage(requests=1, input_tokens=200, output_tokens=output_tokens, total_tokens=200 + output_tokens)
+
+    async def get_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, **kwargs):
+        output, text = self._output(system_instructions, input, handoffs)
+        tokens = self.answer_tokens if text else 1
+        await asyncio.sleep(self.ttft + tokens * self.token_delay)
+        return ModelResponse(output=output, usage=self._usage(text), response_id=None)
+
+    async def stream_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, **kwargs):
+        output, text = self._output(system_instructions, input, handoffs)
+        response = Response(
+            id=f"resp_{output[0].id}", created_at=time.time(), model="stub", object="response",
+            output=output, tool_choice="auto", tools=[], parallel_tool_calls=False,
+        )
+        sequence = itertools.count()
+        yield ResponseCreatedEvent(type="response.created", response=response, sequence_number=next(sequence))
+        await asyncio.sleep(self.ttft)
+        if text:
+            words = text.split(" ")
+            for start in range(0, len(words), self.chunk_tokens):
+                piece = " ".join(words[start:start + self.chunk_tokens])
+                yield ResponseTextDeltaEvent(
+                    type="response.output_text.delta", delta=(" " if start else "") + piece,
+                    item_id=output[0].id, output_index=0, content_index=0,
+                    sequence_number=next(sequence), logprobs=[],
+                )
+                await asyncio.sleep(self.token_delay * self.chunk_tokens)
+        yield ResponseCompletedEvent(type="response.completed", response=response, sequence_number=next(sequence))
+
+
+class StubModelProvider(ModelProvider):
+    """Serves one shared ``StubModel`` for every model name."""
+
+    def __init__(self, **model_kwargs):
+        self.model = StubModel(**model_kwargs)
+
+    def get_model(self, model_name: Optional[str]) -> Model:
+        return self.model
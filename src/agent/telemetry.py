@@ -0,0 +1,321 @@
+"""Non-blocking, batched telemetry export.
+
+Recording a span on the request path only appends a small tuple to a bounded
+ring buffer. A background thread drains the buffer in batches and writes them
+to local files, either as JSON Lines (one span per line) or in the OTLP/JSON
+file exporter layout (one ``ExportTraceServiceRequest`` per line). When the
+buffer is full new spans are dropped and counted rather than blocking the
+caller.
+
+Sampling is decided per trace, so a kept trace keeps all of its spans unless a
+per-span-name rate in ``settings.yaml`` thins them further. The agents SDK's
+own spans can be routed through the same pipeline with ``sdk_traces: local``.
+"""
+
+import atexit
+import json
+import os
+import random
+import threading
+import time
+import zlib
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from agents.tracing import TracingProcessor
+
+from agent.settings import settings, TelemetryConfig
+
+SERVICE_NAME = "agents.michelle"
+
+
+def new_id(bits: int = 64) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+class Span:
+    """A span being timed by ``Telemetry.span``."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start", "attributes")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = new_id()
+        self.parent_id = parent_id
+        self.start = time.time()
+        self.attributes = attributes
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+
+class Telemetry:
+    """Ring buffer of finished spans plus the background thread that exports them."""
+
+    def __init__(self, config: Optional[TelemetryConfig] = None):
+        self.config = config or TelemetryConfig()
+        self._buffer = deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self.recorded = 0
+        self.dropped = 0
+        self.sampled_out = 0
+        self.exported = 0
+        self.batches = 0
+        self.flush_seconds = 0.0
+
+    # Request path
+
+    def sampled(self, name: str, trace_id: str) -> bool:
+        """Whether a span belongs to a kept trace (deterministic per trace id)."""
+        rate = self.config.sampling.get(name, self.config.sample_rate)
+        if rate >= 1.0:
+            return True
+        if rate <= 0.0:
+            return False
+        return (zlib.crc32(trace_id.encode("ascii")) & 0xFFFFFFFF) / 2**32 < rate
+
+    def record(
+        self,
+        name: str,
+        start: float,
+        end: float,
+        attributes: Optional[Dict[str, Any]] = None,
+        trace_id: Optional[str] = None,
+        span_id: Optional[str] = None,
+        parent_id: Optional[str] = None,
+    ) -> bool:
+        """Queue a finished span; returns False if it was sampled out or dropped."""
+        if not self.config.enabled:
+            return False
+        trace_id = trace_id or new_id(128)
+        if not self.sampled(name, trace_id):
+            self.sampled_out += 1
+            return False
+        entry = (name, trace_id, span_id or new_id(), parent_id, start, end, attributes or {})
+        return self._offer(entry)
+
+    def _offer(self, entry) -> bool:
+        with self._lock:
+            if len(self._buffer) >= self.config.buffer_size:
+                self.dropped += 1
+                return False
+            self._buffer.append(entry)
+            self.recorded += 1
+            pending = len(self._buffer)
+        if self._thread is None:
+            self._start()
+        if pending >= self.config.batch_size:
+            self._wake.set()
+        return True
+
+    @contextmanager
+    def span(self, name: str, trace_id: Optional[str] = None, parent_id: Optional[str] = None, **attributes):
+        """Time a block of code as a span."""
+        span = Span(name, trace_id or new_id(128), parent_id, attributes)
+        try:
+            yield span
+        except BaseException as exc:
+            span.attributes["error"] = type(exc).__name__
+            raise
+        finally:
+            self.record(span.name, span.start, time.time(), span.attributes, span.trace_id, span.span_id, span.parent_id)
+
+    def record_sdk_span(self, sdk_span) -> None:
+        """Queue an agents SDK span; it is only exported on the flusher thread."""
+        if not self.config.enabled:
+            return
+        name = getattr(sdk_span.span_data, "type", "sdk")
+        if not self.sampled(name, sdk_span.trace_id):
+            self.sampled_out += 1
+            return
+        self._offer(("sdk", sdk_span))
+
+    # Background export
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="telemetry-flusher", daemon=True)
+            self._thread.start()
+        atexit.register(self.shutdown)
+
+    def _run(self) -> None:
+        while not self._stopping:
+            self._wake.wait(self.config.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        """Write out everything buffered so far; returns the number of spans written."""
+        written = 0
+        while True:
+            with self._lock:
+                count = min(len(self._buffer), self.config.batch_size)
+                batch = [self._buffer.popleft() for _ in range(count)]
+            if not batch:
+                return written
+            started = time.perf_counter()
+            self._write([self._to_record(entry) for entry in batch])
+            self.flush_seconds += time.perf_counter() - started
+            self.batches += 1
+            self.exported += len(batch)
+            written += len(batch)
+
+    @staticmethod
+    def _to_record(entry) -> Dict[str, Any]:
+        if entry[0] == "sdk" and len(entry) == 2:
+            exported = entry[1].export() or {}
+            data = exported.get("span_data") or {}
+            return {
+                "name": data.get("type", "sdk"),
+                "trace_id": exported.get("trace_id", "").removeprefix("trace_"),
+                "span_id": exported.get("id", "").removeprefix("span_"),
+                "parent_id": (exported.get("parent_id") or "").removeprefix("span_") or None,
+                "start": _timestamp(exported.get("started_at")),
+                "end": _timestamp(exported.get("ended_at")),
+                "attributes": {k: v for k, v in data.items() if k != "type" and _is_scalar(v)},
+                "error": exported.get("error"),
+            }
+        name, trace_id, span_id, parent_id, start, end, attributes = entry
+        return {
+            "name": name,
+            "trace_id": trace_id,
+            "span_id": span_id,
+            "parent_id": parent_id,
+            "start": start,
+            "end": end,
+            "attributes": attributes,
+        }
+
+    def _path(self) -> str:
+        extension = "otlp.jsonl" if self.config.format == "otlp" else "jsonl"
+        return os.path.join(self.config.path, f"spans-{datetime.now():%Y%m%d}.{extension}")
+
+    def _write(self, records: List[Dict[str, Any]]) -> None:
+        os.makedirs(self.config.path, exist_ok=True)
+        with open(self._path(), "a", encoding="utf-8") as f:
+            if self.config.format == "otlp":
+                f.write(json.dumps(to_otlp(records), default=str) + "\n")
+            else:
+                f.writelines(json.dumps(record, default=str) + "\n" for record in records)
+
+    def shutdown(self) -> None:
+        """Stop the flusher thread after writing what is left."""
+        self._stopping = True
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "recorded": self.recorded,
+            "dropped": self.dropped,
+            "sampled_out": self.sampled_out,
+            "exported": self.exported,
+            "pending": len(self._buffer),
+            "batches": self.batches,
+            "flush_ms_per_batch": round(1000 * self.flush_seconds / self.batches, 3) if self.batches else 0.0,
+        }
+
+
+def _is_scalar(value) -> bool:
+    return isinstance(value, (str, int, float, bool)) or value is None
+
+
+def _timestamp(value) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def _otlp_value(value) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _nanos(seconds: Optional[float]) -> str:
+    return str(int((seconds or 0) * 1e9))
+
+
+def to_otlp(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Convert span records into an OTLP/JSON ``ExportTraceServiceRequest``."""
+    spans = []
+    for record in records:
+        span = {
+            "traceId": record["trace_id"].rjust(32, "0")[-32:],
+            "spanId": record["span_id"].rjust(16, "0")[-16:],
+            "name": record["name"],
+            "kind": 1,
+            "startTimeUnixNano": _nanos(record["start"]),
+            "endTimeUnixNano": _nanos(record["end"]),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)}
+                for key, value in record["attributes"].items() if value is not None
+            ],
+        }
+        if record.get("parent_id"):
+            span["parentSpanId"] = record["parent_id"].rjust(16, "0")[-16:]
+        if record.get("error"):
+            span["status"] = {"code": 2, "message": str(record["error"])}
+        spans.append(span)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": SERVICE_NAME}, "spans": spans}],
+        }]
+    }
+
+
+class LocalTracingProcessor(TracingProcessor):
+    """Feeds agents SDK spans into the telemetry ring buffer."""
+
+    def __init__(self, sink: Telemetry):
+        self._sink = sink
+
+    def on_trace_start(self, trace) -> None:
+        pass
+
+    def on_trace_end(self, trace) -> None:
+        pass
+
+    def on_span_start(self, span) -> None:
+        pass
+
+    def on_span_end(self, span) -> None:
+        self._sink.record_sdk_span(span)
+
+    def shutdown(self) -> None:
+        self._sink.shutdown()
+
+    def force_flush(self) -> None:
+        self._sink.flush()
+
+
+def configure_sdk_tracing(sink: "Telemetry") -> None:
+    """Apply the ``sdk_traces`` setting to the agents SDK."""
+    mode = sink.config.sdk_traces
+    if mode == "openai":
+        return
+    from agents import set_trace_processors
+    set_trace_processors([LocalTracingProcessor(sink)] if mode == "local" else [])
+
+
+# Global telemetry instance (the flusher thread starts with the first span)
+telemetry = Telemetry(settings.telemetry_config)
+configure_sdk_tracing(telemetry)
@@ -0,0 +1,76 @@
+"""Local tokenisation and text feature helpers.
+
+These run without a model call. Token counts use ``tiktoken`` when it is
+installed and otherwise fall back to a word-piece approximation that is close
+enough for cost and latency estimates.
+"""
+
+import math
+import re
+import zlib
+from array import array
+from typing import List, Optional, Sequence
+
+try:
+    import tiktoken
+except ImportError:  # optional dependency
+    tiktoken = None
+
+_WORD_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_encodings = {}
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase words and punctuation marks."""
+    return _WORD_RE.findall(text.lower())
+
+
+def _encoding(model: Optional[str]):
+    key = model or "cl100k_base"
+    if key not in _encodings:
+        try:
+            _encodings[key] = tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding(key)
+        except (KeyError, ValueError):
+            _encodings[key] = tiktoken.get_encoding("cl100k_base")
+    return _encodings[key]
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """Count (or estimate) the number of model tokens in text."""
+    if not text:
+        return 0
+    if tiktoken is not None:
+        return len(_encoding(model).encode(text))
+    return estimate_tokens(text)
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate model tokens without a tokenizer (the same wherever it runs)."""
+    # Roughly one token per four characters of a word, and one per symbol
+    return sum(max(1, math.ceil(len(piece) / 4)) for piece in _WORD_RE.findall(text))
+
+
+def hash_vector(text: str, dim: int = 256) -> array:
+    """Embed text as an L2-normalised hashed bag of words and bigrams."""
+    vector = array("f", bytes(4 * dim))
+    words = tokenize(text)
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    for feature in features:
+        digest = zlib.crc32(feature.encode("utf-8"))
+        sign = 1.0 if digest & 1 else -1.0
+        vector[(digest >> 1) % dim] += sign
+    norm = math.sqrt(sum(v * v for v in vector))
+    if norm:
+        for i in range(dim):
+            vector[i] /= norm
+    return vector
+
+
+def cosine_similarity(a: Sequence[float], b: Sequence[float]) -> float:
+    """Cosine similarity of two equal-length vectors."""
+    dot = sum(x * y for x, y in zip(a, b))
+    norm_a = math.sqrt(sum(x * x for x in a))
+    norm_b = math.sqrt(sum(y * y for y in b))
+    if not norm_a or not norm_b:
+        return 0.0
+    return dot / (norm_a * norm_b)
@@ -0,0 +1,288 @@
+"""Turn execution shared by the interactive loops.
+
+A turn goes through the priority scheduler and the resilient runner, so every
+entry point gets the same queueing, hedging and circuit breaking behaviour.
+
+When a session is given, its recent messages are sent along with the new user
+message and the exchange is recorded once the turn completes (and appended to
+the durable conversation log for sessions that follow it). Every turn gets a
+response budget (max tokens plus an instruction suffix) picked by a local
+query classifier. Each turn also leaves a telemetry span, queued without
+blocking, and is timed by the session profiler when ``--profile`` is on.
+
+Opening questions are answered from the response cache when possible, and a
+prompt whose route is already known starts at the agent it was handed to last
+time (see ``agent.cache``; across nodes when a shared tier is configured). In
+a conversation that has been handed off, follow-ups start at the agent that
+answered last (see ``agent.affinity``).
+A sampled share of model-answered turns is handed to the shadow mirror, which
+replays them on a candidate model in the background (see ``agent.shadow``).
+With prefetch on, each finished turn of a session starts answering its likely
+follow-ups, and a question that matches one is served from it (see
+``agent.prefetch``).
+
+Turns run on the scheduler's event loop, so pressing Ctrl+C while waiting only
+cancels the in-flight run (closing the upstream stream) instead of ending the
+whole session.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from agent import profiling
+from agent.affinity import session_affinity
+from agent.budgets import response_budgets, output_tokens
+from agent.cache import prompt_key, response_cache, routing_cache
+from agent.convlog import conversation_log
+from agent.prefetch import prefetcher
+from agent.resilience import resilient_runner, RunOutcome
+from agent.registry import find_agent, persona_key
+from agent.scheduler import scheduler, PriorityScheduler, INTERACTIVE
+from agent.sessions import session_store, Session, ROLE_ASSISTANT, ROLE_USER
+from agent.settings import settings
+from agent.shadow import shadow
+from agent.telemetry import telemetry
+
+
+@dataclass
+class TurnResult:
+    """What the user sees for one turn, plus how it was produced."""
+    final_output: str
+    agent_name: str
+    source: str
+    elapsed: float
+    outcome: Optional[RunOutcome] = None
+    cancelled: bool = False
+    timed_out: bool = False
+    tier: Optional[str] = None
+    route: Optional[str] = None  # How the starting agent was chosen: affinity, shift or cache
+
+
+def _turn_result(outcome: RunOutcome, started: float, route: Optional[str] = None) -> TurnResult:
+    return TurnResult(
+        final_output=outcome.final_output,
+        agent_name=outcome.agent_name,
+        source=outcome.source,
+        elapsed=time.perf_counter() - started,
+        outcome=outcome,
+        timed_out=outcome.timed_out,
+        route=route,
+    )
+
+
+def turn_input(session: Optional[Session], user_input: str):
+    """The new user message, preceded by the session's recent context."""
+    if session is None:
+        return user_input
+    history = session.input_items(session_store.config.context_messages)
+    return history + [{"role": "user", "content": user_input}]
+
+
+def record_exchange(session: Optional[Session], user_input: str, result: TurnResult) -> None:
+    """Add a completed exchange to the session (and the conversation log)."""
+    if session is None or result.cancelled:
+        return
+    session.append(ROLE_USER, user_input)
+    instructions = session_store.instructions
+    answered_by = persona_key(instructions.agent_key(session.agent_id), result.agent_name)
+    session.append(ROLE_ASSISTANT, result.final_output, instructions.intern(answered_by))
+    conversation_log.record_turn(session.session_id, user_input, result.final_output, result.agent_name)
+
+
+def _cacheable(agent_key: str, user_input, session: Optional[Session], use_cache: bool = True) -> bool:
+    """Whether the answer to this turn may come from (and go to) the response cache."""
+    config = settings.cache_config
+    return (
+        use_cache
+        and config.enabled
+        and isinstance(user_input, str)
+        and agent_key in config.response_agents
+        and (session is None or len(session) == 0)
+    )
+
+
+def _cached_turn(agent_key: str, user_input, cacheable: bool, started: float) -> Optional[TurnResult]:
+    if not cacheable:
+        return None
+    cached = response_cache.get(prompt_key(agent_key, user_input))
+    if cached is None:
+        return None
+    final_output, agent_name = cached
+    return TurnResult(final_output, agent_name, "cache", time.perf_counter() - started)
+
+
+def _prefetched_turn(outcome: Optional[RunOutcome], started: float) -> Optional[TurnResult]:
+    if outcome is None:
+        return None
+    result = _turn_result(outcome, started, "prefetch")
+    result.source = "prefetch"
+    return result
+
+
+def _start_agent(agent, agent_key: str, user_input, session: Optional[Session] = None, use_cache: bool = True):
+    """The agent to start at (the last agent of a handed-off conversation, the
+    agent a known prompt was handed to last time, or the entry agent) and why."""
+    target, route = session_affinity.route(agent, agent_key, session, user_input)
+    if target is not None:
+        return target, route
+    if not (use_cache and settings.cache_config.enabled) or not isinstance(user_input, str) or not agent.handoffs:
+        return agent, route
+    name = routing_cache.get(prompt_key(agent_key, user_input))
+    if name is None or name == agent.name:
+        return agent, route
+    target = find_agent(agent, name)
+    return (target, "cache") if target is not None else (agent, route)
+
+
+async def _off_loop(function, *args):
+    """Call a cache step from async code, in a worker thread when the caches do network I/O."""
+    if response_cache.remote or routing_cache.remote:
+        return await asyncio.to_thread(function, *args)
+    return function(*args)
+
+
+def _release(agent_key: str, user_input, cacheable: bool) -> None:
+    """Give up the claim a cache miss took on this prompt; other nodes waiting for it compute their own."""
+    if cacheable:
+        response_cache.release(prompt_key(agent_key, user_input))
+
+
+def _remember(agent_key: str, user_input, cacheable: bool, result: TurnResult, use_cache: bool = True) -> None:
+    """Store a fresh, complete answer and its route."""
+    if not (use_cache and settings.cache_config.enabled) or not isinstance(user_input, str):
+        return
+    key = prompt_key(agent_key, user_input)
+    if result.cancelled or result.timed_out or result.source not in ("model", "hedge"):
+        _release(agent_key, user_input, cacheable)
+        return
+    routing_cache.put(key, result.agent_name)
+    if cacheable:
+        response_cache.put(key, (result.final_output, result.agent_name))
+
+
+def _finish(budget, result: TurnResult) -> None:
+    """Attach the turn's budget tier and note its latency for the tier stats."""
+    if budget is not None:
+        result.tier = budget.tier
+        if not result.cancelled:
+            response_budgets.record(budget, result.elapsed, output_tokens(result.outcome))
+
+
+def _trace(agent_key: str, priority: str, result: TurnResult) -> None:
+    """Queue a telemetry span for the turn (never blocks)."""
+    end = time.time()
+    outcome = result.outcome
+    telemetry.record("turn", end - result.elapsed, end, {
+        "agent_key": agent_key,
+        "agent_name": result.agent_name,
+        "priority": priority,
+        "source": result.source,
+        "ttft": outcome.ttft if outcome is not None else None,
+        "hedged": outcome.hedged if outcome is not None else False,
+        "timed_out": result.timed_out,
+        "cancelled": result.cancelled,
+        "tier": result.tier,
+        "output_tokens": output_tokens(outcome),
+        "route": result.route,
+    })
+
+
+def _profile_start():
+    profiler = profiling.active_profiler
+    return (profiler, profiler.turn_started()) if profiler is not None else None
+
+
+def _profile(marker, agent_key: str, result: TurnResult) -> None:
+    if marker is not None:
+        profiler, started = marker
+        profiler.turn_finished(started, agent_key, result)
+
+
+def _cancelled_turn(agent, started: float, route: Optional[str] = None) -> TurnResult:
+    return TurnResult(
+        final_output="",
+        agent_name=agent.name,
+        source="cancelled",
+        elapsed=time.perf_counter() - started,
+        cancelled=True,
+        route=route,
+    )
+
+
+async def run_turn_async(
+    agent,
+    user_input,
+    agent_key: str,
+    priority: str = INTERACTIVE,
+    session: Optional[Session] = None,
+    turn_scheduler: Optional[PriorityScheduler] = None,
+    use_cache: bool = True,
+    **run_kwargs,
+) -> TurnResult:
+    """Run one agent turn from async code (on the global scheduler by default).
+
+    With ``use_cache=False`` the response and routing caches are neither read
+    nor written for this turn (load tests use it to reach the model).
+
+    If the turn is cancelled, while queued, running or waiting for a
+    prefetched answer, its cache claim is released and a cancelled turn is
+    traced and profiled before the cancellation propagates.
+    """
+    started = time.perf_counter()
+    profile = _profile_start()
+    cacheable = _cacheable(agent_key, user_input, session, use_cache)
+    budget = route = None
+    try:
+        result = await _off_loop(_cached_turn, agent_key, user_input, cacheable, started)
+        if result is None:
+            prefetched = prefetcher.take(session, user_input)
+            if prefetched is not None:
+                result = _prefetched_turn(await asyncio.wrap_future(prefetched), started)
+        if result is None:
+            start_agent, route = await _off_loop(_start_agent, agent, agent_key, user_input, session, use_cache)
+            budget = response_budgets.plan(agent_key, user_input)
+            run_kwargs = response_budgets.apply(budget, run_kwargs)
+            model_input = turn_input(session, user_input)
+            try:
+                outcome = await (turn_scheduler or scheduler).run(
+                    lambda: resilient_runner.run(start_agent, model_input, agent_key, **run_kwargs), priority
+                )
+            except BaseException:
+                # Cancelled, scheduler overload, open circuit or model error
+                await _off_loop(_release, agent_key, user_input, cacheable)
+                raise
+            result = _turn_result(outcome, started, route)
+            _finish(budget, result)
+            await _off_loop(_remember, agent_key, user_input, cacheable, result, use_cache)
+            shadow.offer(start_agent, agent_key, model_input, result, **run_kwargs)
+    except asyncio.CancelledError:
+        result = _cancelled_turn(agent, started, route)
+        _finish(budget, result)
+        _trace(agent_key, priority, result)
+        _profile(profile, agent_key, result)
+        raise
+    record_exchange(session, user_input, result)
+    prefetcher.start(agent, agent_key, session, user_input, result, **run_kwargs)
+    _trace(agent_key, priority, result)
+    _profile(profile, agent_key, result)
+    return result
+
+
+def run_turn(
+    agent, user_input, agent_key: str, priority: str = INTERACTIVE, session: Optional[Session] = None, **run_kwargs
+) -> TurnResult:
+    """Run one agent turn and block until it completes or the user presses Ctrl+C.
+
+    The turn is ``run_turn_async`` on the scheduler's loop; Ctrl+C cancels it there.
+    """
+    started = time.perf_counter()
+    future = asyncio.run_coroutine_threadsafe(
+        run_turn_async(agent, user_input, agent_key, priority, session, **run_kwargs), scheduler.loop
+    )
+    try:
+        return future.result()
+    except KeyboardInterrupt:
+        future.cancel()
+        return _cancelled_turn(agent, started)
@@ -0,0 +1,167 @@
+"""Background cache warm-up.
+
+Right after a deploy every cache is empty, so the first users to ask the
+README sample questions pay full model latency (plus a triage call for the
+ones that get handed off). The warm-up stage runs the prompts listed under
+``warmup:`` in ``settings.yaml`` concurrently at process start and stores the
+answers and routes in the response and routing caches.
+
+Warm-up runs on the scheduler's event loop in its own priority class (batch by
+default), so serving never waits for it: a user turn is queued ahead of any
+warm-up prompt that has not started yet. Progress and how often warmed
+entries are hit are available from ``report()``.
+"""
+
+import asyncio
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from agent.budgets import response_budgets
+from agent.cache import prompt_key, response_cache, routing_cache, TTLCache
+from agent.registry import get_agent
+from agent.resilience import resilient_runner
+from agent.scheduler import scheduler, PriorityScheduler
+from agent.settings import settings, CacheConfig, WarmupConfig, WarmupPrompt
+from agent.telemetry import telemetry
+
+
+class Warmup:
+    """Runs the warm-up prompts in the background and tracks their progress."""
+
+    def __init__(
+        self,
+        config: Optional[WarmupConfig] = None,
+        cache_config: Optional[CacheConfig] = None,
+        turn_scheduler: Optional[PriorityScheduler] = None,
+        agent_lookup: Callable[[str], Any] = get_agent,
+        responses: Optional[TTLCache] = None,
+        routes: Optional[TTLCache] = None,
+        **run_kwargs,
+    ):
+        self.config = config or WarmupConfig()
+        self.cache_config = cache_config or CacheConfig()
+        self.scheduler = turn_scheduler or scheduler
+        self._agent_lookup = agent_lookup
+        self.responses = response_cache if responses is None else responses
+        self.routes = routing_cache if routes is None else routes
+        self._run_kwargs = run_kwargs
+        self._future = None
+        self.prompts = list(self.config.prompts)
+        self.total = len(self.prompts)
+        self.warmed = 0
+        self.skipped = 0
+        self.failed = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def start(self, agents: Optional[Iterable[str]] = None):
+        """Start warming in the background, optionally only the prompts of some agents.
+
+        Returns a future, or None if there is nothing to warm.
+        """
+        if self._future is not None:
+            return self._future
+        if agents is not None:
+            agents = set(agents)
+            self.prompts = [entry for entry in self.config.prompts if entry.agent in agents]
+            self.total = len(self.prompts)
+        if not (self.config.enabled and self.cache_config.enabled and self.prompts):
+            return None
+        self.started_at = time.perf_counter()
+        self._future = asyncio.run_coroutine_threadsafe(self._run(), self.scheduler.loop)
+        return self._future
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until warm-up is done (for tests and scripts); returns False on timeout."""
+        if self._future is None:
+            return True
+        try:
+            self._future.result(timeout)
+        except TimeoutError:
+            return False
+        return True
+
+    @property
+    def done(self) -> bool:
+        return self.warmed + self.skipped + self.failed >= self.total
+
+    async def _run(self) -> None:
+        limit = asyncio.Semaphore(max(1, self.config.concurrency))
+        await asyncio.gather(*(self._warm(entry, limit) for entry in self.prompts), return_exceptions=True)
+        self.finished_at = time.perf_counter()
+
+    async def _warm(self, entry: WarmupPrompt, limit: asyncio.Semaphore) -> None:
+        key = prompt_key(entry.agent, entry.prompt)
+        cache_answer = entry.agent in self.cache_config.response_agents
+        async with limit:
+            if await self._cached(key, cache_answer):
+                self.skipped += 1
+                return
+            started = time.time()
+            try:
+                agent = self._agent_lookup(entry.agent)
+                run_kwargs = response_budgets.apply(response_budgets.plan(entry.agent, entry.prompt), self._run_kwargs)
+                outcome = await self.scheduler.run(
+                    lambda: resilient_runner.run(agent, entry.prompt, entry.agent, **run_kwargs),
+                    self.config.priority,
+                )
+            except Exception as exc:
+                self.failed += 1
+                telemetry.record("warmup", started, time.time(), {"agent_key": entry.agent, "error": type(exc).__name__})
+                return
+        if outcome.timed_out or outcome.source not in ("model", "hedge"):
+            self.failed += 1
+            return
+        await self._off_loop(self._store, key, cache_answer, outcome)
+        self.warmed += 1
+        telemetry.record("warmup", started, time.time(), {"agent_key": entry.agent, "agent_name": outcome.agent_name})
+
+    async def _off_loop(self, function, *args):
+        """Run a cache step in a worker thread when the caches do network I/O (shared tier)."""
+        if self.responses.remote or self.routes.remote:
+            return await asyncio.to_thread(function, *args)
+        return function(*args)
+
+    async def _cached(self, key, cache_answer: bool) -> bool:
+        return await self._off_loop(
+            lambda: key in self.routes and (not cache_answer or key in self.responses)
+        )
+
+    def _store(self, key, cache_answer: bool, outcome) -> None:
+        self.routes.put(key, outcome.agent_name, warm=True)
+        if cache_answer:
+            self.responses.put(key, (outcome.final_output, outcome.agent_name), warm=True)
+
+    def progress(self) -> str:
+        finished = self.warmed + self.skipped + self.failed
+        line = f"{finished}/{self.total} warm-up prompts done ({self.warmed} warmed, {self.skipped} already cached"
+        line += f", {self.failed} failed)"
+        if self.finished_at is not None and self.started_at is not None:
+            line += f" in {self.finished_at - self.started_at:.1f}s"
+        return line
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "total": self.total,
+            "warmed": self.warmed,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "seconds": (self.finished_at - self.started_at) if self.finished_at and self.started_at else None,
+            "response_cache": self.responses.stats(),
+            "routing_cache": self.routes.stats(),
+        }
+
+    def report(self) -> str:
+        """Progress plus cache hit rates, for printing at the end of a session."""
+        responses, routes = self.responses.stats(), self.routes.stats()
+        return (
+            f"🔥 {self.progress()}\n"
+            f"   Response cache: {responses['hits']} hits / {responses['hits'] + responses['misses']} lookups "
+            f"({responses['hit_rate']:.0%}), {responses['warm_hits']} from warm-up\n"
+            f"   Routing cache: {routes['hits']} hits / {routes['hits'] + routes['misses']} lookups "
+            f"({routes['hit_rate']:.0%}), {routes['warm_hits']} from warm-up"
+        )
+
+
+# Global warm-up stage (started by the interactive CLIs)
+warmup = Warmup(settings.warmup_config, settings.cache_config)
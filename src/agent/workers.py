@@ -0,0 +1,208 @@
+"""Process pool for the CPU-bound stages around the agents.
+
+Vectorisation, index builds and token-based cost estimation are pure Python and
+would hold the GIL on the event loop that drives ``Runner.run``. These stages
+run in worker processes instead. Large numeric results are handed over through
+shared memory: workers write vectors straight into a shared block and the
+caller reads them through a memoryview, so nothing is pickled or copied back.
+
+The persona index build (``make persona-index``) parses, validates and counts
+the tokens of its files across the pool. Per-turn token counts (handoff
+filters) stay in-process: they cover a few short texts inside synchronous SDK
+callbacks, where a process round trip would cost more than the work.
+"""
+
+import asyncio
+import functools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Callable, List, Optional, Sequence
+
+from agent.settings import settings, WorkerConfig
+from agent.tokens import count_tokens, hash_vector
+
+
+@dataclass(frozen=True)
+class SharedArrayRef:
+    """Picklable handle to a shared array that workers can attach to."""
+    name: str
+    typecode: str
+    length: int
+
+
+class SharedArray:
+    """A flat typed array living in shared memory."""
+
+    def __init__(self, shm: shared_memory.SharedMemory, typecode: str, length: int, owner: bool):
+        self._shm = shm
+        self.typecode = typecode
+        self.length = length
+        self._owner = owner
+
+    @classmethod
+    def create(cls, length: int, typecode: str = "f") -> "SharedArray":
+        """Allocate a zero-filled shared array."""
+        itemsize = memoryview(bytes(8)).cast(typecode).itemsize
+        shm = shared_memory.SharedMemory(create=True, size=max(1, length) * itemsize)  # Empty arrays still cast
+        return cls(shm, typecode, length, owner=True)
+
+    @classmethod
+    def attach(cls, ref: SharedArrayRef) -> "SharedArray":
+        """Attach to an existing shared array from another process."""
+        shm = shared_memory.SharedMemory(name=ref.name)
+        return cls(shm, ref.typecode, ref.length, owner=False)
+
+    @property
+    def ref(self) -> SharedArrayRef:
+        return SharedArrayRef(self._shm.name, self.typecode, self.length)
+
+    def view(self) -> memoryview:
+        """Zero-copy typed view of the array."""
+        return self._shm.buf.cast(self.typecode)[: self.length]
+
+    def row(self, index: int, width: int) -> memoryview:
+        """Zero-copy view of one row of a row-major matrix."""
+        return self.view()[index * width:(index + 1) * width]
+
+    def close(self) -> None:
+        """Detach from the block, and free it if this process created it."""
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+    def __enter__(self) -> "SharedArray":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# Stage functions run inside worker processes, so they must be module-level.
+
+def estimate_tokens_stage(texts: Sequence[str], model: Optional[str] = None) -> List[int]:
+    """Token counts for a batch of texts."""
+    return [count_tokens(text, model) for text in texts]
+
+
+def vectorise_stage(texts: Sequence[str], dim: int, out: SharedArrayRef, first_row: int) -> int:
+    """Write hashed vectors for texts into rows of a shared matrix."""
+    target = SharedArray.attach(out)
+    try:
+        view = target.view()
+        for offset, text in enumerate(texts):
+            start = (first_row + offset) * dim
+            view[start:start + dim] = hash_vector(text, dim)
+        del view
+    finally:
+        target.close()
+    return len(texts)
+
+
+def build_index_stage(vectors: SharedArrayRef, dim: int, first_row: int, rows: int, bits: int) -> List[int]:
+    """Random-hyperplane LSH signatures for a range of shared vector rows."""
+    source = SharedArray.attach(vectors)
+    try:
+        view = source.view()
+        planes = [hash_vector(f"plane-{i}", dim) for i in range(bits)]
+        signatures = [_signature(view[row * dim:(row + 1) * dim], planes) for row in range(first_row, first_row + rows)]
+        del view
+    finally:
+        source.close()
+    return signatures
+
+
+def _signature(vector: memoryview, planes: List) -> int:
+    signature = 0
+    for bit, plane in enumerate(planes):
+        if sum(v * p for v, p in zip(vector, plane)) >= 0:
+            signature |= 1 << bit
+    return signature
+
+
+class WorkerPool:
+    """Async facade over a process pool for CPU-side pipeline stages."""
+
+    def __init__(self, config: Optional[WorkerConfig] = None):
+        self.config = config or WorkerConfig()
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def processes(self) -> int:
+        return self.config.processes or os.cpu_count() or 1
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            context = multiprocessing.get_context(self.config.start_method)
+            self._executor = ProcessPoolExecutor(max_workers=self.processes, mp_context=context)
+        return self._executor
+
+    async def run(self, fn: Callable, *args):
+        """Run a picklable function in a worker process."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool(), functools.partial(fn, *args))
+
+    def _chunks(self, count: int):
+        size = max(1, self.config.chunk_size)
+        for start in range(0, count, size):
+            yield start, min(size, count - start)
+
+    async def map(self, stage: Callable, items: Sequence, *args) -> List:
+        """Run ``stage(chunk, *args)`` over chunks of items across workers and join the results in order.
+
+        ``stage`` takes a list of items and returns one result per item; jobs
+        under ``inline_threshold`` run in-process.
+        """
+        items = list(items)
+        if len(items) <= self.config.inline_threshold:
+            return list(stage(items, *args))
+        batches = await asyncio.gather(*[
+            self.run(stage, items[start:start + size], *args) for start, size in self._chunks(len(items))
+        ])
+        return [result for batch in batches for result in batch]
+
+    async def estimate_tokens(self, texts: Sequence[str], model: Optional[str] = None) -> List[int]:
+        """Token counts for many texts, spread across workers."""
+        return await self.map(estimate_tokens_stage, texts, model)
+
+    async def vectorise(self, texts: Sequence[str], dim: int = 256) -> SharedArray:
+        """Hashed vectors for texts as a row-major shared matrix (caller closes it)."""
+        texts = list(texts)
+        matrix = SharedArray.create(len(texts) * dim, "f")
+        try:
+            if len(texts) <= self.config.inline_threshold:
+                vectorise_stage(texts, dim, matrix.ref, 0)
+            else:
+                await asyncio.gather(*[
+                    self.run(vectorise_stage, texts[start:start + size], dim, matrix.ref, start)
+                    for start, size in self._chunks(len(texts))
+                ])
+        except BaseException:
+            matrix.close()  # The caller never gets the matrix, so free the block here
+            raise
+        return matrix
+
+    async def build_index(self, vectors: SharedArray, dim: int, bits: int = 16) -> List[int]:
+        """LSH signatures for every row of a shared vector matrix."""
+        rows = vectors.length // dim
+        if not rows:
+            return []
+        if rows <= self.config.inline_threshold:
+            return build_index_stage(vectors.ref, dim, 0, rows, bits)
+        batches = await asyncio.gather(*[
+            self.run(build_index_stage, vectors.ref, dim, start, size, bits)
+            for start, size in self._chunks(rows)
+        ])
+        return [signature for batch in batches for signature in batch]
+
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+
+# Global worker pool instance (processes start on first use)
+worker_pool = WorkerPool(settings.worker_config)
@@ -1,17 +1,26 @@
 #!/usr/bin/env python3
-"""Simple test for the Michelle Pfeiffer agent system."""
+"""Simple test for the Michelle Pfeiffer agent system.
 
+Pass --record to capture the model traffic to a cassette, or --replay to run
+the same flow offline from it (--speed 10 replays ten times faster).
+"""
+
+import argparse
 import sys
 import os
 import asyncio
+import time
 
 # Add the src directory to the path for imports
-sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from agents import Runner
 
-from agent.pfeiffer import michelle_agent, Runner
+from agent.pfeiffer import michelle_agent
+from agent.cassettes import cassette_run_config
 
 
-async def test_handoffs():
+async def test_handoffs(run_config=None):
     """Test that handoffs work correctly."""
     
     print("🎭 Testing Michelle Pfeiffer Agent System")
@@ -19,21 +28,30 @@ async def test_handoffs():
     
     # Test 1: Question about Batman Returns should route to Tim Burton
     print("\n🦇 Test 1: Batman Returns question")
-    result1 = await Runner.run(michelle_agent, "Tell me about Batman Returns and Catwoman")
-    print(f"Response: {result1.final_output[:200]}...")
+    started = time.perf_counter()
+    result1 = await Runner.run(michelle_agent, "Tell me about Batman Returns and Catwoman", run_config=run_config)
+    print(f"Response ({result1.last_agent.name}, {time.perf_counter() - started:.2f}s): {result1.final_output[:200]}...")
     
     # Test 2: Question about Age of Innocence should route to Martin Scorsese  
     print("\n🎬 Test 2: Age of Innocence question")
-    result2 = await Runner.run(michelle_agent, "Tell me about The Age of Innocence")
-    print(f"Response: {result2.final_output[:200]}...")
+    started = time.perf_counter()
+    result2 = await Runner.run(michelle_agent, "Tell me about The Age of Innocence", run_config=run_config)
+    print(f"Response ({result2.last_agent.name}, {time.perf_counter() - started:.2f}s): {result2.final_output[:200]}...")
     
     # Test 3: General acting question should stay with Michelle
     print("\n🎭 Test 3: General acting question")
-    result3 = await Runner.run(michelle_agent, "What's your favorite acting technique?")
-    print(f"Response: {result3.final_output[:200]}...")
+    started = time.perf_counter()
+    result3 = await Runner.run(michelle_agent, "What's your favorite acting technique?", run_config=run_config)
+    print(f"Response ({result3.last_agent.name}, {time.perf_counter() - started:.2f}s): {result3.final_output[:200]}...")
     
     print("\n✅ All tests completed!")
 
 
 if __name__ == "__main__":
-    asyncio.run(test_handoffs()) 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--record", action="store_const", const="record", dest="mode", help="record model traffic")
+    mode.add_argument("--replay", action="store_const", const="replay", dest="mode", help="replay recorded traffic")
+    parser.add_argument("--speed", type=float, help="replay speed-up (0 = no delays)")
+    args = parser.parse_args()
+    asyncio.run(test_handoffs(cassette_run_config("system_handoffs", args.mode, args.speed)))
@@ -0,0 +1,34 @@
+"""
+Shared test fixtures.
+"""
+import sys
+import os
+
+import pytest
+
+# Add the src directory to the path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from agents import RunConfig
+
+from agent.cache import response_cache, routing_cache
+from agent.stub_model import StubModelProvider
+
+
+@pytest.fixture(autouse=True)
+def empty_caches():
+    """Keep answers cached by one test from being served in another."""
+    response_cache.clear()
+    routing_cache.clear()
+    yield
+    response_cache.clear()
+    routing_cache.clear()
+
+
+@pytest.fixture
+def stub_config():
+    """Build a ``RunConfig`` on the local stub model (or on ``provider``); the model is ``.model_provider.model``."""
+    def make(ttft=0.001, answer_tokens=8, provider=None):
+        provider = provider or StubModelProvider(ttft=ttft, token_delay=0.0, answer_tokens=answer_tokens)
+        return RunConfig(model_provider=provider, tracing_disabled=True)
+    return make
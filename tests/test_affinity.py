@@ -0,0 +1,107 @@
+"""
+Test session-level agent affinity and the topic-shift detector.
+"""
+import pytest
+import sys
+import os
+
+# Add the src directory to the path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from agents import RunConfig
+
+from agent.affinity import SessionAffinity, content_words, detect_shift
+from agent.registry import get_agent
+from agent.sessions import session_store
+from agent.settings import AffinityConfig
+from agent.stub_model import StubModelProvider
+from agent.turns import run_turn
+
+VOCABULARIES = {
+    "michelle": frozenset(content_words("Michelle Pfeiffer actress career acting techniques Scarface")),
+    "tim_burton": frozenset(content_words("Tim Burton gothic Catwoman Batman costume design visual")),
+    "martin_scorsese": frozenset(content_words("Martin Scorsese Age of Innocence Olenska Wharton method acting")),
+}
+NAMES = {key: frozenset(content_words(name)) for key, name in [
+    ("michelle", "Michelle Pfeiffer"), ("tim_burton", "Tim Burton"), ("martin_scorsese", "Martin Scorsese"),
+]}
+
+
+def shifts(text, context=frozenset()):
+    return detect_shift(text, "tim_burton", VOCABULARIES, NAMES, set(context))[0]
+
+
+class TestDetectShift:
+    """Test the local topic-shift detector."""
+
+    def test_follow_ups_stay(self):
+        """Test that follow-ups on the current topic stay with the agent."""
+        assert not shifts("And how did you design her costume?")
+        assert not shifts("Why was that?")
+        assert not shifts("Thanks!")
+        assert not shifts("How long did the shoot take?", context={"shoot"})
+
+    def test_other_persona_topic_shifts(self):
+        """Test that another persona's topics go back to triage."""
+        assert shifts("What about The Age of Innocence?")
+        assert shifts("What's your favorite acting technique?")
+
+    def test_asking_for_someone_shifts(self):
+        """Test that asking for another persona by name goes back to triage."""
+        assert shifts("Can I talk to Michelle again?")
+
+    def test_unrelated_question_shifts(self):
+        """Test that a new, unrelated question goes back to triage."""
+        assert shifts("Recommend a good restaurant in Paris")
+
+
+class TestSessionAffinity:
+    """Test that follow-ups skip the triage call."""
+
+    def test_follow_up_goes_straight_to_director(self):
+        """Test a Batman conversation that moves on to The Age of Innocence."""
+        provider = StubModelProvider(ttft=0.001, token_delay=0.0, answer_tokens=4)
+        run_config = RunConfig(model_provider=provider, tracing_disabled=True)
+        model = provider.model
+        michelle = get_agent("michelle")
+        session = session_store.create("michelle", michelle.instructions)
+
+        first = run_turn(michelle, "Tell me about Batman Returns", "michelle", session=session, run_config=run_config)
+        assert first.agent_name == "Tim Burton"
+        assert model.calls == 2
+        assert session_store.instructions.agent_key(session.messages[-1].agent_id) == "tim_burton"
+
+        follow_up = run_turn(michelle, "And how did you design her costume?", "michelle", session=session, run_config=run_config)
+        assert follow_up.agent_name == "Tim Burton"
+        assert follow_up.route == "affinity"
+        assert model.calls == 3  # no triage call
+
+        shifted = run_turn(michelle, "What about The Age of Innocence?", "michelle", session=session, run_config=run_config)
+        assert shifted.route == "shift"
+        assert shifted.agent_name == "Martin Scorsese"
+        assert model.calls == 5
+
+        from agent.affinity import session_affinity
+        stats = session_affinity.sessions[session.session_id]
+        assert (stats.direct, stats.shifts) == (1, 1)
+        assert "1 triage calls saved" in session_affinity.report(session.session_id)
+
+    def test_no_affinity_without_handoff(self):
+        """Test that conversations still with the entry agent are routed as usual."""
+        affinity = SessionAffinity()
+        michelle = get_agent("michelle")
+        session = session_store.create("michelle", michelle.instructions)
+        assert affinity.route(michelle, "michelle", session, "Hello") == (None, None)
+        session.append(0, "Hello")
+        session.append(1, "Hi!", session_store.instructions.intern("michelle"))
+        assert affinity.route(michelle, "michelle", session, "And Batman?") == (None, None)
+        assert affinity.route(get_agent("obama"), "obama", session, "And Batman?") == (None, None)
+
+    def test_disabled(self):
+        """Test that disabled affinity never reroutes."""
+        affinity = SessionAffinity(AffinityConfig(enabled=False))
+        michelle = get_agent("michelle")
+        session = session_store.create("michelle", michelle.instructions)
+        session.append(1, "Catwoman!", session_store.instructions.intern("tim_burton"))
+        assert affinity.route(michelle, "michelle", session, "And her costume?") == (None, None)
+        assert SessionAffinity().route(michelle, "michelle", session, "And her costume?")[1] == "affinity"
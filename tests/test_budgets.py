@@ -0,0 +1,120 @@
+"""
+Test adaptive response budgets.
+"""
+import pytest
+import sys
+import os
+
+# Add the src directory to the path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from agents import ModelSettings, RunConfig
+
+from agent.budgets import ResponseBudgets, classify_query
+from agent.settings import ResponseBudgetConfig
+from agent.stub_model import StubModel, StubModelProvider
+from agent.turns import run_turn
+
+
+class CapturingModel(StubModel):
+    """Stub model that remembers the instructions and settings of each call."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.seen = []
+
+    async def stream_response(self, system_instructions, input, model_settings, *args, **kwargs):
+        self.seen.append((system_instructions, model_settings))
+        async for event in super().stream_response(system_instructions, input, model_settings, *args, **kwargs):
+            yield event
+
+
+def capturing_run_config():
+    provider = StubModelProvider(ttft=0.001, token_delay=0.0, answer_tokens=4)
+    provider.model = CapturingModel(ttft=0.001, token_delay=0.0, answer_tokens=4)
+    return RunConfig(model_provider=provider, tracing_disabled=True), provider.model
+
+
+class TestClassifier:
+    """Test the local query classifier."""
+
+    @pytest.mark.parametrize("query, tier", [
+        ("What year was Batman Returns?", "short"),
+        ("Who directed The Age of Innocence?", "short"),
+        ("Walk me through developing Ellen Olenska", "long"),
+        ("Write a roses are red, violets are blue, poem.", "long"),
+        ("Tell me about Batman Returns", "medium"),
+        ("What's your favorite acting technique?", "medium"),
+    ])
+    def test_tiers(self, query, tier):
+        """Test that factual questions get short budgets and walkthroughs long ones."""
+        assert classify_query(query)[0] == tier
+
+    def test_features_reported(self):
+        """Test that the features behind a choice are returned."""
+        _, features = classify_query("Briefly, how many films did you make with Tim Burton?")
+        assert features["cues"] == ["briefly", "how many"]
+        assert features["score"] <= -2
+
+
+class TestResponseBudgets:
+    """Test planning and applying budgets."""
+
+    def test_agent_limits_and_global_cap(self):
+        """Test per-agent minimum tiers and the model.max_tokens ceiling."""
+        budgets = ResponseBudgets(ResponseBudgetConfig(agents={"creative": {"min_tier": "medium"}}), max_tokens=500)
+        assert budgets.plan("michelle", "What year was Batman Returns?").tier == "short"
+        budget = budgets.plan("creative", "What year was Batman Returns?")
+        assert budget.tier == "medium"
+        assert budget.max_tokens == 500
+
+    def test_disabled(self):
+        """Test that disabled budgets leave the run untouched."""
+        budgets = ResponseBudgets(ResponseBudgetConfig(enabled=False))
+        assert budgets.plan("michelle", "Hi") is None
+        assert budgets.apply(None, {"max_turns": 3}) == {"max_turns": 3}
+
+    def test_apply_keeps_existing_settings(self):
+        """Test that the budget is merged into an existing run config."""
+        budgets = ResponseBudgets()
+        base = RunConfig(model_settings=ModelSettings(top_p=0.9), workflow_name="test")
+        kwargs = budgets.apply(budgets.plan("michelle", "How old were you in Scarface?"), {"run_config": base})
+        settings = kwargs["run_config"].model_settings
+        assert settings.max_tokens == 150
+        assert settings.top_p == 0.9
+        assert kwargs["run_config"].workflow_name == "test"
+
+    def test_suffix_reaches_handoff_target(self):
+        """Test that every agent in the run sees the tier's settings and suffix."""
+        from agent.pfeiffer import michelle_agent
+
+        run_config, model = capturing_run_config()
+        result = run_turn(michelle_agent, "When was Batman Returns released, briefly?", "michelle", run_config=run_config)
+
+        assert result.agent_name == "Tim Burton"
+        assert result.tier == "short"
+        assert len(model.seen) == 2
+        for instructions, model_settings in model.seen:
+            assert instructions.endswith("this is a quick factual question.")
+            assert model_settings.max_tokens == 150
+
+    def test_stats_per_tier(self):
+        """Test that latency and output tokens are tracked per tier."""
+        budgets = ResponseBudgets()
+        short = budgets.plan("obama", "Who was your chief of staff?")
+        long = budgets.plan("obama", "Walk me through the Let's Move campaign in detail")
+        budgets.record(short, 1.0, 40)
+        budgets.record(short, 2.0, 60)
+        budgets.record(long, 9.0, 800)
+
+        stats = budgets.stats()
+        assert stats["short"]["count"] == 2
+        assert stats["short"]["p50"] == 1.5
+        assert stats["short"]["mean_output_tokens"] == 50
+        assert stats["long"]["mean_output_tokens"] == 800
+        assert "medium" not in stats
+
+        report = budgets.report()
+        assert "3 turns" in report
+        assert "short   2 turns" in report
+        assert "medium" not in report
@@ -0,0 +1,219 @@
+"""
+Test recording model traffic to cassettes and replaying it offline.
+"""
+import asyncio
+import time
+import pytest
+import sys
+import os
+
+# Add the src directory to the path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from agents import Agent, Runner, RunConfig
+from agents.items import ModelResponse
+from agents.models.interface import Model, ModelProvider
+from agents.usage import Usage
+from openai.types.responses import (
+    Response,
+    ResponseCompletedEvent,
+    ResponseCreatedEvent,
+    ResponseFunctionToolCall,
+    ResponseOutputMessage,
+    ResponseOutputText,
+    ResponseTextDeltaEvent,
+)
+
+from agent.settings import CassetteConfig
+from agent.cassettes import (
+    Cassette,
+    CassetteMiss,
+    RecordingModelProvider,
+    ReplayModelProvider,
+    cassette_run_config,
+    normalise,
+    prompt_text,
+)
+
+
+def message(text):
+    return ResponseOutputMessage(
+        id="msg", type="message", role="assistant", status="completed",
+        content=[ResponseOutputText(text=text, type="output_text", annotations=[])],
+    )
+
+
+class ScriptedModel(Model):
+    """Hands Batman questions to the first handoff and answers everything else."""
+
+    calls = 0
+
+    def _output(self, system_instructions, input, handoffs):
+        ScriptedModel.calls += 1
+        if handoffs and "batman" in prompt_text(input).lower():
+            return [ResponseFunctionToolCall(
+                id="call", call_id="call", type="function_call", name=handoffs[0].tool_name, arguments="{}",
+            )]
+        return [message(f"{system_instructions} says hello")]
+
+    async def get_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, **kwargs):
+        await asyncio.sleep(0.05)
+        output = self._output(system_instructions, input, handoffs)
+        return ModelResponse(output=output, usage=Usage(requests=1, input_tokens=10, output_tokens=5, total_tokens=15), response_id=None)
+
+    async def stream_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, **kwargs):
+        output = self._output(system_instructions, input, handoffs)
+        response = Response(
+            id="resp", created_at=time.time(), model="scripted", object="response", output=output,
+            tool_choice="auto", tools=[], parallel_tool_calls=False,
+        )
+        yield ResponseCreatedEvent(type="response.created", response=response, sequence_number=0)
+        for i, piece in enumerate(["hel", "lo"]):
+            await asyncio.sleep(0.05)
+            yield ResponseTextDeltaEvent(
+                type="response.output_text.delta", delta=piece, item_id="msg",
+                output_index=0, content_index=0, sequence_number=i + 1, logprobs=[],
+            )
+        yield ResponseCompletedEvent(type="response.completed", response=response, sequence_number=3)
+
+
+class ScriptedProvider(ModelProvider):
+    def get_model(self, model_name):
+        return ScriptedModel()
+
+
+def make_agents():
+    tim = Agent(name="Tim Burton", instructions="Tim")
+    michelle = Agent(name="Michelle Pfeiffer", instructions="Michelle", handoffs=[tim])
+    return michelle
+
+
+def record(path):
+    cassette = Cassette.record(path)
+    return cassette, RunConfig(model_provider=RecordingModelProvider(cassette, ScriptedProvider()), tracing_disabled=True)
+
+
+def replay(path, speed=0.0):
+    cassette = Cassette.load(path)
+    return cassette, RunConfig(model_provider=ReplayModelProvider(cassette, speed=speed), tracing_disabled=True)
+
+
+class TestRecordReplay:
+    """Test that recorded flows replay offline."""
+
+    def test_handoff_flow_replays_without_model(self, tmp_path):
+        """Test that a recorded handoff replays to the same agent and answer."""
+        path = str(tmp_path / "flow.cassette")
+        _, recording = record(path)
+        recorded = Runner.run_sync(make_agents(), "Tell me about Batman Returns", run_config=recording)
+        assert recorded.last_agent.name == "Tim Burton"
+
+        calls = ScriptedModel.calls
+        cassette, replaying = replay(path)
+        replayed = Runner.run_sync(make_agents(), "Tell me about Batman Returns", run_config=replaying)
+
+        assert ScriptedModel.calls == calls
+        assert replayed.last_agent.name == "Tim Burton"
+        assert replayed.final_output == recorded.final_output
+        assert cassette.stats()["hits"] == 2
+
+    def test_stream_replays_chunks_with_timing(self, tmp_path):
+        """Test that stream chunks replay at recorded pace, or faster on request."""
+        path = str(tmp_path / "stream.cassette")
+        _, recording = record(path)
+
+        async def stream(run_config):
+            started = time.perf_counter()
+            result = Runner.run_streamed(make_agents(), "What's your favorite role?", run_config=run_config)
+            deltas = [
+                event.data.delta async for event in result.stream_events()
+                if event.type == "raw_response_event" and event.data.type == "response.output_text.delta"
+            ]
+            return deltas, time.perf_counter() - started
+
+        recorded_deltas, recorded_time = asyncio.run(stream(recording))
+        real_deltas, real_time = asyncio.run(stream(replay(path, speed=1.0)[1]))
+        fast_deltas, fast_time = asyncio.run(stream(replay(path, speed=10.0)[1]))
+
+        assert recorded_deltas == real_deltas == fast_deltas == ["hel", "lo"]
+        assert real_time >= 0.09
+        assert fast_time < real_time / 3
+
+    def test_replays_unstreamed_recording_as_stream(self, tmp_path):
+        """Test that a call recorded without streaming can be replayed streamed."""
+        path = str(tmp_path / "mixed.cassette")
+        _, recording = record(path)
+        Runner.run_sync(make_agents(), "Say hi", run_config=recording)
+
+        async def stream():
+            result = Runner.run_streamed(make_agents(), "Say hi", run_config=replay(path)[1])
+            async for _ in result.stream_events():
+                pass
+            return result.final_output
+
+        assert asyncio.run(stream()) == "Michelle says hello"
+
+
+class TestMatching:
+    """Test how requests are matched to recordings."""
+
+    def test_insignificant_differences_match_exactly(self, tmp_path):
+        """Test that case and whitespace changes still hit the recording."""
+        path = str(tmp_path / "match.cassette")
+        _, recording = record(path)
+        Runner.run_sync(make_agents(), "Say hi to everyone", run_config=recording)
+
+        cassette, replaying = replay(path)
+        result = Runner.run_sync(make_agents(), "  say HI to   everyone ", run_config=replaying)
+
+        assert result.final_output == "Michelle says hello"
+        assert cassette.stats()["hits"] == 1
+
+    def test_similar_prompt_falls_back_and_unrelated_misses(self, tmp_path):
+        """Test the similarity fallback and its threshold."""
+        path = str(tmp_path / "fuzzy.cassette")
+        _, recording = record(path)
+        Runner.run_sync(make_agents(), "Please say hi to everyone in the room today", run_config=recording)
+
+        cassette, replaying = replay(path)
+        result = Runner.run_sync(make_agents(), "Please say hi to everyone in the room today!", run_config=replaying)
+        assert result.final_output == "Michelle says hello"
+        assert cassette.stats()["fuzzy_hits"] == 1
+
+        with pytest.raises(CassetteMiss):
+            Runner.run_sync(make_agents(), "Explain the plot of Scarface", run_config=replaying)
+
+    def test_different_agent_does_not_match(self, tmp_path):
+        """Test that recordings are scoped to the agent that made them."""
+        path = str(tmp_path / "scoped.cassette")
+        _, recording = record(path)
+        Runner.run_sync(make_agents(), "Say hi", run_config=recording)
+
+        with pytest.raises(CassetteMiss):
+            Runner.run_sync(Agent(name="Other", instructions="Other"), "Say hi", run_config=replay(path)[1])
+
+    def test_normalise(self):
+        """Test prompt normalisation."""
+        assert normalise("  Hello,\n  WORLD ") == "hello , world"
+        assert prompt_text([{"role": "user", "content": "Hi"}]) == "user: Hi"
+
+
+class TestRunConfig:
+    """Test selecting the cassette mode."""
+
+    def test_off_returns_default_config(self, tmp_path, monkeypatch):
+        """Test that no run config is built when cassettes are off."""
+        monkeypatch.delenv("AGENT_CASSETTES", raising=False)
+        assert cassette_run_config("flow", config=CassetteConfig(directory=str(tmp_path))) is None
+
+    def test_environment_overrides_mode(self, tmp_path, monkeypatch):
+        """Test that AGENT_CASSETTES switches a run to recording."""
+        monkeypatch.setenv("AGENT_CASSETTES", "record")
+        run_config = cassette_run_config("flow", config=CassetteConfig(directory=str(tmp_path)))
+        assert isinstance(run_config.model_provider, RecordingModelProvider)
+        assert (tmp_path / "flow.cassette").exists()
+
+    def test_unknown_mode_rejected(self, tmp_path):
+        """Test that a typo in the mode is an error."""
+        with pytest.raises(ValueError):
+            cassette_run_config("flow", mode="rewind", config=CassetteConfig(directory=str(tmp_path)))
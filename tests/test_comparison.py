@@ -0,0 +1,147 @@
+"""
+Test the model latency/quality comparison harness.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import pytest
+
+# Add the src directory to the path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from agent.cassettes import Cassette, RecordingModelProvider, cassette_path
+from agent.comparison import ComparisonRun, ModelComparison, format_report, recommend, summarise
+from agent.settings import CassetteConfig, ComparisonConfig, ModelPrice
+from agent.stub_model import StubModelProvider
+
+
+class NamedStubProvider(StubModelProvider):
+    """Stub provider that remembers which model names were asked for."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.names = []
+
+    def get_model(self, model_name):
+        self.names.append(model_name)
+        return super().get_model(model_name)
+
+
+def suite_config(**overrides):
+    config = {
+        "concurrency": 4,
+        "variants": [
+            {"name": "big", "model": "big-model", "temperature": 0.2},
+            {"name": "small", "model": "small-model", "max_tokens": 200},
+        ],
+        "suites": {
+            "michelle": [
+                {"prompt": "Tell me about Batman Returns", "expect": "tim_burton"},
+                {"prompt": "What about The Age of Innocence?", "expect": "martin_scorsese"},
+                {"prompt": "How do you approach a new role?", "expect": "michelle"},
+            ],
+            "obama": [{"prompt": "What is her book Becoming about?"}],
+        },
+    }
+    config.update(overrides)
+    return ComparisonConfig(**config)
+
+
+class TestModelComparison:
+    """Test running the suites on every variant."""
+
+    def test_runs_every_variant_and_checks_handoffs(self, stub_config):
+        """Test that each variant runs each suite on its own model and that handoffs are graded."""
+        provider = NamedStubProvider(ttft=0.001, token_delay=0.0, answer_tokens=8)
+        comparison = ModelComparison(suite_config(), run_config=stub_config(provider=provider))
+        runs = comparison.run()
+        assert len(runs) == 8
+        assert all(run.error is None for run in runs)
+        assert {"big-model", "small-model"} <= set(provider.names)
+        michelle = [run for run in runs if run.agent_key == "michelle"]
+        assert all(run.correct for run in michelle)
+        assert {run.answered_by for run in michelle} == {"tim_burton", "martin_scorsese", "michelle"}
+        assert [run.correct for run in runs if run.agent_key == "obama"] == [None, None]
+        assert comparison.run_config(comparison.variants[0]).model_settings.temperature == 0.2
+        assert comparison.run_config(comparison.variants[1]).model_settings.max_tokens == 200
+
+    def test_runs_concurrently(self, stub_config):
+        """Test that up to `concurrency` runs are in flight at once."""
+        config = suite_config(variants=[{"name": "big", "model": "big-model"}], repeats=2)
+        serial = ModelComparison(config.model_copy(update={"concurrency": 1}), run_config=stub_config(ttft=0.05))
+        started = time.perf_counter()
+        serial.run()
+        serial_elapsed = time.perf_counter() - started
+
+        concurrent = ModelComparison(config.model_copy(update={"concurrency": 8}), run_config=stub_config(ttft=0.05))
+        started = time.perf_counter()
+        runs = concurrent.run()
+        assert len(runs) == 8
+        assert time.perf_counter() - started < serial_elapsed / 2
+
+    def test_selection(self):
+        """Test choosing agents and variants, and rejecting unknown ones."""
+        comparison = ModelComparison(suite_config(), agents=["obama"], variants=["small"])
+        assert [(job.agent_key, job.variant) for job in comparison.jobs()] == [("obama", "small")]
+        with pytest.raises(ValueError):
+            ModelComparison(suite_config(), variants=["huge"])
+        with pytest.raises(ValueError):
+            ModelComparison(suite_config(), agents=["nobody"])
+
+    def test_replay_offline(self, stub_config):
+        """Test that a recorded comparison replays from its per-variant cassettes."""
+        directory = tempfile.mkdtemp(prefix="comparison")
+        try:
+            cassettes = CassetteConfig(directory=directory)
+            config = suite_config(variants=[{"name": "small", "model": "small-model"}])
+            cassette = Cassette.record(cassette_path("comparison-small", cassettes))
+            recording = RecordingModelProvider(cassette, StubModelProvider(ttft=0.001, token_delay=0.0, answer_tokens=8))
+            recorded = ModelComparison(config, run_config=stub_config(provider=recording)).run()
+
+            replayed = ModelComparison(config, mode="replay", speed=0, cassettes=cassettes).run()
+            assert all(run.error is None for run in replayed)
+            assert [run.answered_by for run in replayed] == [run.answered_by for run in recorded]
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+class TestComparisonReport:
+    """Test the per-agent metrics and the suggestion."""
+
+    def runs(self):
+        def run(variant, model, elapsed, answered_by="tim_burton", error=None):
+            return ComparisonRun("michelle", variant, model, "Batman?", "tim_burton", elapsed=elapsed, ttft=0.5,
+                                 input_tokens=1000, output_tokens=100, answered_by=answered_by, error=error)
+
+        return [
+            run("big", "big-model", 2.5),
+            run("big", "big-model", 1.5),
+            run("small", "small-model", 1.0),
+            run("small", "small-model", 0.75, answered_by="michelle"),
+            run("tiny", "tiny-model", 0.5),
+            run("tiny", "tiny-model", 0.5, error="RuntimeError: boom"),
+        ]
+
+    def test_summarise(self):
+        """Test latency percentiles, tokens/s, handoff correctness and cost."""
+        prices = {"big-model": ModelPrice(input=2.0, output=10.0)}
+        summary = summarise(self.runs(), prices)["michelle"]
+        assert summary["big"]["p50"] == 2.0
+        assert summary["big"]["ttft_p50"] == 0.5
+        assert summary["big"]["tokens_per_s"] == pytest.approx(200 / 3.0)
+        assert summary["big"]["handoff_correct"] == 1.0
+        assert summary["big"]["cost_per_turn"] == pytest.approx((1000 * 2.0 + 100 * 10.0) / 1e6)
+        assert summary["small"]["handoff_correct"] == 0.5
+        assert summary["small"]["cost"] is None
+        assert summary["tiny"]["errors"] == 1
+
+    def test_recommend(self):
+        """Test that the fastest error-free variant among the most correct ones is suggested."""
+        summary = summarise(self.runs(), {})
+        assert recommend(summary) == {"michelle": "big"}
+        report = format_report(summary)
+        assert "suggested: big" in report
+        assert "n/a" in report
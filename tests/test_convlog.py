@@ -0,0 +1,250 @@
+"""
+Test the durable conversation log and resuming sessions from it.
+"""
+import multiprocessing
+import pytest
+import sys
+import os
+from unittest.mock import patch
+
+# Add the src directory to the path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from agent.settings import ConversationLogConfig, SessionConfig
+from agent.cli import parse_args
+from agent import convlog
+from agent.convlog import ConversationLog, start_session
+from agent.sessions import SessionStore, ROLE_ASSISTANT, ROLE_USER
+
+
+def make_log(tmp_path, **overrides):
+    return ConversationLog(ConversationLogConfig(path=str(tmp_path / "log"), **overrides))
+
+
+def make_store(tmp_path):
+    return SessionStore(SessionConfig(spill_dir=str(tmp_path / "spill")))
+
+
+class TestConversationLog:
+    """Test appending to and reading from the log."""
+
+    def test_recent_returns_session_messages_in_order(self, tmp_path):
+        """Test that interleaved sessions are read back separately, oldest first."""
+        log = make_log(tmp_path)
+        for i in range(3):
+            log.append_exchange("a", f"question {i}", f"answer {i}", "Michelle Pfeiffer")
+            log.append_exchange("b", f"other {i}", f"reply {i}", "Tim Burton")
+
+        records = log.recent("a", 4)
+        assert [r.text for r in records] == ["question 1", "answer 1", "question 2", "answer 2"]
+        assert [r.role for r in records] == [ROLE_USER, ROLE_ASSISTANT, ROLE_USER, ROLE_ASSISTANT]
+        assert records[-1].agent_name == "Michelle Pfeiffer"
+        assert log.recent("b", 1)[0].text == "reply 2"
+        assert log.recent("missing", 4) == []
+        log.close()
+
+    def test_reopen_after_close(self, tmp_path):
+        """Test that the compacted index survives a restart."""
+        log = make_log(tmp_path)
+        log.append_exchange("a", "hello", "hi there", "Creative Assistant")
+        log.close()
+
+        reopened = make_log(tmp_path)
+        assert reopened.has_session("a")
+        assert [r.text for r in reopened.recent("a", 10)] == ["hello", "hi there"]
+        reopened.append("a", ROLE_USER, "still there?")
+        assert reopened.recent("a", 1)[0].text == "still there?"
+        reopened.close()
+
+    def test_records_span_segments(self, tmp_path):
+        """Test that a session is followed back across rolled segments."""
+        log = make_log(tmp_path, segment_bytes=128)
+        for i in range(20):
+            log.append("a", ROLE_USER, f"message number {i}")
+        assert len(os.listdir(tmp_path / "log")) > 3
+
+        assert [r.text for r in log.recent("a", 20)] == [f"message number {i}" for i in range(20)]
+        log.close()
+
+    def test_recovers_unindexed_records_and_drops_torn_tail(self, tmp_path):
+        """Test crash recovery when the index lags the segment."""
+        log = make_log(tmp_path)
+        log.append("a", ROLE_USER, "first")
+        log.append("a", ROLE_ASSISTANT, "second", "Michelle Pfeiffer")
+        log._active_file.close()
+        log._index_file.close()
+
+        # Lose the last index entry and leave half a record behind
+        index_path = tmp_path / "log" / "index.bin"
+        index_path.write_bytes(index_path.read_bytes()[:28])
+        with open(tmp_path / "log" / "segment-00000001.log", "ab") as f:
+            f.write(b"\x01\x02\x03")
+
+        recovered = make_log(tmp_path)
+        assert [r.text for r in recovered.recent("a", 10)] == ["first", "second"]
+        recovered.append("a", ROLE_USER, "third")
+        assert [r.text for r in recovered.recent("a", 10)] == ["first", "second", "third"]
+        recovered.close()
+
+
+class TestIndexCompaction:
+    """Test that the index stays proportional to the number of sessions."""
+
+    def index_entries(self, tmp_path):
+        return os.path.getsize(tmp_path / "log" / "index.bin") // convlog._INDEX_ENTRY.size
+
+    @patch('agent.convlog._COMPACT_MIN_ENTRIES', 8)
+    def test_compacted_while_appending(self, tmp_path):
+        """Test that a long-running log rewrites its index instead of growing it per message."""
+        log = make_log(tmp_path)
+        for i in range(100):
+            log.append_exchange(f"session-{i % 3}", f"question {i}", f"answer {i}", "Michelle Pfeiffer")
+        assert self.index_entries(tmp_path) <= 8
+        assert log.recent("session-1", 1)[0].text == "answer 97"
+
+    @patch('agent.convlog._COMPACT_MIN_ENTRIES', 8)
+    def test_compacted_on_open_after_unclean_exit(self, tmp_path):
+        """Test that opening a log left without close() compacts its index."""
+        log = make_log(tmp_path)
+        for i in range(6):
+            log.append("a", ROLE_USER, f"message {i}")
+        log._active_file.close()
+        log._index_file.close()
+        log._active_file = None  # As if the process died here
+        assert self.index_entries(tmp_path) == 6
+        with patch('agent.convlog._COMPACT_MIN_ENTRIES', 4):
+            reopened = make_log(tmp_path).open()
+        assert self.index_entries(tmp_path) == 1
+        assert [r.text for r in reopened.recent("a", 2)] == ["message 4", "message 5"]
+        reopened.close()
+
+    def test_open_logs_closed_at_exit(self, tmp_path):
+        """Test that the exit hook closes and compacts logs nobody closed."""
+        log = make_log(tmp_path)
+        for i in range(5):
+            log.append("a", ROLE_USER, f"message {i}")
+        convlog._close_open_logs()
+        assert log._active_file is None
+        assert self.index_entries(tmp_path) == 1
+
+
+def append_from_process(path, session_id, count):
+    log = ConversationLog(ConversationLogConfig(path=path, segment_bytes=256))
+    for i in range(count):
+        log.append(session_id, ROLE_USER, f"{session_id} message {i}")
+    log.close()
+
+
+class TestSharedLog:
+    """Test several processes appending to one log directory."""
+
+    @patch('agent.convlog._COMPACT_MIN_ENTRIES', 8)
+    def test_compaction_keeps_other_writers_sessions(self, tmp_path):
+        """Test that compacting in one writer neither drops nor loses another writer's entries."""
+        first, second = make_log(tmp_path), make_log(tmp_path)
+        for i in range(20):
+            first.append("a", ROLE_USER, f"a {i}")
+            second.append("b", ROLE_USER, f"b {i}")
+        first.close()
+        second.close()
+
+        reopened = make_log(tmp_path)
+        assert [r.text for r in reopened.recent("a", 2)] == ["a 18", "a 19"]
+        assert [r.text for r in reopened.recent("b", 2)] == ["b 18", "b 19"]
+        reopened.close()
+
+    def test_concurrent_processes_do_not_interleave_records(self, tmp_path):
+        """Test that appends and segment rolls from several processes stay intact."""
+        ctx = multiprocessing.get_context("fork")
+        path = str(tmp_path / "log")
+        workers = [ctx.Process(target=append_from_process, args=(path, f"s{n}", 50)) for n in range(3)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(timeout=30)
+            assert worker.exitcode == 0
+
+        log = make_log(tmp_path)
+        for n in range(3):
+            assert [r.text for r in log.recent(f"s{n}", 50)] == [f"s{n} message {i}" for i in range(50)]
+        log.close()
+
+
+class TestResume:
+    """Test restoring sessions into the session store."""
+
+    def test_restore_rebuilds_recent_context_window(self, tmp_path):
+        """Test that only the configured number of messages is restored."""
+        log = make_log(tmp_path, resume_messages=4)
+        for i in range(10):
+            log.append_exchange("abc", f"q{i}", f"a{i}", "Tim Burton")
+        store = make_store(tmp_path)
+
+        session, resumed = start_session("michelle", "instructions", "abc", store=store, log=log)
+
+        assert resumed
+        assert session.session_id == "abc"
+        assert session.input_items() == [
+            {"role": "user", "content": "q8"},
+            {"role": "assistant", "content": "a8"},
+            {"role": "user", "content": "q9"},
+            {"role": "assistant", "content": "a9"},
+        ]
+        assert store.instructions.agent_key(session.messages[-1].agent_id) == "tim_burton"
+        log.close()
+
+    def test_unknown_session_starts_fresh_and_is_followed(self, tmp_path):
+        """Test that resuming an unknown id starts a new logged session."""
+        log = make_log(tmp_path)
+        store = make_store(tmp_path)
+
+        session, resumed = start_session("obama", "instructions", "nope", store=store, log=log)
+
+        assert not resumed
+        assert session.session_id != "nope"
+        log.record_turn(session.session_id, "hello", "hi", "Michelle Obama Knowledge Assistant")
+        log.record_turn("not-followed", "hello", "hi", "Michelle Obama Knowledge Assistant")
+        assert len(log.recent(session.session_id, 10)) == 2
+        assert not log.has_session("not-followed")
+        log.close()
+
+    def test_disabled_log_does_not_record(self, tmp_path):
+        """Test that turns are not logged when the log is disabled."""
+        log = make_log(tmp_path, enabled=False)
+        session, _ = start_session("creative", "", store=make_store(tmp_path), log=log)
+        log.record_turn(session.session_id, "hello", "hi", "Creative Assistant")
+        assert not (tmp_path / "log").exists()
+
+
+class TestResumeFlag:
+    """Test the shared command-line options."""
+
+    def test_resume_implies_interactive(self):
+        """Test that --resume turns on interactive mode."""
+        args = parse_args("test", ["--resume", "abc123"])
+        assert args.interactive
+        assert args.resume == "abc123"
+
+    def test_defaults(self):
+        """Test that no flags means a single non-interactive run."""
+        args = parse_args("test", [])
+        assert not args.interactive
+        assert args.resume is None
+
+    @patch('builtins.input', side_effect=['exit'])
+    @patch('sys.stdout')
+    def test_interactive_mode_resumes_session(self, mock_stdout, mock_input, tmp_path):
+        """Test that interactive mode restores the logged session."""
+        from agent.obama import interactive_mode
+
+        log = make_log(tmp_path)
+        log.append_exchange("resume-me", "Who is Michelle Obama?", "A former First Lady.", "Michelle Obama Knowledge Assistant")
+        store = make_store(tmp_path)
+
+        with patch('agent.convlog.conversation_log', log), patch('agent.convlog.session_store', store):
+            interactive_mode(resume="resume-me")
+
+        output = "".join(str(call) for call in mock_stdout.write.call_args_list)
+        assert "Resumed session resume-me" in output
+        assert len(store.get("resume-me")) == 2
+        log.close()
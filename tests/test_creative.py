@@ -0,0 +1,209 @@
+"""
+Test parallel creative candidates and their local ranking.
+"""
+import asyncio
+import contextvars
+import threading
+import time
+import pytest
+import sys
+import os
+
+# Add the src directory to the path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from agents import Agent, RunConfig
+
+from agent.creative import (
+    Candidate, CandidateSet, CreativeCandidates, run_creative_turn, request_kind, is_another_request,
+    score_candidate, rhyme_key, syllables, POEM, STORY,
+)
+from agent.sessions import session_store
+from agent.settings import CandidateConfig, CreativeConfig
+from agent.stub_model import StubModel, StubModelProvider
+
+RHYMING = """Roses are red,
+Violets are blue,
+Sugar is sweet,
+And so are you."""
+
+RHYMING_COUPLETS = """The night was long and cold,
+The story old and bold,
+The moon above the hill,
+Was shining bright and still."""
+
+FLAT = """Roses are red
+violets seem to be generally a kind of purple colour in most gardens I have visited
+sugar
+and this is the end of it all without any sort of pattern or sound"""
+
+_temperature = contextvars.ContextVar("temperature", default=None)
+
+
+class TemperatureModel(StubModel):
+    """Stub model whose answer (and speed) depends on the sampling temperature."""
+
+    def __init__(self, answers, delays=None, **kwargs):
+        super().__init__(ttft=0.001, token_delay=0.0, **kwargs)
+        self.answers = answers
+        self.delays = delays or {}
+        self.temperatures = []
+
+    def _answer(self, system_instructions):
+        return self.answers[_temperature.get()]
+
+    async def stream_response(self, system_instructions, input, model_settings, *args, **kwargs):
+        _temperature.set(model_settings.temperature)
+        self.temperatures.append(model_settings.temperature)
+        await asyncio.sleep(self.delays.get(model_settings.temperature, 0.0))
+        async for event in super().stream_response(system_instructions, input, model_settings, *args, **kwargs):
+            yield event
+
+
+def generator_with(answers, delays=None, rank_wait=1.0, **config):
+    provider = StubModelProvider()
+    provider.model = TemperatureModel(answers, delays)
+    creative = CreativeConfig(candidates=CandidateConfig(
+        temperatures=list(answers), rank_wait=rank_wait, **config
+    ))
+    run_config = RunConfig(model_provider=provider, tracing_disabled=True)
+    return CreativeCandidates(creative), run_config, provider.model
+
+
+class TestHeuristics:
+    """Test the local ranking heuristics."""
+
+    def test_request_kind_honours_flags(self):
+        """Test that disabled kinds of writing are not detected."""
+        config = CreativeConfig()
+        assert request_kind("Write a roses are red, violets are blue, poem.", config) == POEM
+        assert request_kind("Tell me a story about a dragon", config) == STORY
+        assert request_kind("What is a metaphor?", config) is None
+        no_poetry = CreativeConfig(enable_poetry=False)
+        assert request_kind("Write a haiku about rain", no_poetry) is None
+        assert request_kind("Tell me a story", CreativeConfig(enable_storytelling=False)) is None
+
+    def test_another_requests(self):
+        """Test phrases that ask for a different version."""
+        assert is_another_request("give me another")
+        assert is_another_request("Another one please")
+        assert is_another_request("one more")
+        assert not is_another_request("Tell me about another director")
+
+    def test_rhyme_and_syllables(self):
+        """Test the rhyme key and syllable estimates."""
+        assert rhyme_key("blue") == rhyme_key("you")
+        assert rhyme_key("cold") == rhyme_key("bold")
+        assert syllables("sugar") == 2
+        assert syllables("rose") == 1
+
+    def test_rhyming_poem_beats_flat_text(self):
+        """Test that rhyme and regular meter raise a poem's score."""
+        rhyming, checks = score_candidate(RHYMING_COUPLETS, POEM)
+        flat, _ = score_candidate(FLAT, POEM)
+        assert checks["rhyme"] == 1.0
+        assert checks["meter"] > 0.8
+        assert rhyming > flat
+
+    def test_story_structure(self):
+        """Test that paragraphs and dialogue count for stories."""
+        story = 'The door creaked.\n\n"Who is there?" she asked, stepping into the long dark hall.\n\nNobody answered.'
+        score, checks = score_candidate(story, STORY)
+        assert checks["dialogue"] == 1.0
+        assert checks["paragraphs"] == 1.0
+        assert score > score_candidate("it was a story", STORY)[0]
+
+
+class TestCandidates:
+    """Test concurrent generation, ranking and the spare-variant cache."""
+
+    def test_best_first_then_cached(self):
+        """Test that the best variant is served first and the rest need no model call."""
+        generator, run_config, model = generator_with({0.7: FLAT, 0.9: RHYMING_COUPLETS, 1.1: RHYMING})
+        agent = Agent(name="Creative Assistant", instructions="Be creative.")
+        session = session_store.create("creative")
+
+        result = run_creative_turn(agent, "Write a poem", session=session, generator=generator, run_config=run_config)
+        assert result.source == "candidates"
+        assert result.final_output == RHYMING_COUPLETS
+        assert sorted(model.temperatures) == [0.7, 0.9, 1.1]
+
+        calls = model.calls
+        again = run_creative_turn(agent, "give me another", session=session, generator=generator,
+                                  run_config=run_config)
+        assert again.source == "candidate_cache"
+        assert again.final_output == RHYMING
+        assert model.calls == calls
+        assert generator.stats()["served_from_cache"] == 1
+
+    def test_variants_run_concurrently(self):
+        """Test that K variants take about as long as the slowest, not the sum."""
+        delays = {0.7: 0.2, 0.9: 0.2, 1.1: 0.2, 1.3: 0.2}
+        answers = {t: RHYMING for t in delays}
+        generator, run_config, _ = generator_with(answers, delays)
+        started = time.perf_counter()
+        run_creative_turn(Agent(name="Poet", instructions="Poet."), "Write a poem",
+                          session=session_store.create("creative"), generator=generator, run_config=run_config)
+        assert time.perf_counter() - started < 0.6
+
+    def test_concurrency_cap(self):
+        """Test that the cap serialises variants beyond it."""
+        delays = {0.7: 0.15, 0.9: 0.15, 1.1: 0.15}
+        answers = {t: RHYMING for t in delays}
+        generator, run_config, _ = generator_with(answers, delays, max_concurrency=1)
+        started = time.perf_counter()
+        run_creative_turn(Agent(name="Poet", instructions="Poet."), "Write a poem",
+                          session=session_store.create("creative"), generator=generator, run_config=run_config)
+        assert time.perf_counter() - started >= 0.4
+
+    def test_slow_variants_join_cache_later(self):
+        """Test that variants finishing after rank_wait are still cached."""
+        delays = {0.7: 0.0, 0.9: 0.3}
+        generator, run_config, _ = generator_with({0.7: FLAT, 0.9: RHYMING}, delays, rank_wait=0.05)
+        agent = Agent(name="Poet", instructions="Poet.")
+        session = session_store.create("creative")
+
+        first = run_creative_turn(agent, "Write a poem", session=session, generator=generator, run_config=run_config)
+        assert first.final_output == FLAT
+        deadline = time.time() + 2
+        while not generator.cached(session.session_id) and time.time() < deadline:
+            time.sleep(0.01)
+        assert generator.stats()["late"] == 1
+        assert run_creative_turn(agent, "another", session=session, generator=generator).final_output == RHYMING
+
+    def test_candidate_set_shared_across_threads(self):
+        """Test that variants added on one thread and served on another are each served once."""
+        candidates = CandidateSet("Write a poem", POEM)
+
+        def add():
+            for i in range(2000):
+                candidates.add(Candidate(f"variant {i}", "Poet", 0.7, i % 7))
+
+        adder = threading.Thread(target=add)
+        adder.start()
+        served = []
+        while adder.is_alive() or len(candidates):
+            candidate = candidates.next()
+            if candidate is not None:
+                served.append(candidate.text)
+        adder.join()
+        assert sorted(served) == sorted(f"variant {i}" for i in range(2000))
+
+    def test_other_requests_fall_through(self):
+        """Test that non-creative requests are left to a normal turn."""
+        generator, run_config, _ = generator_with({0.7: RHYMING})
+        agent = Agent(name="Poet", instructions="Poet.")
+        session = session_store.create("creative")
+        assert run_creative_turn(agent, "What is a metaphor?", session=session, generator=generator) is None
+        assert run_creative_turn(agent, "give me another", session=session, generator=generator) is None
+        disabled = CreativeCandidates(CreativeConfig(candidates=CandidateConfig(enabled=False)))
+        assert run_creative_turn(agent, "Write a poem", session=session, generator=disabled) is None
+        no_temperatures = CreativeCandidates(CreativeConfig(candidates=CandidateConfig(temperatures=[])))
+        assert run_creative_turn(agent, "Write a poem", session=session, generator=no_temperatures) is None
+
+    def test_one_shot_requests_make_one_call(self):
+        """Test that a request outside a session is left to a single normal turn."""
+        generator, run_config, model = generator_with({0.7: RHYMING, 0.9: RHYMING})
+        agent = Agent(name="Poet", instructions="Poet.")
+        assert run_creative_turn(agent, "Write a poem", generator=generator, run_config=run_config) is None
+        assert model.calls == 0
@@ -0,0 +1,138 @@
+"""
+Test the local agent daemon and its thin client.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+import pytest
+
+# Add the src directory to the path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from agents import RunConfig
+
+from agent.client import AgentClient, DaemonUnavailable, ask, socket_path
+from agent.daemon import AgentDaemon, sample_prompt
+from agent.registry import get_agent
+from agent.settings import settings, DaemonConfig
+from agent.stub_model import StubModelProvider
+
+
+@pytest.fixture
+def daemon():
+    directory = tempfile.mkdtemp(prefix="agentd", dir="/tmp")  # Unix socket paths must be short
+    provider = StubModelProvider(ttft=0.001, token_delay=0.0, answer_tokens=4)
+    daemon = AgentDaemon(
+        DaemonConfig(preload=["obama"]),
+        path=os.path.join(directory, "agentd.sock"),
+        warm=False,
+        run_config=RunConfig(model_provider=provider, tracing_disabled=True),
+    )
+    daemon.model = provider.model
+    thread = daemon.serve_in_thread()
+    yield daemon
+    daemon.stop()
+    thread.join(5)
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+class TestDaemon:
+    """Test serving turns over the Unix socket."""
+
+    def test_ping_and_run(self, daemon):
+        """Test a round trip and a turn served by the daemon."""
+        client = AgentClient(daemon.path)
+        assert client.ping()["pid"] == os.getpid()
+        response = client.run("obama", "Who is Michelle Obama?")
+        assert response["ok"]
+        assert response["agent_name"] == "Michelle Obama Knowledge Assistant"
+        assert client.run("michelle", "Tell me about Batman Returns")["agent_name"] == "Tim Burton"
+        assert client.stats()["requests"] == 2
+        client.close()
+
+    def test_sample_prompt_and_sessions(self, daemon):
+        """Test the default question and a conversation kept by the daemon."""
+        client = AgentClient(daemon.path)
+        assert client.run("obama")["ok"]
+        assert client.run("obama", "Hello", session="s1")["ok"]
+        assert client.run("obama", "And then?", session="s1")["ok"]
+        from agent.sessions import session_store
+        assert len(session_store.get("s1")) == 4
+
+    def test_errors_are_returned(self, daemon):
+        """Test that failures come back as responses, not dropped connections."""
+        client = AgentClient(daemon.path)
+        assert "unknown agent" in client.run("nobody", "Hi")["error"]
+        assert "unknown op" in client.request({"op": "reboot"})["error"]
+        assert "expected a JSON object" in client.request([])["error"]
+        assert "bad request" in client.request("ping")["error"]
+        assert client.ping()["ok"]
+        assert daemon.errors == 1
+
+    def test_scripts_ask_the_daemon(self, daemon, capsys):
+        """Test that the scripts' one-shot examples are answered by a running daemon."""
+        from agent import obama, pfeiffer
+        with patch.dict(os.environ, {"AGENT_DAEMON_SOCKET": daemon.path}):
+            pfeiffer.main()
+            obama.main()
+        out = capsys.readouterr().out
+        assert out.startswith(f"\n{pfeiffer.michelle_config.emoji} ")
+        assert "Michelle Obama Knowledge Assistant\nUsing model:" in out
+        assert daemon.requests == 2
+
+    def test_single_daemon_per_socket(self, daemon):
+        """Test that a second daemon refuses to take over a live socket."""
+        with pytest.raises(RuntimeError, match="already listening"):
+            AgentDaemon(path=daemon.path)._claim_socket()
+
+    def test_shutdown_removes_socket(self, daemon):
+        """Test that shutdown stops serving and cleans up the socket."""
+        AgentClient(daemon.path).shutdown()
+        for _ in range(100):
+            if not os.path.exists(daemon.path):
+                break
+            time.sleep(0.02)
+        assert not os.path.exists(daemon.path)
+        assert not AgentClient(daemon.path).available()
+
+
+class TestClient:
+    """Test the client's socket discovery and in-process fallback."""
+
+    def test_falls_back_in_process(self):
+        """Test that requests run in-process when no daemon is up."""
+        client = AgentClient("/tmp/no-such-agentd.sock")
+        with pytest.raises(DaemonUnavailable):
+            client.ping()
+        with patch('agent.daemon.execute', return_value={"ok": True, "final_output": "local"}) as execute:
+            assert ask("obama", "Hi", client=client)["final_output"] == "local"
+        execute.assert_called_once()
+
+    def test_socket_path(self):
+        """Test the environment override of the socket path."""
+        with patch.dict(os.environ, {"AGENT_DAEMON_SOCKET": "/tmp/custom.sock"}):
+            assert socket_path() == "/tmp/custom.sock"
+            assert AgentDaemon(warm=False).path == AgentClient().path == "/tmp/custom.sock"
+        with patch.dict(os.environ, {}, clear=True):
+            assert socket_path().endswith(f"agents-michelle-{os.getuid()}.sock")
+
+
+class TestPersonaAgents:
+    """Test agents built straight from the persona catalogue."""
+
+    def test_spanish_agent(self):
+        """Test that spanish_agent has its own persona instead of the default."""
+        agent = get_agent("spanish_agent")
+        assert agent.name == "Asistente en Español"
+        assert "español" in agent.instructions
+        assert sample_prompt("spanish_agent").startswith("¿")
+        assert sample_prompt("creative") == settings.creative_config.default_task
+
+    def test_unknown_persona_warns(self):
+        """Test that falling back to the default config is no longer silent."""
+        with pytest.warns(UserWarning, match="no persona 'spanish'"):
+            assert settings.get_agent_config("spanish").name == "Default Agent"
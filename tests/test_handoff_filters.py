@@ -0,0 +1,121 @@
+"""
+Test the per-edge handoff input filters.
+"""
+import pytest
+import sys
+import os
+from unittest.mock import patch
+
+# Add the src directory to the path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from agents import RunConfig
+from agents.handoffs import HandoffInputData
+
+from agent.handoff_filters import HandoffFilters, drop_tools, input_tokens, last_turns, summary_only
+from agent.handoff_graph import HandoffGraphError
+from agent.registry import get_agent
+from agent.settings import HandoffFilterConfig
+from agent.sessions import session_store
+from agent.stub_model import StubModel, StubModelProvider
+from agent.turns import run_turn
+
+
+def conversation(exchanges):
+    history = []
+    for i in range(exchanges):
+        history.append({"role": "user", "content": f"Question {i} about the films you made together?"})
+        history.append({"role": "assistant", "content": f"Answer {i}. It was a wonderful time on set with everyone."})
+    history.append({"role": "user", "content": "Tell me about Batman Returns"})
+    history.append({"type": "function_call", "call_id": "c1", "name": "lookup", "arguments": "{}"})
+    history.append({"type": "function_call_output", "call_id": "c1", "output": "lookup result " * 20})
+    return HandoffInputData(input_history=tuple(history), pre_handoff_items=(), new_items=())
+
+
+class CapturingModel(StubModel):
+    """Stub model that remembers the input of each call."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.seen = []
+
+    async def stream_response(self, system_instructions, input, *args, **kwargs):
+        self.seen.append((system_instructions, input))
+        async for event in super().stream_response(system_instructions, input, *args, **kwargs):
+            yield event
+
+
+class TestFilters:
+    """Test each filter on a recorded conversation."""
+
+    def test_drop_tools(self):
+        """Test that tool calls and outputs are dropped."""
+        data = drop_tools(conversation(2), HandoffFilterConfig())
+        assert all("type" not in item or item["type"] == "message" for item in data.input_history)
+        assert input_tokens(data) < input_tokens(conversation(2))
+
+    def test_last_turns(self):
+        """Test that only the last N user messages and what follows are kept."""
+        data = last_turns(conversation(5), HandoffFilterConfig(last_turns=2))
+        assert data.input_history[0]["content"].startswith("Question 4")
+        assert last_turns(conversation(1), HandoffFilterConfig(last_turns=2)) == conversation(1)
+
+    def test_summary_only(self):
+        """Test that the history becomes a summary plus the latest question."""
+        data = summary_only(conversation(5), HandoffFilterConfig())
+        assert len(data.input_history) == 2
+        assert "- Asked: Question 0" in data.input_history[0]["content"]
+        assert "- Answered: Answer 0" in data.input_history[0]["content"]
+        assert data.input_history[1]["content"] == "Tell me about Batman Returns"
+        assert data.input_items == ()
+        short = summary_only(conversation(50), HandoffFilterConfig(summary_chars=100))
+        assert len(short.input_history[0]["content"]) < 150
+
+
+class TestHandoffFilters:
+    """Test the per-edge filter chains during real handoffs."""
+
+    def test_edge_chain_applied_and_counted(self, capsys):
+        """Test that Tim receives the trimmed conversation and tokens are counted."""
+        provider = StubModelProvider(ttft=0.001, token_delay=0.0, answer_tokens=30)
+        provider.model = model = CapturingModel(ttft=0.001, token_delay=0.0, answer_tokens=30)
+        run_config = RunConfig(model_provider=provider, tracing_disabled=True)
+        filters = HandoffFilters(HandoffFilterConfig(last_turns=1, edges={"michelle->tim_burton": ["drop_tools", "last_turns"]}))
+        michelle = get_agent("michelle")
+        session = session_store.create("michelle", michelle.instructions)
+        with patch('agent.resilience.handoff_filters', filters):
+            for question in ["How do you approach character development?", "What's your favorite acting technique?"]:
+                run_turn(michelle, question, "michelle", session=session, run_config=run_config)
+            result = run_turn(michelle, "Tell me about Catwoman in Batman Returns", "michelle", session=session, run_config=run_config)
+        assert result.agent_name == "Tim Burton"
+        instructions, tim_input = model.seen[-1]
+        assert instructions.startswith("You are Tim Burton")
+        assert [item.get("role") for item in tim_input] == ["user"]
+        stats = filters.stats()["michelle->tim_burton"]
+        assert stats["handoffs"] == 1
+        assert stats["tokens_after"] < stats["tokens_before"]
+        # The session still records the whole exchange
+        assert len(session) == 6
+        assert "🔀 Handoff michelle->tim_burton" in capsys.readouterr().err
+        assert "michelle->tim_burton" in filters.report()
+
+    def test_default_chain(self):
+        """Test that edges without their own chain use the default."""
+        filters = HandoffFilters(HandoffFilterConfig(default=["summary_only"]))
+        assert filters.chain("michelle", "tim_burton") == ["summary_only"]
+
+    def test_invalid_config_rejected(self):
+        """Test that unknown filters and edges are reported."""
+        with pytest.raises(HandoffGraphError, match="unknown handoff filter"):
+            HandoffFilters(HandoffFilterConfig(default=["shrink"])).apply("michelle", {})
+        with pytest.raises(HandoffGraphError, match="not an edge"):
+            HandoffFilters(HandoffFilterConfig(edges={"tim_burton->michelle": []})).apply("michelle", {})
+
+    def test_only_installed_where_handoffs_exist(self):
+        """Test that runs without handoffs, or with their own filter, are left alone."""
+        filters = HandoffFilters()
+        assert filters.apply("obama", {}) == {}
+        assert filters.apply("michelle", {})["run_config"].handoff_input_filter is filters
+        own = RunConfig(handoff_input_filter=lambda data: data)
+        assert filters.apply("michelle", {"run_config": own})["run_config"] is own
+        assert HandoffFilters(HandoffFilterConfig(enabled=False)).apply("michelle", {}) == {}
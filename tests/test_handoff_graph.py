@@ -0,0 +1,108 @@
+"""
+Test compiling declared handoffs into a graph and bounding runs with it.
+"""
+import asyncio
+import dataclasses
+import pytest
+import sys
+import os
+
+# Add the src directory to the path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from agents import Agent, RunConfig
+from agents.exceptions import MaxTurnsExceeded
+
+from agent.handoff_graph import HandoffGraphError, build_agents, compile_graph
+from agent.resilience import ResilientRunner
+from agent.settings import settings, AgentConfig
+from agent.stub_model import StubModelProvider
+
+
+class FakeCatalogue(dict):
+    """A persona catalogue built from ``{key: [handoff keys]}``."""
+
+    def __init__(self, graph):
+        super().__init__({
+            key: AgentConfig(name=key.title(), emoji="🎬", instructions=f"You are {key}.", handoffs=targets)
+            for key, targets in graph.items()
+        })
+
+    def handoffs(self, key):
+        return list(self[key].handoffs)
+
+
+class TestCompileGraph:
+    """Test adjacency, depth, reachability and validation."""
+
+    def test_project_graph(self):
+        """Test the compiled Michelle Pfeiffer graph."""
+        graph = settings.handoff_graph
+        assert graph is settings.handoff_graph
+        assert graph.targets("michelle") == ("tim_burton", "martin_scorsese")
+        assert graph.depth("michelle") == 1
+        assert graph.max_turns("michelle") == 2
+        assert graph.max_turns("tim_burton") == 1
+        assert graph.max_turns("obama") is None
+        assert not graph.unreachable
+
+    def test_depth_and_unreachable(self):
+        """Test the longest chain and personas no entry can reach."""
+        catalogue = FakeCatalogue({
+            "lead": ["director", "writer"],
+            "writer": ["director"],
+            "director": [],
+            "extra": ["director"],
+        })
+        graph = compile_graph(catalogue, ["lead", "obama"])
+        assert graph.entries == ("lead",)
+        assert graph.depth("lead") == 2
+        assert graph.max_depth == 2
+        assert graph.unreachable == {"extra"}
+        assert "longest chain 2 hop(s) from lead" in graph.report()
+        assert "No entry agent hands off to: extra" in graph.report()
+        assert graph.order("lead")[-1] == "lead"
+        with pytest.raises(TypeError):
+            graph.adjacency["lead"] = ()
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            graph.entries = ()
+
+    def test_cycle_rejected(self):
+        """Test that a handoff cycle is reported with its path."""
+        catalogue = FakeCatalogue({"a": ["b"], "b": ["c"], "c": ["a"]})
+        with pytest.raises(HandoffGraphError, match="a → b → c → a"):
+            compile_graph(catalogue, ["a"])
+
+    def test_unknown_target_rejected(self):
+        """Test that a handoff to a missing persona is rejected."""
+        with pytest.raises(HandoffGraphError, match="nobody"):
+            compile_graph(FakeCatalogue({"a": ["nobody"]}), ["a"])
+
+    def test_build_agents(self):
+        """Test that agents are wired to their targets by key."""
+        catalogue = FakeCatalogue({"lead": ["director", "writer"], "writer": ["director"], "director": []})
+        graph = compile_graph(catalogue, ["lead"])
+        agents = build_agents("lead", graph, catalogue, "gpt-4o")
+        assert [a.name for a in agents["lead"].handoffs] == ["Director", "Writer"]
+        assert agents["writer"].handoffs[0] is agents["director"]
+        with pytest.raises(KeyError):
+            build_agents("nobody", graph, catalogue, "gpt-4o")
+
+
+class TestRunBound:
+    """Test that runs are limited to the graph's hop depth."""
+
+    def test_run_bounded_by_graph(self):
+        """Test that a model handing off forever is stopped by max_turns."""
+        provider = StubModelProvider(ttft=0.001, token_delay=0.0, answer_tokens=2)
+        run_config = RunConfig(model_provider=provider, tracing_disabled=True)
+        provider.model.routes = {"Loop": ("batman",)}
+        looping = Agent(name="Loop", instructions="Loop")
+        looping.handoffs = [looping]
+
+        async def run():
+            return await ResilientRunner().run(looping, "Tell me about Batman Returns", "michelle", run_config=run_config)
+
+        with pytest.raises(MaxTurnsExceeded):
+            asyncio.run(run())
+        assert provider.model.calls == settings.handoff_graph.max_turns("michelle")
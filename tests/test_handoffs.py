@@ -99,15 +99,20 @@ class TestHandoffTriggers:
 
 @pytest.mark.integration
 class TestHandoffBehavior:
-    """Integration tests for actual handoff behavior (requires API key)."""
+    """Integration tests for actual handoff behavior (requires API key).
+
+    Set AGENT_CASSETTES=record to capture the model traffic, or
+    AGENT_CASSETTES=replay to rerun these flows offline from the recording.
+    """
     
     @pytest.mark.skipif(not os.getenv("OPENAI_API_KEY"), reason="Requires OpenAI API key")
     def test_batman_returns_handoff(self):
         """Test that Batman Returns questions trigger handoff to Tim Burton."""
         from agents import Runner
+        from agent.cassettes import cassette_run_config
         
         # This should trigger a handoff to Tim Burton
-        result = Runner.run_sync(michelle_agent, "Tell me about working with Tim Burton on Batman Returns.")
+        result = Runner.run_sync(michelle_agent, "Tell me about working with Tim Burton on Batman Returns.", run_config=cassette_run_config("handoff_batman_returns"))
         
         assert result.final_output
         # The result should come from Tim Burton, not Michelle
@@ -123,9 +128,10 @@ class TestHandoffBehavior:
     def test_age_of_innocence_handoff(self):
         """Test that Age of Innocence questions trigger handoff to Martin Scorsese."""
         from agents import Runner
+        from agent.cassettes import cassette_run_config
         
         # This should trigger a handoff to Martin Scorsese
-        result = Runner.run_sync(michelle_agent, "Tell me about The Age of Innocence and working with Martin Scorsese.")
+        result = Runner.run_sync(michelle_agent, "Tell me about The Age of Innocence and working with Martin Scorsese.", run_config=cassette_run_config("handoff_age_of_innocence"))
         
         assert result.final_output
         response_lower = result.final_output.lower()
@@ -139,9 +145,10 @@ class TestHandoffBehavior:
     def test_general_question_stays_with_michelle(self):
         """Test that general acting questions stay with Michelle."""
         from agents import Runner
+        from agent.cassettes import cassette_run_config
         
         # This should stay with Michelle
-        result = Runner.run_sync(michelle_agent, "What's your favorite acting technique?")
+        result = Runner.run_sync(michelle_agent, "What's your favorite acting technique?", run_config=cassette_run_config("handoff_general_question"))
         
         assert result.final_output
         response_lower = result.final_output.lower()
@@ -0,0 +1,135 @@
+"""
+Test the load generator and the local stub model it runs against.
+"""
+import random
+import statistics
+import pytest
+import sys
+import os
+from unittest.mock import patch
+
+# Add the src directory to the path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from agents import Agent, Runner
+
+from agent.settings import settings, PriorityClassConfig, SchedulerConfig
+from agent.loadgen import LoadProfile, LoadTest, load_scheduler, stub_run_config, PERSONAS
+from agent.scheduler import PriorityScheduler, INTERACTIVE
+from agent.stub_model import StubModelProvider
+
+
+def fast_stub():
+    return stub_run_config(ttft=0.005, token_delay=0.0005, answer_tokens=12)
+
+
+class TestStubModel:
+    """Test the stub model behind the load generator."""
+
+    def test_routes_handoffs_by_keyword(self):
+        """Test that Batman questions hand off and others stay put."""
+        from agent.pfeiffer import michelle_agent
+
+        result = Runner.run_sync(michelle_agent, "Tell me about Batman Returns", run_config=fast_stub())
+        assert result.last_agent.name == "Tim Burton"
+        assert result.final_output.startswith("[You are Tim Burton")
+
+        result = Runner.run_sync(michelle_agent, "What's your favorite acting technique?", run_config=fast_stub())
+        assert result.last_agent.name == "Michelle Pfeiffer"
+
+    def test_agent_without_handoffs_answers(self):
+        """Test that keyword matches are ignored without handoffs."""
+        agent = Agent(name="Solo", instructions="Solo agent.")
+        result = Runner.run_sync(agent, "Tell me about Batman Returns", run_config=fast_stub())
+        assert result.last_agent.name == "Solo"
+        assert result.final_output
+
+
+class TestLoadProfile:
+    """Test persona mixing and think times."""
+
+    def test_handoff_mix_extremes(self):
+        """Test that the mix selects only handoff or only direct personas."""
+        rng = random.Random(1)
+        assert all(LoadProfile(handoff_mix=1.0).persona(rng).handoff for _ in range(50))
+        assert not any(LoadProfile(handoff_mix=0.0).persona(rng).handoff for _ in range(50))
+
+    @pytest.mark.parametrize("distribution", ["exponential", "lognormal", "uniform", "constant"])
+    def test_think_time_mean(self, distribution):
+        """Test that every distribution is centred on the configured mean."""
+        rng = random.Random(3)
+        profile = LoadProfile(think_time=2.0, think_time_distribution=distribution)
+        samples = [profile.think(rng) for _ in range(4000)]
+        assert statistics.mean(samples) == pytest.approx(2.0, rel=0.1)
+        assert min(samples) >= 0
+
+    def test_unknown_distribution_rejected(self):
+        """Test that a typo in the distribution is an error."""
+        with pytest.raises(ValueError):
+            LoadProfile(think_time_distribution="gaussian").think(random.Random())
+
+    def test_personas_cover_readme_samples(self):
+        """Test that the README sample questions are part of the personas."""
+        questions = {question for persona in PERSONAS for question, _ in persona.turns}
+        assert "Tell me about Batman Returns" in questions
+        assert "What about The Age of Innocence?" in questions
+        assert "How do you approach character development?" in questions
+
+
+class TestLoadTest:
+    """Test running virtual users against the agent stack."""
+
+    def test_runs_all_turns_and_reports(self):
+        """Test that every user completes its turns with correct routing."""
+        profile = LoadProfile(users=30, ramp_up=0.2, turns_per_user=2, think_time=0.01)
+        report = LoadTest(profile, run_config=fast_stub(), turn_scheduler=load_scheduler(30, 30)).run()
+
+        summary = report.summary()
+        assert summary["turns"] == 60
+        assert summary["errors"] == 0
+        assert summary["routing_accuracy"] == 1.0
+        assert summary["throughput_turns_per_s"] > 0
+        assert 0 < summary["latency_p50_s"] <= summary["latency_p99_s"]
+        assert summary["ttft_p50_s"] > 0
+        assert summary["max_active_users"] >= 1
+        assert report.loop_lag
+        assert "turns/s" in report.format()
+
+    def test_scheduler_rejections_are_counted(self):
+        """Test that an undersized scheduler shows up as errors, not crashes."""
+        tiny = PriorityScheduler(SchedulerConfig(
+            max_concurrency=1,
+            classes={INTERACTIVE: PriorityClassConfig(weight=1, max_concurrency=1, max_queue=1)},
+        ))
+        profile = LoadProfile(users=10, ramp_up=0.0, turns_per_user=1, think_time=0.0)
+        report = LoadTest(profile, run_config=fast_stub(), turn_scheduler=tiny).run()
+
+        assert report.errors["SchedulerOverloaded"] > 0
+        assert report.turns + report.errors["SchedulerOverloaded"] == 10
+
+    def test_scheduler_sized_from_users(self):
+        """Test that the default capacity admits every user's turn and 0 keeps the configured one."""
+        assert load_scheduler(None, 500)._classes[INTERACTIVE].max_concurrency == 500
+        assert load_scheduler(0, 500)._classes[INTERACTIVE].max_concurrency == \
+            settings.scheduler_config.classes[INTERACTIVE].max_concurrency
+
+    def test_caches_bypassed_unless_asked(self):
+        """Test that repeated openers reach the model by default and are reported apart when cached."""
+        profile = LoadProfile(users=20, ramp_up=0.5, turns_per_user=1, think_time=0.0, handoff_mix=0.0)
+        config = settings.cache_config
+        with patch('agent.turns.response_cache.get', side_effect=AssertionError("cache read")), \
+                patch('agent.turns.routing_cache.put', side_effect=AssertionError("cache write")):
+            report = LoadTest(profile, run_config=fast_stub(), turn_scheduler=load_scheduler(None, 20)).run()
+        assert report.summary()["cached_turns"] == 0
+        assert len(report.latencies) == 20
+        assert settings.cache_config is config and config.enabled
+
+        report = LoadTest(profile, run_config=fast_stub(), turn_scheduler=load_scheduler(None, 20), cache=True).run()
+        assert report.summary()["cached_turns"] > 0
+        assert report.turns == len(report.latencies) + len(report.cached_latencies)
+
+    def test_duration_stops_new_turns(self):
+        """Test that the duration cap ends conversations early."""
+        profile = LoadProfile(users=5, ramp_up=0.0, turns_per_user=50, think_time=0.05, duration=0.3)
+        report = LoadTest(profile, run_config=fast_stub(), turn_scheduler=load_scheduler(5, 5)).run()
+        assert 0 < report.turns < 250
@@ -0,0 +1,130 @@
+"""
+Test the on-disk persona catalogue.
+"""
+import json
+import os
+import sys
+
+import pytest
+import yaml
+
+# Add the src directory to the path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from agent.personas import PersonaCatalogue, PersonaError, build_index, main, write_index
+from agent.settings import settings, AgentConfig, PersonaConfig
+
+
+def write_persona(directory, key, **fields):
+    persona = {"name": key.title(), "emoji": "🎬", "instructions": f"You are {key}."}
+    persona.update(fields)
+    with open(os.path.join(directory, f"{key}.yaml"), "w") as f:
+        yaml.safe_dump(persona, f, allow_unicode=True)
+
+
+@pytest.fixture
+def persona_dir(tmp_path):
+    write_persona(tmp_path, "lead", handoffs=["director"])
+    write_persona(tmp_path, "director")
+    write_index(str(tmp_path), str(tmp_path / "index.json"))
+    return tmp_path
+
+
+def open_catalogue(directory, **config):
+    return PersonaCatalogue(PersonaConfig(directory=str(directory), index=str(directory / "index.json"), **config))
+
+
+class TestPersonaCatalogue:
+    """Test lazy loading, the index and handoff lookups."""
+
+    def test_project_personas(self):
+        """Test that the project's personas come from config/personas."""
+        assert set(settings.agent_configs) >= {"michelle", "tim_burton", "martin_scorsese"}
+        assert settings.agent_configs.handoffs("michelle") == ["tim_burton", "martin_scorsese"]
+        assert not settings.agent_configs.index_rebuilt
+
+    def test_project_index_is_current(self):
+        """Test that the committed index matches the persona files."""
+        with open(settings.persona_config.index) as f:
+            committed = json.load(f)["personas"]
+        current = build_index(settings.persona_config.directory)["personas"]
+        assert committed == current
+
+    def test_list_reports_handoff_graph(self, capsys):
+        """Test that the listing shows each persona's depth and the longest handoff chain."""
+        main(["list"])
+        out = capsys.readouterr().out
+        assert "Michelle Pfeiffer" in out and "depth 1" in out
+        assert "longest chain 1 hop(s)" in out
+        assert "No entry agent" not in out
+
+    def test_loads_on_demand(self, persona_dir):
+        """Test that listing and handoffs never read a persona file."""
+        catalogue = open_catalogue(persona_dir)
+        assert sorted(catalogue) == ["director", "lead"]
+        assert catalogue.handoffs("lead") == ["director"]
+        assert catalogue.display_name("director") == "Director"
+        assert catalogue.loads == 0
+
+        config = catalogue["lead"]
+        assert isinstance(config, AgentConfig)
+        assert catalogue["lead"] is config
+        assert catalogue.loads == 1
+
+    def test_bounded_memory(self, persona_dir):
+        """Test that at most max_loaded configs are kept."""
+        catalogue = open_catalogue(persona_dir, max_loaded=1)
+        catalogue["lead"]
+        catalogue["director"]
+        catalogue["lead"]
+        assert catalogue.stats()["loaded"] == 1
+        assert catalogue.loads == 3
+
+    def test_missing_key_and_default(self, persona_dir):
+        """Test unknown keys raise KeyError and get() falls back."""
+        catalogue = open_catalogue(persona_dir)
+        assert "nobody" not in catalogue
+        with pytest.raises(KeyError):
+            catalogue["nobody"]
+        assert catalogue.get("nobody") is None
+        assert settings.get_agent_config("nobody").name == "Default Agent"
+
+    def test_edited_file_refreshes_entry(self, persona_dir):
+        """Test that a file changed after indexing is trusted over the index."""
+        catalogue = open_catalogue(persona_dir)
+        write_persona(persona_dir, "director", handoffs=["lead"])
+        os.utime(persona_dir / "director.yaml", ns=(1, 1))
+        assert catalogue["director"].handoffs == ["lead"]
+        assert catalogue.handoffs("director") == ["lead"]
+
+    def test_touched_file_keeps_entry(self, persona_dir):
+        """Test that a new modification time alone (as after a clone) does not count as an edit."""
+        catalogue = open_catalogue(persona_dir)
+        entry = catalogue.entries["director"]
+        os.utime(persona_dir / "director.yaml", ns=(1, 1))
+        assert catalogue["director"].name == "Director"
+        assert catalogue.entries["director"] is entry
+
+    def test_missing_index_is_rebuilt(self, persona_dir):
+        """Test that the catalogue still works without an index file."""
+        os.remove(persona_dir / "index.json")
+        catalogue = open_catalogue(persona_dir)
+        assert len(catalogue) == 2
+        assert catalogue.index_rebuilt
+
+    def test_invalid_persona_rejected(self, persona_dir):
+        """Test that building the index validates every file."""
+        with open(persona_dir / "broken.yaml", "w") as f:
+            f.write("name: Broken\n")
+        with pytest.raises(PersonaError):
+            build_index(str(persona_dir))
+
+    def test_inline_agents_take_precedence(self, persona_dir):
+        """Test that inline configs override files with the same key."""
+        inline = {"lead": AgentConfig(name="Inline Lead", emoji="⭐", instructions="Inline.")}
+        catalogue = PersonaCatalogue(
+            PersonaConfig(directory=str(persona_dir), index=str(persona_dir / "index.json")), inline
+        )
+        assert catalogue["lead"].name == "Inline Lead"
+        assert catalogue.handoffs("lead") == []
+        assert len(catalogue) == 2
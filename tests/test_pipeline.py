@@ -0,0 +1,165 @@
+"""
+Test the pipelined stdin mode of the interactive entry points.
+"""
+import io
+import json
+import os
+import sys
+import threading
+import time
+import weakref
+
+import pytest
+
+# Add the src directory to the path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from agents import RunConfig
+
+from agent.cli import parse_args
+from agent.pipeline import pipeline_mode, run_pipeline
+from agent.registry import get_agent
+from agent.scheduler import API
+from agent.settings import PipelineConfig
+from agent.stub_model import StubModelProvider
+from agent.turns import TurnResult, run_turn
+
+
+def answer_after(delays):
+    """An answer function that takes delays[question] seconds."""
+    def answer(question):
+        time.sleep(delays.get(question, 0.0))
+        return TurnResult(final_output=question.upper(), agent_name="Echo", source="stub", elapsed=0.0)
+    return answer
+
+
+class FakeStdin(io.StringIO):
+    def __init__(self, text, tty):
+        super().__init__(text)
+        self.tty = tty
+
+    def isatty(self):
+        return self.tty
+
+
+class TestRunPipeline:
+    """Test ordering, concurrency and errors."""
+
+    def test_answers_in_input_order(self):
+        """Test that slow early questions still come out first."""
+        out = io.StringIO()
+        answer = answer_after({"first": 0.2, "second": 0.05, "third": 0.0})
+        stats = run_pipeline(answer, "Echo", ["first\n", "second\n", "\n", "third\n"], out, fmt="jsonl")
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert [r["input"] for r in records] == ["first", "second", "third"]
+        assert [r["output"] for r in records] == ["FIRST", "SECOND", "THIRD"]
+        assert [r["index"] for r in records] == [0, 1, 2]
+        assert stats.questions == 3
+
+    def test_runs_concurrently_up_to_the_limit(self):
+        """Test that questions overlap but never exceed the configured concurrency."""
+        questions = [f"q{i}\n" for i in range(12)]
+        answer = answer_after({q.strip(): 0.05 for q in questions})
+        started = time.perf_counter()
+        stats = run_pipeline(answer, "Echo", questions, io.StringIO(), concurrency=4)
+        assert time.perf_counter() - started < 12 * 0.05 / 2
+        assert stats.max_in_flight == 4
+
+    def test_read_ahead_is_bounded(self):
+        """Test that reading stops once it is read_ahead questions ahead of the oldest answer."""
+        release = threading.Event()
+        read = []
+
+        def lines():
+            for i in range(100):
+                read.append(i)
+                yield f"q{i}\n"
+
+        def answer(question):
+            release.wait(5)
+            return TurnResult(final_output=question, agent_name="Echo", source="stub", elapsed=0.0)
+
+        config = PipelineConfig(concurrency=2, read_ahead=5)
+        thread = threading.Thread(target=run_pipeline, args=(answer, "Echo", lines(), io.StringIO(), config))
+        thread.start()
+        time.sleep(0.2)
+        assert len(read) <= config.read_ahead + config.concurrency + 1
+        release.set()
+        thread.join(5)
+        assert len(read) == 100
+
+    def test_written_answers_are_freed(self):
+        """Test that answers already written are not kept alive while input is still being read."""
+        alive = []
+        most_alive = []
+
+        def lines():
+            for i in range(200):
+                most_alive.append(sum(ref() is not None for ref in alive))
+                yield f"q{i}\n"
+
+        def answer(question):
+            result = TurnResult(final_output=question, agent_name="Echo", source="stub", elapsed=0.0)
+            alive.append(weakref.ref(result))
+            return result
+
+        config = PipelineConfig(concurrency=2, read_ahead=5)
+        stats = run_pipeline(answer, "Echo", lines(), io.StringIO(), config)
+        assert stats.errors == 0
+        assert max(most_alive) <= config.read_ahead + config.concurrency + 2
+
+    def test_errors_reported_in_place(self):
+        """Test that a failed question is reported and the rest are answered."""
+        def answer(question):
+            if question == "boom":
+                raise RuntimeError("upstream failed")
+            return TurnResult(final_output="ok", agent_name="Echo", source="stub", elapsed=0.0)
+
+        out = io.StringIO()
+        stats = run_pipeline(answer, "🎭 Response", ["a\n", "boom\n", "b\n"], out)
+        text = out.getvalue()
+        assert text.index("💬 You: a") < text.index("❌ Error: upstream failed") < text.index("💬 You: b\n")
+        assert text.count("🎭 Response: ok") == 2
+        assert stats.errors == 1
+
+    def test_exit_stops_reading(self):
+        """Test that an exit line ends the input."""
+        stats = run_pipeline(answer_after({}), "Echo", ["a\n", "exit\n", "b\n"], io.StringIO())
+        assert stats.questions == 1
+
+    def test_unknown_format_rejected(self):
+        """Test that an unknown output format is reported."""
+        with pytest.raises(ValueError, match="unknown pipeline format"):
+            run_pipeline(answer_after({}), "Echo", [], io.StringIO(), fmt="xml")
+
+    def test_agent_turns(self):
+        """Test piping questions through real turns on the stub model."""
+        provider = StubModelProvider(ttft=0.05, token_delay=0.0, answer_tokens=5)
+        run_config = RunConfig(model_provider=provider, tracing_disabled=True)
+        michelle = get_agent("michelle")
+        questions = ["Tell me about Batman Returns pipeline", "What about The Age of Innocence pipeline?"]
+        out = io.StringIO()
+        run_pipeline(
+            lambda q: run_turn(michelle, q, "michelle", priority=API, run_config=run_config),
+            "🎭 Response", [q + "\n" for q in questions], out, fmt="jsonl",
+        )
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert [r["agent"] for r in records] == ["Tim Burton", "Martin Scorsese"]
+
+
+class TestPipelineMode:
+    """Test when the entry points switch to pipeline mode."""
+
+    def test_piped_stdin_only(self):
+        """Test that only piped input without --no-pipeline or --resume is pipelined."""
+        args = parse_args("test", ["--interactive"])
+        assert pipeline_mode(args, FakeStdin("", tty=False))
+        assert not pipeline_mode(args, FakeStdin("", tty=True))
+        assert not pipeline_mode(parse_args("test", ["--interactive", "--no-pipeline"]), FakeStdin("", tty=False))
+        assert not pipeline_mode(parse_args("test", ["--resume", "abc"]), FakeStdin("", tty=False))
+
+    def test_options(self):
+        """Test the pipeline options."""
+        args = parse_args("test", ["--interactive", "--concurrency", "3", "--jsonl"])
+        assert args.concurrency == 3
+        assert args.jsonl
@@ -0,0 +1,181 @@
+"""
+Test predictive prefetch of likely follow-up answers.
+"""
+import os
+import sys
+from unittest.mock import patch
+
+import pytest
+
+# Add the src directory to the path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from agent.prefetch import Prefetcher
+from agent.registry import get_agent
+from agent.resilience import CircuitBreaker, ResilientRunner
+from agent.sessions import session_store
+from agent.settings import PrefetchConfig
+from agent.turns import TurnResult, run_turn
+
+FOLLOW_UPS = {
+    "michelle": [
+        {"after": ["batman", "catwoman"], "question": "How did you prepare for the Catwoman costume?"},
+        {"after": ["batman", "burton"], "question": "What was it like working with Tim Burton?"},
+        {"after": ["batman"], "question": "Where did the gothic style come from?"},
+        {"after": ["innocence", "scorsese"], "question": "What was it like working with Martin Scorsese?"},
+    ],
+}
+
+
+def prefetch_config(**overrides):
+    config = {"enabled": True, "top_k": 2, "follow_ups": FOLLOW_UPS}
+    config.update(overrides)
+    return PrefetchConfig(**config)
+
+
+def settle(prefetcher, session):
+    """Wait for a session's predictions to finish."""
+    for prefetch in prefetcher._sessions[session.session_id].pending:
+        prefetch.future.result(10)
+
+
+class TestPrediction:
+    """Test choosing the follow-ups to answer ahead."""
+
+    def test_ranks_by_topic_words(self):
+        """Test that follow-ups sharing more topic words with the turn come first."""
+        prefetcher = Prefetcher(prefetch_config())
+        predicted = prefetcher.predict("michelle", "Batman Returns: Burton cast me as Catwoman")
+        assert predicted == ["How did you prepare for the Catwoman costume?", "What was it like working with Tim Burton?"]
+        assert prefetcher.predict("michelle", "The Age of Innocence") == ["What was it like working with Martin Scorsese?"]
+        assert prefetcher.predict("obama", "Batman") == []
+
+    def test_skips_questions_already_asked(self):
+        """Test that a follow-up the session already asked is not predicted again."""
+        prefetcher = Prefetcher(prefetch_config(top_k=3))
+        predicted = prefetcher.predict("michelle", "Batman and Catwoman", ["how did you prepare for the catwoman costume"])
+        assert "How did you prepare for the Catwoman costume?" not in predicted
+
+
+class TestPrefetchTurns:
+    """Test serving prefetched answers in a session."""
+
+    def test_serves_predicted_follow_up(self, stub_config):
+        """Test that a predicted follow-up is answered ahead and served without a model call."""
+        run_config = stub_config()
+        provider = run_config.model_provider
+        prefetcher = Prefetcher(prefetch_config(), run_config=run_config)
+        michelle = get_agent("michelle")
+        session = session_store.create("michelle", michelle.instructions)
+        with patch('agent.turns.prefetcher', prefetcher):
+            first = run_turn(michelle, "Tell me about Batman Returns", "michelle", session=session, run_config=run_config)
+            assert prefetcher.predicted == 2
+            settle(prefetcher, session)
+            second = run_turn(michelle, "What was it like working with Tim Burton?", "michelle", session=session,
+                              run_config=run_config)
+        assert first.agent_name == "Tim Burton"
+        assert second.source == "prefetch"
+        assert second.agent_name == "Tim Burton"
+        assert second.final_output
+        assert len(session) == 4
+        stats = prefetcher.stats()
+        assert stats["hits"] == 1
+        assert stats["hit_rate"] == 1.0
+        assert stats["wasted"] == 1
+
+    def test_in_flight_prediction_is_awaited(self, stub_config):
+        """Test that a follow-up still being generated is waited for rather than run again."""
+        run_config = stub_config(ttft=0.2)
+        provider = run_config.model_provider
+        prefetcher = Prefetcher(prefetch_config(top_k=1), run_config=run_config)
+        michelle = get_agent("michelle")
+        session = session_store.create("michelle", michelle.instructions)
+        with patch('agent.turns.prefetcher', prefetcher):
+            run_turn(michelle, "Tell me about Batman Returns and Catwoman", "michelle", session=session,
+                     run_config=run_config)
+            result = run_turn(michelle, "How did you prepare for the Catwoman costume?", "michelle", session=session,
+                              run_config=run_config)
+        assert result.source == "prefetch"
+        assert prefetcher.stats()["in_flight_hits"] == 1
+
+    def test_unpredicted_question_drops_predictions(self, stub_config):
+        """Test that a question nobody predicted runs normally and counts the predictions as wasted."""
+        run_config = stub_config()
+        provider = run_config.model_provider
+        prefetcher = Prefetcher(prefetch_config(), run_config=run_config)
+        michelle = get_agent("michelle")
+        session = session_store.create("michelle", michelle.instructions)
+        with patch('agent.turns.prefetcher', prefetcher):
+            run_turn(michelle, "Tell me about Batman Returns", "michelle", session=session, run_config=run_config)
+            settle(prefetcher, session)
+            result = run_turn(michelle, "What about The Age of Innocence?", "michelle", session=session,
+                              run_config=run_config)
+        assert result.source != "prefetch"
+        stats = prefetcher.stats()
+        assert stats["lookups"] == 1
+        assert stats["hits"] == 0
+        assert stats["wasted"] == 2
+        assert "0 of 1 follow-ups" in prefetcher.report()
+
+    def test_token_budget(self, stub_config):
+        """Test that predictions stop once the session's budget is reserved."""
+        run_config = stub_config()
+        provider = run_config.model_provider
+        prefetcher = Prefetcher(prefetch_config(token_budget=1000, reserve_tokens=600), run_config=run_config)
+        michelle = get_agent("michelle")
+        session = session_store.create("michelle", michelle.instructions)
+        with patch('agent.turns.prefetcher', prefetcher):
+            run_turn(michelle, "Tell me about Batman Returns", "michelle", session=session, run_config=run_config)
+        assert prefetcher.predicted == 1
+        assert prefetcher.budget_skips == 1
+
+    @pytest.mark.parametrize("config", [prefetch_config(enabled=False), prefetch_config()])
+    def test_off_or_without_session(self, config, stub_config):
+        """Test that nothing is predicted when prefetch is off or the turn has no session."""
+        run_config = stub_config()
+        provider = run_config.model_provider
+        prefetcher = Prefetcher(config, run_config=run_config)
+        michelle = get_agent("michelle")
+        session = session_store.create("michelle", michelle.instructions) if not config.enabled else None
+        with patch('agent.turns.prefetcher', prefetcher):
+            run_turn(michelle, "Tell me about Batman Returns", "michelle", session=session, run_config=run_config)
+        assert prefetcher.predicted == 0
+
+
+class TestCircuitBreaker:
+    """Test that speculation stays out of the agents' circuit breakers."""
+
+    def test_speculation_leaves_the_breaker_alone(self, stub_config):
+        """Test that failing predictions neither open the circuit nor take the half-open probe."""
+        run_config = stub_config()
+        provider = run_config.model_provider
+        runner = ResilientRunner()
+        breaker = runner.breaker("michelle")
+        prefetcher = Prefetcher(prefetch_config(), run_config=run_config)
+        michelle = get_agent("michelle")
+        session = session_store.create("michelle", michelle.instructions)
+        with patch('agent.turns.prefetcher', prefetcher), patch('agent.prefetch.resilient_runner', runner), \
+                patch.object(provider.model, 'stream_response', side_effect=RuntimeError("provider error")):
+            prefetcher.start(michelle, "michelle", session, "Tell me about Batman Returns",
+                             TurnResult("Burton cast me as Catwoman", "Tim Burton", "model", 0.1))
+            settle(prefetcher, session)
+        assert prefetcher.stats()["failed"] == 2
+        assert breaker.failures == 0
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_no_predictions_while_the_circuit_is_open(self, stub_config):
+        """Test that nothing is speculated for an agent whose circuit is not closed."""
+        run_config = stub_config()
+        provider = run_config.model_provider
+        runner = ResilientRunner()
+        for _ in range(runner.breaker("michelle").config.failure_threshold):
+            runner.breaker("michelle").record_failure()
+        prefetcher = Prefetcher(prefetch_config(), run_config=run_config)
+        michelle = get_agent("michelle")
+        session = session_store.create("michelle", michelle.instructions)
+        with patch('agent.prefetch.resilient_runner', runner):
+            launched = prefetcher.start(michelle, "michelle", session, "Tell me about Batman Returns",
+                                        TurnResult("Burton cast me as Catwoman", "Tim Burton", "model", 0.1))
+        assert launched == []
+        assert prefetcher.stats()["circuit_skips"] == 1
+        assert provider.model.calls == 0
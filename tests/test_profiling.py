@@ -0,0 +1,115 @@
+"""
+Test the profiling hooks of the agent entry points.
+"""
+import os
+import sys
+import threading
+import time
+from unittest.mock import patch
+
+# Add the src directory to the path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from agent import profiling
+from agent.cli import parse_args
+from agent.profiling import SamplingProfiler, profile_session
+from agent.resilience import RunOutcome
+from agent.turns import run_turn
+from agent.obama import create_obama_agent
+
+
+def busy_wait(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+class TestSamplingProfiler:
+    """Test stack sampling and the folded output."""
+
+    def test_samples_other_threads(self):
+        """Test that a busy thread's frames show up as a folded stack."""
+        sampler = SamplingProfiler(interval=0.001)
+        sampler.start()
+        worker = threading.Thread(target=busy_wait, args=(0.2,), name="worker")
+        worker.start()
+        worker.join()
+        sampler.stop()
+
+        folded = sampler.folded().splitlines()
+        assert sampler.sample_count > 0
+        busy = [line for line in folded if line.startswith("worker;") and "busy_wait" in line]
+        assert busy
+        stack, count = busy[0].rsplit(" ", 1)
+        assert int(count) > 0
+        assert stack.split(";")[-1].startswith("busy_wait (test_profiling.py:")
+
+
+class TestProfileSession:
+    """Test the session wrapper used by the scripts."""
+
+    def test_no_flags_is_a_no_op(self, tmp_path):
+        """Test that without flags nothing is started or written."""
+        with profile_session("obama", directory=str(tmp_path)) as profiler:
+            assert profiler is None
+            assert profiling.active_profiler is None
+        assert os.listdir(tmp_path) == []
+
+    def test_writes_profiles_at_exit(self, tmp_path, capsys):
+        """Test that folded stacks, the turn table and the memory report are written."""
+        with profile_session("obama", cpu=True, memory=True, directory=str(tmp_path)):
+            busy_wait(0.05)
+            data = [bytearray(1024) for _ in range(100)]
+        assert profiling.active_profiler is None
+
+        names = sorted(os.listdir(tmp_path))
+        assert len(names) == 3
+        assert any(name.endswith(".folded") for name in names)
+        memory = next(name for name in names if name.endswith("-memory.txt"))
+        assert "peak" in (tmp_path / memory).read_text()
+        assert "Profile written to" in capsys.readouterr().err
+        del data
+
+    def test_turns_split_wait_and_cpu(self, tmp_path):
+        """Test that a turn waiting on the model counts as model wait, not CPU."""
+        outcome = RunOutcome(final_output="Hi", agent_name="Michelle Obama Knowledge Assistant", ttft=0.1)
+
+        def slow_model(*args, **kwargs):
+            time.sleep(0.2)
+            return outcome
+
+        with profile_session("obama", cpu=True, directory=str(tmp_path)) as profiler:
+            with patch('agent.resilience.ResilientRunner.run', side_effect=slow_model):
+                run_turn(create_obama_agent(), "Hello", "obama")
+
+        turn = profiler.turns[0]
+        assert turn.agent_key == "obama"
+        assert turn.ttft == 0.1
+        assert turn.wall >= 0.2
+        assert turn.model_wait > 0.15
+        assert turn.cpu < turn.model_wait
+        report = next(name for name in os.listdir(tmp_path) if name.endswith("-turns.txt"))
+        assert "model wait" in (tmp_path / report).read_text()
+
+    def test_one_shot_runs_are_profiled(self, tmp_path, capsys):
+        """Test that each script's non-interactive example is recorded as a turn."""
+        from agent import obama, pfeiffer, simple_agent
+        outcome = RunOutcome(final_output="Roses are red", agent_name="Assistant", ttft=0.1)
+
+        with profile_session("scripts", cpu=True, directory=str(tmp_path)) as profiler:
+            with patch('agent.resilience.ResilientRunner.run', return_value=outcome):
+                for script in (pfeiffer, obama, simple_agent):
+                    script.main()
+
+        assert [turn.agent_key for turn in profiler.turns] == ["michelle", "obama", "creative"]
+
+
+class TestCommandLine:
+    """Test the profiling switches."""
+
+    def test_profile_flags(self):
+        """Test that both switches parse and default to off."""
+        args = parse_args("test", ["--profile", "--profile-memory"])
+        assert args.profile and args.profile_memory
+        args = parse_args("test", [])
+        assert not args.profile and not args.profile_memory
@@ -0,0 +1,135 @@
+"""
+Test the static prompt-cost analyser and its budget checks.
+"""
+import os
+import sys
+
+import pytest
+
+# Add the src directory to the path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from agents import Agent, Handoff
+
+from agent.personas import PersonaCatalogue, write_index
+from agent.prompt_costs import (
+    TOOL_OVERHEAD_TOKENS, PromptCostAnalyser, analyse_agents, check_catalogue, describe_agents,
+    format_report, handoff_tool_text,
+)
+from agent.registry import get_agent
+from agent.settings import settings, ModelPrice, PersonaConfig, PromptBudgetConfig, Settings
+from agent.tokens import count_tokens
+
+
+def budget(**overrides):
+    config = {
+        "context_tokens": 100,
+        "handoff_call_tokens": 10,
+        "output_tokens": 50,
+        "throughput": {"ttft_base": 0.5, "prefill_tokens_per_s": 1000, "output_tokens_per_s": 50},
+        "limits": {"max_prompt_tokens": None},
+    }
+    config.update(overrides)
+    return PromptBudgetConfig(**config)
+
+
+def cast():
+    director = Agent(name="Tim Burton", instructions="Talk about Batman Returns. " * 10, model="gpt-4o")
+    return Agent(name="Michelle", instructions="Be Michelle.", model="gpt-4o", handoffs=[director])
+
+
+class TestDescribe:
+    """Test counting the fixed prompt of each agent."""
+
+    def test_handoff_tool_matches_sdk(self):
+        """Test that the handoff tool text is the SDK's default name and description."""
+        director = Agent(name="Martin Scorsese", instructions="x", handoff_description="Period dramas.")
+        text = handoff_tool_text(director.name, director.handoff_description)
+        assert text == f"{Handoff.default_tool_name(director)} {Handoff.default_tool_description(director)}"
+
+    def test_instructions_and_handoff_tools(self):
+        """Test that an agent's prompt counts its instructions and one tool per handoff."""
+        prompts = describe_agents(cast(), "gpt-4o")
+        michelle = prompts["Michelle"]
+        assert michelle.instruction_tokens == count_tokens("Be Michelle.", "gpt-4o")
+        assert michelle.tool_tokens > TOOL_OVERHEAD_TOKENS
+        assert michelle.handoffs == ("Tim Burton",)
+        assert prompts["Tim Burton"].tool_tokens == 0
+
+    def test_project_agents(self):
+        """Test that the report covers the agent scripts, including Obama's instructions, and the personas."""
+        reports = {report.key: report for report in analyse_agents()}
+        assert {"michelle", "obama", "creative", "tim_burton"} <= set(reports)
+        obama = get_agent("obama")
+        assert reports["obama"].agent.instruction_tokens == count_tokens(obama.instructions, obama.model)
+        assert [path.path for path in reports["michelle"].paths] == [
+            ("Michelle Pfeiffer",), ("Michelle Pfeiffer", "Tim Burton"), ("Michelle Pfeiffer", "Martin Scorsese"),
+        ]
+        assert "Michelle Pfeiffer → Tim Burton" in format_report(list(reports.values()))
+
+
+class TestProjection:
+    """Test the per-path size, latency and cost projections."""
+
+    def test_path_cost(self):
+        """Test that each hop resends the conversation and adds a model call."""
+        analyser = PromptCostAnalyser(budget(), {"gpt-4o": ModelPrice(input=2.0, output=10.0)})
+        prompts = describe_agents(cast(), "gpt-4o")
+        direct, handed_off = analyser.report("michelle", prompts, "Michelle").paths
+        michelle, director = prompts["Michelle"].system_tokens, prompts["Tim Burton"].system_tokens
+        assert direct.prompt_tokens == michelle + 100
+        assert direct.ttft == pytest.approx(0.5 + (michelle + 100) / 1000)
+        assert direct.latency == pytest.approx(direct.ttft + 1.0)
+        second_call = director + 100 + 10
+        assert handed_off.prompt_tokens == max(michelle + 100, second_call)
+        assert handed_off.input_tokens == michelle + 100 + second_call
+        assert handed_off.output_tokens == 10 + 50
+        assert handed_off.ttft == pytest.approx(direct.ttft + 10 / 50 + 0.5 + second_call / 1000)
+        assert handed_off.cost == pytest.approx((handed_off.input_tokens * 2.0 + 60 * 10.0) / 1_000_000)
+
+    def test_per_model_throughput_and_missing_prices(self):
+        """Test that a model's own figures are used and a path with an unpriced model has no cost."""
+        config = budget(models={"gpt-4o": {"ttft_base": 0.1, "prefill_tokens_per_s": 1e9, "output_tokens_per_s": 1e9}})
+        path = PromptCostAnalyser(config).report("michelle", describe_agents(cast(), "gpt-4o"), "Michelle").paths[1]
+        assert path.ttft == pytest.approx(0.2, abs=1e-3)
+        assert path.cost is None
+
+
+class TestBudgets:
+    """Test flagging agents over budget."""
+
+    def test_limits_and_overrides(self):
+        """Test that the worst path is reported and per-agent overrides apply."""
+        config = budget(limits={"max_prompt_tokens": 120, "max_ttft": 10.0}, agents={"tim": {"max_prompt_tokens": 1000}})
+        analyser = PromptCostAnalyser(config)
+        prompts = describe_agents(cast(), "gpt-4o")
+        michelle = analyser.report("michelle", prompts, "Michelle")
+        assert len(michelle.over) == 1
+        assert michelle.over[0].startswith("prompt ")
+        assert "(Michelle → Tim Burton)" in michelle.over[0]
+        assert analyser.report("tim", prompts, "Tim Burton").over == []
+
+    def test_catalogue_check_reads_only_the_index(self, tmp_path):
+        """Test that the settings-load check uses the index estimates and opens no persona file."""
+        for key, handoffs in (("lead", ["director"]), ("director", [])):
+            with open(tmp_path / f"{key}.yaml", "w") as f:
+                f.write(f"name: {key.title()}\nemoji: x\ninstructions: {'Talk about films. ' * 40}\nhandoffs: {handoffs}\n")
+        write_index(str(tmp_path), str(tmp_path / "index.json"))
+        catalogue = PersonaCatalogue(PersonaConfig(directory=str(tmp_path), index=str(tmp_path / "index.json")))
+        reports = {report.key: report for report in check_catalogue(catalogue, "gpt-4o")}
+        assert catalogue.loads == 0
+        assert reports["lead"].agent.tool_tokens == catalogue.prompt_tokens("director")[1]
+        assert [path.path for path in reports["lead"].paths] == [("Lead",), ("Lead", "Director")]
+
+    def test_settings_load_warns(self):
+        """Test that personas over budget are warned about when settings load."""
+        tight = Settings(
+            OPENAI_API_KEY="x",
+            persona_config=settings.persona_config,
+            prompt_budget_config=budget(limits={"max_prompt_tokens": 10}),
+        )
+        with pytest.warns(UserWarning) as warned:
+            tight.check_prompt_budgets()
+        messages = [str(warning.message) for warning in warned]
+        assert any(message.startswith("persona 'michelle' is over its prompt budget: prompt ") for message in messages)
+        assert len(messages) == len(settings.agent_configs)
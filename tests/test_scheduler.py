@@ -0,0 +1,180 @@
+"""
+Test the priority-aware request scheduler.
+"""
+import asyncio
+import time
+import pytest
+import sys
+import os
+
+# Add the src directory to the path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from agent.settings import settings, SchedulerConfig, PriorityClassConfig
+from agent.scheduler import (
+    PriorityScheduler,
+    SchedulerOverloaded,
+    scheduler,
+    INTERACTIVE,
+    API,
+    BATCH,
+)
+
+
+def make_scheduler(max_concurrency=1, batch_cap=1, batch_queue=100):
+    """Build a small scheduler for deterministic ordering tests."""
+    return PriorityScheduler(SchedulerConfig(
+        max_concurrency=max_concurrency,
+        classes={
+            INTERACTIVE: PriorityClassConfig(weight=8, max_concurrency=max_concurrency),
+            API: PriorityClassConfig(weight=4, max_concurrency=max_concurrency),
+            BATCH: PriorityClassConfig(weight=1, max_concurrency=batch_cap, max_queue=batch_queue),
+        },
+    ))
+
+
+def run_in_loop(sched, scenario):
+    """Drive a test scenario on the scheduler's own event loop."""
+    return asyncio.run_coroutine_threadsafe(scenario(), sched.loop).result(timeout=10)
+
+
+class TestSchedulerConfig:
+    """Test scheduler configuration loading."""
+
+    def test_scheduler_config_loaded(self):
+        """Test that the scheduler section is loaded from YAML."""
+        config = settings.scheduler_config
+        assert config.max_concurrency == 8
+        assert set(config.classes) == {"interactive", "api", "batch"}
+        assert config.classes["interactive"].weight > config.classes["batch"].weight
+
+    def test_batch_cannot_take_every_slot(self):
+        """Test that batch is capped below the global concurrency."""
+        config = settings.scheduler_config
+        assert config.classes["batch"].max_concurrency < config.max_concurrency
+
+    def test_global_scheduler_instance(self):
+        """Test that the global scheduler uses the loaded settings."""
+        assert scheduler.max_concurrency == settings.scheduler_config.max_concurrency
+
+
+class TestSchedulerOrdering:
+    """Test weighted fair queuing between priority classes."""
+
+    def test_interactive_jumps_ahead_of_batch_backlog(self):
+        """Test that interactive work is served before queued batch work."""
+        sched = make_scheduler(max_concurrency=1, batch_cap=1)
+        order = []
+
+        async def job(label):
+            order.append(label)
+            await asyncio.sleep(0.01)
+
+        async def scenario():
+            tasks = [asyncio.create_task(sched.run(lambda i=i: job(f"batch-{i}"), BATCH)) for i in range(4)]
+            await asyncio.sleep(0)
+            tasks.append(asyncio.create_task(sched.run(lambda: job("interactive"), INTERACTIVE)))
+            await asyncio.gather(*tasks)
+
+        run_in_loop(sched, scenario)
+        assert order[0] == "batch-0"  # already running when interactive arrived
+        assert order.index("interactive") == 1
+
+    def test_per_class_concurrency_cap(self):
+        """Test that a class never exceeds its concurrency cap."""
+        sched = make_scheduler(max_concurrency=4, batch_cap=2)
+        peak = {"running": 0, "max": 0}
+
+        async def job():
+            peak["running"] += 1
+            peak["max"] = max(peak["max"], peak["running"])
+            await asyncio.sleep(0.01)
+            peak["running"] -= 1
+
+        async def scenario():
+            await asyncio.gather(*[sched.run(job, BATCH) for _ in range(8)])
+
+        run_in_loop(sched, scenario)
+        assert peak["max"] == 2
+
+    def test_queue_full_is_rejected(self):
+        """Test that a full class queue raises SchedulerOverloaded."""
+        sched = make_scheduler(max_concurrency=1, batch_cap=1, batch_queue=1)
+
+        async def scenario():
+            blocker = asyncio.Event()
+            first = asyncio.create_task(sched.run(blocker.wait, BATCH))
+            await asyncio.sleep(0)
+            second = asyncio.create_task(sched.run(blocker.wait, BATCH))
+            await asyncio.sleep(0)
+            with pytest.raises(SchedulerOverloaded):
+                await sched.run(blocker.wait, BATCH)
+            blocker.set()
+            await asyncio.gather(first, second)
+
+        run_in_loop(sched, scenario)
+        assert sched.stats()[BATCH]["rejected"] == 1
+
+    def test_unknown_priority_class(self):
+        """Test that an unknown priority class is refused."""
+        sched = make_scheduler()
+
+        async def job():
+            return None
+
+        with pytest.raises(ValueError):
+            sched.run_sync(job, "urgent")
+
+
+class TestSchedulerMetrics:
+    """Test queue-time metrics and slot accounting."""
+
+    def test_run_sync_returns_result(self):
+        """Test that synchronous callers receive the coroutine result."""
+        sched = make_scheduler()
+
+        async def job():
+            return 42
+
+        assert sched.run_sync(job, INTERACTIVE) == 42
+        stats = sched.stats()[INTERACTIVE]
+        assert stats["submitted"] == 1
+        assert stats["completed"] == 1
+        assert stats["running"] == 0
+
+    def test_queue_time_recorded(self):
+        """Test that waiting behind another job shows up in queue-time stats."""
+        sched = make_scheduler(max_concurrency=1, batch_cap=1)
+
+        async def slow():
+            await asyncio.sleep(0.05)
+
+        async def scenario():
+            await asyncio.gather(sched.run(slow, BATCH), sched.run(slow, BATCH))
+
+        run_in_loop(sched, scenario)
+        stats = sched.stats()[BATCH]
+        assert stats["completed"] == 2
+        assert stats["queue_time_max"] >= 0.04
+
+    def test_cancelled_job_releases_slot(self):
+        """Test that cancelling a running job frees its slot for the next one."""
+        sched = make_scheduler(max_concurrency=1, batch_cap=1)
+
+        async def hang():
+            await asyncio.sleep(10)
+
+        async def quick():
+            return "done"
+
+        future = sched.submit(hang, BATCH)
+        while sched.stats()[BATCH]["running"] == 0:
+            time.sleep(0.001)
+        future.cancel()
+        assert sched.run_sync(quick, INTERACTIVE) == "done"
+        assert sched.stats()[BATCH]["running"] == 0
+
+
+if __name__ == "__main__":
+    # Run tests with pytest
+    pytest.main([__file__, "-v"])
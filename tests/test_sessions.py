@@ -0,0 +1,172 @@
+"""
+Test the compact session store and how turns use it.
+"""
+import pytest
+import sys
+import os
+from unittest.mock import patch, AsyncMock
+
+# Add the src directory to the path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from agent import sessions
+from agent.settings import settings, SessionConfig
+from agent.resilience import RunOutcome
+from agent.sessions import (
+    InstructionTable,
+    Message,
+    Session,
+    SessionStore,
+    pack_messages,
+    unpack_messages,
+    ROLE_ASSISTANT,
+    ROLE_USER,
+)
+from agent.turns import run_turn
+from agent.obama import create_obama_agent
+
+
+def make_store(tmp_path, **overrides):
+    config = SessionConfig(spill_dir=str(tmp_path / "spill"), **overrides)
+    return SessionStore(config)
+
+
+class TestInstructionTable:
+    """Test instruction interning."""
+
+    def test_instructions_stored_once_per_agent(self):
+        """Test that repeated interning reuses the same id and string."""
+        table = InstructionTable()
+        first = table.intern("michelle", "You are Michelle Pfeiffer...")
+        second = table.intern("michelle", "ignored duplicate")
+        assert first == second
+        assert table.instructions(first) == "You are Michelle Pfeiffer..."
+        assert len(table) == 1
+
+    def test_instructions_filled_in_later(self):
+        """Test that an agent first interned without instructions gets them from a later call."""
+        table = InstructionTable()
+        agent_id = table.intern("tim_burton")
+        assert table.intern("tim_burton", "You are Tim Burton...") == agent_id
+        assert table.instructions(agent_id) == "You are Tim Burton..."
+
+    def test_answers_are_recorded_by_persona_key(self):
+        """Test that assistant messages refer to the persona that answered, not its display name."""
+        from agent.sessions import session_store
+        from agent.turns import TurnResult, record_exchange
+        session = session_store.create("michelle")
+        record_exchange(session, "Batman?", TurnResult("Catwoman!", "Tim Burton", "model", 0.0))
+        assert session_store.instructions.agent_key(session.messages[-1].agent_id) == "tim_burton"
+        obama = session_store.create("obama")
+        record_exchange(obama, "Hi", TurnResult("Hello", "Michelle Obama Knowledge Assistant", "model", 0.0))
+        assert obama.messages[-1].agent_id == obama.agent_id
+        assert "Tim Burton" not in [session_store.instructions.agent_key(i) for i in range(len(session_store.instructions))]
+
+
+class TestSessionStorage:
+    """Test message packing, cold compression and context windows."""
+
+    def test_message_round_trip(self):
+        """Test that packed messages decode to the same content."""
+        messages = [Message(ROLE_USER, 0, "Tell me about Batman Returns"), Message(ROLE_ASSISTANT, 1, "Ah, Catwoman 🐈")]
+        decoded = unpack_messages(pack_messages(messages))
+        assert [(m.role, m.agent_id, m.text) for m in decoded] == [(0, 0, "Tell me about Batman Returns"), (1, 1, "Ah, Catwoman 🐈")]
+
+    def test_message_records_are_slotted(self):
+        """Test that messages carry no per-instance dict."""
+        assert not hasattr(Message(ROLE_USER, 0, "hi"), "__dict__")
+        assert not hasattr(Session("s", 0), "__dict__")
+
+    def test_old_messages_move_to_cold_storage(self):
+        """Test that history beyond the hot window is compressed but kept."""
+        session = Session("s1", 0, hot_limit=4)
+        for i in range(20):
+            session.append(ROLE_USER if i % 2 == 0 else ROLE_ASSISTANT, f"message {i}")
+        assert len(session.messages) <= 8
+        assert session.cold
+        assert len(session) == 20
+        assert [m.text for m in session.history()] == [f"message {i}" for i in range(20)]
+
+    def test_freezing_never_rereads_cold_storage(self):
+        """Test that each spill to cold storage compresses only the messages it moves."""
+        session = Session("s1", 0, hot_limit=4)
+        with patch("agent.sessions._decompress", side_effect=AssertionError("cold storage re-read")):
+            for i in range(100):
+                session.append(ROLE_USER, f"message {i}")
+        assert len(session.cold) > 1
+        assert [m.text for m in session.history()] == [f"message {i}" for i in range(100)]
+
+    def test_input_items_returns_recent_context(self):
+        """Test that the context window holds the latest messages in SDK format."""
+        session = Session("s1", 0, hot_limit=2)
+        for i in range(10):
+            session.append(ROLE_USER if i % 2 == 0 else ROLE_ASSISTANT, f"m{i}")
+        items = session.input_items(6)
+        assert [item["content"] for item in items] == ["m4", "m5", "m6", "m7", "m8", "m9"]
+        assert items[0]["role"] == "user"
+        assert items[1]["role"] == "assistant"
+
+    def test_input_items_decompresses_only_needed_chunks(self):
+        """Test that a window reaching into cold storage reads only the newest chunks."""
+        session = Session("s1", 0, hot_limit=4)
+        for i in range(100):
+            session.append(ROLE_USER, f"message {i}")
+        assert len(session.cold) > 3
+        with patch("agent.sessions._decompress", wraps=sessions._decompress) as decompress:
+            items = session.input_items(len(session.messages) + 2)
+        assert decompress.call_count == 1
+        assert [item["content"] for item in items] == [f"message {i}" for i in range(100 - len(items), 100)]
+        assert [item["content"] for item in session.input_items(200)] == [f"message {i}" for i in range(100)]
+
+
+class TestSessionStore:
+    """Test LRU residency and spill to disk."""
+
+    def test_session_config_loaded(self):
+        """Test that the sessions section is loaded from YAML."""
+        assert settings.session_config.max_resident == 10000
+        assert settings.session_config.compress_cold is True
+
+    def test_lru_spill_and_reload(self, tmp_path):
+        """Test that evicted sessions spill to disk and come back intact."""
+        store = make_store(tmp_path, max_resident=2)
+        first = store.create("obama", "You are an expert on Michelle Obama.", session_id="first")
+        first.append(ROLE_USER, "What book did Michelle Obama write?")
+        first.append(ROLE_ASSISTANT, "Becoming.")
+        store.create("obama", session_id="second")
+        store.create("obama", session_id="third")
+        assert len(store) == 2
+        assert store.spills == 1
+        reloaded = store.get("first")
+        assert [m.text for m in reloaded.history()] == ["What book did Michelle Obama write?", "Becoming."]
+        assert store.agent_key(reloaded) == "obama"
+        assert store.loads == 1
+
+    def test_unknown_session(self, tmp_path):
+        """Test that a missing session id returns None."""
+        assert make_store(tmp_path).get("missing") is None
+
+
+class TestTurnsWithSession:
+    """Test that turns send history and record the exchange."""
+
+    def test_turn_sends_history_and_records(self, tmp_path):
+        """Test that a session turn includes prior messages and appends the new ones."""
+        store = make_store(tmp_path)
+        session = store.create("obama")
+        session.append(ROLE_USER, "Who is Michelle Obama?")
+        session.append(ROLE_ASSISTANT, "The former First Lady.")
+        outcome = RunOutcome(final_output="Becoming, in 2018.", agent_name="Michelle Obama Knowledge Assistant")
+        with patch('agent.turns.resilient_runner.run', new=AsyncMock(return_value=outcome)) as run:
+            result = run_turn(create_obama_agent(), "What did she write?", "obama", session=session)
+        model_input = run.call_args.args[1]
+        assert [item["content"] for item in model_input] == [
+            "Who is Michelle Obama?", "The former First Lady.", "What did she write?",
+        ]
+        assert result.final_output == "Becoming, in 2018."
+        assert [m.text for m in session.history()][-2:] == ["What did she write?", "Becoming, in 2018."]
+
+
+if __name__ == "__main__":
+    # Run tests with pytest
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,134 @@
+"""
+Test mirroring sampled turns to a candidate model.
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+import pytest
+
+# Add the src directory to the path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from agent.registry import get_agent
+from agent.settings import ShadowConfig
+from agent.shadow import ShadowMirror, compare, format_summary, load_records, summarise
+from agent.stub_model import StubModelProvider
+from agent.turns import TurnResult, run_turn
+
+
+@pytest.fixture
+def store():
+    directory = tempfile.mkdtemp(prefix="shadow")
+    yield directory
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+def model_result(text="An answer about Batman Returns."):
+    return TurnResult(final_output=text, agent_name="Tim Burton", source="model", elapsed=0.5)
+
+
+class TestShadowMirror:
+    """Test sampling, the bounded queue and the result store."""
+
+    def test_mirrors_real_turns(self, store, stub_config):
+        """Test that a sampled turn is replayed on the candidate and stored with both answers."""
+        mirror = ShadowMirror(ShadowConfig(enabled=True, sample_rate=1.0, model="candidate-mini", path=store),
+                              run_config=stub_config())
+        michelle = get_agent("michelle")
+        with patch('agent.turns.shadow', mirror):
+            result = run_turn(michelle, "Tell me about Batman Returns", "michelle", run_config=stub_config())
+        assert mirror.drain(10)
+        records = load_records(store)
+        assert len(records) == 1
+        record = records[0]
+        assert record["input"] == "Tell me about Batman Returns"
+        assert record["primary"]["agent"] == result.agent_name == "Tim Burton"
+        assert record["primary"]["model"] == "gpt-4o-2024-11-20"
+        assert record["candidate"]["model"] == "candidate-mini"
+        assert record["candidate"]["agent"] == "Tim Burton"
+        assert record["same_agent"]
+        assert 0.0 <= record["overlap"] <= 1.0
+        assert mirror.stats()["completed"] == 1
+
+    def test_sampling_per_agent(self, store, stub_config):
+        """Test that each agent is mirrored at its own rate."""
+        config = ShadowConfig(enabled=True, sample_rate=0.0, agents={"obama": 1.0}, path=store)
+        mirror = ShadowMirror(config, run_config=stub_config())
+        assert not mirror.offer(get_agent("michelle"), "michelle", "Hi", model_result())
+        assert mirror.offer(get_agent("obama"), "obama", "Hi", model_result())
+        assert mirror.drain(10)
+        assert ShadowMirror(ShadowConfig(enabled=False, sample_rate=1.0)).rate("obama") == 0.0
+
+        sampled = ShadowMirror(ShadowConfig(enabled=True, sample_rate=0.25, path=store), rng=random.Random(7),
+                               run_config=stub_config())
+        for i in range(200):
+            sampled.offer(get_agent("obama"), "obama", f"Question {i}", model_result())
+        assert sampled.drain(10)
+        assert sampled.stats()["offered"] == 200
+        assert 30 < sampled.stats()["sampled"] < 70
+
+    def test_only_model_answers(self, store, stub_config):
+        """Test that cached, guardrail and cut-short turns are not mirrored."""
+        mirror = ShadowMirror(ShadowConfig(enabled=True, sample_rate=1.0, path=store), run_config=stub_config())
+        obama = get_agent("obama")
+        for source in ("cache", "guardrail", "fallback_model"):
+            assert not mirror.offer(obama, "obama", "Hi", TurnResult("x", "Obama", source, 0.1))
+        assert not mirror.offer(obama, "obama", "Hi", TurnResult("x", "Obama", "model", 0.1, timed_out=True))
+        assert mirror.stats()["sampled"] == 0
+
+    def test_bounded_queue_never_blocks(self, store, stub_config):
+        """Test that a full queue drops turns instead of slowing the caller."""
+        mirror = ShadowMirror(ShadowConfig(enabled=True, sample_rate=1.0, queue_size=2, max_concurrency=1, path=store),
+                              run_config=stub_config(ttft=0.3))
+        obama = get_agent("obama")
+        started = time.perf_counter()
+        queued = [mirror.offer(obama, "obama", f"Question {i}", model_result()) for i in range(10)]
+        assert time.perf_counter() - started < 0.1
+        assert queued.count(True) == 2
+        assert mirror.stats()["dropped"] == 8
+        assert mirror.drain(10)
+        assert len(load_records(store)) == 2
+
+    def test_candidate_errors_recorded(self, store, stub_config):
+        """Test that a failing candidate run is stored as an error."""
+        class Broken(StubModelProvider):
+            def get_model(self, model_name):
+                raise RuntimeError("no such model")
+
+        mirror = ShadowMirror(ShadowConfig(enabled=True, sample_rate=1.0, path=store),
+                              run_config=stub_config(provider=Broken()))
+        mirror.offer(get_agent("obama"), "obama", "Hi", model_result())
+        assert mirror.drain(10)
+        record = load_records(store)[0]
+        assert "no such model" in record["candidate"]["error"]
+        assert mirror.stats()["failed"] == 1
+
+
+class TestShadowReport:
+    """Test the offline comparison."""
+
+    def test_compare(self):
+        """Test the local quality signals."""
+        assert compare("Batman Returns was gothic", "Batman Returns was gothic") == {"overlap": 1.0, "length_ratio": 1.0}
+        assert compare("Batman Returns", "Scorsese period drama")["overlap"] == 0.0
+
+    def test_summarise(self):
+        """Test per-agent latency percentiles and agreement."""
+        records = [
+            {"agent_key": "michelle", "primary": {"model": "big", "elapsed": 2.0, "ttft": 0.8, "agent": "Tim Burton"},
+             "candidate": {"model": "small", "elapsed": 1.0, "ttft": 0.3, "agent": "Tim Burton", "output": "x"},
+             "same_agent": True, "overlap": 0.5, "length_ratio": 0.9},
+            {"agent_key": "michelle", "primary": {"model": "big", "elapsed": 2.0, "ttft": 0.8},
+             "candidate": {"model": "small", "error": "Timeout"}},
+        ]
+        summary = summarise(records)["michelle"]
+        assert summary["turns"] == 2
+        assert summary["errors"] == 1
+        assert summary["candidate_ttft_p50"] == 0.3
+        assert summary["same_agent"] == 1.0
+        assert "big -> small" in format_summary(summarise(records))
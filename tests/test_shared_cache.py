@@ -0,0 +1,231 @@
+"""
+Test the shared cache tier, its key-value backends and stampede protection.
+"""
+import asyncio
+import os
+import socket
+import sys
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+# Add the src directory to the path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from agents import Agent, RunConfig
+
+from agent import cache
+from agent.cache import TieredCache, TTLCache, build_cache, config_hash, prompt_key
+from agent.kvstore import EmbeddedRedisServer, KVError, MemoryKV, RedisKV
+from agent.registry import get_agent
+from agent.settings import CacheConfig, SharedCacheConfig
+from agent.stub_model import StubModelProvider
+from agent.turns import run_turn, run_turn_async
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def server():
+    server = EmbeddedRedisServer().start()
+    yield server
+    server.stop()
+
+
+def node(backend, config=None, clock=time.time, ttl=3600.0, namespace=lambda agent_key: "v1"):
+    """One node's cache: its own local tier in front of the shared backend."""
+    return TieredCache(TTLCache(16, ttl), backend, "response", config or SharedCacheConfig(lock_wait=2.0),
+                       stampede=True, namespace=namespace, clock=clock)
+
+
+class TestBackends:
+    """Test the embedded store and the Redis-protocol adapter."""
+
+    def test_memory_kv(self):
+        """Test expiry and set-if-absent."""
+        clock = Clock()
+        kv = MemoryKV(clock)
+        assert kv.set("a", b"1", ttl=10)
+        assert not kv.set("a", b"2", nx=True)
+        assert kv.get("a") == b"1"
+        clock.now += 11
+        assert kv.get("a") is None
+        assert kv.set("a", b"3", nx=True)
+        assert kv.delete("a") == 1
+
+    def test_redis_protocol_round_trip(self, server):
+        """Test the adapter against the embedded server over a real socket."""
+        kv = RedisKV(server.url, timeout=1.0)
+        assert kv.ping()
+        value = bytes(range(256)) + b"\r\n$-1\r\n"
+        assert kv.set("binary", value, ttl=60)
+        assert kv.get("binary") == value
+        assert kv.get("missing") is None
+        assert not kv.set("binary", b"other", ttl=60, nx=True)
+        assert kv.set("short", b"x", ttl=0.05)
+        time.sleep(0.1)
+        assert kv.get("short") is None
+        assert kv.delete("binary") == 1
+        with pytest.raises(KVError):
+            kv.command("FLUSHALL")
+        assert kv.ping()  # An error reply leaves the connection usable
+        kv.close()
+
+    def test_unreachable_server(self):
+        """Test that connection failures surface as KVError."""
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        with pytest.raises(KVError):
+            RedisKV(f"redis://127.0.0.1:{port}/0", timeout=0.2).get("key")
+
+
+class TestTieredCache:
+    """Test two nodes sharing one backend."""
+
+    def test_answer_shared_between_nodes(self, server):
+        """Test that an answer stored by one node is served by another and kept locally."""
+        backend = RedisKV(server.url, timeout=1.0)
+        a, b = node(backend), node(backend)
+        key = prompt_key("michelle", "Tell me about Batman Returns")
+        a.put(key, ("Gotham was cold.", "Tim Burton"))
+        assert b.get(key) == ("Gotham was cold.", "Tim Burton")
+        assert key in b.local
+        assert b.stats()["shared_hits"] == 1
+        assert b.get(key) == ("Gotham was cold.", "Tim Burton")
+        assert b.stats()["local_hits"] == 1
+
+    def test_compression(self):
+        """Test that large answers are stored compressed and small ones as they are."""
+        kv = MemoryKV()
+        cache_ = node(kv, SharedCacheConfig(compress_min_bytes=100))
+        cache_.put(("obama", "long"), ("Becoming " * 200, "Michelle Obama Knowledge Assistant"))
+        cache_.put(("obama", "short"), ("Yes.", "Michelle Obama Knowledge Assistant"))
+        assert kv.get(cache_.shared_key(("obama", "long")))[:1] == b"1"
+        assert kv.get(cache_.shared_key(("obama", "short")))[:1] == b"0"
+        assert cache_.stats()["compression_ratio"] < 0.5
+        assert node(kv).get(("obama", "long"))[0] == "Becoming " * 200
+
+    def test_age_carries_across_nodes(self):
+        """Test that an entry expires on every node when its original TTL runs out."""
+        clock, kv = Clock(), MemoryKV()
+        a = node(kv, clock=clock, ttl=60)
+        a.put(("obama", "q"), ("answer", "Obama"))
+        clock.now += 50
+        b = node(kv, clock=clock, ttl=60)
+        assert b.get(("obama", "q")) == ("answer", "Obama")
+        clock.now += 20  # 70 seconds after it was computed
+        assert node(kv, clock=clock, ttl=60).get(("obama", "q")) is None
+
+    def test_namespace_invalidation(self):
+        """Test that a changed agent configuration stops serving old answers."""
+        kv = MemoryKV()
+        node(kv, namespace=lambda agent_key: "old").put(("michelle", "q"), ("old answer", "Michelle"))
+        assert node(kv, namespace=lambda agent_key: "old").get(("michelle", "q")) == ("old answer", "Michelle")
+        assert node(kv, namespace=lambda agent_key: "new").get(("michelle", "q")) is None
+
+    def test_config_hash_follows_agent_configuration(self):
+        """Test that the namespace changes with an agent's instructions or handoff targets."""
+        assert config_hash("michelle") != config_hash("obama")
+        assert config_hash("michelle") == config_hash("michelle")
+        director = Agent(name="Tim Burton", instructions="Talk about Batman Returns.")
+        hashes = []
+        for agent in (
+            Agent(name="Michelle", instructions="Be Michelle.", handoffs=[director]),
+            Agent(name="Michelle", instructions="Be Michelle, briefly.", handoffs=[director]),
+            Agent(name="Michelle", instructions="Be Michelle.",
+                  handoffs=[Agent(name="Tim Burton", instructions="Talk about Ed Wood.")]),
+        ):
+            with patch('agent.cache.get_agent', return_value=agent), patch.dict(cache._config_hashes, clear=True):
+                hashes.append(config_hash("michelle"))
+        assert len(set(hashes)) == 3
+
+    def test_stampede_waits_for_first_node(self):
+        """Test that a second node waits for the answer the first is computing."""
+        kv = MemoryKV()
+        a, b = node(kv), node(kv)
+        key = ("michelle", "q")
+        assert a.get(key) is None  # Claims the prompt
+        results = []
+        waiter = threading.Thread(target=lambda: results.append(b.get(key)))
+        waiter.start()
+        time.sleep(0.2)
+        a.put(key, ("answer", "Michelle"))
+        waiter.join(5)
+        assert results == [("answer", "Michelle")]
+        assert b.stats()["stampede_served"] == 1
+
+    def test_released_claim_stops_waiting(self):
+        """Test that waiters stop as soon as the claim is given up without an answer."""
+        kv = MemoryKV()
+        a, b = node(kv), node(kv)
+        assert a.get(("michelle", "q")) is None
+        threading.Timer(0.1, a.release, args=[("michelle", "q")]).start()
+        started = time.perf_counter()
+        assert b.get(("michelle", "q")) is None
+        assert time.perf_counter() - started < 1.0
+
+    def test_backend_errors_fall_back_to_local(self):
+        """Test that a failing backend is skipped for a while and the local tier keeps working."""
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        cache_ = node(RedisKV(f"redis://127.0.0.1:{port}/0", timeout=0.1), SharedCacheConfig(retry_after=60))
+        cache_.put(("obama", "q"), ("answer", "Obama"))
+        assert cache_.get(("obama", "q")) == ("answer", "Obama")
+        assert cache_.get(("obama", "other")) is None
+        assert cache_.stats()["shared_errors"] == 1
+
+    def test_build_cache(self):
+        """Test that the shared tier is only added with a backend."""
+        assert isinstance(build_cache("response", 60, None, CacheConfig()), TTLCache)
+        assert isinstance(build_cache("response", 60, MemoryKV(), CacheConfig()), TieredCache)
+
+
+class TestSharedTurns:
+    """Test turns served across nodes."""
+
+    def test_second_node_serves_first_nodes_answer(self):
+        """Test that an opening question answered on one node is a cache hit on another."""
+        kv = MemoryKV()
+        provider = StubModelProvider(ttft=0.001, token_delay=0.0, answer_tokens=8)
+        run_config = RunConfig(model_provider=provider, tracing_disabled=True)
+        obama = get_agent("obama")
+        question = "What did Michelle Obama study at Princeton, on node tests?"
+        with patch('agent.turns.response_cache', node(kv)), patch('agent.turns.routing_cache', TTLCache()):
+            first = run_turn(obama, question, "obama", run_config=run_config)
+        calls = provider.model.calls
+        with patch('agent.turns.response_cache', node(kv)), patch('agent.turns.routing_cache', TTLCache()):
+            second = run_turn(obama, question, "obama", run_config=run_config)
+        assert first.source == "model"
+        assert second.source == "cache"
+        assert second.final_output == first.final_output
+        assert provider.model.calls == calls
+
+    @pytest.mark.parametrize("asynchronous", [False, True])
+    def test_failed_run_releases_the_claim(self, asynchronous):
+        """Test that a turn whose run raises frees the prompt at once for other nodes."""
+        kv = MemoryKV()
+        a, b = node(kv), node(kv)
+        obama = get_agent("obama")
+        question = f"What is Becoming about, asked {'async' if asynchronous else 'sync'}?"
+        failing = patch('agent.turns.resilient_runner.run', side_effect=RuntimeError("provider error"))
+        with patch('agent.turns.response_cache', a), patch('agent.turns.routing_cache', TTLCache()), failing:
+            with pytest.raises(RuntimeError):
+                if asynchronous:
+                    asyncio.run(run_turn_async(obama, question, "obama"))
+                else:
+                    run_turn(obama, question, "obama")
+        assert not a._claimed
+        assert kv.get(a.shared_key(prompt_key("obama", question)) + ":lock") is None
+        started = time.perf_counter()
+        assert b.get(prompt_key("obama", question)) is None
+        assert time.perf_counter() - started < 0.5
@@ -0,0 +1,162 @@
+"""
+Test the batched, non-blocking telemetry pipeline.
+"""
+import json
+import time
+import pytest
+import sys
+import os
+from unittest.mock import patch
+
+# Add the src directory to the path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from agent.settings import TelemetryConfig
+from agent.telemetry import Telemetry, LocalTracingProcessor
+from agent.resilience import RunOutcome
+from agent.turns import run_turn
+from agent.obama import create_obama_agent
+
+
+def make_sink(tmp_path, **overrides):
+    return Telemetry(TelemetryConfig(enabled=True, path=str(tmp_path), **overrides))
+
+
+def read_lines(tmp_path):
+    lines = []
+    for name in sorted(os.listdir(tmp_path)):
+        with open(tmp_path / name) as f:
+            lines.extend(json.loads(line) for line in f)
+    return lines
+
+
+class TestRingBuffer:
+    """Test buffering, dropping and flushing."""
+
+    def test_flush_writes_jsonl_batches(self, tmp_path):
+        """Test that buffered spans are written in batches."""
+        sink = make_sink(tmp_path, batch_size=4, flush_interval=60)
+        for i in range(10):
+            sink.record("turn", 1.0, 2.0, {"n": i})
+        sink.shutdown()
+
+        records = read_lines(tmp_path)
+        assert [r["attributes"]["n"] for r in records] == list(range(10))
+        assert sink.stats()["exported"] == 10
+        assert sink.stats()["batches"] == 3
+
+    def test_full_buffer_drops_instead_of_blocking(self, tmp_path):
+        """Test that a stalled exporter costs dropped spans, not latency."""
+        sink = make_sink(tmp_path, buffer_size=5, flush_interval=60, batch_size=1000)
+        with patch.object(Telemetry, "_write", side_effect=lambda records: time.sleep(10)):
+            started = time.perf_counter()
+            results = [sink.record("turn", 1.0, 2.0) for _ in range(20)]
+            elapsed = time.perf_counter() - started
+
+        assert results.count(True) == 5
+        assert sink.stats()["dropped"] == 15
+        assert elapsed < 0.5
+
+    def test_background_flusher_exports(self, tmp_path):
+        """Test that the flusher thread writes without an explicit flush."""
+        sink = make_sink(tmp_path, flush_interval=0.05)
+        sink.record("turn", 1.0, 2.0)
+        deadline = time.time() + 2
+        while sink.stats()["exported"] < 1 and time.time() < deadline:
+            time.sleep(0.01)
+        assert sink.stats()["exported"] == 1
+        sink.shutdown()
+
+    def test_disabled_records_nothing(self, tmp_path):
+        """Test that a disabled pipeline neither buffers nor starts a thread."""
+        sink = Telemetry(TelemetryConfig(enabled=False, path=str(tmp_path)))
+        assert not sink.record("turn", 1.0, 2.0)
+        assert sink._thread is None
+
+
+class TestSampling:
+    """Test sampling controls."""
+
+    def test_sample_rate_is_per_trace(self, tmp_path):
+        """Test that sampling keeps roughly the configured share, consistently per trace."""
+        sink = make_sink(tmp_path, sample_rate=0.25)
+        kept = [sink.sampled("turn", f"{i:032x}") for i in range(4000)]
+        assert 0.2 < sum(kept) / len(kept) < 0.3
+        assert all(sink.sampled("turn", f"{i:032x}") == kept[i] for i in range(100))
+
+    def test_per_name_override(self, tmp_path):
+        """Test that a span name can be sampled differently."""
+        sink = make_sink(tmp_path, sampling={"response": 0.0})
+        assert sink.record("turn", 1.0, 2.0)
+        assert not sink.record("response", 1.0, 2.0)
+        assert sink.stats()["sampled_out"] == 1
+
+
+class TestExportFormats:
+    """Test span conversion."""
+
+    def test_span_context_records_errors(self, tmp_path):
+        """Test that span() times a block and notes exceptions."""
+        sink = make_sink(tmp_path)
+        with pytest.raises(ValueError):
+            with sink.span("turn", agent_key="obama") as span:
+                span.set(source="model")
+                raise ValueError("boom")
+        sink.shutdown()
+
+        record = read_lines(tmp_path)[0]
+        assert record["attributes"] == {"agent_key": "obama", "source": "model", "error": "ValueError"}
+        assert record["end"] >= record["start"]
+
+    def test_otlp_layout(self, tmp_path):
+        """Test the OTLP/JSON file exporter layout."""
+        sink = make_sink(tmp_path, format="otlp")
+        sink.record("turn", 1.5, 2.5, {"agent_key": "michelle", "ttft": 0.3, "hedged": True}, parent_id="ab")
+        sink.shutdown()
+
+        request = read_lines(tmp_path)[0]
+        span = request["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+        assert span["name"] == "turn"
+        assert len(span["traceId"]) == 32 and len(span["spanId"]) == 16
+        assert span["parentSpanId"] == "00000000000000ab"
+        assert span["startTimeUnixNano"] == "1500000000"
+        values = {a["key"]: a["value"] for a in span["attributes"]}
+        assert values["ttft"] == {"doubleValue": 0.3}
+        assert values["hedged"] == {"boolValue": True}
+
+    def test_sdk_spans_export_on_flusher(self, tmp_path):
+        """Test that SDK spans are only exported when flushed."""
+        from agents.tracing.spans import SpanImpl
+        from agents.tracing.span_data import CustomSpanData
+
+        sink = make_sink(tmp_path)
+        processor = LocalTracingProcessor(sink)
+        span = SpanImpl("trace_0123", None, None, processor, CustomSpanData("lookup", {"hits": 3}), None)
+        span.start()
+        span.finish()
+        assert sink.stats()["exported"] == 0
+        processor.force_flush()
+
+        record = read_lines(tmp_path)[0]
+        assert record["name"] == "custom"
+        assert record["trace_id"] and record["start"] and record["end"]
+        assert record["attributes"]["name"] == "lookup"
+
+
+class TestTurnSpans:
+    """Test that turns leave telemetry spans."""
+
+    def test_turn_recorded(self, tmp_path):
+        """Test that run_turn queues one span with the outcome."""
+        sink = make_sink(tmp_path)
+        outcome = RunOutcome(final_output="Hi", agent_name="Michelle Obama Knowledge Assistant", ttft=0.2, hedged=True)
+        with patch('agent.turns.telemetry', sink), \
+             patch('agent.resilience.ResilientRunner.run', return_value=outcome):
+            run_turn(create_obama_agent(), "Hello", "obama")
+        sink.shutdown()
+
+        record = read_lines(tmp_path)[0]
+        assert record["name"] == "turn"
+        assert record["attributes"]["agent_key"] == "obama"
+        assert record["attributes"]["ttft"] == 0.2
+        assert record["attributes"]["hedged"] is True
@@ -0,0 +1,118 @@
+"""
+Test turn execution, cancellation and how the interactive loops present it.
+"""
+import asyncio
+import concurrent.futures
+import pytest
+import signal
+import sys
+import os
+import threading
+import time
+from unittest.mock import patch
+from io import StringIO
+
+# Add the src directory to the path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from agent.resilience import RunOutcome
+from agent.turns import run_turn, TurnResult
+from agent.obama import interactive_mode as obama_interactive, create_obama_agent
+from agent.pfeiffer import interactive_mode as pfeiffer_interactive
+
+
+def turn(output="answer", **kwargs):
+    return TurnResult(final_output=output, agent_name="Agent", source="model", elapsed=0.1, **kwargs)
+
+
+def press_ctrl_c(when: threading.Event, delay: float = 0.2):
+    """Send this process SIGINT shortly after ``when`` is set, like a user pressing Ctrl+C."""
+    def send():
+        if when.wait(5):
+            time.sleep(delay)
+            os.kill(os.getpid(), signal.SIGINT)
+    threading.Thread(target=send, daemon=True).start()
+
+
+class TestRunTurn:
+    """Test the blocking turn entry point."""
+
+    def test_ctrl_c_cancels_in_flight_run(self):
+        """Test that Ctrl+C cancels the scheduled run instead of propagating."""
+        started, cancelled = threading.Event(), threading.Event()
+
+        async def slow_run(*args, **kwargs):
+            started.set()
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        press_ctrl_c(started)
+        with patch('agent.resilience.ResilientRunner.run', side_effect=slow_run):
+            result = run_turn(create_obama_agent(), "question", "obama")
+        assert result.cancelled
+        assert result.final_output == ""
+        assert cancelled.wait(2)
+
+    def test_ctrl_c_while_waiting_for_prefetched_answer(self):
+        """Test that Ctrl+C also cancels a turn waiting on a prefetched answer."""
+        prefetched, waiting = concurrent.futures.Future(), threading.Event()
+
+        def take(*args):
+            waiting.set()
+            return prefetched
+
+        press_ctrl_c(waiting)
+        with patch('agent.turns.prefetcher.take', side_effect=take):
+            result = run_turn(create_obama_agent(), "And then?", "obama")
+        assert result.cancelled
+        for _ in range(100):
+            if prefetched.cancelled():
+                break
+            time.sleep(0.01)
+        assert prefetched.cancelled()
+
+    def test_outcome_is_wrapped(self):
+        """Test that a completed run becomes a TurnResult."""
+        outcome = RunOutcome(
+            final_output="partial", agent_name="Michelle Obama Knowledge Assistant",
+            source="deadline", timed_out=True,
+        )
+        with patch('agent.resilience.ResilientRunner.run', return_value=outcome):
+            result = run_turn(create_obama_agent(), "question", "obama")
+        assert result.timed_out
+        assert result.source == "deadline"
+        assert result.final_output == "partial"
+
+
+class TestInteractiveCancellation:
+    """Test that cancelled and cut-off turns keep the session alive."""
+
+    @patch('builtins.input', side_effect=['slow question', 'exit'])
+    @patch('sys.stdout', new_callable=StringIO)
+    def test_cancelled_turn_returns_to_prompt(self, mock_stdout, mock_input):
+        """Test that a cancelled turn goes back to the prompt instead of exiting."""
+        with patch('agent.obama.run_turn', return_value=turn("", cancelled=True)):
+            obama_interactive()
+        output = mock_stdout.getvalue()
+        assert "Stopped" in output
+        assert "Michelle Obama Expert:" not in output
+        assert mock_input.call_count == 2
+        assert "goodbye" in output.lower()
+
+    @patch('builtins.input', side_effect=['long question', 'exit'])
+    @patch('sys.stdout', new_callable=StringIO)
+    def test_deadline_shows_partial_answer(self, mock_stdout, mock_input):
+        """Test that a deadline hit shows the partial answer and a note."""
+        with patch('agent.pfeiffer.run_turn', return_value=turn("Ah, Batman Returns", timed_out=True)):
+            pfeiffer_interactive()
+        output = mock_stdout.getvalue()
+        assert "Ah, Batman Returns" in output
+        assert "turn deadline" in output
+
+
+if __name__ == "__main__":
+    # Run tests with pytest
+    pytest.main([__file__, "-v"])
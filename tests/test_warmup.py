@@ -0,0 +1,184 @@
+"""
+Test the response/routing caches and the background warm-up stage.
+"""
+import time
+import pytest
+import sys
+import os
+from unittest.mock import patch
+
+# Add the src directory to the path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from agent.cache import TTLCache, prompt_key, response_cache, routing_cache
+from agent.registry import get_agent, find_agent
+from agent.settings import CacheConfig, WarmupConfig, WarmupPrompt
+from agent.turns import run_turn
+from agent.warmup import Warmup
+
+
+class TestTTLCache:
+    """Test the bounded, expiring cache."""
+
+    def test_lru_and_ttl(self):
+        """Test eviction of the least recently used entry and expiry."""
+        now = [0.0]
+        cache = TTLCache(max_entries=2, ttl=10, clock=lambda: now[0])
+        cache.put("a", 1)
+        cache.put("b", 2)
+        assert cache.get("a") == 1
+        cache.put("c", 3)
+        assert cache.get("b") is None
+        now[0] = 11
+        assert cache.get("a") is None
+        assert cache.stats()["expired"] == 1
+
+    def test_warm_hits_counted(self):
+        """Test that hits on warmed entries are counted separately."""
+        cache = TTLCache()
+        cache.put("warm", 1, warm=True)
+        cache.put("cold", 2)
+        cache.get("warm")
+        cache.get("cold")
+        assert "warm" in cache
+        assert cache.stats()["warm_hits"] == 1
+        assert cache.hit_rate() == 1.0
+
+    def test_prompt_key_normalises(self):
+        """Test that case and spacing do not matter."""
+        assert prompt_key("michelle", "Tell me about  Batman Returns") == prompt_key("michelle", "tell me about batman returns")
+
+
+class TestRegistry:
+    """Test agent lookup by key and by name."""
+
+    def test_get_agent(self):
+        """Test that keys resolve to the project's agents."""
+        assert get_agent("michelle").name == "Michelle Pfeiffer"
+        assert get_agent("obama") is get_agent("obama")
+        with pytest.raises(KeyError):
+            get_agent("nobody")
+
+    def test_find_handoff_target(self):
+        """Test that handoff targets are found by name."""
+        michelle = get_agent("michelle")
+        assert find_agent(michelle, "Tim Burton").name == "Tim Burton"
+        assert find_agent(michelle, "Steven Spielberg") is None
+
+
+class TestTurnCaching:
+    """Test that turns use and fill the caches."""
+
+    def test_opening_question_served_from_cache(self, stub_config):
+        """Test that a repeated opening question skips the model."""
+        run_config = stub_config(answer_tokens=4)
+        model = run_config.model_provider.model
+        agent = get_agent("obama")
+        first = run_turn(agent, "What is Let's Move?", "obama", run_config=run_config)
+        second = run_turn(agent, "what is let's move?", "obama", run_config=run_config)
+        assert first.source == "model"
+        assert second.source == "cache"
+        assert second.final_output == first.final_output
+        assert model.calls == 1
+
+    def test_creative_answers_not_cached(self, stub_config):
+        """Test that agents outside response_agents always get a fresh answer."""
+        run_config = stub_config(answer_tokens=4)
+        model = run_config.model_provider.model
+        agent = get_agent("creative")
+        run_turn(agent, "Describe a sunset", "creative", run_config=run_config)
+        run_turn(agent, "Describe a sunset", "creative", run_config=run_config)
+        assert model.calls == 2
+
+    def test_known_route_skips_triage(self, stub_config):
+        """Test that a prompt routed before starts at the handoff target."""
+        from agent.sessions import SessionStore
+
+        run_config = stub_config(answer_tokens=4)
+        model = run_config.model_provider.model
+        michelle = get_agent("michelle")
+        first = run_turn(michelle, "Tell me about Batman Returns", "michelle", run_config=run_config)
+        assert first.agent_name == "Tim Burton"
+        assert model.calls == 2  # triage + Tim
+
+        # Mid-conversation the answer is not cached, but the route is
+        session = SessionStore().create("michelle")
+        session.append(1, "Hello")
+        again = run_turn(michelle, "Tell me about Batman Returns", "michelle", session=session, run_config=run_config)
+        assert again.source == "model"
+        assert again.agent_name == "Tim Burton"
+        assert model.calls == 3
+
+
+class TestWarmup:
+    """Test the background warm-up stage."""
+
+    @pytest.fixture
+    def make_warmup(self, stub_config):
+        def make(prompts, **config):
+            run_config = stub_config(answer_tokens=4)
+            warmup = Warmup(
+                WarmupConfig(prompts=[WarmupPrompt(agent=a, prompt=p) for a, p in prompts], **config),
+                CacheConfig(),
+                run_config=run_config,
+            )
+            return warmup, run_config.model_provider.model
+        return make
+
+    def test_warms_caches_then_serves_hits(self, make_warmup):
+        """Test that warmed prompts are answered from the cache."""
+        warmup, model = make_warmup([
+            ("michelle", "Tell me about Batman Returns"),
+            ("michelle", "What's your favorite acting technique?"),
+            ("obama", "What were Michelle Obama's major initiatives as First Lady?"),
+        ])
+        assert warmup.start(["michelle", "obama"]) is not None
+        assert warmup.wait(10)
+        assert warmup.done
+        assert warmup.stats()["warmed"] == 3
+        assert routing_cache.get(prompt_key("michelle", "Tell me about Batman Returns")) == "Tim Burton"
+
+        calls = model.calls
+        result = run_turn(get_agent("michelle"), "Tell me about Batman Returns", "michelle")
+        assert result.source == "cache"
+        assert result.agent_name == "Tim Burton"
+        assert model.calls == calls
+        assert response_cache.stats()["warm_hits"] == 1
+        assert "3/3 warm-up prompts done" in warmup.report()
+
+    def test_start_does_not_block(self, make_warmup):
+        """Test that start() returns while the prompts are still running."""
+        warmup, model = make_warmup([("obama", f"Question {i}") for i in range(4)], concurrency=1)
+        model.ttft = 0.1
+        started = time.perf_counter()
+        warmup.start()
+        assert time.perf_counter() - started < 0.05
+        assert not warmup.done
+        assert warmup.wait(10)
+        assert warmup.warmed == 4
+
+    def test_filters_agents_and_skips_cached(self, make_warmup):
+        """Test agent filtering and that already cached prompts are not rerun."""
+        warmup, model = make_warmup([("obama", "Who is she?"), ("michelle", "Hi there")])
+        response_cache.put(prompt_key("obama", "Who is she?"), ("cached", "Michelle Obama Knowledge Assistant"))
+        routing_cache.put(prompt_key("obama", "Who is she?"), "Michelle Obama Knowledge Assistant")
+        warmup.start(["obama"])
+        warmup.wait(10)
+        assert warmup.total == 1
+        assert warmup.skipped == 1
+        assert model.calls == 0
+
+    def test_failures_are_counted(self, make_warmup):
+        """Test that a failing prompt is reported, not raised."""
+        warmup, _ = make_warmup([("obama", "Boom")])
+        with patch('agent.resilience.ResilientRunner.run', side_effect=RuntimeError("down")):
+            warmup.start()
+            warmup.wait(10)
+        assert warmup.failed == 1
+        assert "1 failed" in warmup.progress()
+
+    def test_disabled(self, make_warmup):
+        """Test that a disabled warm-up never starts."""
+        warmup, _ = make_warmup([("obama", "Hi")], enabled=False)
+        assert warmup.start() is None
+        assert warmup.wait()
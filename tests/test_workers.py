@@ -0,0 +1,164 @@
+"""
+Test the CPU worker pool, shared-memory handoff and tokenisation helpers.
+"""
+import asyncio
+from multiprocessing import shared_memory
+from unittest.mock import patch
+
+import pytest
+import sys
+import os
+
+# Add the src directory to the path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from agent.personas import build_index
+from agent.settings import settings, WorkerConfig
+from agent.tokens import count_tokens, cosine_similarity, hash_vector, tokenize
+from agent.workers import SharedArray, WorkerPool, worker_pool, build_index_stage, vectorise_stage
+
+TEXTS = [
+    "Tell me about Batman Returns",
+    "What about The Age of Innocence?",
+    "How do you approach character development?",
+    "What's your favorite acting technique?",
+] * 5
+
+
+@pytest.fixture(scope="module")
+def pool():
+    """A small two-process pool that always goes through the workers."""
+    pool = WorkerPool(WorkerConfig(processes=2, chunk_size=4, inline_threshold=0))
+    yield pool
+    pool.shutdown()
+
+
+class TestTokens:
+    """Test the local tokenisation helpers."""
+
+    def test_tokenize_lowercases_words(self):
+        """Test that tokenize splits words and punctuation."""
+        assert tokenize("Batman Returns!") == ["batman", "returns", "!"]
+
+    def test_count_tokens_scales_with_length(self):
+        """Test that longer text has more tokens."""
+        assert count_tokens("") == 0
+        assert count_tokens("Hi") >= 1
+        assert count_tokens("Tell me about Batman Returns " * 10) > count_tokens("Tell me")
+
+    def test_hash_vector_is_deterministic(self):
+        """Test that hashed vectors are stable across calls and processes."""
+        assert list(hash_vector("Catwoman", 64)) == list(hash_vector("Catwoman", 64))
+
+    def test_similar_texts_are_closer(self):
+        """Test that cosine similarity ranks related questions higher."""
+        base = hash_vector("Tell me about Batman Returns")
+        related = hash_vector("tell me more about batman returns please")
+        unrelated = hash_vector("Which initiatives did the First Lady launch?")
+        assert cosine_similarity(base, related) > cosine_similarity(base, unrelated)
+
+
+class TestSharedArray:
+    """Test the shared-memory array handoff."""
+
+    def test_attach_sees_writes_without_copy(self):
+        """Test that writes through an attached handle are visible to the owner."""
+        with SharedArray.create(8, "f") as owner:
+            other = SharedArray.attach(owner.ref)
+            view = other.view()
+            view[3] = 2.5
+            view.release()
+            other.close()
+            view = owner.view()
+            assert view[3] == 2.5
+            view.release()
+
+    def test_vectorise_stage_writes_rows(self):
+        """Test that the vectorise stage fills the requested rows in place."""
+        with SharedArray.create(2 * 16, "f") as matrix:
+            vectorise_stage(["Batman", "Scorsese"], 16, matrix.ref, 0)
+            row = matrix.row(1, 16)
+            assert list(row) == pytest.approx(list(hash_vector("Scorsese", 16)))
+            row.release()
+
+
+class TestWorkerPool:
+    """Test running stages in worker processes."""
+
+    def test_worker_config_loaded(self):
+        """Test that the worker section is loaded from YAML."""
+        assert settings.worker_config.start_method == "spawn"
+        assert worker_pool.processes >= 1
+
+    def test_estimate_tokens_matches_inline(self, pool):
+        """Test that worker token counts match in-process counts."""
+        counts = asyncio.run(pool.estimate_tokens(TEXTS))
+        assert counts == [count_tokens(text) for text in TEXTS]
+
+    def test_vectorise_in_workers(self, pool):
+        """Test that workers write vectors into shared memory in order."""
+        dim = 32
+        matrix = asyncio.run(pool.vectorise(TEXTS, dim))
+        try:
+            for index in (0, 7, len(TEXTS) - 1):
+                row = matrix.row(index, dim)
+                assert list(row) == pytest.approx(list(hash_vector(TEXTS[index], dim)))
+                row.release()
+        finally:
+            matrix.close()
+
+    def test_build_index_groups_duplicates(self, pool):
+        """Test that identical texts get identical LSH signatures."""
+        dim = 32
+        matrix = asyncio.run(pool.vectorise(TEXTS, dim))
+        try:
+            signatures = asyncio.run(pool.build_index(matrix, dim, bits=12))
+        finally:
+            matrix.close()
+        assert len(signatures) == len(TEXTS)
+        assert signatures[0] == signatures[4]
+        assert signatures[1] == signatures[5]
+
+    def test_empty_input(self, pool):
+        """Test that no texts give an empty matrix and an empty index, inline and in workers."""
+        for runner in (pool, WorkerPool(WorkerConfig(processes=1))):
+            matrix = asyncio.run(runner.vectorise([], 32))
+            try:
+                assert matrix.length == 0
+                assert len(matrix.view()) == 0
+                assert asyncio.run(runner.build_index(matrix, 32)) == []
+                assert build_index_stage(matrix.ref, 32, 0, 0, 8) == []
+            finally:
+                matrix.close()
+
+    def test_failed_vectorise_frees_shared_memory(self):
+        """Test that the shared block is unlinked when a stage fails."""
+        created = []
+        original = SharedArray.create.__func__
+
+        def create(cls, length, typecode="f"):
+            created.append(original(cls, length, typecode))
+            return created[-1]
+
+        with patch.object(SharedArray, "create", classmethod(create)), \
+                patch("agent.workers.vectorise_stage", side_effect=RuntimeError("boom")):
+            with pytest.raises(RuntimeError):
+                asyncio.run(WorkerPool(WorkerConfig(processes=1)).vectorise(TEXTS, 16))
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=created[0].ref.name)
+
+    def test_persona_index_across_workers(self, pool):
+        """Test that the persona index built in worker processes matches the in-process build."""
+        directory = settings.persona_config.directory
+        assert build_index(directory, pool) == build_index(directory)
+
+    def test_small_jobs_run_inline(self):
+        """Test that jobs under the inline threshold never start processes."""
+        inline = WorkerPool(WorkerConfig(processes=2, inline_threshold=100))
+        assert asyncio.run(inline.estimate_tokens(["short text"])) == [count_tokens("short text")]
+        assert inline._executor is None
+
+
+if __name__ == "__main__":
+    # Run tests with pytest
+    pytest.main([__file__, "-v"])